@@ -33,7 +33,26 @@ echo "Copying files to device..."
 mpremote cp secrets.mpy :secrets.mpy
 
 # Copy files as source (easier to debug)
+mpremote cp ahttp.py :ahttp.py
+mpremote cp breaker.py :breaker.py
+mpremote cp source.py :source.py
 mpremote cp dexcom.py :dexcom.py
+mpremote cp followers.py :followers.py
+mpremote cp trend.py :trend.py
+mpremote cp alerts.py :alerts.py
+mpremote cp power.py :power.py
+mpremote cp wifi.py :wifi.py
+mpremote cp startup.py :startup.py
+mpremote cp ntp.py :ntp.py
+mpremote cp renderer.py :renderer.py
+mpremote cp buttons.py :buttons.py
+mpremote cp state.py :state.py
+mpremote cp glucose_log.py :glucose_log.py
+mpremote cp relay_client.py :relay_client.py
+mpremote cp nightscout.py :nightscout.py
+mpremote cp replay_source.py :replay_source.py
+mpremote cp ble_glucose.py :ble_glucose.py
+mpremote cp raster.py :raster.py
 mpremote cp display.py :display.py
 mpremote cp font.py :font.py
 mpremote cp main.py :main.py
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Alert timing test - check the low alert pulse keeps its frame rate during slow fetches
+
+Runs the replay harness on the synthetic trace (which dips below the low
+and urgent low thresholds several times a day) with every glucose fetch
+taking --fetch-delay seconds, plus --fetch-block seconds of synchronous
+work that stalls the event loop (TLS handshake, JSON parsing). Alert frame
+intervals are measured on the emulated display, overall and while a fetch
+is in flight.
+
+Exits non-zero if no alert frames were drawn, none were drawn while a
+fetch was pending, or any interval between alert frames goes over budget.
+
+Usage:
+    python host/alert_timing.py                         # 12 simulated hours
+    python host/alert_timing.py --fetch-delay 25 --fetch-block 0.04
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from replay import ReplayHarness, format_report
+
+DEFAULT_FETCH_DELAY = 10.0      # Seconds each fetch waits on the "network"
+DEFAULT_FETCH_BLOCK = 0.03      # Seconds of loop-blocking work per fetch
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check alert frame timing during slow glucose fetches")
+    parser.add_argument('--hours', type=float, default=12.0, help="Simulated duration (default: 12)")
+    parser.add_argument('--fetch-delay', type=float, default=DEFAULT_FETCH_DELAY,
+                        help=f"Seconds each fetch is pending (default: {DEFAULT_FETCH_DELAY})")
+    parser.add_argument('--fetch-block', type=float, default=DEFAULT_FETCH_BLOCK,
+                        help=f"Seconds each fetch blocks the event loop (default: {DEFAULT_FETCH_BLOCK})")
+    parser.add_argument('--budget-ms', type=float,
+                        help="Max interval between alert frames (default: 2 x ALERT_FRAME_MS)")
+    args = parser.parse_args()
+
+    harness = ReplayHarness(hours=args.hours, fetch_delay=args.fetch_delay)
+    harness.share.fetch_block = args.fetch_block
+    budget = (args.budget_ms or 2 * harness.alerts.ALERT_FRAME_MS) / 1000
+    report = harness.run()
+
+    for line in format_report(report):
+        print(line)
+
+    count, _, _, high = report['alert_intervals']
+    fetch_count, _, _, fetch_high = report['alert_fetch_intervals']
+    print(f"Alert frame budget: {budget * 1000:.0f}ms "
+          f"(frame period {harness.alerts.ALERT_FRAME_MS}ms)")
+
+    failed = False
+    if not count:
+        print("FAIL: no alert frames drawn - trace never went low?")
+        failed = True
+    elif not fetch_count:
+        print("FAIL: no alert frames drawn while a fetch was in flight")
+        failed = True
+    if max(high, fetch_high) > budget:
+        print(f"FAIL: alert frame interval {max(high, fetch_high) * 1000:.0f}ms over budget")
+        failed = True
+    if not failed:
+        print("PASS")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
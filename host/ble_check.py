@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+BLE glucose check - src/ble_glucose.py against the emulated bluetooth.BLE
+
+Three parts:
+- Encoding: packed readings unpack to the same timestamp, value, trend and
+  flags, GLUCOSE_SIZE bytes each; no reading packs to zeros.
+- Bookkeeping: notifications go to every connected central and only when
+  the packed reading changes; advertising restarts after each connect
+  (until MAX_CONNECTIONS) and disconnect; a central whose notification
+  fails is forgotten.
+- Device run: the device tasks through the replay harness with BLE on and
+  a central connected. Every reading is notified exactly once, and when
+  the network goes away the stale flag follows within
+  BLE_STALE_CHECK_SECONDS of the reading turning STALE_SECONDS old.
+
+Exits non-zero on any failure.
+
+Usage:
+    python host/ble_check.py
+    python host/ble_check.py --hours 12
+"""
+
+import argparse
+import os
+import struct
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from emulator import install
+
+OFFLINE_SECONDS = 1800          # Network gone for the end of the device run
+
+
+def check_encoding(ble_glucose, trend):
+    """
+    Round-trip readings through pack_reading
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    cases = [(1700000000, 123, "Flat", False, False), (1700000300, 39, "DoubleDown", True, False),
+             (1800000000, 401, "SingleUp", False, True), (1700000600, 250, None, True, True)]
+    buf = bytearray(ble_glucose.GLUCOSE_SIZE)
+    bad = []
+    for timestamp, value, name, stale, local in cases:
+        ble_glucose.pack_reading(buf, timestamp, value, name, stale, local)
+        t, v, index, flags = struct.unpack(ble_glucose.GLUCOSE_FORMAT, buf)
+        got = (t, v, trend.TRENDS[index], bool(flags & ble_glucose.FLAG_STALE), bool(flags & ble_glucose.FLAG_LOCAL))
+        if got != (timestamp, value, name, stale, local):
+            bad.append((timestamp, value, name, stale, local))
+    ble_glucose.pack_reading(buf, None, None, None)
+    ok = not bad and bytes(buf) == bytes(ble_glucose.GLUCOSE_SIZE)
+    ok = ok and struct.calcsize(ble_glucose.GLUCOSE_FORMAT) == ble_glucose.GLUCOSE_SIZE
+    lines = [f"Encoding:    {len(cases)} readings round-trip in {ble_glucose.GLUCOSE_SIZE} bytes each"]
+    if not ok:
+        lines.append(f"  readings that didn't round-trip (or no reading isn't zeros): {bad}")
+    return ok, lines
+
+
+def check_bookkeeping(ble_glucose, bluetooth):
+    """
+    Connect and disconnect centrals around repeated and changed readings
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    ok = True
+    lines = []
+    radio = bluetooth.BLE()
+    service = ble_glucose.BLEGlucose(accounts=2, ble=radio)
+
+    def expect(condition, message):
+        nonlocal ok
+        if not condition:
+            lines.append(f"  {message}")
+            ok = False
+
+    expect(radio.advertising and len(radio.advertised) == 1, "not advertising after start")
+    expect(len(radio.advertised[0][1]) <= 31 and len(radio.advertised[0][2]) <= 31,
+           "advertising or scan response data over 31 bytes")
+
+    radio.connect(64)
+    radio.connect(65)
+    expect(radio.advertising, "advertising not restarted after a connect")
+    reading = (1700000000, 120, "Flat")
+    changed = [service.update(0, *reading) for _ in range(5)]
+    expect(changed == [True, False, False, False, False], f"repeats reported as changes: {changed}")
+    expect(len(radio.notified) == 2, f"{len(radio.notified)} notifications for one reading to two centrals")
+    expect(radio.gatts_read(service.handles[0]) == service.values[0], "characteristic not written")
+
+    service.update(0, *reading, stale=True)
+    service.update(1, 1700000000, 200, "SingleUp")
+    expect(len(radio.notified) == 6, "stale flag or second account not notified")
+
+    for conn in range(66, 64 + ble_glucose.MAX_CONNECTIONS):
+        radio.connect(conn)
+    expect(len(service.connections) == ble_glucose.MAX_CONNECTIONS, "connections not all tracked")
+    expect(not radio.advertising, "still advertising with MAX_CONNECTIONS centrals connected")
+    radio.disconnect(65)
+    expect(radio.advertising and 65 not in service.connections, "disconnect not handled")
+
+    radio.lost.add(64)
+    notified = len(radio.notified)
+    service.update(0, 1700000300, 118, "Flat")
+    expect(64 not in service.connections, "central with failing notifications kept")
+    expect(len(radio.notified) - notified == len(service.connections), "notifications not sent to the others")
+
+    lines.append(f"Bookkeeping: {len(radio.notified)} notifications for 4 changes and 4 repeats, "
+                 f"{len(radio.advertised)} advertising starts, {len(service.connections)} centrals left")
+    return ok, lines
+
+
+def check_device(hours):
+    """
+    Run the device tasks with BLE on and a central connected
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    from replay import ReplayHarness
+    harness = ReplayHarness(hours=hours)
+    import ble_glucose
+    import bluetooth
+    import trend
+    radio = bluetooth.BLE()
+    harness.ble = ble_glucose.BLEGlucose(ble=radio)
+    radio.connect(64)
+    offline_at = hours * 3600 - OFFLINE_SECONDS
+    harness.share.link = lambda: harness.clock.monotonic() < offline_at
+    notified_at = []
+    write = radio.gatts_notify
+
+    def recording_notify(conn, handle, data=None):
+        notified_at.append(harness.clock.time())
+        write(conn, handle, data)
+
+    radio.gatts_notify = recording_notify
+    harness.run()
+
+    packets = [struct.unpack(ble_glucose.GLUCOSE_FORMAT, data) for _, _, data in radio.notified]
+    fresh = [p for p in packets if not p[3] & ble_glucose.FLAG_STALE]
+    stale = [(p, at) for p, at in zip(packets, notified_at) if p[3] & ble_glucose.FLAG_STALE]
+    end = harness.clock.time()
+    shown = sorted({harness.dexcom.parse_share_timestamp(r["WT"]) for r in harness.share.readings
+                    if harness.dexcom.parse_share_timestamp(r["WT"]) < end - OFFLINE_SECONDS})
+    times = [p[0] for p in fresh]
+    last = harness.client.glucose_time
+    ok = True
+    lines = [f"Device run:  {hours:.0f} h, {len(radio.notified)} notifications "
+             f"({len(radio.notified) * ble_glucose.GLUCOSE_SIZE} bytes) for {len(set(times))} readings"]
+    missing = [t for t in shown if t not in times and t >= times[0]] if times else shown
+    if not times or len(times) != len(set(times)) or missing:
+        lines.append(f"  readings notified more than once or missed ({len(missing)} missed)")
+        ok = False
+    if fresh and (fresh[-1][1], trend.TRENDS[fresh[-1][2]]) != (harness.client.get_glucose_value(),
+                                                                   harness.client.get_glucose_trend()):
+        lines.append("  last notification doesn't match the display's reading")
+        ok = False
+    main = harness.main
+    if len(stale) != 1:
+        lines.append(f"  {len(stale)} stale notifications, expected 1")
+        ok = False
+    else:
+        late = stale[0][1] - (last + main.STALE_SECONDS)
+        lines.append(f"Stale:       flagged {late:.0f} s after the reading turned "
+                     f"{main.STALE_SECONDS // 60} min old (bound {main.BLE_STALE_CHECK_SECONDS} s)")
+        if not 0 <= late <= main.BLE_STALE_CHECK_SECONDS or stale[0][0][0] != last:
+            ok = False
+    return ok, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the BLE glucose service against an emulated radio")
+    parser.add_argument('--hours', type=float, default=6.0, help="Virtual hours for the device run (default: 6)")
+    args = parser.parse_args()
+
+    install()
+    import ble_glucose
+    import bluetooth
+    import trend
+
+    ok = True
+    for part_ok, lines in (check_encoding(ble_glucose, trend), check_bookkeeping(ble_glucose, bluetooth),
+                           check_device(args.hours)):
+        for line in lines:
+            print(line)
+        ok = ok and part_ok
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Boot pipeline check - power-on to first reading on a fake clock
+
+Boots the real device tasks through the replay harness with the digit test
+on, an emulated WLAN that takes --wifi seconds to associate, an NTP server
+that answers in --ntp seconds and Share requests that take --auth / --fetch
+seconds each, then reads back the device's boot timeline.
+
+The boot steps used to run one after the other (digit test, then NTP, then
+authentication, login and the first fetch). Checks that the first reading
+now reaches the screen within the critical path (WiFi, then the slower of
+NTP and authentication, then the fetch) and well ahead of that sequential
+boot, that the steps respect their dependencies, that the digit test gives
+way to the first reading and that the display never stalls while booting.
+
+Exits non-zero on any failure.
+
+Usage:
+    python host/boot_check.py
+    python host/boot_check.py --wifi 6 --auth 1.5
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from replay import ReplayHarness
+from emulator import bind_clock
+
+BOOT_SECONDS = 60               # Simulated run length (boot plus a little steady state)
+SLACK = 0.3                     # Seconds allowed on top of the critical path (status polls, redraw)
+DIGIT_TEST_SECONDS = 10         # Full digit test run (see main.run_digit_test)
+MAX_FRAME_GAP = 1.1             # Seconds - display must keep its 1 s timer updates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the boot pipeline against a fake clock")
+    parser.add_argument('--wifi', type=float, default=4.0, help="Seconds to associate (default: 4)")
+    parser.add_argument('--ntp', type=float, default=0.5, help="NTP round trip in seconds (default: 0.5)")
+    parser.add_argument('--auth', type=float, default=0.8,
+                        help="Seconds per authentication/login request (default: 0.8)")
+    parser.add_argument('--fetch', type=float, default=0.6, help="Seconds per glucose fetch (default: 0.6)")
+    args = parser.parse_args()
+
+    harness = ReplayHarness(hours=BOOT_SECONDS / 3600, fetch_delay=args.fetch)
+    harness.share.auth_delay = args.auth
+    clock = harness.clock
+    network = sys.modules['network']
+    import wifi as wifi_module
+    import startup
+    bind_clock(clock, wifi_module)
+    harness.ntp_server.delay = args.ntp
+
+    wlan = network.WLAN(network.STA_IF)
+    wlan.connect_polls = int(args.wifi * 1000 / wifi_module.CONNECT_POLL_MS)
+    harness.wifi = wifi_module.WifiSupervisor(wlan, "home", "secret")
+    harness.wifi.start_connect()
+    harness.self_test = True
+    harness.boot = startup.BootTimeline()
+    harness.boot.mark("display")
+    report = harness.run()
+
+    boot = harness.boot
+    print("BOOT TIMELINE")
+    for name, ms in boot.steps:
+        print(f"  {name:<20} {ms / 1000:6.2f}s")
+
+    failed = []
+    at = {name: boot.elapsed(name) for name in
+          ("wifi", "ntp", "auth", "self-test", "first fetch", "first reading shown")}
+    missing = [name for name, ms in at.items() if ms is None]
+    if missing:
+        failed.append(f"boot steps never finished: {', '.join(missing)}")
+    else:
+        at = {name: ms / 1000 for name, ms in at.items()}
+        sequential = max(DIGIT_TEST_SECONDS, args.wifi) + args.ntp + 2 * args.auth + args.fetch
+        critical = at["wifi"] + max(args.ntp, 2 * args.auth) + args.fetch
+        first = at["first reading shown"]
+        print(f"First reading:  {first:.2f}s (critical path {critical:.2f}s, sequential boot {sequential:.2f}s)")
+
+        if first > critical + SLACK:
+            failed.append(f"first reading at {first:.2f}s, critical path is {critical:.2f}s")
+        if first >= sequential:
+            failed.append("boot is no faster than running the steps one after the other")
+        for step in ("ntp", "auth"):
+            if at[step] < at["wifi"]:
+                failed.append(f"{step} finished before WiFi was up")
+        if at["first fetch"] < max(at["ntp"], at["auth"]):
+            failed.append("first fetch ran before NTP and authentication were done")
+        if at["self-test"] > first:
+            failed.append("digit test held back the first reading")
+    if not harness.ntp.clock.synced:
+        failed.append("clock never synced over NTP")
+    if harness.share.auth_requests != 2:
+        failed.append(f"{harness.share.auth_requests} auth requests (expected authenticate + login once)")
+    if report['frame_intervals'][3] > MAX_FRAME_GAP:
+        failed.append(f"display stalled for {report['frame_intervals'][3]:.2f}s while booting")
+
+    for message in failed:
+        print(f"FAIL: {message}")
+    if not failed:
+        print("PASS")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
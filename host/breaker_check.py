@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker check - src/breaker.py and DexcomClient against injected Share faults
+
+Two parts:
+- State machine: CircuitBreaker on a virtual clock. FAILURE_THRESHOLD
+  failures open it, the open period doubles (with at most
+  BACKOFF_JITTER_PCT jitter) up to its cap, exactly one probe goes out
+  when it ends, only a successful read closes it, and a single rejected
+  login opens it for AUTH_BACKOFF_SECONDS.
+- Device runs: the device tasks through the replay harness, with the
+  replay Share transport answering errors for a while (ShareReplay.fault):
+  - down:   every request gets a plain 500 for two hours
+  - auth:   the session expires and every login is rejected for an hour
+  - expire: one read answers SessionIdNotFound
+  Checks that requests during an outage stay within what the backoff
+  schedule allows (no re-authenticating on plain 500s), that the display's
+  error indicator shows the right level while the circuit is open and
+  clears when it closes, that fetching resumes within one open period of
+  Share coming back, and that a lone expired session costs one login
+  without opening the circuit.
+
+Exits non-zero on any failure.
+
+Usage:
+    python host/breaker_check.py
+    python host/breaker_check.py --seed 4
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from emulator import VirtualClock, install, bind_clock
+
+FAULT_START = 3600              # Seconds into each device run the fault starts
+SAMPLE_SECONDS = 5              # Indicator / reading sample period
+SCENARIOS = {                   # Fault -> (seconds it lasts, run hours)
+    'down': (7200, 4.5),
+    'auth': (3600, 4.5),
+    'expire': (None, 2.0),
+}
+
+
+def check_state_machine(breaker):
+    """
+    Drive a CircuitBreaker through failures, probes and recovery
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    clock = VirtualClock()
+    bind_clock(clock, breaker)
+    ok = True
+    lines = []
+
+    def expect(condition, message):
+        nonlocal ok
+        if not condition:
+            lines.append(f"  {message}")
+            ok = False
+
+    b = breaker.CircuitBreaker()
+    for _ in range(breaker.FAILURE_THRESHOLD - 1):
+        b.failure(breaker.ENDPOINT_READ)
+    expect(b.state == breaker.CLOSED and b.allow(), "opened before FAILURE_THRESHOLD failures")
+    b.failure(breaker.ENDPOINT_AUTH)
+    expect(b.state == breaker.CLOSED, "failures on different endpoints added up")
+    b.failure(breaker.ENDPOINT_READ)
+    expect(b.state == breaker.OPEN and not b.allow(), "not open after FAILURE_THRESHOLD failures")
+    expect(b.error_level() == breaker.SOURCE_BACKOFF, "server errors not shown as backing off")
+
+    # Open periods double up to the cap, jitter stays within BACKOFF_JITTER_PCT
+    periods = []
+    for _ in range(8):
+        wait = b.open_ms / 1000
+        periods.append((b.backoff, wait))
+        clock.advance(wait - 1)
+        expect(not b.allow(), "probe allowed before the open period ended")
+        clock.advance(1.001)
+        expect(b.allow(), "no probe after the open period")
+        expect(b.state == breaker.HALF_OPEN and not b.allow(), "more than one probe let through")
+        b.success(breaker.ENDPOINT_AUTH)
+        expect(b.state == breaker.HALF_OPEN, "a successful login closed the circuit")
+        b.failure(breaker.ENDPOINT_READ)
+    backoffs = [p[0] for p in periods]
+    expected = [min(breaker.BACKOFF_MIN_SECONDS << i, breaker.BACKOFF_MAX_SECONDS) for i in range(len(periods))]
+    expect(backoffs == expected, f"open periods {backoffs}, expected {expected}")
+    expect(all(backoff <= wait <= backoff * (100 + breaker.BACKOFF_JITTER_PCT) / 100 for backoff, wait in periods),
+           "jitter outside BACKOFF_JITTER_PCT")
+
+    # A lost probe is given up after PROBE_TIMEOUT_SECONDS
+    clock.advance(b.open_ms / 1000 + 0.001)
+    b.allow()
+    clock.advance(breaker.PROBE_TIMEOUT_SECONDS)
+    expect(b.allow(), "lost probe never given up")
+    b.success(breaker.ENDPOINT_READ)
+    expect(b.state == breaker.CLOSED and b.backoff == 0 and b.error_level() == breaker.SOURCE_OK,
+           "successful read didn't close the circuit")
+
+    # Rejected credentials open it at once
+    b.failure(breaker.ENDPOINT_AUTH, breaker.FAIL_AUTH)
+    expect(b.state == breaker.OPEN and b.backoff == breaker.AUTH_BACKOFF_SECONDS,
+           "rejected credentials didn't open the circuit for AUTH_BACKOFF_SECONDS")
+    expect(b.error_level() == breaker.SOURCE_AUTH, "rejected credentials not shown as such")
+
+    lines.insert(0, f"State machine: {b.trips} trips, open periods "
+                    f"{', '.join(f'{wait:.0f}' for _, wait in periods)} s")
+    return ok, lines
+
+
+def run(kind, seed):
+    """
+    Run the device tasks with one fault scenario
+
+    Returns:
+        dict: requests [(monotonic, endpoint)], samples [(monotonic,
+            indicator level, reading timestamp)], fault window, harness
+    """
+    from replay import ReplayHarness
+    seconds, hours = SCENARIOS[kind]
+    random.seed(seed)
+    harness = ReplayHarness(hours=hours)
+    clock = harness.clock
+    end = FAULT_START + (seconds or 0)
+    expired = []
+
+    def fault(url):
+        now = clock.monotonic()
+        if kind == 'expire':
+            if now >= FAULT_START and not expired and "ReadPublisher" in url:
+                expired.append(now)
+                return 500, '{"Code": "SessionIdNotFound"}'
+            return None
+        if not FAULT_START <= now < end:
+            return None
+        if kind == 'down':
+            return 500, '{"Code": "InternalError"}'
+        if "ReadPublisher" in url:
+            return 500, '{"Code": "SessionIdNotFound"}'
+        return 500, '{"Code": "AccountPasswordInvalid"}'
+
+    requests = []
+    post = harness.share.apost
+
+    async def logging_post(url, payload=None, headers=None, timeout=None):
+        endpoint = "read" if "ReadPublisher" in url else "login" if "Login" in url else "auth"
+        requests.append((clock.monotonic(), endpoint))
+        return await post(url, payload, headers, timeout)
+
+    harness.share.fault = fault
+    harness.dexcom.ahttp = types.SimpleNamespace(post=logging_post)
+    samples = []
+
+    async def sampler(h):
+        while True:
+            samples.append((clock.monotonic(), h.disp.source_error, h.client.glucose_time))
+            await asyncio.sleep(SAMPLE_SECONDS)
+
+    harness.run(monitors=(sampler,))
+    return {'requests': requests, 'samples': samples, 'start': FAULT_START, 'end': end,
+            'expired': expired, 'harness': harness}
+
+
+def max_requests(seconds, low, high, threshold):
+    """Most fetch attempts the backoff schedule allows in `seconds` (no jitter: shortest periods)"""
+    attempts = threshold
+    elapsed = 0
+    backoff = low
+    while elapsed + backoff <= seconds:
+        elapsed += backoff
+        attempts += 1
+        backoff = min(backoff * 2, high)
+    return attempts
+
+
+def check_outage(kind, result, breaker, device):
+    """
+    Score a down or auth run
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    start, end = result['start'], result['end']
+    during = [(at, endpoint) for at, endpoint in result['requests'] if start <= at < end]
+    auth = [at for at, endpoint in during if endpoint == "auth"]
+    reads = [at for at, endpoint in during if endpoint == "read"]
+    if kind == 'down':
+        level = breaker.SOURCE_BACKOFF
+        budget = max_requests(end - start, breaker.BACKOFF_MIN_SECONDS, breaker.BACKOFF_MAX_SECONDS,
+                              breaker.FAILURE_THRESHOLD)
+        made = len(reads)
+        cap = breaker.BACKOFF_MAX_SECONDS
+    else:
+        level = breaker.SOURCE_AUTH
+        budget = max_requests(end - start, breaker.AUTH_BACKOFF_SECONDS, breaker.AUTH_BACKOFF_MAX_SECONDS, 1)
+        made = len(auth)
+        cap = breaker.AUTH_BACKOFF_MAX_SECONDS
+    unprotected = 3 * (end - start) / device.DEXCOM_UPDATE_INTERVAL
+    hours = (end - start) / 3600
+    ok = True
+    lines = [f"{kind + ':':<8}{len(during)} requests in {hours:.0f} h ({len(reads)} reads, {len(auth)} logins; "
+             f"budget {budget} {'reads' if kind == 'down' else 'logins'}, unprotected up to {unprotected:.0f})"]
+    if made > budget:
+        lines.append("  more attempts than the backoff schedule allows")
+        ok = False
+    if kind == 'down' and auth:
+        lines.append("  logged in again on plain server errors")
+        ok = False
+    if kind == 'auth' and len(reads) > 1:
+        lines.append(f"  {len(reads)} reads without a session")
+        ok = False
+
+    # Indicator: set from the first failed attempt's open period to the end of the fault
+    opened = reads[breaker.FAILURE_THRESHOLD - 1] if kind == 'down' else auth[0]
+    shown = [lvl for at, lvl, _ in result['samples'] if opened + 2 * SAMPLE_SECONDS <= at < end]
+    wrong = [lvl for lvl in shown if lvl != level]
+    if not shown or wrong:
+        lines.append(f"  indicator wrong in {len(wrong)} of {len(shown)} samples while open")
+        ok = False
+
+    # Recovery: next reading within one open period (capped, with jitter) of the fault ending
+    newest = max((t for at, _, t in result['samples'] if at < end and t is not None), default=None)
+    resumed = next((at for at, lvl, t in result['samples'] if at >= end and t != newest), None)
+    cleared = next((at for at, lvl, t in result['samples'] if at >= end and lvl == breaker.SOURCE_OK), None)
+    bound = cap * (100 + breaker.BACKOFF_JITTER_PCT) / 100 + device.READING_INTERVAL
+    if resumed is None or resumed - end > bound or cleared is None:
+        lines.append(f"  fetching didn't resume within {bound:.0f} s of the fault ending")
+        ok = False
+    else:
+        lines.append(f"        resumed {resumed - end:.0f} s after Share came back, indicator cleared "
+                     f"{cleared - end:.0f} s after")
+    if result['samples'][-1][1] != breaker.SOURCE_OK:
+        lines.append("  indicator still set at the end")
+        ok = False
+    return ok, lines
+
+
+def check_expire(result, breaker):
+    """
+    Score the expire run
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    expired = result['expired']
+    client = result['harness'].client
+    after = [endpoint for at, endpoint in result['requests'] if expired and at >= expired[0]]
+    logins = after.count("auth") + after.count("login")
+    ok = bool(expired) and logins == 2 and client.breaker.trips == 0
+    lines = [f"expire: {logins} login requests after the session expired, {client.breaker.trips} trips"]
+    levels = {lvl for _, lvl, _ in result['samples']}
+    if levels != {breaker.SOURCE_OK}:
+        lines.append("  indicator set for an expired session")
+        ok = False
+    if not ok:
+        lines.append("  an expired session should cost one authenticate and one login")
+    return ok, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the circuit breaker against injected Share faults")
+    parser.add_argument('--seed', type=int, default=1, help="Backoff jitter seed (default: 1)")
+    args = parser.parse_args()
+
+    install()
+    import breaker
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        ok, lines = check_state_machine(breaker)
+    for line in lines:
+        print(line)
+    import main as device
+    for kind in SCENARIOS:
+        result = run(kind, args.seed)
+        if kind == 'expire':
+            part_ok, lines = check_expire(result, breaker)
+        else:
+            part_ok, lines = check_outage(kind, result, breaker, device)
+        for line in lines:
+            print(line)
+        ok = ok and part_ok
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
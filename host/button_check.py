@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Button check - IRQ edge capture and decoding on emulated pins
+
+Two parts, on a fake clock:
+- Decoder: injects edge sequences on emulated machine.Pin inputs into a
+  src/buttons.py ButtonReader and checks the events decoded from them -
+  a clean press, contact bounce on press and release, a tap shorter than
+  the debounce time, a long hold with repeats, a press made while the
+  consumer wasn't running, and edges beyond the ring's capacity.
+- Task: runs the real device tasks through the replay harness and presses
+  the LUX buttons from a monitor: three taps while the event loop is
+  blocked (as in a blocking socket call), a held button, a bouncy press,
+  then nothing for a minute. Every tap must change the brightness once,
+  holding must repeat, and the button task must not wake while idle.
+
+Exits non-zero on any failure.
+
+Usage:
+    python host/button_check.py
+    python host/button_check.py --block 5
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from emulator import VirtualClock, install, bind_clock
+from replay import ReplayHarness
+
+MIDDAY_UTC = 1700049600         # 2023-11-15 12:00 UTC (day profile, full brightness range)
+IDLE_SECONDS = 60               # Idle stretch the button task must sleep through
+MAX_IDLE_WAKEUPS = 2            # Button task wake-ups allowed while idle
+POLL_MS = 50                    # The old gu.is_pressed() poll period
+
+
+class EventLog:
+    """Collects (ms, button, event name) from ButtonReader.poll callbacks"""
+
+    def __init__(self, clock, buttons):
+        self.clock = clock
+        self.buttons = buttons
+        self.events = []
+
+    def __call__(self, button, event):
+        self.events.append((round(self.clock.elapsed * 1000), button, self.buttons.EVENT_NAMES[event]))
+
+    def names(self):
+        return [name for _, _, name in self.events]
+
+    def poll(self, reader, until_ms):
+        """Poll like main.button_checker would, up to until_ms of virtual time"""
+        while self.clock.elapsed * 1000 < until_ms:
+            wait = reader.poll(self.clock.ticks_ms(), self)
+            if wait < 0:
+                break
+            self.clock.advance(min(wait, POLL_MS, until_ms - self.clock.elapsed * 1000) / 1000)
+
+
+def check_decoder(buttons):
+    """
+    Decode injected edge sequences
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    ok = True
+    lines = []
+    repeats = (1500 - buttons.LONG_PRESS_MS) // buttons.REPEAT_MS
+
+    def scenario(name, edges, expected, run_ms=None):
+        """edges: (ms, level) on button 0; expected: event names in order"""
+        nonlocal ok
+        clock = VirtualClock()
+        bind_clock(clock, buttons)
+        reader = buttons.ButtonReader((21, 26))
+        log = EventLog(clock, buttons)
+        pin = reader.pins[0]
+        for at, level in edges:
+            log.poll(reader, at)
+            clock.advance(max(0, at - clock.elapsed * 1000) / 1000)
+            pin.inject(level)
+        log.poll(reader, run_ms or edges[-1][0] + 1000)
+        got = log.names()
+        passed = got == expected
+        lines.append(f"{name:<22} {pin.edges:>3} edges -> {', '.join(got) or 'nothing'}")
+        if not passed:
+            lines.append(f"  expected {', '.join(expected)}")
+            ok = False
+        return reader, log
+
+    scenario("Clean press", [(100, 0), (300, 1)], ["press", "release"])
+    scenario("Bouncy press", [(100, 0), (101, 1), (103, 0), (104, 1), (106, 0),
+                              (300, 1), (302, 0), (303, 1), (307, 0), (309, 1)], ["press", "release"])
+    scenario("Tap under debounce", [(100, 0), (100 + buttons.DEBOUNCE_MS // 2, 1)], ["press", "release"])
+    reader, log = scenario("Hold 1.5s", [(100, 0), (1600, 1)],
+                           ["press", "long press"] + ["repeat"] * repeats + ["release"])
+    times = [at for at, _, name in log.events if name in ("long press", "repeat")]
+    if times and times[0] != 100 + buttons.LONG_PRESS_MS:
+        lines.append(f"  long press at {times[0]} ms, expected {100 + buttons.LONG_PRESS_MS}")
+        ok = False
+
+    # Nobody polls while edges come in (consumer blocked); all decoded afterwards
+    clock = VirtualClock()
+    bind_clock(clock, buttons)
+    reader = buttons.ButtonReader((21, 26))
+    log = EventLog(clock, buttons)
+    for n in range(3):
+        clock.advance(0.2)
+        reader.pins[n % 2].press()
+        clock.advance(0.03)
+        reader.pins[n % 2].release()
+    clock.advance(1.0)
+    log.poll(reader, clock.elapsed * 1000 + 100)
+    got = [(button, name) for _, button, name in log.events]
+    expected = [(0, "press"), (0, "release"), (1, "press"), (1, "release"), (0, "press"), (0, "release")]
+    presses = sum(1 for _, name in got if name == "press")
+    lines.append(f"{'Taps while blocked':<22}   6 edges -> {len(got)} events, {presses} presses")
+    if got != expected:
+        lines.append(f"  got {got}")
+        ok = False
+
+    # More edges than the ring holds: the excess is counted, not corrupted
+    clock = VirtualClock()
+    bind_clock(clock, buttons)
+    reader = buttons.ButtonReader((21, 26))
+    log = EventLog(clock, buttons)
+    edges = buttons.EDGE_QUEUE_SIZE * 2
+    for n in range(edges):
+        clock.advance(0.05)
+        reader.pins[0].inject(n % 2)
+    kept = edges - reader.overflows
+    log.poll(reader, clock.elapsed * 1000 + 1000)
+    presses = log.names().count("press")
+    lines.append(f"{'Ring overflow':<22} {edges:>3} edges -> {kept} kept, {reader.overflows} overwritten, "
+                 f"{presses} presses, ends {'held' if reader.down[0] else 'released'}")
+    if kept != buttons.EDGE_QUEUE_SIZE - 1 or presses != kept // 2 or reader.down[0]:
+        lines.append("  ring buffer lost the final level or duplicated edges")
+        ok = False
+    return ok, lines
+
+
+def check_task(buttons_module, block):
+    """
+    Press the LUX buttons at the running device
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    harness = ReplayHarness(hours=(block + IDLE_SECONDS + 30) / 3600, start_epoch=MIDDAY_UTC)
+    clock = harness.clock
+    gu = harness.gu
+    buttons = harness.buttons
+    up, down = buttons.pins
+    step = harness.main.BRIGHTNESS_STEP
+
+    polls = []
+    poll = buttons.poll
+
+    def counting_poll(now, on_event):
+        polls.append(clock.elapsed)
+        return poll(now, on_event)
+
+    buttons.poll = counting_poll
+    results = {}
+
+    async def presser(h):
+        await asyncio.sleep(5)
+        start = gu.get_brightness()
+
+        # Event loop blocked: three quick taps on LUX + go in meanwhile
+        clock.advance(block / 4)
+        for _ in range(3):
+            up.press()
+            clock.advance(0.04)
+            up.release()
+            clock.advance(block / 4 - 0.04)
+        await asyncio.sleep(0.1)
+        results['blocked'] = (start, gu.get_brightness())
+
+        # Hold LUX - for 1.1 s: press, long press, repeats
+        start = gu.get_brightness()
+        down.press()
+        await asyncio.sleep(1.1)
+        down.release()
+        await asyncio.sleep(0.1)
+        results['hold'] = (start, gu.get_brightness())
+
+        # One bouncy press on LUX +
+        start = gu.get_brightness()
+        for level in (0, 1, 0, 1, 0):
+            up.inject(level)
+            clock.advance(0.002)
+        await asyncio.sleep(0.2)
+        up.release()
+        await asyncio.sleep(0.2)
+        results['bounce'] = (start, gu.get_brightness())
+
+        # Idle
+        results['idle_start'] = clock.elapsed
+        await asyncio.sleep(IDLE_SECONDS)
+        results['idle_end'] = clock.elapsed
+
+    harness.run(monitors=(presser,))
+
+    ok = True
+    lines = []
+    holds = 2 + (1100 - buttons_module.LONG_PRESS_MS) // buttons_module.REPEAT_MS
+
+    def steps(key):
+        before, after = results[key]
+        return round((after - before) / step)
+
+    def expect(key, label, wanted):
+        nonlocal ok
+        if key not in results:
+            lines.append(f"{label}: never ran")
+            ok = False
+            return
+        got = steps(key)
+        before, after = results[key]
+        lines.append(f"{label:<32} {before:.1f} -> {after:.1f} ({got:+d} steps, expected {wanted:+d})")
+        if got != wanted:
+            ok = False
+
+    expect('blocked', f"3 taps, loop blocked {block:.1f}s", 3)
+    expect('hold', "LUX - held 1.1s", -holds)
+    expect('bounce', "Bouncy press", 1)
+
+    if 'idle_end' in results:
+        idle = [t for t in polls if results['idle_start'] + 0.5 <= t < results['idle_end']]
+        polled = int(IDLE_SECONDS * 1000 / POLL_MS)
+        lines.append(f"Idle {IDLE_SECONDS}s: {len(idle)} button task wake-ups (was {polled} at {POLL_MS} ms polling)")
+        if len(idle) > MAX_IDLE_WAKEUPS:
+            lines.append("Button task keeps waking while idle")
+            ok = False
+    if buttons.overflows:
+        lines.append(f"{buttons.overflows} edges overwritten")
+        ok = False
+    return ok, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check IRQ button capture against emulated pins")
+    parser.add_argument('--block', type=float, default=2.0,
+                        help="Seconds the event loop is blocked while buttons are tapped (default: 2)")
+    args = parser.parse_args()
+
+    install()
+    import buttons
+
+    print("DECODER")
+    decoder_ok, lines = check_decoder(buttons)
+    for line in lines:
+        print(f"  {line}")
+
+    print("TASK")
+    task_ok, lines = check_task(buttons, args.block)
+    for line in lines:
+        print(f"  {line}")
+
+    ok = decoder_ok and task_ok
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Dual-core render check - FrameSlot handoff and core 1 render loop on threads
+
+Two parts, on real time with Python threads standing in for the cores:
+- Slot: a producer thread posts snapshots whose fields all derive from one
+  counter while the main thread reads them back as fast as it can. Every
+  copy FrameSlot.read() accepts must be consistent (no torn snapshots);
+  the same copies made without the sequence check are counted as well,
+  to show the race is really being exercised.
+- Render: src/renderer.py's Renderer runs the emulated display on a thread
+  while the main thread ("core 0") posts a low reading and then stalls -
+  blocked as in a network call, and busy as in a GC pass. The alert must
+  keep pulsing at its frame rate throughout, and a new snapshot must be on
+  screen within SLOT_POLL_MS once the stall ends.
+
+Exits non-zero on any failure.
+
+Usage:
+    python host/dual_core_check.py
+    python host/dual_core_check.py --stall 3 --posts 500000
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from array import array
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from emulator import GalacticUnicorn, PicoGraphics, RealClock, install, bind_clock
+
+MAX_ALERT_GAP_MS = 120          # Alert frame period is 50 ms; allow host scheduling jitter
+PICKUP_MARGIN_MS = 100          # On top of SLOT_POLL_MS for a new snapshot to be drawn
+
+
+def check_slot(renderer, posts):
+    """
+    Hammer a FrameSlot from a producer thread
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    slot = renderer.FrameSlot()
+    done = threading.Event()
+
+    def producer():
+        for n in range(1, posts + 1):
+            k = n % 100000
+            slot.post(k, renderer.TRENDS[k % 9 + 1], k & 1, -k, 2 * k, 3 * k, k % 100, k % 4, k % 5, 5)
+        done.set()
+
+    def consistent(data):
+        k = data[renderer.FIELD_VALUE]
+        return (data[renderer.FIELD_TREND] == k % 9 + 1 and data[renderer.FIELD_LOCAL] == k & 1
+                and data[renderer.FIELD_DELTA] == -k and data[renderer.FIELD_CHANGE] == 2 * k
+                and data[renderer.FIELD_TICKS] == 3 * k and data[renderer.FIELD_BRIGHTNESS] == k % 100
+                and data[renderer.FIELD_ALERT] == k % 4 and data[renderer.FIELD_ACCOUNT] == k % 5)
+
+    snapshot = array('i', [0] * renderer.SLOT_SIZE)
+    raw = array('i', [0] * renderer.SLOT_SIZE)
+    accepted = torn = raw_torn = 0
+    last_seq = slot.seq
+    thread = threading.Thread(target=producer)
+    switch = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)     # Interleave the threads as often as possible
+    try:
+        thread.start()
+        while not done.is_set():
+            for i in range(renderer.SLOT_SIZE):
+                raw[i] = slot.data[i]
+            if not consistent(raw):
+                raw_torn += 1
+            seq = slot.read(snapshot, last_seq)
+            if seq != last_seq:
+                last_seq = seq
+                accepted += 1
+                if not consistent(snapshot):
+                    torn += 1
+        thread.join()
+    finally:
+        sys.setswitchinterval(switch)
+
+    lines = [f"Slot:   {posts} posts, {accepted} snapshots read, {torn} torn "
+             f"({raw_torn} torn copies without the sequence check)"]
+    ok = torn == 0 and accepted > 0
+    if torn:
+        lines.append("FrameSlot.read returned torn snapshots")
+    if not accepted:
+        lines.append("No snapshots read")
+    return ok, lines
+
+
+def check_render(renderer, stall):
+    """
+    Stall the posting thread while the renderer draws a pulsing low alert
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    import alerts
+    import display as display_module
+    gu = GalacticUnicorn()
+    display = display_module.Display(gu, PicoGraphics())
+
+    frames = []
+    gu.on_update = lambda g: frames.append(time.monotonic())
+    render = renderer.Renderer(gu, display)
+    render.start()
+
+    clock = renderer.time
+    lines = []
+    ok = True
+    try:
+        render.slot.post(62, "SingleDown", False, -4, -12, clock.ticks_ms(), 60, alerts.ALERT_LOW, 0, 1)
+        time.sleep(0.5)
+
+        # Core 0 stalls: blocked on I/O, then busy (GC pass, TLS handshake)
+        gaps = {}
+        for kind in ("blocked", "busy"):
+            start = time.monotonic()
+            if kind == "blocked":
+                time.sleep(stall)
+            else:
+                while time.monotonic() - start < stall:
+                    pass
+            during = [t for t in frames if start <= t <= start + stall]
+            gaps[kind] = max(b - a for a, b in zip(during, during[1:])) * 1000 if len(during) > 1 else None
+            lines.append(f"Render: core 0 {kind} {stall:.1f}s - {len(during)} frames, "
+                         f"max gap {gaps[kind] or 0:.0f} ms")
+            if gaps[kind] is None or gaps[kind] > MAX_ALERT_GAP_MS:
+                lines.append(f"LEDs froze while core 0 was {kind}")
+                ok = False
+
+        # A new snapshot after the stall shows up promptly
+        render.slot.post(142, "Flat", False, 3, 8, clock.ticks_ms(), 80, alerts.ALERT_NONE, 0, 1)
+        posted = time.monotonic()
+        shown = None
+        while time.monotonic() - posted < 1.0:
+            if bytes(display.digits) == bytes((1, 4, 2)) and display.alert_level == alerts.ALERT_NONE:
+                shown = (time.monotonic() - posted) * 1000
+                break
+            time.sleep(0.001)
+        lines.append(f"Render: new reading on screen {shown or 0:.0f} ms after posting, "
+                     f"brightness {gu.get_brightness():.2f}")
+        if shown is None or shown > renderer.SLOT_POLL_MS + PICKUP_MARGIN_MS:
+            lines.append("New snapshot not picked up in time")
+            ok = False
+        if abs(gu.get_brightness() - 0.8) > 1e-9:
+            lines.append("Brightness not applied by the renderer")
+            ok = False
+    finally:
+        render.stop()
+    lines.append(f"Render: {render.frames} frames drawn on the render thread")
+    return ok, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the dual-core frame handoff with threads")
+    parser.add_argument('--posts', type=int, default=200000, help="Snapshots posted in the slot test")
+    parser.add_argument('--stall', type=float, default=2.0, help="Seconds core 0 stalls for (default: 2)")
+    args = parser.parse_args()
+
+    install()
+    import renderer
+    import display
+    bind_clock(RealClock(), renderer, display)
+
+    slot_ok, lines = check_slot(renderer, args.posts)
+    for line in lines:
+        print(line)
+    render_ok, lines = check_render(renderer, args.stall)
+    for line in lines:
+        print(line)
+
+    ok = slot_ok and render_ok
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
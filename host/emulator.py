@@ -0,0 +1,733 @@
+#!/usr/bin/env python3
+"""
+Host emulator - stand-ins for the MicroPython/Pimoroni modules used by src/
+
+Lets the device code in src/ run unmodified under CPython:
+- VirtualClock: fake time module (time, sleep, ticks_ms, ...) that only moves when advanced
+- VirtualEventLoop: asyncio loop driven by the VirtualClock, so sleeps cost no wall time
+- GalacticUnicorn / PicoGraphics: emulated 53x11 matrix with a readable framebuffer
+- Pin (machine): GPIO input whose level tests drive, firing its IRQ handler
+- BLE (bluetooth): GATT server that records writes, notifications and
+  advertising; tests connect and disconnect fake centrals
+- network / urequests / micropython / uasyncio / secrets: minimal stand-ins
+- VirtualNtpServer: SNTP answers on the VirtualClock (installed as ntp.socket)
+
+Usage:
+    from emulator import VirtualClock, install, bind_clock
+    clock = VirtualClock()
+    install()                   # Register stand-in modules in sys.modules
+    import main, display        # Device modules now import cleanly
+    bind_clock(clock, main, display)
+"""
+
+import asyncio
+import os
+from array import array
+import selectors
+import struct
+import sys
+import types
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+# Galactic Unicorn matrix size
+WIDTH = 53
+HEIGHT = 11
+
+# Default virtual start time (2023-11-14 22:13:20 UTC)
+DEFAULT_START_EPOCH = 1700000000
+
+
+class VirtualClock:
+    """
+    Fake time module backed by a virtual clock
+
+    Implements the subset of MicroPython's time module used by src/.
+    time() returns whole seconds like the RP2 port. Nothing moves unless
+    advance() or sleep() is called (or VirtualEventLoop waits on a timer).
+    """
+
+    def __init__(self, start_epoch=DEFAULT_START_EPOCH):
+        self.start_epoch = start_epoch
+        self.elapsed = 0.0      # Virtual seconds since start
+
+    def advance(self, seconds):
+        """Move virtual time forward"""
+        if seconds > 0:
+            self.elapsed += seconds
+
+    def monotonic(self):
+        """Virtual seconds since start (float)"""
+        return self.elapsed
+
+    # --- MicroPython time module API ---
+
+    def time(self):
+        return self.start_epoch + int(self.elapsed)
+
+    def time_ns(self):
+        return int((self.start_epoch + self.elapsed) * 1_000_000_000)
+
+    def sleep(self, seconds):
+        self.advance(seconds)
+
+    def sleep_ms(self, ms):
+        self.advance(ms / 1000)
+
+    def sleep_us(self, us):
+        self.advance(us / 1_000_000)
+
+    def ticks_ms(self):
+        return int(self.elapsed * 1000) & 0x3FFFFFFF
+
+    def ticks_us(self):
+        return int(self.elapsed * 1_000_000) & 0x3FFFFFFF
+
+    def ticks_add(self, ticks, delta):
+        return (ticks + delta) & 0x3FFFFFFF
+
+    def ticks_diff(self, end, start):
+        diff = (end - start) & 0x3FFFFFFF
+        return diff - 0x40000000 if diff >= 0x20000000 else diff
+
+    def gmtime(self, secs=None):
+        import time as _time
+        t = _time.gmtime(self.time() if secs is None else secs)
+        return (t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour, t.tm_min, t.tm_sec, t.tm_wday, t.tm_yday)
+
+    localtime = gmtime      # Device clock is UTC after NTP sync
+
+    def mktime(self, t):
+        import calendar
+        return calendar.timegm(tuple(t[:6]) + (0, 0, 0))
+
+
+class RealClock(VirtualClock):
+    """
+    VirtualClock that follows the host's real time
+
+    For running device modules against real servers (e.g., fake_share.py):
+    gives them MicroPython's ticks API, which CPython's time module lacks.
+    """
+
+    def __init__(self):
+        import time as _time
+        self._time = _time
+        self._origin = _time.monotonic()
+        super().__init__(int(_time.time()))
+
+    @property
+    def elapsed(self):
+        return self._time.monotonic() - self._origin
+
+    @elapsed.setter
+    def elapsed(self, value):
+        pass            # Real time can't be moved; advance() is a no-op
+
+    def sleep(self, seconds):
+        self._time.sleep(seconds)
+
+    def sleep_ms(self, ms):
+        self._time.sleep(ms / 1000)
+
+    def sleep_us(self, us):
+        self._time.sleep(us / 1_000_000)
+
+
+class _VirtualSelector(selectors.BaseSelector):
+    """Selector that advances the virtual clock instead of blocking"""
+
+    def __init__(self, clock):
+        self._clock = clock
+        self._keys = {}
+
+    def register(self, fileobj, events, data=None):
+        key = selectors.SelectorKey(fileobj, fileobj if isinstance(fileobj, int) else fileobj.fileno(), events, data)
+        self._keys[fileobj] = key
+        return key
+
+    def unregister(self, fileobj):
+        return self._keys.pop(fileobj)
+
+    def select(self, timeout=None):
+        # No real I/O under emulation - waiting for a timer just moves time
+        if timeout:
+            self._clock.advance(timeout)
+        return []
+
+    def get_map(self):
+        return self._keys
+
+    def close(self):
+        self._keys.clear()
+
+
+class VirtualEventLoop(asyncio.SelectorEventLoop):
+    """asyncio event loop whose time is the VirtualClock"""
+
+    def __init__(self, clock):
+        super().__init__(selector=_VirtualSelector(clock))
+        self._clock = clock
+        self._clock_resolution = 1e-9
+
+    def time(self):
+        return self._clock.monotonic()
+
+
+# --- Pimoroni stand-ins ---
+
+class PicoGraphics:
+    """
+    Emulated PicoGraphics for the Galactic Unicorn (RGB888 pens)
+
+    framebuffer holds one 32-bit 0x00RRGGBB word per pixel, row major, like
+    the device's PEN_RGB888 buffer; src/raster.py's Python kernels write it
+    directly.
+    """
+
+    def __init__(self, display=None, buffer=None):
+        self.width = WIDTH
+        self.height = HEIGHT
+        self.framebuffer = array('I', [0] * (WIDTH * HEIGHT))
+        self.pen = 0
+        self.texts = []         # Text drawn since last clear: (text, x, y, scale)
+
+    def create_pen(self, r, g, b):
+        return (max(0, min(255, int(r))) << 16) | (max(0, min(255, int(g))) << 8) | max(0, min(255, int(b)))
+
+    def set_pen(self, pen):
+        self.pen = pen
+
+    def get_bounds(self):
+        return (self.width, self.height)
+
+    def clear(self):
+        pen = self.pen
+        fb = self.framebuffer
+        for i in range(len(fb)):
+            fb[i] = pen
+        self.texts = []
+
+    def pixel(self, x, y):
+        if 0 <= x < WIDTH and 0 <= y < HEIGHT:
+            self.framebuffer[y * WIDTH + x] = self.pen
+
+    def pixel_span(self, x, y, length):
+        for i in range(length):
+            self.pixel(x + i, y)
+
+    def rectangle(self, x, y, w, h):
+        for dy in range(h):
+            self.pixel_span(x, y + dy, w)
+
+    def text(self, text, x, y, wordwrap=-1, scale=1, angle=0, spacing=1):
+        self.texts.append((text, x, y, scale))
+
+    def get_pixel(self, x, y):
+        """Read back a pixel as packed RGB888 (host-only helper)"""
+        return self.framebuffer[y * WIDTH + x]
+
+    def to_ascii(self):
+        """Render framebuffer as text rows, '#' for lit pixels (host-only helper)"""
+        rows = []
+        for y in range(HEIGHT):
+            rows.append(''.join('#' if self.framebuffer[y * WIDTH + x] else '.' for x in range(WIDTH)))
+        return '\n'.join(rows)
+
+
+class GalacticUnicorn:
+    """Emulated GalacticUnicorn - counts frames and lets tests hold buttons"""
+
+    WIDTH = WIDTH
+    HEIGHT = HEIGHT
+    SWITCH_A = 0
+    SWITCH_B = 1
+    SWITCH_C = 3
+    SWITCH_D = 6
+    SWITCH_SLEEP = 27
+    SWITCH_VOLUME_UP = 7
+    SWITCH_VOLUME_DOWN = 8
+    SWITCH_BRIGHTNESS_UP = 21
+    SWITCH_BRIGHTNESS_DOWN = 26
+
+    def __init__(self):
+        self.brightness = 0.5
+        self.pressed = set()    # Buttons currently held
+        self.frames = 0         # Number of update() calls
+        self.on_update = None   # Optional callback(graphics) per frame
+
+    def set_brightness(self, value):
+        self.brightness = max(0.0, min(1.0, value))
+
+    def get_brightness(self):
+        return self.brightness
+
+    def adjust_brightness(self, delta):
+        self.set_brightness(self.brightness + delta)
+
+    def is_pressed(self, button):
+        return button in self.pressed
+
+    def update(self, graphics):
+        self.frames += 1
+        if self.on_update:
+            self.on_update(graphics)
+
+
+# --- machine stand-in ---
+
+class Pin:
+    """
+    Emulated machine.Pin input - tests drive its level
+
+    inject(level) changes the level and, on an edge matching the IRQ
+    trigger, calls the handler straight away like the hardware would: from
+    whatever code is running, e.g. in the middle of a blocking call.
+    press()/release() inject the edge of an active-low button.
+    """
+
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, id, mode=IN, pull=None, value=None):
+        self.id = id
+        self.level = 1 if pull == Pin.PULL_UP else 0
+        self.handler = None
+        self.trigger = 0
+        self.hard = False
+        self.edges = 0          # Level changes injected
+
+    def value(self, level=None):
+        if level is None:
+            return self.level
+        self.inject(level)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self.handler = handler
+        self.trigger = trigger
+        self.hard = hard
+
+    def inject(self, level):
+        level = 1 if level else 0
+        if level == self.level:
+            return
+        self.level = level
+        self.edges += 1
+        if self.handler and self.trigger & (Pin.IRQ_RISING if level else Pin.IRQ_FALLING):
+            self.handler(self)
+
+    def press(self):
+        self.inject(0)
+
+    def release(self):
+        self.inject(1)
+
+
+# --- bluetooth stand-ins ---
+
+class UUID:
+    """bluetooth.UUID for 128-bit UUID strings; bytes() is little-endian like the device"""
+
+    def __init__(self, value):
+        self.value = value
+        self.raw = bytes.fromhex(value.replace("-", ""))[::-1]
+
+    def __bytes__(self):
+        return self.raw
+
+    def __eq__(self, other):
+        return isinstance(other, UUID) and other.raw == self.raw
+
+    def __hash__(self):
+        return hash(self.raw)
+
+    def __repr__(self):
+        return f"UUID('{self.value}')"
+
+
+class BLE:
+    """
+    Emulated bluetooth.BLE GATT server - records what the device does
+
+    Characteristic values live in `values` (by handle); gatts_notify()
+    appends (connection, handle, value) to `notified` and gap_advertise()
+    appends (interval, adv_data, resp_data) to `advertised`. connect() and
+    disconnect() play a central, calling the IRQ handler like the stack
+    does (and a connect stops advertising). Set `lost` to connection
+    handles whose notifications fail with OSError.
+    """
+
+    FLAG_READ = 0x0002
+    FLAG_NOTIFY = 0x0010
+
+    def __init__(self):
+        self.is_active = False
+        self.handler = None
+        self.services = []
+        self.values = {}
+        self.notified = []
+        self.advertised = []
+        self.advertising = False
+        self.lost = set()
+        self._next_handle = 1
+
+    def active(self, state=None):
+        if state is not None:
+            self.is_active = bool(state)
+        return self.is_active
+
+    def irq(self, handler):
+        self.handler = handler
+
+    def gatts_register_services(self, services):
+        handles = []
+        for uuid, characteristics in services:
+            self.services.append((uuid, characteristics))
+            service_handles = []
+            for _ in characteristics:
+                self._next_handle += 1              # Declaration, then value
+                service_handles.append(self._next_handle)
+                self.values[self._next_handle] = b""
+                self._next_handle += 1
+            handles.append(tuple(service_handles))
+        return tuple(handles)
+
+    def gatts_write(self, handle, data):
+        self.values[handle] = bytes(data)
+
+    def gatts_read(self, handle):
+        return self.values[handle]
+
+    def gatts_notify(self, conn, handle, data=None):
+        if conn in self.lost:
+            raise OSError(-128, "ENOTCONN")
+        self.notified.append((conn, handle, bytes(data) if data is not None else self.values[handle]))
+
+    def gap_advertise(self, interval_us, adv_data=None, resp_data=None):
+        self.advertising = interval_us is not None
+        self.advertised.append((interval_us, adv_data, resp_data))
+
+    def connect(self, conn):
+        self.advertising = False
+        self.handler(1, (conn, 0, bytes(6)))
+
+    def disconnect(self, conn):
+        self.handler(2, (conn, 0, bytes(6)))
+
+
+# --- network stand-ins ---
+
+STAT_IDLE = 0
+STAT_CONNECTING = 1
+STAT_GOT_IP = 3
+STAT_CONNECT_FAIL = -1
+STAT_NO_AP_FOUND = -2
+STAT_WRONG_PASSWORD = -3
+
+
+class WLAN:
+    """
+    Emulated network.WLAN - connects immediately unless told otherwise
+
+    Simulating a flaky network: set ap_up False to make the access point
+    vanish (drop() also cuts an existing link), connect_polls to make
+    association take that many status() calls, and fail_connects to make
+    the next N attempts fail. connect() records its keyword arguments
+    (e.g., bssid, channel) in connect_kwargs; config() reports the
+    access point's bssid and channel while connected. scan() finds one
+    access point, named ap_ssid, and counts its calls in scans.
+    """
+
+    AP_BSSID = b'\x02\x00\x00\x00\x00\x01'
+    AP_CHANNEL = 6
+
+    def __init__(self, interface=0):
+        self._active = False
+        self._status = STAT_IDLE
+        self.connect_status = STAT_GOT_IP   # Status reached by connect()
+        self.connects = 0
+        self.ssid = None
+        self.ap_up = True
+        self.connect_polls = 0
+        self.fail_connects = 0
+        self.connect_kwargs = []
+        self.ap_ssid = "home"
+        self.scans = 0
+        self._pending = 0
+
+    def active(self, value=None):
+        if value is None:
+            return self._active
+        self._active = bool(value)
+
+    def connect(self, ssid=None, key=None, **kwargs):
+        self.connects += 1
+        self.ssid = ssid
+        self.connect_kwargs.append(kwargs)
+        self._status = STAT_CONNECTING
+        self._pending = self.connect_polls
+        self._settle()
+
+    def _settle(self):
+        """Finish a pending connect once its status polls are used up"""
+        if self._status != STAT_CONNECTING or self._pending > 0:
+            return
+        if not self.ap_up:
+            self._status = STAT_NO_AP_FOUND
+        elif self.fail_connects > 0:
+            self.fail_connects -= 1
+            self._status = STAT_CONNECT_FAIL
+        else:
+            self._status = self.connect_status
+
+    def drop(self):
+        """Lose the link (as when the access point goes away)"""
+        self._status = STAT_CONNECT_FAIL
+
+    def disconnect(self):
+        self._status = STAT_IDLE
+
+    def status(self, param=None):
+        if param == 'rssi':
+            return -55
+        if self._status == STAT_CONNECTING:
+            self._pending -= 1
+            self._settle()
+        return self._status
+
+    def isconnected(self):
+        return self._status == STAT_GOT_IP
+
+    def ifconfig(self, config=None):
+        return ('192.168.1.50', '255.255.255.0', '192.168.1.1', '192.168.1.1')
+
+    def config(self, *args, **kwargs):
+        """Only the associated access point's 'bssid' and 'channel' are reported"""
+        if args and args[0] in ('bssid', 'channel') and self._status == STAT_GOT_IP:
+            return self.AP_BSSID if args[0] == 'bssid' else self.AP_CHANNEL
+        return None
+
+    def scan(self):
+        """(ssid, bssid, channel, RSSI, security, hidden) for the emulated access point"""
+        self.scans += 1
+        if not self.ap_up:
+            return []
+        return [(self.ap_ssid.encode(), self.AP_BSSID, self.AP_CHANNEL, -55, 3, 0)]
+
+
+NTP_DELTA = 2208988800          # Seconds from 1900 (NTP epoch) to 1970
+
+
+def sntp_reply(request, seconds):
+    """
+    Build an SNTP server reply
+
+    Args:
+        request: 48-byte client request
+        seconds: Server time (epoch seconds, float) for the receive and
+            transmit timestamps
+
+    Returns:
+        bytes: Reply echoing the request's transmit timestamp as origin
+    """
+    whole = int(seconds)
+    fraction = int((seconds - whole) * (1 << 32)) & 0xFFFFFFFF
+    stamp = struct.pack("!II", whole + NTP_DELTA, fraction)
+    header = bytes((0x24, 1, 6, 0xEC))     # Version 4, server mode, stratum 1
+    return header + bytes(20) + bytes(request[40:48]) + stamp + stamp
+
+
+class VirtualNtpServer:
+    """
+    SNTP server on a VirtualClock, installed in place of the `socket` module
+
+    Set as ntp.socket so NtpClient's UDP exchange runs against virtual
+    time: each request is answered `delay` virtual seconds after it is
+    sent, with the clock's time plus `offset` seconds, running `drift_ppm`
+    fast. While `drop` is set requests are lost (the client times out).
+    """
+
+    AF_INET = 2
+    SOCK_DGRAM = 2
+
+    def __init__(self, clock, delay=0.0, offset=0.0, drift_ppm=0):
+        self.clock = clock
+        self.delay = delay
+        self.offset = offset
+        self.drift_ppm = drift_ppm
+        self.drop = False
+        self.requests = 0
+
+    def server_time(self, elapsed=None):
+        """Server epoch seconds at a virtual time (default: now)"""
+        elapsed = self.clock.elapsed if elapsed is None else elapsed
+        return self.clock.start_epoch + elapsed * (1 + self.drift_ppm / 1e6) + self.offset
+
+    def getaddrinfo(self, host, port, *args):
+        return [(self.AF_INET, self.SOCK_DGRAM, 0, '', ('127.0.0.1', port))]
+
+    def socket(self, family=AF_INET, kind=SOCK_DGRAM):
+        return _VirtualUdpSocket(self)
+
+
+class _VirtualUdpSocket:
+    """Non-blocking UDP socket talking to a VirtualNtpServer"""
+
+    def __init__(self, server):
+        self.server = server
+        self.replies = []           # (virtual time ready, reply)
+
+    def setblocking(self, flag):
+        pass
+
+    def sendto(self, data, addr):
+        server = self.server
+        server.requests += 1
+        if not server.drop:
+            sent = server.clock.elapsed
+            # Stamped halfway through the round trip
+            reply = sntp_reply(data, server.server_time(sent + server.delay / 2))
+            self.replies.append((sent + server.delay, reply))
+        return len(data)
+
+    def recv(self, size):
+        if self.replies and self.server.clock.elapsed >= self.replies[0][0]:
+            return self.replies.pop(0)[1][:size]
+        raise OSError(11, "EAGAIN")
+
+    def close(self):
+        self.replies = []
+
+
+# --- micropython stand-in ---
+
+def _const(value):
+    return value
+
+
+def _passthrough(func):
+    return func
+
+
+def _noop(*args, **kwargs):
+    return 0
+
+
+def _module(name, **attrs):
+    mod = types.ModuleType(name)
+    for key, value in attrs.items():
+        setattr(mod, key, value)
+    return mod
+
+
+def _uasyncio_module():
+    """uasyncio = asyncio plus MicroPython's sleep_ms"""
+    mod = types.ModuleType('uasyncio')
+    for key in dir(asyncio):
+        if not key.startswith('__'):
+            setattr(mod, key, getattr(asyncio, key))
+
+    # Plain functions, so the sleep coroutine is made here rather than in the
+    # device task awaiting it (uasyncio's sleeps don't allocate)
+    def sleep(seconds):
+        return asyncio.sleep(seconds)
+
+    def sleep_ms(ms):
+        return asyncio.sleep(ms / 1000)
+
+    class ThreadSafeFlag:
+        """Flag a task can wait on, set from an IRQ handler (here: Pin.inject)"""
+
+        def __init__(self):
+            self._event = asyncio.Event()
+
+        def set(self):
+            self._event.set()
+
+        def clear(self):
+            self._event.clear()
+
+        async def wait(self):
+            await self._event.wait()
+            self._event.clear()
+
+    mod.sleep = sleep
+    mod.sleep_ms = sleep_ms
+    mod.ThreadSafeFlag = ThreadSafeFlag
+    return mod
+
+
+def install(urequests=None):
+    """
+    Register stand-in modules in sys.modules and put src/ on sys.path
+
+    Device modules keep CPython's real time module until bind_clock() is
+    called; bind a RealClock to run them against real time with the ticks
+    API available.
+
+    Args:
+        urequests: Optional urequests replacement (e.g., a ShareReplay instance)
+    """
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+
+    sys.modules['galactic'] = _module('galactic', GalacticUnicorn=GalacticUnicorn)
+    sys.modules['picographics'] = _module(
+        'picographics', PicoGraphics=PicoGraphics, DISPLAY_GALACTIC_UNICORN=0, PEN_RGB888=0)
+    sys.modules['network'] = _module(
+        'network', WLAN=WLAN, STA_IF=0, AP_IF=1,
+        STAT_IDLE=STAT_IDLE, STAT_CONNECTING=STAT_CONNECTING, STAT_GOT_IP=STAT_GOT_IP,
+        STAT_CONNECT_FAIL=STAT_CONNECT_FAIL, STAT_NO_AP_FOUND=STAT_NO_AP_FOUND,
+        STAT_WRONG_PASSWORD=STAT_WRONG_PASSWORD)
+    sys.modules['machine'] = _module('machine', Pin=Pin)
+    sys.modules['bluetooth'] = _module(
+        'bluetooth', BLE=BLE, UUID=UUID, FLAG_READ=BLE.FLAG_READ, FLAG_NOTIFY=BLE.FLAG_NOTIFY)
+    sys.modules['micropython'] = _module(
+        'micropython', const=_const, native=_passthrough, viper=_passthrough,
+        heap_lock=_noop, heap_unlock=_noop, mem_info=_noop)
+    sys.modules['uasyncio'] = _uasyncio_module()
+    sys.modules['urequests'] = urequests or _module('urequests')
+    # Shadow CPython's stdlib secrets module with placeholder credentials
+    sys.modules['secrets'] = _module(
+        'secrets', WIFI_SSID='emulator', WIFI_PASS='emulator',
+        DEXCOM_USER='emulator', DEXCOM_PASS='emulator', DEXCOM_US=True)
+
+
+class _ClockModule:
+    """
+    Module-shaped view of a clock for a device module's `time` global
+
+    src/ modules `import time`, so CPython compiles time.ticks_ms() to an
+    attribute load, which on a clock instance makes a new bound method per
+    call (the device's built-in module doesn't). The methods are bound once
+    here; anything else is looked up on the clock.
+    """
+
+    def __init__(self, clock):
+        self._clock = clock
+        for name in dir(clock):
+            if not name.startswith('_'):
+                value = getattr(clock, name)
+                if callable(value):
+                    setattr(self, name, value)
+
+    def __getattr__(self, name):
+        return getattr(self._clock, name)
+
+
+def bind_clock(clock, *modules):
+    """
+    Point each device module's `time` global at the virtual clock
+
+    Args:
+        clock: VirtualClock instance
+        *modules: Imported src/ modules that did `import time`
+    """
+    view = _ClockModule(clock)
+    for module in modules:
+        if hasattr(module, 'time'):
+            module.time = view
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Fake NTP server - local SNTP stand-in for development
+
+Answers SNTP requests over UDP on localhost with a clock that can be set
+off by --offset seconds, run --drift-ppm fast, answer after --delay
+seconds (half each way) or drop every request.
+
+Point the device client at it with NtpClient(host="127.0.0.1", port=...).
+
+Usage:
+    python host/fake_ntp.py --port 1123 --offset 37.5        # Serve until Ctrl+C
+    python host/fake_ntp.py --check
+        # Sync src/ntp.py against it and check the offset, that the event
+        # loop keeps running during requests and timeouts, that the server
+        # is looked up once (and again after a timeout), drift tracking and
+        # a week without resyncs
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from emulator import sntp_reply
+
+CHECK_OFFSET = 37.5             # Server clock offset used by --check (seconds)
+CHECK_DELAY = 0.3               # Round trip used by --check (seconds)
+CHECK_DRIFT_PPM = 400           # Device crystal error simulated by --check
+MAX_OFFSET_ERROR_MS = 50        # Clock error allowed after a sync over localhost
+MAX_LOOP_GAP_MS = 100           # Longest event loop stall allowed during a request
+WEEK_ERROR_MS = 1000            # Clock error allowed after a week without resyncs
+
+
+class FakeNtpServer(asyncio.DatagramProtocol):
+    """
+    SNTP server answering from `now()` (epoch seconds) plus `offset`
+
+    Counts requests and replies; while `drop` is set requests go
+    unanswered.
+    """
+
+    def __init__(self, now=time.time, offset=0.0, delay=0.0):
+        self.now = now
+        self.offset = offset
+        self.delay = delay
+        self.drop = False
+        self.requests = 0
+        self.replies = 0
+        self.transport = None
+        self.port = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start listening; returns the bound port"""
+        loop = asyncio.get_running_loop()
+        self.transport, _ = await loop.create_datagram_endpoint(lambda: self, local_addr=(host, port))
+        self.port = self.transport.get_extra_info('sockname')[1]
+        return self.port
+
+    def stop(self):
+        self.transport.close()
+
+    def datagram_received(self, data, addr):
+        self.requests += 1
+        if self.drop or len(data) < 48:
+            return
+        # Stamped halfway through the round trip
+        reply = sntp_reply(data, self.now() + self.offset + self.delay / 2)
+        asyncio.get_running_loop().call_later(self.delay, self._reply, reply, addr)
+
+    def _reply(self, reply, addr):
+        self.replies += 1
+        self.transport.sendto(reply, addr)
+
+
+class CountingResolver:
+    """`socket` module wrapper counting getaddrinfo() calls (blocking DNS lookups)"""
+
+    def __init__(self, module):
+        self.module = module
+        self.lookups = 0
+
+    def __getattr__(self, name):
+        return getattr(self.module, name)
+
+    def getaddrinfo(self, *args):
+        self.lookups += 1
+        return self.module.getaddrinfo(*args)
+
+
+async def _loop_gap(task):
+    """Run task while measuring the longest event loop stall (ms)"""
+    gap = 0
+    stop = False
+
+    async def ticker():
+        nonlocal gap
+        last = time.monotonic()
+        while not stop:
+            await asyncio.sleep(0.01)
+            now = time.monotonic()
+            gap = max(gap, (now - last) * 1000)
+            last = now
+
+    ticking = asyncio.create_task(ticker())
+    try:
+        result = await task
+    finally:
+        stop = True
+        await ticking
+    return result, gap
+
+
+async def check():
+    """
+    Sync against fake servers on real and virtual time
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    from emulator import install, bind_clock, RealClock, VirtualClock
+    install()
+    import ntp
+
+    ok = True
+    lines = []
+    resolver = ntp.socket = CountingResolver(ntp.socket)
+
+    # Real time: offset, non-blocking exchange, timeout
+    bind_clock(RealClock(), ntp)
+    server = FakeNtpServer(offset=CHECK_OFFSET, delay=CHECK_DELAY)
+    port = await server.start()
+    clock = ntp.SyncedClock()
+    client = ntp.NtpClient(clock, host="127.0.0.1", port=port)
+    with contextlib.redirect_stdout(io.StringIO()):
+        synced, gap = await _loop_gap(client.sync())
+    error = clock.now_ms() - (time.time() + CHECK_OFFSET) * 1000
+    lines.append(f"Sync:     {'ok' if synced else 'failed'}, error {error:+.0f} ms, RTT {clock.rtt_ms} ms, "
+                 f"loop stall {gap:.0f} ms")
+    if not synced or abs(error) > MAX_OFFSET_ERROR_MS:
+        lines.append(f"Clock off by {error:.0f} ms after sync")
+        ok = False
+    if gap > MAX_LOOP_GAP_MS:
+        lines.append("Event loop blocked during the request")
+        ok = False
+
+    server.drop = True
+    start = time.monotonic()
+    with contextlib.redirect_stdout(io.StringIO()):
+        synced, gap = await _loop_gap(client.sync())
+    waited = (time.monotonic() - start) * 1000
+    lines.append(f"Timeout:  {'synced?!' if synced else 'failed'} after {waited:.0f} ms, loop stall {gap:.0f} ms")
+    if synced or waited > ntp.NTP_TIMEOUT_MS + 500 or gap > MAX_LOOP_GAP_MS:
+        lines.append("Lost request not handled by a non-blocking timeout")
+        ok = False
+
+    server.drop = False
+    with contextlib.redirect_stdout(io.StringIO()):
+        synced = await client.sync()
+    lines.append(f"Lookups:  {resolver.lookups} for 2 syncs around a timeout")
+    if not synced or resolver.lookups != 2:
+        lines.append("Server not looked up once, then again after the timeout")
+        ok = False
+    server.stop()
+
+    # Virtual time: drift tracking and a week without resyncs. Device ticks
+    # run true; the server runs CHECK_DRIFT_PPM fast (same as a slow crystal)
+    vclock = VirtualClock()
+    bind_clock(vclock, ntp)
+    server = FakeNtpServer(now=lambda: vclock.start_epoch + vclock.elapsed * (1 + CHECK_DRIFT_PPM / 1e6))
+    port = await server.start()
+    clock = ntp.SyncedClock()
+    client = ntp.NtpClient(clock, host="127.0.0.1", port=port)
+    resolver.lookups = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(3):
+            await client.sync()
+            vclock.advance(ntp.NTP_RESYNC_SECONDS)
+    lines.append(f"Drift:    {clock.drift_ppm} ppm (server {CHECK_DRIFT_PPM}), "
+                 f"last offset {clock.offset_ms} ms after {ntp.NTP_RESYNC_SECONDS}s")
+    if abs(clock.drift_ppm - CHECK_DRIFT_PPM) > 5:
+        lines.append("Drift not measured")
+        ok = False
+    if resolver.lookups != 1:
+        lines.append(f"{resolver.lookups} lookups for 3 resyncs - the address should be kept")
+        ok = False
+
+    for _ in range(7 * 24):
+        vclock.advance(3600)
+        clock.now_ms()                                  # As power_manager does every minute
+    error = clock.now_ms() - server.now() * 1000
+    uncorrected = 7 * 86400 * CHECK_DRIFT_PPM / 1000
+    lines.append(f"One week: error {error:+.0f} ms without resync (uncorrected {uncorrected:.0f} ms)")
+    if abs(error) > WEEK_ERROR_MS:
+        lines.append("Drift correction doesn't hold over a week")
+        ok = False
+    server.stop()
+    return ok, lines
+
+
+async def serve(args):
+    server = FakeNtpServer(offset=args.offset, delay=args.delay)
+    if args.check:
+        ok, lines = await check()
+        for line in lines:
+            print(line)
+        print("PASS" if ok else "FAIL")
+        return 0 if ok else 1
+
+    if args.drift_ppm:
+        origin = time.time()
+        server.now = lambda: origin + (time.time() - origin) * (1 + args.drift_ppm / 1e6)
+    server.drop = args.drop
+    port = await server.start(port=args.port)
+    print(f"Fake NTP serving on udp://127.0.0.1:{port} (offset {args.offset:+.1f}s, "
+          f"drift {args.drift_ppm} ppm, delay {args.delay:.2f}s{', dropping' if args.drop else ''})")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local fake NTP server")
+    parser.add_argument('--port', type=int, default=1123, help="UDP port to listen on (default: 1123)")
+    parser.add_argument('--offset', type=float, default=0.0, help="Seconds added to real time (default: 0)")
+    parser.add_argument('--drift-ppm', type=int, default=0, help="Clock runs this many ppm fast (default: 0)")
+    parser.add_argument('--delay', type=float, default=0.0, help="Round trip in seconds (default: 0)")
+    parser.add_argument('--drop', action='store_true', help="Never answer (for timeout testing)")
+    parser.add_argument('--check', action='store_true', help="Run an NtpClient check and exit")
+    args = parser.parse_args()
+    try:
+        sys.exit(asyncio.run(serve(args)) or 0)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Fake Dexcom Share server - local multi-account stand-in for development
+
+Serves the three Share endpoints used by src/dexcom.py over plain HTTP on
+localhost, for any number of accounts. Each account has its own password,
+session, synthetic reading history (one reading per 5 minutes of real time)
+and simulated response latency.
+
+Point a client at it with DexcomClient(user, password, base_url="http://127.0.0.1:8080").
+
+--fault injects failures, to watch a display's circuit breaker (src/breaker.py)
+back off and recover: `down` answers every request 503, `flaky` fails a
+random FLAKY_PCT of them with 500, `auth` rejects every password and
+`expire` drops each session after one read.
+
+Usage:
+    python host/fake_share.py --accounts 3 --port 8080        # Serve until Ctrl+C
+    python host/fake_share.py --accounts 1 --fault down       # Share outage
+    python host/fake_share.py --accounts 4 --latency 0.2,0.4,0.6,0.8 --check
+        # Fetch all accounts through FollowerGroup, sequentially and concurrently,
+        # and check the readings and the concurrent speed-up
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from replay import synth_trace, READING_INTERVAL
+
+SHARE_PATH = "/ShareWebServices/Services"
+HISTORY_HOURS = 3               # Synthetic history served per account
+FAULTS = ("down", "flaky", "auth", "expire")
+FLAKY_PCT = 30                  # Share of requests failed in `flaky` mode
+
+
+class FakeAccount:
+    """One Share account: credentials, readings and simulated latency"""
+
+    def __init__(self, username, password, seed, latency=0.0):
+        self.username = username
+        self.password = password
+        self.account_id = str(uuid.UUID(int=seed + 1))
+        self.latency = latency
+        now = int(time.time())
+        start = now - now % READING_INTERVAL - HISTORY_HOURS * 3600
+        # Oldest first; served by real time, so new readings "arrive" every 5 min
+        self.readings = synth_trace(start, HISTORY_HOURS + 24, seed=seed)
+
+    def latest(self, now, minutes, max_count):
+        """Readings at or before now within the window, newest first"""
+        result = []
+        for reading in reversed(self.readings):
+            t = int(reading["WT"][5:-1]) // 1000
+            if t > now:
+                continue
+            if t < now - minutes * 60 or len(result) >= max_count:
+                break
+            result.append(reading)
+        return result
+
+
+class FakeShareServer:
+    """
+    asyncio HTTP server answering AuthenticatePublisherAccount,
+    LoginPublisherAccountById and ReadPublisherLatestGlucoseValues
+
+    Tracks per-endpoint request counts and the peak number of requests in
+    flight, so concurrency limits can be checked from outside. `fault`
+    (one of FAULTS, or None) injects failures; they are counted in
+    `faulted`.
+    """
+
+    def __init__(self, accounts, fault=None):
+        self.accounts = {account.username: account for account in accounts}
+        self.by_id = {account.account_id: account for account in accounts}
+        self.sessions = {}          # session ID -> FakeAccount
+        self.requests = {}          # endpoint -> count
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fault = fault
+        self.faulted = 0
+        self.server = None
+        self.port = None
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start listening; returns the bound port"""
+        self.server = await asyncio.start_server(self._handle, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, target, _ = request_line.decode().split(" ", 2)
+            length = 0
+            while True:
+                line = await reader.readline()
+                if not line or line == b"\r\n":
+                    break
+                name, _, value = line.decode().partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value.strip())
+            body = await reader.readexactly(length) if length else b""
+            status, payload, account = self.route(target, body)
+            if account is not None and account.latency:
+                await asyncio.sleep(account.latency)
+            data = json.dumps(payload).encode()
+            writer.write(f"HTTP/1.0 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                         f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+            await writer.drain()
+        finally:
+            self.in_flight -= 1
+            writer.close()
+
+    def route(self, target, body):
+        """
+        Answer one request
+
+        Returns:
+            tuple: (status, JSON-able payload, FakeAccount or None)
+        """
+        parts = urlsplit(target)
+        endpoint = parts.path.rsplit("/", 1)[-1]
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        request = json.loads(body) if body else {}
+        if self.fault == "down" or (self.fault == "flaky" and random.randrange(100) < FLAKY_PCT):
+            self.faulted += 1
+            return (503 if self.fault == "down" else 500), {"Code": "InternalError"}, None
+
+        if parts.path == f"{SHARE_PATH}/General/AuthenticatePublisherAccount":
+            account = self.accounts.get(request.get("accountName"))
+            if self.fault == "auth":
+                self.faulted += 1
+            if account is None or account.password != request.get("password") or self.fault == "auth":
+                return 500, {"Code": "AccountPasswordInvalid"}, account
+            return 200, account.account_id, account
+
+        if parts.path == f"{SHARE_PATH}/General/LoginPublisherAccountById":
+            account = self.by_id.get(request.get("accountId"))
+            if account is None or account.password != request.get("password") or self.fault == "auth":
+                return 500, {"Code": "AccountPasswordInvalid"}, account
+            session_id = str(uuid.uuid4())
+            self.sessions[session_id] = account
+            return 200, session_id, account
+
+        if parts.path == f"{SHARE_PATH}/Publisher/ReadPublisherLatestGlucoseValues":
+            query = parse_qs(parts.query)
+            account = self.sessions.get(query.get("sessionId", [""])[0])
+            if account is None:
+                return 500, {"Code": "SessionIdNotFound"}, None
+            minutes = int(query.get("minutes", ["10"])[0])
+            max_count = int(query.get("maxCount", ["1"])[0])
+            if self.fault == "expire":
+                self.faulted += 1
+                del self.sessions[query["sessionId"][0]]
+            return 200, account.latest(int(time.time()), minutes, max_count), account
+
+        return 404, {"Code": "NotFound"}, None
+
+
+def make_accounts(count, latencies):
+    """Build `count` FakeAccounts (user0/pass0, ...) with per-account latency"""
+    accounts = []
+    for i in range(count):
+        latency = latencies[i % len(latencies)] if latencies else 0.0
+        accounts.append(FakeAccount(f"user{i}", f"pass{i}", seed=i + 1, latency=latency))
+    return accounts
+
+
+async def check(server, accounts):
+    """
+    Fetch every account via FollowerGroup, sequentially then concurrently
+
+    Returns:
+        tuple: (ok, report lines) - ok is True if every reading matches, the
+               concurrency limit held and concurrent fetching was faster
+    """
+    from emulator import install, bind_clock, RealClock
+    install()
+    import ntp
+    import source
+    import breaker
+    from dexcom import DexcomClient
+    from followers import FollowerGroup
+    bind_clock(RealClock(), source, breaker, ntp)
+
+    base_url = f"http://127.0.0.1:{server.port}"
+    ok = True
+    lines = []
+    timings = {}
+    for label, concurrency in (("sequential", 1), ("concurrent", len(accounts))):
+        clients = [DexcomClient(a.username, a.password, base_url=base_url) for a in accounts]
+        group = FollowerGroup(clients, concurrency=concurrency)
+        # Device code logs every request; keep the report readable
+        with contextlib.redirect_stdout(io.StringIO()):
+            await group.fetch_all()                 # Authenticate and backfill
+            server.max_in_flight = 0
+            start = time.perf_counter()
+            results = await group.fetch_all()       # Steady-state fetch
+            timings[label] = time.perf_counter() - start
+        lines.append(f"{label:<11} {timings[label]:.2f}s, peak in flight {server.max_in_flight}, "
+                     f"results {results}")
+
+        for account, client in zip(accounts, clients):
+            expected = account.latest(int(time.time()), 10, 1)
+            if not expected or client.get_glucose_value() != expected[0]["Value"]:
+                lines.append(f"MISMATCH for {account.username}: {client.get_glucose_value()}")
+                ok = False
+        if server.max_in_flight > concurrency:
+            lines.append(f"Concurrency limit exceeded: {server.max_in_flight} > {concurrency}")
+            ok = False
+
+    slowest = max(a.latency for a in accounts)
+    total = sum(a.latency for a in accounts)
+    lines.append(f"Latency: slowest {slowest:.2f}s, sum {total:.2f}s")
+    if total > slowest and timings["concurrent"] >= timings["sequential"]:
+        lines.append("Concurrent fetch was not faster than sequential")
+        ok = False
+    return ok, lines
+
+
+async def serve(args):
+    latencies = [float(x) for x in args.latency.split(",")] if args.latency else []
+    accounts = make_accounts(args.accounts, latencies)
+    server = FakeShareServer(accounts, args.fault)
+    port = await server.start(port=0 if args.check else args.port)
+
+    if args.check:
+        ok, lines = await check(server, accounts)
+        await server.stop()
+        for line in lines:
+            print(line)
+        print(f"Requests: {server.requests}")
+        print("PASS" if ok else "FAIL")
+        return 0 if ok else 1
+
+    fault = f" (fault: {args.fault})" if args.fault else ""
+    print(f"Fake Share serving {len(accounts)} account(s) on http://127.0.0.1:{port}{fault}")
+    for account in accounts:
+        print(f"  {account.username} / {account.password} (latency {account.latency:.2f}s)")
+    async with server.server:
+        await server.server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local multi-account fake Dexcom Share server")
+    parser.add_argument('--accounts', type=int, default=3, help="Number of accounts (default: 3)")
+    parser.add_argument('--port', type=int, default=8080, help="Port to listen on (default: 8080)")
+    parser.add_argument('--latency', help="Per-account response latency in seconds, comma-separated")
+    parser.add_argument('--fault', choices=FAULTS, help="Inject failures (see above)")
+    parser.add_argument('--check', action='store_true', help="Run a FollowerGroup fetch check and exit")
+    args = parser.parse_args()
+    try:
+        sys.exit(asyncio.run(serve(args)) or 0)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
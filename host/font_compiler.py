@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Font Compiler - headless batch version of the font editor's export
+
+Reads glyph bitmaps, optimizes every glyph into (x, y, width, height) blocks
+in parallel, checks that the blocks reproduce each bitmap pixel for pixel,
+and rewrites the CUSTOM_FONT dict in src/font.py in one step.
+
+Glyph sources:
+- Bitmap text (.txt): a "[name]" header line per glyph, then one row per
+  line with '#' for a lit pixel and '.' for an unlit one
+- PNG sprite sheet (.png, needs pygame): fixed-size cells read left to
+  right, top to bottom; --cell gives the cell size and --names the glyph
+  name of each cell. Bright, opaque pixels are lit.
+
+Glyphs in the sources replace those already in font.py; the rest are kept.
+Compiling an unchanged font reproduces font.py byte for byte (comment
+columns included), so a no-op compile leaves no diff; --check without
+sources verifies that round trip for the font dict.
+
+Usage:
+    python host/font_compiler.py --dump glyphs.txt          # Current font.py as bitmap text
+    python host/font_compiler.py glyphs.txt                 # Compile into src/font.py
+    python host/font_compiler.py sheet.png --cell 6x10 --names 0,1,2,3,4,5,6,7,8,9
+    python host/font_compiler.py glyphs.txt --check         # Validate only, don't write
+    python host/font_compiler.py --check                    # font.py round-trips unchanged
+    python host/font_compiler.py small.txt --dict COMPACT_FONT  # Compact 3x5 font
+"""
+
+import argparse
+import ast
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+FONT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'font.py')
+FONT_DICT = 'CUSTOM_FONT'       # Dict in font.py to compile into (--dict)
+
+LIT = '#'
+UNLIT = '.'
+PNG_THRESHOLD = 128             # Min brightness/alpha for a lit PNG pixel
+BLOCK_COMMENT_GAP = 2           # Spaces before "# Block n" on lines new to font.py
+
+# Comments kept on glyphs with no blocks
+EMPTY_GLYPH_COMMENTS = {
+    ' ': "Space character (empty, reserves width for padding)",
+}
+
+
+def optimize_blocks(grid):
+    """
+    Cover the lit pixels of a grid with rectangles (x, y, width, height)
+
+    Greedy row-major scan: each unvisited lit pixel starts a block that is
+    extended right as far as possible, then down while the whole row fits.
+    Shared with FontEditor.export_as_blocks.
+
+    Args:
+        grid: List of rows, each a list of truthy/falsy pixels
+
+    Returns:
+        list: (x, y, width, height) tuples
+    """
+    height = len(grid)
+    width = max((len(row) for row in grid), default=0)
+    blocks = []
+    visited = [[False for _ in range(width)] for _ in range(height)]
+
+    def lit(x, y):
+        return x < len(grid[y]) and grid[y][x]
+
+    for y in range(height):
+        for x in range(width):
+            if lit(x, y) and not visited[y][x]:
+                # Find the largest rectangle starting at this pixel
+                block_width = 1
+                block_height = 1
+
+                # Extend width
+                while x + block_width < width and lit(x + block_width, y) and not visited[y][x + block_width]:
+                    block_width += 1
+
+                # Extend height (check if entire row can be extended)
+                can_extend = True
+                while can_extend and y + block_height < height:
+                    for check_x in range(x, x + block_width):
+                        if not lit(check_x, y + block_height) or visited[y + block_height][check_x]:
+                            can_extend = False
+                            break
+                    if can_extend:
+                        block_height += 1
+
+                # Mark all pixels in this block as visited
+                for mark_y in range(y, y + block_height):
+                    for mark_x in range(x, x + block_width):
+                        visited[mark_y][mark_x] = True
+
+                blocks.append((x, y, block_width, block_height))
+
+    return blocks
+
+
+def blocks_to_grid(blocks, width=0, height=0):
+    """Rasterize blocks into a grid at least width x height"""
+    width = max([width] + [x + w for x, y, w, h in blocks])
+    height = max([height] + [y + h for x, y, w, h in blocks])
+    grid = [[False] * width for _ in range(height)]
+    for x, y, w, h in blocks:
+        for dy in range(h):
+            for dx in range(w):
+                grid[y + dy][x + dx] = True
+    return grid
+
+
+def lit_pixels(grid):
+    """Set of (x, y) for every lit pixel"""
+    return {(x, y) for y, row in enumerate(grid) for x, pixel in enumerate(row) if pixel}
+
+
+def compile_glyph(item):
+    """
+    Optimize one glyph and verify it (runs in a worker process)
+
+    Args:
+        item: (name, grid) tuple
+
+    Returns:
+        tuple: (name, blocks, error message or None)
+    """
+    name, grid = item
+    blocks = optimize_blocks(grid)
+    expected = lit_pixels(grid)
+    actual = lit_pixels(blocks_to_grid(blocks))
+    if actual != expected:
+        missing = len(expected - actual)
+        extra = len(actual - expected)
+        return name, blocks, f"{missing} pixel(s) missing, {extra} extra"
+    # Overlapping blocks would render fine but mean the optimizer double-counted
+    if sum(w * h for x, y, w, h in blocks) != len(expected):
+        return name, blocks, "blocks overlap"
+    return name, blocks, None
+
+
+def compile_glyphs(glyphs, jobs=None):
+    """
+    Compile glyphs in parallel, preserving input order
+
+    Args:
+        glyphs: List of (name, grid) tuples
+        jobs: Worker processes (None = one per CPU, 1 = in-process)
+
+    Returns:
+        list: (name, blocks, error or None) per glyph
+    """
+    if jobs == 1:
+        return [compile_glyph(item) for item in glyphs]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(compile_glyph, glyphs, chunksize=4))
+
+
+# --- Glyph sources ---
+
+def parse_bitmap_text(text):
+    """
+    Parse bitmap text into (name, grid) tuples
+
+    Raises:
+        ValueError: On rows outside a glyph or unknown pixel characters
+    """
+    glyphs = []
+    grid = None
+    for lineno, line in enumerate(text.splitlines(), 1):
+        line = line.rstrip()
+        if line.startswith('[') and line.endswith(']'):
+            grid = []
+            glyphs.append((line[1:-1], grid))
+        elif not line or line.startswith(';'):
+            continue
+        elif grid is None:
+            raise ValueError(f"line {lineno}: pixel row before any [name] header")
+        else:
+            bad = set(line) - {LIT, UNLIT}
+            if bad:
+                raise ValueError(f"line {lineno}: unexpected character(s) {''.join(sorted(bad))!r}")
+            grid.append([c == LIT for c in line])
+    return glyphs
+
+
+def format_bitmap_text(font):
+    """Format a CUSTOM_FONT dict as bitmap text (inverse of parse_bitmap_text)"""
+    lines = []
+    for name, blocks in font.items():
+        lines.append(f"[{name}]")
+        for row in blocks_to_grid(blocks):
+            lines.append(''.join(LIT if pixel else UNLIT for pixel in row))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def load_png_sheet(path, cell, names):
+    """
+    Cut a PNG sprite sheet into (name, grid) tuples
+
+    Args:
+        path: PNG file
+        cell: (width, height) of each glyph cell
+        names: Glyph name per cell, row-major
+    """
+    import pygame       # Only needed for PNG input
+    image = pygame.image.load(path)
+    cell_w, cell_h = cell
+    columns = image.get_width() // cell_w
+    rows = image.get_height() // cell_h
+    if len(names) > columns * rows:
+        raise ValueError(f"{path}: {len(names)} names but only {columns * rows} cells")
+
+    glyphs = []
+    for index, name in enumerate(names):
+        left = (index % columns) * cell_w
+        top = (index // columns) * cell_h
+        grid = []
+        for y in range(cell_h):
+            row = []
+            for x in range(cell_w):
+                r, g, b, a = image.get_at((left + x, top + y))
+                row.append(a >= PNG_THRESHOLD and max(r, g, b) >= PNG_THRESHOLD)
+            grid.append(row)
+        glyphs.append((name, grid))
+    return glyphs
+
+
+# --- font.py I/O ---
+
+def _font_span(source, dict_name=FONT_DICT):
+    """Line range (start, end) and value node of a font dict assignment in font.py"""
+    tree = ast.parse(source)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+                isinstance(target, ast.Name) and target.id == dict_name for target in node.targets):
+            return node.lineno, node.end_lineno, node.value
+    raise ValueError(f"{dict_name} not found in font.py")
+
+
+def read_font(path=FONT_PATH, dict_name=FONT_DICT):
+    """Read a font dict (default CUSTOM_FONT) from font.py without importing it"""
+    with open(path) as f:
+        source = f.read()
+    return ast.literal_eval(_font_span(source, dict_name)[2])
+
+
+def comment_columns(source, dict_name=FONT_DICT):
+    """
+    Column of the "# Block n" comment on each block line of a font dict in font.py
+
+    Hand-aligned comments in font.py don't follow one rule, so format_font
+    keeps their columns rather than re-deriving them.
+
+    Returns:
+        dict: {(glyph name, block index): column}
+    """
+    start, end, _ = _font_span(source, dict_name)
+    columns = {}
+    name = None
+    index = 0
+    for line in source.split("\n")[start - 1:end]:
+        code, _, _ = line.partition('#')
+        code = code.strip()
+        if code.endswith(': ['):
+            name = ast.literal_eval(code[:-3])
+            index = 0
+        elif code.startswith('(') and name is not None:
+            if '#' in line:
+                columns[(name, index)] = line.index('#')
+            index += 1
+    return columns
+
+
+def format_font(font, dict_name=FONT_DICT, columns=None):
+    """
+    Format a CUSTOM_FONT dict in font.py's layout (same block lines as the editor's export)
+
+    Args:
+        font: {glyph name: blocks}
+        dict_name: Name assigned in font.py
+        columns: comment_columns() of the dict being replaced; block lines
+            keep their comment column, new ones get BLOCK_COMMENT_GAP spaces
+    """
+    columns = columns or {}
+    lines = [f"{dict_name} = {{"]
+    for name, blocks in font.items():
+        if not blocks:
+            comment = EMPTY_GLYPH_COMMENTS.get(name)
+            lines.append(f"    {name!r}: [],  # {comment}" if comment else f"    {name!r}: [],")
+            continue
+        lines.append(f"    {name!r}: [")
+        for i, (x, y, w, h) in enumerate(blocks):
+            code = f"    ({x}, {y}, {w}, {h}),"
+            column = columns.get((name, i), 0)
+            if column <= len(code):
+                column = len(code) + BLOCK_COMMENT_GAP
+            lines.append(f"{code:<{column}}# Block {i + 1}")
+        lines.append("    ],")
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def replace_font(source, font, dict_name=FONT_DICT):
+    """font.py source with a font dict replaced, everything around it (and its comment columns) kept"""
+    start, end, _ = _font_span(source, dict_name)
+    lines = source.split("\n")
+    formatted = format_font(font, dict_name, comment_columns(source, dict_name))
+    return "\n".join(lines[:start - 1] + [formatted] + lines[end:])
+
+
+def write_font(font, path=FONT_PATH, dict_name=FONT_DICT):
+    """
+    Replace a font dict (default CUSTOM_FONT) in font.py, keeping everything around it
+
+    The new source is parsed back and compared before the file is written.
+    """
+    with open(path) as f:
+        source = f.read()
+    new_source = replace_font(source, font, dict_name)
+
+    written = ast.literal_eval(_font_span(new_source, dict_name)[2])
+    if written != {name: list(blocks) for name, blocks in font.items()}:
+        raise ValueError(f"generated {dict_name} does not round-trip")
+    compile(new_source, path, 'exec')
+
+    with open(path, 'w') as f:
+        f.write(new_source)
+
+
+def check_round_trip(path=FONT_PATH, dict_name=FONT_DICT, jobs=None):
+    """
+    Recompile a font dict from its own bitmaps and compare with font.py
+
+    Returns:
+        list: Error messages (empty if font.py is reproduced byte for byte)
+    """
+    with open(path) as f:
+        source = f.read()
+    font = ast.literal_eval(_font_span(source, dict_name)[2])
+    results = compile_glyphs(parse_bitmap_text(format_bitmap_text(font)), jobs)
+    errors = [f"{name}: {error}" for name, _, error in results if error]
+    compiled = {name: blocks for name, blocks, _ in results}
+    errors.extend(f"{name}: recompiles to different blocks" for name in font
+                  if compiled.get(name) != font[name])
+    new_lines = replace_font(source, compiled, dict_name).split("\n")
+    for lineno, (old, new) in enumerate(zip(source.split("\n"), new_lines), 1):
+        if old != new:
+            errors.append(f"line {lineno}: {old.strip()!r} rewritten as {new.strip()!r}")
+            break
+    else:
+        if len(new_lines) != source.count("\n") + 1:
+            errors.append(f"{dict_name} rewritten with a different number of lines")
+    return errors
+
+
+def load_sources(paths, cell=None, names=None):
+    """Load (name, grid) tuples from every source file, in order"""
+    glyphs = []
+    for path in paths:
+        if path.lower().endswith('.png'):
+            if not cell or not names:
+                raise ValueError(f"{path}: PNG sheets need --cell and --names")
+            glyphs.extend(load_png_sheet(path, cell, names))
+        else:
+            with open(path) as f:
+                glyphs.extend(parse_bitmap_text(f.read()))
+    return glyphs
+
+
+def parse_cell(text):
+    """Parse "WxH" into (width, height)"""
+    width, _, height = text.lower().partition('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile glyph bitmaps into src/font.py")
+    parser.add_argument('sources', nargs='*', help="Bitmap text (.txt) or PNG sprite sheet (.png) files")
+    parser.add_argument('--font', default=FONT_PATH, help="font.py to update (default: src/font.py)")
+    parser.add_argument('--dict', default=FONT_DICT, dest='dict_name',
+                        help=f"Font dict to update, e.g. COMPACT_FONT (default: {FONT_DICT})")
+    parser.add_argument('--cell', type=parse_cell, help="PNG cell size, e.g. 6x10")
+    parser.add_argument('--names', help="Comma-separated glyph names for PNG cells")
+    parser.add_argument('--jobs', type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--check', action='store_true', help="Compile and verify only, don't write")
+    parser.add_argument('--dump', metavar='FILE', help="Write the current font as bitmap text and exit")
+    args = parser.parse_args()
+
+    font = read_font(args.font, args.dict_name)
+
+    if args.dump:
+        with open(args.dump, 'w') as f:
+            f.write(format_bitmap_text(font))
+        print(f"Wrote {len(font)} glyphs to {args.dump}")
+        return
+
+    if not args.sources:
+        if not args.check:
+            parser.error("no glyph sources given")
+        errors = check_round_trip(args.font, args.dict_name, args.jobs)
+        for error in errors:
+            print(f"  {error}")
+        print(f"{args.dict_name}: {'FAIL' if errors else 'PASS'} - recompiling "
+              f"{'changes' if errors else 'reproduces'} {args.font}")
+        sys.exit(1 if errors else 0)
+
+    names = args.names.split(',') if args.names else None
+    try:
+        glyphs = load_sources(args.sources, args.cell, names)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    results = compile_glyphs(glyphs, args.jobs)
+    failed = False
+    for name, blocks, error in results:
+        status = f"FAIL ({error})" if error else "ok"
+        print(f"  {name:<18} {len(blocks):>3} blocks  {status}")
+        failed = failed or error is not None
+    if failed:
+        print("Pixel check failed - font.py not written")
+        sys.exit(1)
+
+    changed = 0
+    for name, blocks, _ in results:
+        if font.get(name) != blocks:
+            changed += 1
+        font[name] = blocks
+    print(f"Compiled {len(results)} glyphs ({changed} changed)")
+
+    if args.check:
+        return
+    write_font(font, args.font, args.dict_name)
+    print(f"Wrote {args.font}")
+
+
+if __name__ == "__main__":
+    main()
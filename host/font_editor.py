@@ -1,6 +1,11 @@
 #!/usr/bin/env python3
 """
 Font Editor - Paint custom characters on a variable-width grid and export to font.py format
+
+Includes a live 53x11 preview rendered by the real Display class (src/display.py)
+on the host emulator's PicoGraphics, so edits are seen in the glucose layout.
+Only changed grid cells and preview pixels are redrawn, and the main loop
+sleeps until the next input event.
 """
 
 import pygame
@@ -14,6 +19,9 @@ try:
 except ImportError:
     CUSTOM_FONT = {}
 
+from font_compiler import optimize_blocks
+import emulator
+
 # Default grid dimensions
 DEFAULT_GRID_WIDTH = 6
 DEFAULT_GRID_HEIGHT = 10
@@ -23,6 +31,16 @@ BORDER_SIZE = 1
 # Window dimensions (will be adjusted based on grid size)
 CONTROL_PANEL_WIDTH = 400
 BOTTOM_MARGIN = 100
+MIN_WINDOW_HEIGHT = 650
+
+# Live preview of the 53x11 matrix (below the grid and controls)
+PREVIEW_SCALE = 8               # Screen pixels per LED
+PREVIEW_MARGIN = 20
+PREVIEW_LABEL_HEIGHT = 24
+PREVIEW_PANEL_HEIGHT = emulator.HEIGHT * PREVIEW_SCALE + PREVIEW_LABEL_HEIGHT + 2 * PREVIEW_MARGIN
+PREVIEW_ELAPSED = 75            # Seconds since last reading shown by the timer bar
+PREVIEW_VALUE = 128             # Glucose shown when the edited glyph isn't a digit
+PREVIEW_TREND = "Flat"          # Trend shown when the edited glyph isn't an arrow
 
 # Colors
 BLACK = (0, 0, 0)
@@ -32,6 +50,116 @@ GRAY = (50, 50, 50)
 DARK_GRAY = (30, 30, 30)
 LIGHT_GRAY = (100, 100, 100)
 YELLOW = (255, 255, 0)
+LED_OFF = (15, 15, 15)
+
+
+class DisplayPreview:
+    """
+    53x11 preview drawn by the real Display class on an emulated PicoGraphics
+    
+    The glyph being edited is swapped into a private copy of CUSTOM_FONT, so
+    the preview shows unsaved edits without touching the loaded font.
+    update() re-renders the frame and returns only the LEDs that changed.
+    """
+    
+    def __init__(self, x, y):
+        """
+        Initialize preview
+        
+        Args:
+            x: Screen X of the preview's top-left LED
+            y: Screen Y of the preview's top-left LED
+        """
+        self.x = x
+        self.y = y
+        
+        # Frozen virtual clock keeps the timer bar still
+        emulator.install()
+        import display
+        import font as font_module
+        self.clock = emulator.VirtualClock()
+        emulator.bind_clock(self.clock, display)
+        self.module = display
+        self.font_module = font_module
+        self.font = dict(CUSTOM_FONT)
+        display.CUSTOM_FONT = self.font
+        
+        self.graphics = emulator.PicoGraphics()
+        self.display = display.Display(emulator.GalacticUnicorn(), self.graphics)
+        self.display.framebuffer = None     # Draw the edited glyph lists, not the packed font
+        self.shown = [None] * (emulator.WIDTH * emulator.HEIGHT)   # Color drawn per LED
+        self.label = ""
+        
+        # Dexcom trend string for each arrow glyph
+        self.arrow_trends = {}
+        for trend, key in display.TREND_ARROWS.items():
+            self.arrow_trends.setdefault(key, trend)
+    
+    def move(self, x, y):
+        """Move the preview and force a full redraw"""
+        self.x = x
+        self.y = y
+        self.shown = [None] * len(self.shown)
+    
+    def render(self, char, blocks):
+        """
+        Render the Display layout with `char` drawn as `blocks`
+        
+        Returns:
+            list: Framebuffer indices whose color changed since the last draw
+        """
+        font = self.font
+        font.clear()
+        font.update(CUSTOM_FONT)
+        font[char] = blocks
+        self.module.DIGIT_GLYPHS = tuple(font.get(c, []) for c in "0123456789 ")
+        self.font_module.build_metrics(font)    # Advances/kerning follow the edit
+        
+        value = PREVIEW_VALUE
+        trend = PREVIEW_TREND
+        if len(char) == 1 and char.isdigit():
+            value = int("1" + char + char)
+        elif char in self.arrow_trends:
+            trend = self.arrow_trends[char]
+        self.label = f"Preview: {value} {trend}"
+        
+        # Timer bar restarts on a new value, then shows PREVIEW_ELAPSED seconds
+        self.clock.elapsed = 0.0
+        self.display.last_glucose_value = None
+        self.display.draw_glucose(value, trend)
+        self.clock.elapsed = PREVIEW_ELAPSED
+        self.display.draw_glucose(value, trend)
+        
+        framebuffer = self.graphics.framebuffer
+        return [i for i, color in enumerate(framebuffer) if color != self.shown[i]]
+    
+    def led_rect(self, index):
+        """Screen rectangle for a framebuffer index"""
+        x = index % emulator.WIDTH
+        y = index // emulator.WIDTH
+        return pygame.Rect(self.x + x * PREVIEW_SCALE, self.y + y * PREVIEW_SCALE,
+                           PREVIEW_SCALE - 1, PREVIEW_SCALE - 1)
+    
+    def draw(self, screen, changed):
+        """
+        Draw changed LEDs
+        
+        Returns:
+            list: Dirty screen rectangles
+        """
+        framebuffer = self.graphics.framebuffer
+        rects = []
+        for index in changed:
+            color = framebuffer[index]
+            rect = self.led_rect(index)
+            if color:
+                pygame.draw.rect(screen, ((color >> 16) & 0xFF, (color >> 8) & 0xFF, color & 0xFF), rect)
+            else:
+                pygame.draw.rect(screen, LED_OFF, rect)
+            self.shown[index] = color
+            rects.append(rect)
+        return rects
+
 
 class FontEditor:
     def __init__(self):
@@ -65,14 +193,33 @@ class FontEditor:
         # Drawing state
         self.is_drawing = False
         self.draw_mode = True  # True = paint, False = erase
+        
+        # Redraw state - only dirty cells/panels are drawn each frame
+        self.dirty_cells = set()
+        self.full_redraw = True
+        self.controls_dirty = True
+        self.preview_dirty = True
+        self.preview = DisplayPreview(*self.preview_origin())
     
     def update_window_size(self):
         """Update window size based on current grid dimensions"""
-        window_width = self.grid_width * PIXEL_SIZE + CONTROL_PANEL_WIDTH
-        # Ensure minimum height for all controls (650px minimum)
-        window_height = max(self.grid_height * PIXEL_SIZE + BOTTOM_MARGIN, 650)
+        window_width = max(self.grid_width * PIXEL_SIZE + CONTROL_PANEL_WIDTH,
+                           emulator.WIDTH * PREVIEW_SCALE + 2 * PREVIEW_MARGIN)
+        # Ensure minimum height for all controls, plus the preview panel
+        window_height = self.editor_height() + PREVIEW_PANEL_HEIGHT
         self.screen = pygame.display.set_mode((window_width, window_height))
         pygame.display.set_caption(f"Font Editor - {self.grid_width}x{self.grid_height} Grid")
+        self.full_redraw = True
+        if hasattr(self, 'preview'):
+            self.preview.move(*self.preview_origin())
+    
+    def editor_height(self):
+        """Height of the grid/controls area above the preview"""
+        return max(self.grid_height * PIXEL_SIZE + BOTTOM_MARGIN, MIN_WINDOW_HEIGHT)
+    
+    def preview_origin(self):
+        """Screen position of the preview's top-left LED"""
+        return (PREVIEW_MARGIN, self.editor_height() + PREVIEW_MARGIN + PREVIEW_LABEL_HEIGHT)
     
     def resize_grid(self, new_width, new_height):
         """Resize the grid, preserving existing content where possible"""
@@ -100,14 +247,19 @@ class FontEditor:
     def toggle_pixel(self, grid_x, grid_y, value=None):
         """Toggle or set a pixel in the grid"""
         if 0 <= grid_x < self.grid_width and 0 <= grid_y < self.grid_height:
+            old = self.grid[grid_y][grid_x]
             if value is None:
-                self.grid[grid_y][grid_x] = not self.grid[grid_y][grid_x]
+                self.grid[grid_y][grid_x] = not old
             else:
                 self.grid[grid_y][grid_x] = value
+            if self.grid[grid_y][grid_x] != old:
+                self.dirty_cells.add((grid_x, grid_y))
+                self.preview_dirty = True
     
     def clear_grid(self):
         """Clear all pixels"""
         self.grid = [[False for _ in range(self.grid_width)] for _ in range(self.grid_height)]
+        self.full_redraw = True
     
     def load_character(self, char_key):
         """Load a character from CUSTOM_FONT into the grid"""
@@ -144,38 +296,7 @@ class FontEditor:
     
     def export_as_blocks(self):
         """Export grid as list of (x, y, width, height) blocks - optimized"""
-        blocks = []
-        visited = [[False for _ in range(self.grid_width)] for _ in range(self.grid_height)]
-        
-        for y in range(self.grid_height):
-            for x in range(self.grid_width):
-                if self.grid[y][x] and not visited[y][x]:
-                    # Find the largest rectangle starting at this pixel
-                    width = 1
-                    height = 1
-                    
-                    # Extend width
-                    while x + width < self.grid_width and self.grid[y][x + width] and not visited[y][x + width]:
-                        width += 1
-                    
-                    # Extend height (check if entire row can be extended)
-                    can_extend = True
-                    while can_extend and y + height < self.grid_height:
-                        for check_x in range(x, x + width):
-                            if not self.grid[y + height][check_x] or visited[y + height][check_x]:
-                                can_extend = False
-                                break
-                        if can_extend:
-                            height += 1
-                    
-                    # Mark all pixels in this block as visited
-                    for mark_y in range(y, y + height):
-                        for mark_x in range(x, x + width):
-                            visited[mark_y][mark_x] = True
-                    
-                    blocks.append((x, y, width, height))
-        
-        return blocks
+        return optimize_blocks(self.grid)
     
     def export_as_bitmap(self):
         """Export grid as 2D bitmap array"""
@@ -226,23 +347,81 @@ class FontEditor:
         print("Copy the format you prefer to font.py")
         print("="*60 + "\n")
     
+    def draw_cell(self, x, y):
+        """Draw one grid cell, returning its screen rectangle"""
+        rect = pygame.Rect(
+            x * PIXEL_SIZE,
+            y * PIXEL_SIZE,
+            PIXEL_SIZE,
+            PIXEL_SIZE
+        )
+        
+        # Draw pixel
+        color = GREEN if self.grid[y][x] else DARK_GRAY
+        pygame.draw.rect(self.screen, color, rect)
+        
+        # Draw border
+        pygame.draw.rect(self.screen, GRAY, rect, BORDER_SIZE)
+        return rect
+    
     def draw_grid(self):
         """Draw the pixel grid"""
         for y in range(self.grid_height):
             for x in range(self.grid_width):
-                rect = pygame.Rect(
-                    x * PIXEL_SIZE,
-                    y * PIXEL_SIZE,
-                    PIXEL_SIZE,
-                    PIXEL_SIZE
-                )
-                
-                # Draw pixel
-                color = GREEN if self.grid[y][x] else DARK_GRAY
-                pygame.draw.rect(self.screen, color, rect)
-                
-                # Draw border
-                pygame.draw.rect(self.screen, GRAY, rect, BORDER_SIZE)
+                self.draw_cell(x, y)
+    
+    def controls_rect(self):
+        """Screen area of the control panel"""
+        panel_left = self.grid_width * PIXEL_SIZE
+        return pygame.Rect(panel_left, 0, self.screen.get_width() - panel_left, self.editor_height())
+    
+    def draw_preview_label(self):
+        """Draw the preview caption, returning its screen rectangle"""
+        rect = pygame.Rect(0, self.editor_height(), self.screen.get_width(),
+                           PREVIEW_MARGIN + PREVIEW_LABEL_HEIGHT)
+        pygame.draw.rect(self.screen, BLACK, rect)
+        text = self.small_font.render(f"{self.preview.label}  (emulated 53x11 matrix)", True, YELLOW)
+        self.screen.blit(text, (PREVIEW_MARGIN, self.editor_height() + PREVIEW_MARGIN))
+        return rect
+    
+    def redraw(self):
+        """
+        Draw whatever changed since the last call
+        
+        A full redraw only happens after a resize, load or clear; painting
+        redraws just the touched cells and the preview LEDs they affect.
+        """
+        rects = []
+        if self.full_redraw:
+            self.screen.fill(BLACK)
+            self.draw_grid()
+            self.draw_controls()
+            self.preview.move(*self.preview_origin())
+            self.preview_dirty = True
+        else:
+            for x, y in self.dirty_cells:
+                if x < self.grid_width and y < self.grid_height:
+                    rects.append(self.draw_cell(x, y))
+            if self.controls_dirty:
+                panel = self.controls_rect()
+                pygame.draw.rect(self.screen, BLACK, panel)
+                self.draw_controls()
+                rects.append(panel)
+        
+        if self.preview_dirty:
+            changed = self.preview.render(self.current_char, self.export_as_blocks())
+            rects.extend(self.preview.draw(self.screen, changed))
+            rects.append(self.draw_preview_label())
+        
+        if self.full_redraw:
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
+        
+        self.dirty_cells.clear()
+        self.full_redraw = False
+        self.controls_dirty = False
+        self.preview_dirty = False
     
     def draw_controls(self):
         """Draw control panel"""
@@ -321,13 +500,20 @@ class FontEditor:
             self.screen.blit(text, (panel_x, y_offset))
             y_offset += 22
     
-    def handle_events(self):
+    def handle_events(self, events):
         """Handle user input"""
-        for event in pygame.event.get():
+        for event in events:
             if event.type == pygame.QUIT:
                 return False
             
+            elif event.type == pygame.WINDOWEXPOSED:
+                self.full_redraw = True
+            
             elif event.type == pygame.KEYDOWN:
+                # Keys change the panel text (character, dropdown, size)
+                self.controls_dirty = True
+                self.preview_dirty = True
+                
                 if event.key == pygame.K_ESCAPE or event.key == pygame.K_q:
                     return False
                 
@@ -428,15 +614,14 @@ class FontEditor:
         print("Press '0-9' or 'A-Z' to set the current character")
         print("="*60 + "\n")
         
+        self.redraw()
         while running:
-            running = self.handle_events()
+            # Sleep until input arrives, then take everything queued
+            events = [pygame.event.wait()] + pygame.event.get()
+            running = self.handle_events(events)
             
-            # Draw
-            self.screen.fill(BLACK)
-            self.draw_grid()
-            self.draw_controls()
-            
-            pygame.display.flip()
+            # Draw only what changed
+            self.redraw()
             clock.tick(60)
         
         pygame.quit()
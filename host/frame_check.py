@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Frame check - steady-state display frames must not allocate
+
+main.display_updater and Display.draw_glucose are written to be
+allocation-free once running, so MicroPython's GC never pauses the timer
+animation or the alert pulse. On the device DEBUG_ALLOC_GUARD locks the
+heap while drawing, but the emulator's heap_lock is a no-op, so this
+meters frames with soak.AllocationMeter instead (tracemalloc, every
+allocation charged to the src/ function that made it, short-lived ones
+included) and requires zero bytes:
+- Frames: Display.draw_glucose for every display snapshot scenario (ranges,
+  local trend, stale, multi-account, delta mode, both alert levels), drawn
+  --frames times a second apart with the alert pulse stepping every frame.
+- Task: the device tasks run through the replay harness on the synthetic
+  trace from a little before its first low alert, and the display_updater
+  task is metered for --minutes: plain frames, new readings and the alert
+  pulsing at the full frame rate.
+
+The meter is primed first (frames traced but not counted): CPython pays a
+one-off cost the first time the trace hook sees each call site.
+
+Allocations only CPython makes (int boxes, the hook's frame objects) and
+the emulator's own are left out (see AllocationMeter). Exits non-zero if
+any frame allocates, naming the functions.
+
+Usage:
+    python host/frame_check.py
+    python host/frame_check.py --frames 120 --minutes 20
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from emulator import VirtualClock, GalacticUnicorn, PicoGraphics, install, bind_clock, DEFAULT_START_EPOCH
+from replay import ReplayHarness, synth_trace
+from snapshot import SCENARIOS
+from soak import AllocationMeter, FunctionIndex, HOST_STAND_INS, UNATTRIBUTED_OWNER
+
+TASK = "main.display_updater"
+FIRST_ALERT_MINUTES = 395       # Synthetic trace (seed 1) first predicts a low here
+LEAD_MINUTES = 5                # Task metering starts this long before the alert
+WARMUP_MINUTES = 5              # Device tasks run uncounted first (boot, first fetches)
+PRIMING_FRAMES = 10             # Frames traced but not counted per scenario (both delta phases)
+PRIMING_MINUTES = 1             # Last part of the task warmup, traced but not counted
+NOT_DEVICE = (HOST_STAND_INS, UNATTRIBUTED_OWNER[1])
+
+
+def device_allocations(by_function):
+    """(bytes, blocks, [(function, bytes, blocks)]) charged to src/ functions"""
+    culprits = sorted(((name, size, count) for name, (size, count) in by_function.items()
+                       if name not in NOT_DEVICE), key=lambda c: -c[1])
+    return sum(c[1] for c in culprits), sum(c[2] for c in culprits), culprits
+
+
+def check_frames(frames):
+    """
+    Meter draw_glucose for each snapshot scenario
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    install()
+    import display as display_module
+    meter = AllocationMeter(FunctionIndex())
+    ok = True
+    lines = []
+    for name, scenario in SCENARIOS.items():
+        clock = VirtualClock()
+        bind_clock(clock, display_module)
+        display = display_module.Display(GalacticUnicorn(), PicoGraphics(), digit_spacing=1,
+                                         delta_mode=scenario.get('delta_mode', False))
+        if 'account' in scenario:
+            display.set_account(*scenario['account'])
+        level, step = scenario.get('alert', (0, 0))
+        reading_ticks = None
+        if 'age' in scenario:
+            reading_ticks = clock.ticks_add(clock.ticks_ms(), -scenario['age'] * 1000)
+        args = (scenario['value'], scenario['trend'], scenario.get('local', False),
+                scenario.get('delta'), scenario.get('change'), reading_ticks)
+
+        tracemalloc.start()
+        meter.start()
+        for frame in range(PRIMING_FRAMES + frames):
+            if frame == PRIMING_FRAMES:
+                meter.take()
+            clock.advance(1)
+            step += 1
+            display.set_alert(level, step)
+            display.draw_glucose(*args)
+        meter.stop()
+        tracemalloc.stop()
+
+        size, count, culprits = device_allocations(meter.take()[1])
+        lines.append(f"{name:<28} {frames} frames, {size} B / {count} blocks")
+        for function, function_size, function_count in culprits:
+            lines.append(f"  {function}: {function_size} B / {function_count} blocks")
+            ok = False
+    return ok, lines
+
+
+def check_task(minutes):
+    """
+    Meter the display_updater task through a stretch of the replay with a low alert
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    # Shift the trace so the run starts WARMUP_MINUTES + LEAD_MINUTES before the alert
+    offset = (FIRST_ALERT_MINUTES - LEAD_MINUTES - WARMUP_MINUTES) * 60
+    hours = (WARMUP_MINUTES + minutes) / 60 + 0.1
+    readings = synth_trace(DEFAULT_START_EPOCH - offset, hours + offset / 3600 + 1)
+    harness = ReplayHarness(readings=readings, hours=hours)
+    meter = AllocationMeter(FunctionIndex(), task=TASK)
+    counts = {}
+
+    async def monitor(harness):
+        await asyncio.sleep((WARMUP_MINUTES - PRIMING_MINUTES) * 60)
+        tracemalloc.start()
+        meter.start()
+        try:
+            await asyncio.sleep(PRIMING_MINUTES * 60)
+            meter.take()
+            frames = harness.gu.frames
+            alert_frames = harness.alert_timing.summary()[0]
+            await asyncio.sleep(minutes * 60)
+        finally:
+            meter.stop()
+            tracemalloc.stop()
+        counts['frames'] = harness.gu.frames - frames
+        counts['alert_frames'] = harness.alert_timing.summary()[0] - alert_frames
+
+    harness.run(monitors=(monitor,))
+    by_task, by_function = meter.take()
+    size, count = by_task.get(TASK, (0, 0))
+    _, _, culprits = device_allocations(by_function)
+    ok = 'frames' in counts and counts['alert_frames'] > 0 and not size
+    lines = [f"{TASK}: {counts.get('frames', 0)} frames ({counts.get('alert_frames', 0)} alert) "
+             f"over {minutes} min, {size} B / {count} blocks"]
+    for function, function_size, function_count in culprits:
+        lines.append(f"  {function}: {function_size} B / {function_count} blocks")
+    if not counts.get('alert_frames'):
+        lines.append("  no alert frames metered (--minutes too short, or the synthetic trace changed)")
+    return ok, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check steady-state display frames don't allocate")
+    parser.add_argument('--frames', type=int, default=60,
+                        help="Frames metered per display scenario (default: 60)")
+    parser.add_argument('--minutes', type=float, default=10.0,
+                        help="Simulated minutes of the display task metered (default: 10)")
+    args = parser.parse_args()
+
+    print("FRAMES")
+    frames_ok, lines = check_frames(args.frames)
+    for line in lines:
+        print(f"  {line}")
+
+    print("TASK")
+    task_ok, lines = check_task(args.minutes)
+    for line in lines:
+        print(f"  {line}")
+
+    ok = frames_ok and task_ok
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
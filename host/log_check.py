@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Glucose log check - src/glucose_log.py on the host filesystem
+
+Four parts, in a temporary directory (or --dir):
+- Queries: appends a synthetic trace (with gaps and repeats) to a log with
+  small segments, then checks random time ranges against a brute-force
+  scan, and that each query reads no more than INDEX_STRIDE + READ_RECORDS
+  records beyond its results.
+- Compaction: the number of segment files never exceeds max_segments,
+  the oldest readings go first, and flash bytes written per reading stay
+  within a record plus its share of index appends and rewrites.
+- Recovery: reopening reads only the index and the tail segment, and comes
+  back with the same records and index; also after a record torn by a
+  power loss, a missing index entry and a torn index entry.
+- Reboot: runs the device tasks through the replay harness with a log,
+  "reboots" a while later into a fresh harness on the same log, and checks
+  the last reading is back on screen before the first fetch, the trend
+  history is restored from flash, and the readings missed while off are
+  backfilled so the log has no holes.
+
+Exits non-zero on any failure.
+
+Usage:
+    python host/log_check.py
+    python host/log_check.py --readings 5000 --queries 1000
+    python host/log_check.py --dir /tmp/glucose    # Keep the log files
+"""
+
+import argparse
+import builtins
+import os
+import random
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from emulator import install, DEFAULT_START_EPOCH
+
+SEGMENT_RECORDS = 64            # Small segments so compaction runs often
+MAX_SEGMENTS = 6
+INDEX_STRIDE = 8
+REBOOT_OFF_SECONDS = 900        # Time powered off between the two runs (3 readings missed)
+
+
+class FileCounter:
+    """Wraps open() in glucose_log to count bytes read and written per file"""
+
+    def __init__(self):
+        self.read = {}
+        self.written = {}
+
+    def __call__(self, path, mode="r"):
+        f = builtins.open(path, mode)
+        counter = self
+
+        class Counted:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                f.close()
+
+            def read(self, *args):
+                data = f.read(*args)
+                counter.read[path] = counter.read.get(path, 0) + len(data)
+                return data
+
+            def readinto(self, buf):
+                count = f.readinto(buf)
+                counter.read[path] = counter.read.get(path, 0) + count
+                return count
+
+            def write(self, data):
+                counter.written[path] = counter.written.get(path, 0) + len(data)
+                return f.write(data)
+
+            def seek(self, offset):
+                return f.seek(offset)
+
+            def close(self):
+                f.close()
+
+        return Counted()
+
+    def reset(self):
+        self.read.clear()
+        self.written.clear()
+
+
+def synthetic(count, seed=1):
+    """(epoch seconds, value, trend, local) readings with gaps, oldest first"""
+    rng = random.Random(seed)
+    readings = []
+    t = DEFAULT_START_EPOCH
+    trends = ("Flat", "FortyFiveUp", "SingleUp", "DoubleUp", "FortyFiveDown", "SingleDown", "DoubleDown")
+    for n in range(count):
+        t += 300 if rng.random() > 0.05 else 300 * rng.randint(2, 40)   # Signal losses
+        readings.append((t, rng.randint(40, 400), trends[n % len(trends)], rng.random() < 0.2))
+    return readings
+
+
+def write_budget(glucose_log, segment_records, max_segments, index_stride):
+    """Flash bytes written per reading: record, index entry share, index rewrite share"""
+    index_bytes = glucose_log.INDEX_SIZE * max_segments * segment_records // index_stride
+    return glucose_log.RECORD_SIZE + glucose_log.INDEX_SIZE / index_stride + index_bytes / segment_records
+
+
+def open_log(glucose_log, path):
+    return glucose_log.GlucoseLog(path, SEGMENT_RECORDS, MAX_SEGMENTS, INDEX_STRIDE)
+
+
+def check_queries(glucose_log, path, readings, queries, counter):
+    """
+    Append readings, then compare range queries with a brute-force scan
+
+    Returns:
+        tuple: (ok, report lines, kept readings)
+    """
+    ok = True
+    lines = []
+    log = open_log(glucose_log, path)
+    counter.reset()
+    refused = 0
+    for n, reading in enumerate(readings):
+        if not log.append(*reading):
+            ok = False
+        if n % 7 == 0 and log.append(*reading):     # Repeats are refused
+            ok = False
+        elif n % 7 == 0:
+            refused += 1
+    written = sum(counter.written.values())
+    kept = readings[-len(log):]
+
+    rng = random.Random(2)
+    first, last = kept[0][0], kept[-1][0]
+    worst = 0
+    for _ in range(queries):
+        a = rng.randint(first - 3600, last + 3600)
+        b = rng.randint(a, a + rng.choice((600, 3600, 86400, 10 * 86400)))
+        counter.reset()
+        got = list(log.between(a, b))
+        expected = [r for r in kept if a <= r[0] <= b]
+        read = sum(counter.read.values()) // glucose_log.RECORD_SIZE
+        worst = max(worst, read - len(got))
+        if got != expected:
+            lines.append(f"  between({a}, {b}): {len(got)} readings, expected {len(expected)}")
+            ok = False
+    every = list(log.between())
+    if every != kept:
+        lines.append("  between() without bounds doesn't return every kept reading")
+        ok = False
+    bound = INDEX_STRIDE + glucose_log.READ_RECORDS
+    lines.insert(0, f"Queries:     {queries} ranges over {len(log)} readings, worst {worst} records "
+                    f"read beyond the results (bound {bound}), {refused} repeats refused")
+    if worst > bound:
+        ok = False
+
+    # Compaction: a record, an index entry per stride and an index rewrite per segment
+    segments = [name for name in os.listdir(path) if name.endswith(".seg")]
+    per_reading = written / len(readings)
+    budget = write_budget(glucose_log, SEGMENT_RECORDS, MAX_SEGMENTS, INDEX_STRIDE)
+    device = write_budget(glucose_log, glucose_log.SEGMENT_RECORDS, glucose_log.MAX_SEGMENTS,
+                          glucose_log.INDEX_STRIDE)
+    lines.append(f"Compaction:  {len(readings)} appended, {len(log)} kept in {len(segments)} segments "
+                 f"(max {MAX_SEGMENTS}), {per_reading:.1f} bytes written per reading "
+                 f"(budget {budget:.1f}; {device:.1f} with the device defaults)")
+    if len(segments) > MAX_SEGMENTS or len(log) > MAX_SEGMENTS * SEGMENT_RECORDS:
+        lines.append("  too many segments kept")
+        ok = False
+    if list(log.between(None, kept[0][0] - 1)):
+        lines.append("  compacted readings still returned")
+        ok = False
+    if per_reading > budget:
+        lines.append("  too much written per reading")
+        ok = False
+    return ok, lines, kept
+
+
+def check_recovery(glucose_log, path, kept, counter):
+    """
+    Reopen the log, cleanly and after torn writes
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    ok = True
+    lines = []
+    reference = open_log(glucose_log, path)
+    index = (list(reference.index_times), list(reference.index_records))
+    tail = reference._segment_path((reference.end - 1) // SEGMENT_RECORDS)
+    index_path = path + "/index"
+
+    def reopen(label):
+        nonlocal ok
+        counter.reset()
+        log = open_log(glucose_log, path)
+        segments_read = [p for p in counter.read if p.endswith(".seg")]
+        same = (len(log) == len(kept) and list(log.between()) == kept
+                and (list(log.index_times), list(log.index_records)) == index)
+        lines.append(f"Recovery:    {label:<26} {len(log)} readings, read {sum(counter.read.values())} bytes "
+                     f"from {len(segments_read)} segment(s)")
+        if segments_read != [tail]:
+            lines.append(f"  read segments {segments_read}, expected only the tail")
+            ok = False
+        if not same:
+            lines.append("  recovered log differs")
+            ok = False
+        return log
+
+    reopen("clean")
+
+    with open(tail, "ab") as f:
+        f.write(b"\x01\x02\x03")                # Power lost mid-append
+    reopen("torn record")
+    if os.path.getsize(tail) % glucose_log.RECORD_SIZE:
+        lines.append("  torn record left in the tail segment")
+        ok = False
+
+    size = os.path.getsize(index_path)
+    with open(index_path, "r+b") as f:
+        f.truncate(size - glucose_log.INDEX_SIZE)   # Lost between record and index append
+    reopen("missing index entry")
+
+    with open(index_path, "r+b") as f:
+        f.truncate(size - 3)
+    log = reopen("torn index entry")
+
+    reading = (kept[-1][0] + 300, 123, "Flat", False)
+    log.append(*reading)
+    log = open_log(glucose_log, path)
+    if log.latest() != reading:
+        lines.append(f"Recovery:    append after recovery lost: {log.latest()}")
+        ok = False
+    return ok, lines
+
+
+def check_reboot(glucose_log, path):
+    """
+    Run the device tasks with a log, reboot later and run again
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    from replay import ReplayHarness, synth_trace
+    import trend
+    lines = []
+    ok = True
+    start = DEFAULT_START_EPOCH
+    first_hours = 3.0
+    trace = synth_trace(start, first_hours + 2)
+
+    before = ReplayHarness(trace, hours=first_hours, start_epoch=start)
+    before.client.log = glucose_log.GlucoseLog(path)
+    before.run()
+    last = before.client.log.latest()
+
+    after = ReplayHarness(trace, hours=0.5, start_epoch=int(start + first_hours * 3600 + REBOOT_OFF_SECONDS))
+    after.client.log = glucose_log.GlucoseLog(path)
+    first_fetch = {}
+    read_latest = after.share._read_latest
+
+    def recording_read(url):
+        if not first_fetch:
+            client = after.client
+            first_fetch.update(url=url, value=client.get_glucose_value(), history=client.trend_estimator.count,
+                               frames=after.gu.frames)
+        return read_latest(url)
+
+    after.share._read_latest = recording_read
+    after.run()
+
+    lines.append(f"Reboot:      off {REBOOT_OFF_SECONDS // 60} min; last logged {last[1]} mg/dL, "
+                 f"on screen at first fetch: {first_fetch.get('value')} "
+                 f"({first_fetch.get('history')} readings of trend history)")
+    if first_fetch.get('value') != last[1]:
+        lines.append("  last reading not restored before the first fetch")
+        ok = False
+    if first_fetch.get('history') != trend.TREND_HISTORY_SIZE:
+        lines.append("  trend history not restored from the log")
+        ok = False
+
+    # Every trace reading up to the end of the second run is logged exactly once
+    end = after.clock.time()
+    expected = [after.dexcom.parse_share_timestamp(r["WT"]) for r in trace]
+    expected = [t for t in expected if t <= end - 60]
+    logged = [t for t, _, _, _ in after.client.log.between()]
+    missing = sorted(set(expected) - set(logged))
+    lines.append(f"Reboot:      {len(logged)} readings logged across both runs, {len(missing)} missing, "
+                 f"first fetch {first_fetch.get('url', '').split('&', 1)[-1]}")
+    if missing or logged != sorted(set(logged)):
+        ok = False
+    return ok, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the flash glucose log on the host filesystem")
+    parser.add_argument('--readings', type=int, default=2000, help="Readings appended (default: 2000)")
+    parser.add_argument('--queries', type=int, default=500, help="Random range queries (default: 500)")
+    parser.add_argument('--dir', help="Directory for the log files (default: a temporary one)")
+    args = parser.parse_args()
+
+    install()
+    import glucose_log
+    counter = FileCounter()
+    glucose_log.open = counter
+
+    with tempfile.TemporaryDirectory() as scratch:
+        root = args.dir or scratch
+        path = os.path.join(root, "queries")
+        query_ok, lines, kept = check_queries(glucose_log, path, synthetic(args.readings), args.queries, counter)
+        for line in lines:
+            print(line)
+        recovery_ok, lines = check_recovery(glucose_log, path, kept, counter)
+        for line in lines:
+            print(line)
+        reboot_ok, lines = check_reboot(glucose_log, os.path.join(root, "reboot"))
+        for line in lines:
+            print(line)
+
+    ok = query_ok and recovery_ok and reboot_ok
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
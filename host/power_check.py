@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Power profile check - night dimming, task rates and duty cycle on a fake clock
+
+Two parts:
+- Schedule: steps a PowerScheduler through two days on a VirtualClock and
+  checks the night window, the brightness cap and its restore in the
+  morning, and that an unsynced clock (rp2 boot default, 2021) stays on the
+  day profile.
+- Replay: runs the real device tasks for a day through the replay harness,
+  with every frame costing --frame-cost ms of (virtual) CPU time, and reads
+  the device's own "Power profile" / "Brightness" / "CPU duty" log lines.
+  Night windows must wake the CPU well under half as often as day windows.
+
+Exits non-zero on any failure.
+
+Usage:
+    python host/power_check.py
+    python host/power_check.py --frame-cost 5 --hours 48
+"""
+
+import argparse
+import io
+import os
+import re
+import sys
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from emulator import VirtualClock, install, bind_clock
+from replay import ReplayHarness, format_report
+
+MIDNIGHT_UTC = 1704067200       # 2024-01-01 00:00 UTC
+UNSYNCED_EPOCH = 1609459200     # 2021-01-01 00:00 UTC (rp2 clock before NTP)
+DEFAULT_FRAME_COST_MS = 3.0     # Assumed CPU time per rendered frame
+MAX_NIGHT_WAKEUP_RATIO = 0.5    # Night wake-ups per window vs day, at most
+
+DUTY_LINE = re.compile(r"CPU duty: (\d+)\.(\d)% \((\d+) wake-ups in (\d+)s\)")
+
+
+def check_schedule():
+    """
+    Step a PowerScheduler through 48 hours at one-minute resolution
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    install()
+    import power
+    import ntp
+    clock = VirtualClock(MIDNIGHT_UTC)
+    bind_clock(clock, power, ntp)
+
+    ok = True
+    lines = []
+    scheduler = power.PowerScheduler(utc_offset_hours=0)
+    brightness = 60
+    night_minutes = 0
+    restored = []
+    for minute in range(48 * 60):
+        hour = (minute // 60) % 24
+        level = scheduler.update(brightness)
+        if level is not None:
+            lines.append(f"{minute // 60:02d}:{minute % 60:02d} -> "
+                         f"{power.PROFILE_NAMES[scheduler.profile]}, brightness {brightness}% -> {level}%")
+            brightness = level
+            if scheduler.profile == power.PROFILE_DAY:
+                restored.append(level)
+        expected_night = hour >= power.NIGHT_START_HOUR or hour < power.NIGHT_END_HOUR
+        if (scheduler.profile == power.PROFILE_NIGHT) != expected_night:
+            lines.append(f"Wrong profile at hour {hour}")
+            ok = False
+            break
+        if scheduler.profile == power.PROFILE_NIGHT:
+            night_minutes += 1
+            if brightness > power.NIGHT_BRIGHTNESS_PCT or scheduler.redraw_ms != power.NIGHT_REDRAW_MS:
+                lines.append(f"Night profile not applied at hour {hour}")
+                ok = False
+                break
+        clock.advance(60)
+
+    expected = 2 * 60 * (24 - power.NIGHT_START_HOUR + power.NIGHT_END_HOUR)
+    lines.append(f"Night minutes: {night_minutes} (expected {expected})")
+    if night_minutes != expected or restored != [60, 60]:
+        lines.append(f"Schedule mismatch (morning brightness {restored}, expected 60% twice)")
+        ok = False
+
+    # Clock not synced yet: always day
+    clock = VirtualClock(UNSYNCED_EPOCH)
+    bind_clock(clock, power, ntp)
+    scheduler = power.PowerScheduler(utc_offset_hours=0)
+    for _ in range(24):
+        if scheduler.update(brightness) is not None:
+            lines.append("Unsynced clock switched profile")
+            ok = False
+            break
+        clock.advance(3600)
+    return ok, lines
+
+
+def check_replay(hours, frame_cost_ms):
+    """
+    Run the device tasks and split their duty cycle reports by profile
+
+    Returns:
+        tuple: (ok, report lines, replay report)
+    """
+    harness = ReplayHarness(hours=hours, start_epoch=MIDNIGHT_UTC + 12 * 3600)
+    on_frame = harness.gu.on_update
+
+    def costly_frame(graphics):
+        on_frame(graphics)
+        harness.clock.advance(frame_cost_ms / 1000)
+
+    harness.gu.on_update = costly_frame
+    log = io.StringIO()
+    with redirect_stdout(log):
+        report = harness.run(quiet=False)
+
+    # Attribute each duty window to the profile it ran under; skip windows
+    # that straddle a profile change
+    windows = {"day": [], "night": []}
+    profile = "day"
+    mixed = False
+    night_brightness = []
+    for line in log.getvalue().splitlines():
+        if line.startswith("Power profile:"):
+            profile = line.split(":", 1)[1].strip()
+            mixed = True
+        elif line.startswith("Brightness:") and profile == "night":
+            night_brightness.append(int(line.split()[1]))
+        else:
+            match = DUTY_LINE.match(line)
+            if match:
+                if not mixed:
+                    duty = int(match.group(1)) + int(match.group(2)) / 10
+                    windows[profile].append((duty, int(match.group(3))))
+                mixed = False
+
+    ok = True
+    lines = []
+    medians = {}
+    for name, samples in windows.items():
+        if not samples:
+            lines.append(f"No {name} duty windows reported")
+            ok = False
+            continue
+        duties = sorted(d for d, _ in samples)
+        wakeups = sorted(w for _, w in samples)
+        medians[name] = wakeups[len(wakeups) // 2]
+        lines.append(f"{name:<6} {len(samples):>3} windows, duty median {duties[len(duties) // 2]:.1f}% "
+                     f"(max {duties[-1]:.1f}%), wake-ups median {medians[name]}")
+    if len(medians) == 2 and medians["night"] > medians["day"] * MAX_NIGHT_WAKEUP_RATIO:
+        lines.append("Night profile doesn't reduce wake-ups enough")
+        ok = False
+    power = harness.power
+    if not night_brightness or max(night_brightness) > power.NIGHT_BRIGHTNESS_PCT:
+        lines.append(f"Night brightness not capped: {night_brightness}")
+        ok = False
+    return ok, lines, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check power profiles against a fake clock")
+    parser.add_argument('--hours', type=float, default=24.0, help="Replay duration (default: 24)")
+    parser.add_argument('--frame-cost', type=float, default=DEFAULT_FRAME_COST_MS,
+                        help=f"CPU ms per rendered frame (default: {DEFAULT_FRAME_COST_MS})")
+    args = parser.parse_args()
+
+    print("SCHEDULE")
+    schedule_ok, lines = check_schedule()
+    for line in lines:
+        print(f"  {line}")
+
+    print("REPLAY")
+    replay_ok, lines, report = check_replay(args.hours, args.frame_cost)
+    for line in format_report(report):
+        print(line)
+    for line in lines:
+        print(f"  {line}")
+
+    ok = schedule_ok and replay_ok
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
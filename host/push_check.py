@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Push channel check - long-polling the relay against interval polling
+
+Runs the device tasks in relay mode through the replay harness twice,
+polling (RELAY_PUSH off) and long-polling (RELAY_PUSH on), with the relay
+(host/relay.py) in the same event loop: its Share poller reads the replay
+trace, and display requests reach Relay.respond directly instead of over
+TCP. Share gets each reading UPLOAD_LAG seconds after its timestamp (a
+random 5-120 s, as from the uploader), so neither the relay nor a polling
+display knows exactly when it will be there. For each run it counts
+display requests per hour and the latency from the relay caching a reading
+to the display showing it.
+
+The push run also takes the channel away on a schedule:
+- outage:  the relay is unreachable for an hour (requests fail)
+- no-hold: the relay ignores `wait` for an hour (answers at once, like a
+  relay without long-poll support)
+
+Checks that push shows readings within MAX_PUSH_LATENCY of the relay with
+fewer requests than polling, that during both phases the display falls
+back to polling at the interval schedule instead of spinning, and that
+push resumes once the relay holds requests again.
+
+Exits non-zero on any failure.
+
+Usage:
+    python host/push_check.py
+    python host/push_check.py --hours 12
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from replay import ReplayHarness
+
+MAX_PUSH_LATENCY = 1.0          # Seconds from the relay caching a reading to the display showing it
+PHASE_SECONDS = 3600            # Length of the outage and no-hold phases
+UPLOAD_LAG = (5, 120)           # Seconds after its timestamp a reading reaches Share
+
+
+class RelayLink:
+    """
+    In-process stand-in for relay_client's ahttp: GETs go to Relay.respond
+
+    Counts requests, and fails them (outage) or drops `wait` from them
+    (no-hold) while the matching phase is on.
+    """
+
+    def __init__(self, relay, clock):
+        self.relay = relay
+        self.clock = clock
+        self.phase = None
+        self.requests = []              # (monotonic seconds, phase) per request
+
+    async def get(self, url, headers=None, timeout=None):
+        self.requests.append((self.clock.monotonic(), self.phase))
+        if self.phase == 'outage':
+            raise OSError(113, "EHOSTUNREACH")
+        target = "/" + url.split("/", 3)[3]
+        if self.phase == 'no-hold':
+            target = target.split("&wait=", 1)[0]
+        self.relay.requests += 1
+        status, payload = await asyncio.wait_for(self.relay.respond("GET", target), timeout)
+        return status, "" if payload is None else json.dumps(payload)
+
+
+def run(hours, push, phases=()):
+    """
+    Run the device in relay mode for `hours`
+
+    Args:
+        hours: Virtual hours to run
+        push: RELAY_PUSH setting
+        phases: [(start seconds, kind)] of PHASE_SECONDS each
+
+    Returns:
+        dict: requests, latencies and the link of the run
+    """
+    harness = ReplayHarness(hours=hours)
+    rng = random.Random(3)
+    harness.share.times = [t + rng.randint(*UPLOAD_LAG) for t in harness.share.times]
+    import relay as relay_module
+    import relay_client
+    harness.main.RELAY_PUSH = push
+    relay = relay_module.Relay([("replay", "replay")])
+    link = RelayLink(relay, harness.clock)
+    relay_client.ahttp = types.SimpleNamespace(get=link.get, HTTP_TIMEOUT=relay_client.ahttp.HTTP_TIMEOUT)
+    harness.client = relay_client.RelayClient("http://relay", 0)
+
+    # When each reading reached the relay's cache and the display
+    cached = {}
+    shown = {}
+    cache_fetch = relay.clients[0]._handle_fetch
+    device_fetch = harness.client._handle_relay
+
+    def record_cached(status, content):
+        result = cache_fetch(status, content)
+        for t in relay.clients[0].times:
+            cached.setdefault(t, harness.clock.monotonic())
+        return result
+
+    def record_shown(status, content):
+        result = device_fetch(status, content)
+        if harness.client.glucose_time is not None:
+            shown.setdefault(harness.client.glucose_time, harness.clock.monotonic())
+        return result
+
+    relay.clients[0]._handle_fetch = record_cached
+    harness.client._handle_relay = record_shown
+
+    async def relay_poller(h):
+        await relay.poll(0)
+
+    async def scheduler(h):
+        for start, kind in phases:
+            await asyncio.sleep(start - h.clock.monotonic())
+            link.phase = kind
+            await asyncio.sleep(PHASE_SECONDS)
+            link.phase = None
+
+    harness.run(monitors=(relay_poller, scheduler))
+    return {'hours': hours, 'link': link, 'cached': cached, 'shown': shown}
+
+
+def latencies(result, start=0, end=None):
+    """Relay-to-display latency of readings cached between start and end"""
+    end = end if end is not None else result['hours'] * 3600
+    first = min(result['cached'].values())          # The backfill isn't a push
+    return [result['shown'][t] - at for t, at in result['cached'].items()
+            if at > first and start <= at < end and t in result['shown']]
+
+
+def summarize(label, result, lats):
+    per_hour = len(result['link'].requests) / result['hours']
+    median = statistics.median(lats) if lats else 0
+    worst = max(lats) if lats else 0
+    return per_hour, f"{label:<8} {per_hour:5.1f} requests/hour, latency median {median:.1f} s, max {worst:.1f} s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the relay long-poll push channel against polling")
+    parser.add_argument('--hours', type=float, default=8.0, help="Virtual hours per run (default: 8)")
+    args = parser.parse_args()
+    if args.hours < 5:
+        parser.error("--hours must leave room for both phases (at least 5)")
+
+    ok = True
+    outage = 1 * 3600
+    no_hold = 3 * 3600
+    phases = [(outage, 'outage'), (no_hold, 'no-hold')]
+    quiet = [(0, outage), (outage + PHASE_SECONDS + 600, no_hold), (no_hold + PHASE_SECONDS + 600, None)]
+
+    poll = run(args.hours, push=False)
+    push = run(args.hours, push=True, phases=phases)
+    import main as device
+
+    poll_rate, line = summarize("Polling:", poll, latencies(poll))
+    print(line)
+    push_lats = [lat for start, end in quiet for lat in latencies(push, start, end)]
+    quiet_hours = sum((end or args.hours * 3600) - start for start, end in quiet) / 3600
+    quiet_requests = sum(1 for at, phase in push['link'].requests
+                         if any(start <= at < (end or args.hours * 3600) for start, end in quiet))
+    push_rate = quiet_requests / quiet_hours
+    print(f"Push:     {push_rate:5.1f} requests/hour, latency median {statistics.median(push_lats):.1f} s, "
+          f"max {max(push_lats):.1f} s (outside the phases)")
+    if max(push_lats) > MAX_PUSH_LATENCY:
+        print(f"  readings took longer than {MAX_PUSH_LATENCY} s to reach the display")
+        ok = False
+    if push_rate >= poll_rate:
+        print("  push made no fewer requests than polling")
+        ok = False
+
+    # Polling fallback: about one request per retry interval at worst, never a spin
+    budget = PHASE_SECONDS / device.DEXCOM_UPDATE_INTERVAL + 2
+    for start, kind in phases:
+        made = sum(1 for _, phase in push['link'].requests if phase == kind)
+        recovered = latencies(push, start + PHASE_SECONDS + 600, start + PHASE_SECONDS + 1800)
+        print(f"{kind + ':':<9} {made} requests in {PHASE_SECONDS // 60} min (budget {budget:.0f}), "
+              f"next readings after it shown in max {max(recovered, default=0):.1f} s")
+        if made > budget:
+            print("  fallback polled faster than the retry interval")
+            ok = False
+        if not recovered or max(recovered) > MAX_PUSH_LATENCY:
+            print("  push didn't resume after the phase")
+            ok = False
+
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Raster kernel benchmark - per-glyph draw cost on the host and on the device
+
+Times every glyph of CUSTOM_FONT and COMPACT_FONT, the timer bar and a
+whole draw_glucose frame two ways: through graphics.pixel() (the
+interpreted loops used without a framebuffer) and through the raster
+kernels (src/raster.py) straight into the framebuffer. Reports cycles per
+draw and the speedup.
+
+On the host the Python kernels run against the emulated PicoGraphics, and
+times are converted to cycles at the host CPU clock (/proc/cpuinfo, or
+--cpu-mhz). Before timing, the viper kernel bodies are also run under
+CPython (ptr8/ptr32 stood in by the buffers themselves) and every glyph,
+at offsets clipped on each edge, must land on exactly the pixels
+graphics.pixel() draws; exits non-zero on a mismatch.
+
+On the device the same file runs under MicroPython (font.py, raster.py,
+display.py and alerts.py deployed): times come from ticks_us and cycles
+from machine.freq(). --capture runs it through mpremote and saves the
+output.
+
+Usage:
+    python host/raster_bench.py                     # Host: check + benchmark
+    python host/raster_bench.py --reps 2000 --cpu-mhz 3000
+    python host/raster_bench.py --capture device.txt --port /dev/ttyACM0
+    mpremote run host/raster_bench.py               # Device, console output only
+"""
+
+import sys
+import time
+
+MICROPYTHON = sys.implementation.name == "micropython"
+DEFAULT_REPS = 200              # Draws per timing (device default; host uses 10x)
+BENCH_X = 10                    # Glyph origin for timing (fully on screen)
+BENCH_VALUE = 188               # draw_glucose frame: three wide digits...
+BENCH_TREND = "DoubleUp"        # ...and the largest arrow
+BENCH_ELAPSED = 329             # Timer bar: 10 full pixels plus a growing one
+CLIP_OFFSETS = ((0, 0), (-3, -2), (49, 4), (47, -5), (20, 7), (-8, 3))
+
+
+class _NoUpdate:
+    """GalacticUnicorn stand-in for frame timing (no LED refresh)"""
+
+    def update(self, graphics):
+        pass
+
+
+def _time_draw(draw, args, reps):
+    """Mean ns per draw(*args), less the cost of the call itself"""
+    def empty(*args):
+        pass
+
+    spent = []
+    for func in (empty, draw):
+        if MICROPYTHON:
+            start = time.ticks_us()
+            for _ in range(reps):
+                func(*args)
+            spent.append(time.ticks_diff(time.ticks_us(), start) * 1000)
+        else:
+            start = time.perf_counter_ns()
+            for _ in range(reps):
+                func(*args)
+            spent.append(time.perf_counter_ns() - start)
+    return max(0, spent[1] - spent[0]) // reps
+
+
+def _glyphs(font):
+    """(label, blocks, packed) for every glyph drawn by Display"""
+    rows = []
+    for name, blocks in font.CUSTOM_FONT.items():
+        if blocks:
+            rows.append(("space" if name == " " else name, blocks, font.PACKED_FONT[name]))
+    for name, blocks in font.COMPACT_FONT.items():
+        rows.append(("compact " + name, blocks, font.PACKED_COMPACT[name]))
+    return rows
+
+
+def benchmark(graphics, display_module, font, raster, reps):
+    """
+    Time glyph, timer bar and frame draws with and without the kernels
+
+    Returns:
+        list: (label, pixels, ns via graphics.pixel, ns via the kernel)
+    """
+    fb = raster.framebuffer(graphics)
+    pen = graphics.create_pen(255, 255, 255)
+    rows = []
+    for label, blocks, packed in _glyphs(font):
+        pixels = sum(w * h for _, _, w, h in blocks)
+        slow = _time_draw(font.draw_char_blocks, (graphics, blocks, BENCH_X, 0, pen), reps)
+        fast = None
+        if fb is not None:
+            fast = _time_draw(raster.fill_blocks, (fb, packed, len(packed), BENCH_X, 0, pen), reps)
+        rows.append((label, pixels, slow, fast))
+
+    plain = display_module.Display(_NoUpdate(), graphics)
+    plain.framebuffer = None
+    kernel = display_module.Display(_NoUpdate(), graphics)
+    timer_pixels = 2 * (BENCH_ELAPSED // display_module.TIMER_UPDATE_SECONDS + 1)
+    slow = _time_draw(plain.draw_timer_bar, (0, BENCH_ELAPSED), reps)
+    fast = _time_draw(kernel.draw_timer_bar, (0, BENCH_ELAPSED), reps) if fb is not None else None
+    rows.append(("timer bar", timer_pixels, slow, fast))
+
+    frame_reps = max(1, reps // 10)
+    slow = _time_draw(plain.draw_glucose, (BENCH_VALUE, BENCH_TREND), frame_reps)
+    fast = _time_draw(kernel.draw_glucose, (BENCH_VALUE, BENCH_TREND), frame_reps) if fb is not None else None
+    rows.append(("frame", raster.FRAME_PIXELS, slow, fast))
+    return rows
+
+
+def report(rows, mhz, kernel, where):
+    """Print benchmark rows as cycles per draw (ns if the clock is unknown)"""
+    unit = "cyc" if mhz else "ns"
+    scale = mhz / 1000 if mhz else 1
+    clock = "%d MHz" % mhz if mhz else "clock unknown"
+    # Plain % formatting: this also runs under MicroPython
+    print("RASTER BENCH (%s, %s kernels, %s)" % (where, kernel, clock))
+    print("  %-20s %4s %14s %14s %8s" % ("draw", "px", "pixel() " + unit, "kernel " + unit, "speedup"))
+    total_slow = total_fast = 0
+    for label, pixels, slow, fast in rows:
+        slow_cycles = int(slow * scale)
+        if fast is None:
+            print("  %-20s %4d %14d %14s %8s" % (label, pixels, slow_cycles, "-", "-"))
+            continue
+        fast_cycles = int(fast * scale)
+        speedup = slow / fast if fast else 0
+        print("  %-20s %4d %14d %14d %7.1fx" % (label, pixels, slow_cycles, fast_cycles, speedup))
+        if label not in ("timer bar", "frame"):
+            total_slow += slow_cycles
+            total_fast += fast_cycles
+    glyphs = len(rows) - 2
+    if total_fast:
+        print("  %-20s %4s %14d %14d %7.1fx" % ("mean per glyph", "", total_slow // glyphs,
+                                                 total_fast // glyphs, total_slow / total_fast))
+
+
+def device_main():
+    import machine
+    from picographics import PicoGraphics, DISPLAY_GALACTIC_UNICORN
+    import display
+    import font
+    import raster
+
+    graphics = PicoGraphics(DISPLAY_GALACTIC_UNICORN)
+    if raster.framebuffer(graphics) is None:
+        print("No RGB888 framebuffer - kernels can't be timed")
+    rows = benchmark(graphics, display, font, raster, DEFAULT_REPS)
+    report(rows, machine.freq() // 1000000, raster.KERNEL, "device")
+
+
+# --- Host only ---
+
+def check_viper_source(emulator, font, raster):
+    """
+    Run the viper kernel bodies under CPython against graphics.pixel()
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    from array import array
+    mismatches = []
+    checked = 0
+    raster.ptr32 = lambda buf: buf          # Globals the viper bodies look up
+    raster.ptr8 = lambda data: data
+    try:
+        for label, blocks, packed in _glyphs(font):
+            coords = [(x + dx, y + dy) for x, y, w, h in blocks for dy in range(h) for dx in range(w)]
+            packed_coords = raster.pack_coords(coords)
+            for x, y in CLIP_OFFSETS:
+                reference = emulator.PicoGraphics()
+                font.draw_char_blocks(reference, blocks, x, y, 0xFFFFFF)
+                for kernel, data in ((raster._fill_blocks_viper, packed), (raster._fill_blocks_python, packed),
+                                     (raster._fill_coords_viper, packed_coords),
+                                     (raster._fill_coords_python, packed_coords)):
+                    fb = array('I', [0] * raster.FRAME_PIXELS)
+                    kernel(fb, data, len(data), x, y, 0xFFFFFF)
+                    checked += 1
+                    if fb != reference.framebuffer:
+                        mismatches.append(f"{kernel.__name__} {label} at ({x}, {y})")
+        for x, y, w, h in ((51, 0, 2, 11), (51, 10, 2, 1), (-1, -1, 55, 13), (52, 5, 4, 1), (0, 11, 3, 3)):
+            reference = emulator.PicoGraphics()
+            reference.set_pen(0xFFFFFF)
+            reference.rectangle(x, y, w, h)
+            for kernel in (raster._fill_rect_viper, raster._fill_rect_python):
+                fb = array('I', [0] * raster.FRAME_PIXELS)
+                kernel(fb, x, y, w, h, 0xFFFFFF)
+                checked += 1
+                if fb != reference.framebuffer:
+                    mismatches.append(f"{kernel.__name__} ({x}, {y}, {w}, {h})")
+    finally:
+        del raster.ptr32, raster.ptr8
+
+    lines = [f"{checked} kernel draws compared with graphics.pixel(), {len(mismatches)} mismatches"]
+    lines += [f"  mismatch: {m}" for m in mismatches[:10]]
+    return not mismatches, lines
+
+
+def host_cpu_mhz():
+    """Host CPU clock from /proc/cpuinfo, or None"""
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("cpu MHz"):
+                    return int(float(line.split(":")[1]))
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def capture(path, port):
+    """Run this file on the device through mpremote and save its output"""
+    import subprocess
+    command = ["mpremote"] + (["connect", port] if port else []) + ["run", __file__]
+    result = subprocess.run(command, capture_output=True, text=True)
+    output = result.stdout + result.stderr
+    with open(path, "w") as f:
+        f.write(output)
+    print(output, end="")
+    print(f"Saved to {path}")
+    return result.returncode
+
+
+def host_main():
+    import argparse
+    import os
+    parser = argparse.ArgumentParser(description="Check and benchmark the raster kernels")
+    parser.add_argument('--reps', type=int, default=DEFAULT_REPS * 10, help="Draws per timing")
+    parser.add_argument('--cpu-mhz', type=int, help="Host clock for cycle counts (default: /proc/cpuinfo)")
+    parser.add_argument('--capture', metavar='FILE', help="Run on the device via mpremote, save output to FILE")
+    parser.add_argument('--port', help="Device serial port for --capture (default: mpremote's auto)")
+    args = parser.parse_args()
+
+    if args.capture:
+        sys.exit(capture(args.capture, args.port))
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import emulator
+    emulator.install()
+    import display
+    import font
+    import raster
+    emulator.bind_clock(emulator.VirtualClock(), display)
+
+    print("VIPER SOURCE CHECK")
+    ok, lines = check_viper_source(emulator, font, raster)
+    for line in lines:
+        print(f"  {line}")
+
+    rows = benchmark(emulator.PicoGraphics(), display, font, raster, args.reps)
+    report(rows, args.cpu_mhz or host_cpu_mhz(), raster.KERNEL, "host")
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    if MICROPYTHON:
+        device_main()
+    else:
+        host_main()
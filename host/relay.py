@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Dexcom Share relay - one Share session per account, fanned out to LAN displays
+
+Runs on a computer on the same network as the displays. For each account
+it holds one Share session (src/dexcom.py's DexcomClient, so login, session
+expiry and retries work exactly as on the device), polls when the next
+reading is due and caches the last HISTORY_HOURS of readings. Displays
+set RELAY_URL in secrets.py and read from here (src/relay_client.py), so
+Share sees one client however many displays there are, and each display
+fetch costs a LAN round trip instead of a TLS session to Dexcom.
+
+Protocol (plain HTTP/1.0; readings in Share's own JSON format, newest first):
+    GET /glucose/<account>?minutes=M&maxCount=N[&since=S][&wait=W]
+        200 with at most N readings from the last M minutes (newer than S,
+        epoch seconds, if given); 304 with no body if nothing is newer than S.
+        With `wait`, a request with nothing newer is held open (long-poll)
+        and answered the moment a newer reading is cached, or 304 after W
+        seconds (at most MAX_WAIT_SECONDS)
+    GET /status
+        Cache and request counters per account
+
+Usage:
+    python host/relay.py --account user:pass                    # Serve on :8081 until Ctrl+C
+    python host/relay.py --account user1:pass1 --account user2:pass2 --ous --port 8081
+    python host/relay.py --share http://127.0.0.1:8080 --account user0:pass0   # Against fake_share.py
+    python host/relay.py --check --devices 20
+        # Relay in front of fake_share.py with 20 emulated displays: checks
+        # long-polls, their readings and counts Share requests against direct polling
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from emulator import install, bind_clock, RealClock
+
+install()
+import breaker
+import dexcom
+import ntp
+import source
+from dexcom import DexcomClient, parse_share_timestamp
+from source import READING_INTERVAL
+
+HISTORY_HOURS = 24              # Readings cached per account
+READING_UPLOAD_LAG = 15         # Seconds after a reading is due before Share usually has it
+RETRY_SECONDS = 30              # Poll period while a reading is due (Share rate limits)
+MAX_WAIT_SECONDS = 600          # Longest a long-poll is held
+HISTORY_READINGS = HISTORY_HOURS * 3600 // READING_INTERVAL
+REASONS = {200: "OK", 304: "Not Modified", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class CachingClient(DexcomClient):
+    """
+    DexcomClient that keeps every reading it fetches
+
+    The first fetch backfills HISTORY_HOURS; later ones ask for the readings
+    missed since the newest cached one (usually just the next). `updated`
+    is set (and replaced) whenever a new reading is cached, waking the
+    long-polls waiting on it.
+    """
+
+    def __init__(self, username, password, is_us=True, base_url=None):
+        super().__init__(username, password, is_us, base_url)
+        self.readings = []              # Share reading dicts, newest first
+        self.times = []                 # Their timestamps (epoch seconds)
+        self.fetches = 0
+        self.updated = asyncio.Event()
+
+    def _fetch_window(self):
+        if not self.times:
+            return HISTORY_HOURS * 60, HISTORY_READINGS
+        missed = (ntp.clock.time() - self.times[0]) // READING_INTERVAL
+        count = max(1, min(missed, HISTORY_READINGS))
+        return count * 5 + 5, count
+
+    def _handle_fetch(self, status, content):
+        if status != 200:
+            return super()._handle_fetch(status, content)
+        self.fetches += 1
+        data = json.loads(content) if content else []
+        added = False
+        for reading in data:
+            t = parse_share_timestamp(reading.get("WT"))
+            if t is not None and t not in self.times:
+                self.readings.append(reading)
+                self.times.append(t)
+                added = True
+        order = sorted(range(len(self.times)), key=lambda i: -self.times[i])[:HISTORY_READINGS]
+        self.readings = [self.readings[i] for i in order]
+        self.times = [self.times[i] for i in order]
+        result = super()._handle_fetch(status, content)
+        if added:
+            self.updated.set()
+            self.updated = asyncio.Event()
+        return result
+
+    def select(self, minutes, max_count, since=None, now=None):
+        """Cached readings for a device request, newest first"""
+        now = now if now is not None else ntp.clock.time()
+        oldest = now - minutes * 60
+        result = []
+        for t, reading in zip(self.times, self.readings):
+            if len(result) >= max_count or t < oldest or (since is not None and t <= since):
+                break
+            result.append(reading)
+        return result
+
+
+class Relay:
+    """Polls Share for each account and answers display requests from the cache"""
+
+    def __init__(self, accounts, base_url=None, is_us=True):
+        """
+        Initialize relay
+
+        Args:
+            accounts: List of (username, password) tuples
+            base_url: Share server URL override (e.g., fake_share.py)
+            is_us: US Share servers (default: True)
+        """
+        self.clients = [CachingClient(user, password, is_us, base_url) for user, password in accounts]
+        self.server = None
+        self.port = None
+        self.requests = 0
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self.devices = set()
+        self.waiting = 0                # Long-polls being held
+
+    async def start(self, host="0.0.0.0", port=8081):
+        """Start listening; returns the bound port"""
+        self.server = await asyncio.start_server(self._handle, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def refresh(self, index):
+        """Fetch one account from Share now"""
+        return await self.clients[index].fetch_glucose_async()
+
+    async def poll(self, index):
+        """Keep one account's cache current, fetching when the next reading is due (or Share's breaker allows)"""
+        client = self.clients[index]
+        while True:
+            await self.refresh(index)
+            age = client.get_glucose_age()
+            delay = RETRY_SECONDS if age is None else READING_INTERVAL + READING_UPLOAD_LAG - age
+            await asyncio.sleep(max(delay, RETRY_SECONDS, client.breaker.retry_in()))
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, target, _ = request_line.decode().split(" ", 2)
+            while True:
+                line = await reader.readline()
+                if not line or line == b"\r\n":
+                    break
+            self.requests += 1
+            self.devices.add(writer.get_extra_info("peername")[0])
+            status, payload = await self.respond(method, target)
+            data = b"" if payload is None else json.dumps(payload).encode()
+            reason = REASONS.get(status, "Error")
+            response = (f"HTTP/1.0 {status} {reason}\r\n"
+                        f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n").encode() + data
+            self.bytes_sent += len(response)
+            writer.write(response)
+            await writer.drain()
+        except (ValueError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, method, target):
+        """
+        Answer one display request (holding it open for a long-poll)
+
+        Returns:
+            tuple: (status, JSON-able payload or None for no body)
+        """
+        parts = urlsplit(target)
+        path = parts.path.strip("/").split("/")
+        if method != "GET":
+            return 405, {"Code": "MethodNotAllowed"}
+        if path == ["status"]:
+            return 200, self.status()
+        if len(path) != 2 or path[0] != "glucose" or not path[1].isdigit() or int(path[1]) >= len(self.clients):
+            return 404, {"Code": "NotFound"}
+
+        client = self.clients[int(path[1])]
+        query = parse_qs(parts.query)
+        minutes = int(query.get("minutes", ["10"])[0])
+        max_count = int(query.get("maxCount", ["1"])[0])
+        since = int(query["since"][0]) if "since" in query else None
+        wait = min(int(query.get("wait", ["0"])[0]), MAX_WAIT_SECONDS)
+        readings = client.select(minutes, max_count, since)
+        if not readings and since is not None and wait > 0:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(client.updated.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                self.waiting -= 1
+            readings = client.select(minutes, max_count, since)
+        if not readings and since is not None:
+            self.not_modified += 1
+            return 304, None
+        return 200, readings
+
+    def status(self):
+        return {
+            "accounts": [{"cached": len(c.readings), "latest": c.times[0] if c.times else None,
+                          "share_fetches": c.fetches, "share_breaker": breaker.STATE_NAMES[c.breaker.state]}
+                         for c in self.clients],
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "bytes_sent": self.bytes_sent,
+            "devices": len(self.devices),
+            "waiting": self.waiting,
+        }
+
+
+async def check(devices, rounds):
+    """
+    Serve emulated displays through the relay from fake_share.py
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    from fake_share import FakeShareServer, make_accounts
+    from relay_client import RelayClient
+
+    accounts = make_accounts(1, [])
+    share = FakeShareServer(accounts)
+    await share.start()
+    relay = Relay([(accounts[0].username, accounts[0].password)], base_url=f"http://127.0.0.1:{share.port}")
+    await relay.start(host="127.0.0.1", port=0)
+    relay_url = f"http://127.0.0.1:{relay.port}"
+    ok = True
+    lines = []
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            await relay.refresh(0)
+            clients = [RelayClient(relay_url, 0) for _ in range(devices)]
+            await asyncio.gather(*[c.fetch_glucose_async() for c in clients])   # Backfill
+            before = relay.bytes_sent
+            for _ in range(rounds):
+                await relay.refresh(0)
+                results = await asyncio.gather(*[c.fetch_glucose_async() for c in clients])
+            idle_bytes = (relay.bytes_sent - before) / (devices * rounds)
+
+            # Displays long-poll; a new reading arrives at Share: one relay fetch answers them all
+            polls = [asyncio.create_task(c.fetch_glucose_async(wait=30)) for c in clients]
+            for _ in range(50):
+                if relay.waiting == devices:
+                    break
+                await asyncio.sleep(0.1)
+            newest = parse_share_timestamp(accounts[0].latest(int(time.time()), 10, 1)[0]["WT"])
+            while int(time.time()) <= newest:
+                await asyncio.sleep(0.1)
+            accounts[0].readings.append({"WT": f"Date({int(time.time()) * 1000})", "Value": 77,
+                                         "Trend": "SingleDown"})
+            accounts[0].readings.sort(key=lambda r: parse_share_timestamp(r["WT"]))
+            held = relay.waiting
+            await relay.refresh(0)
+            updated = await asyncio.gather(*polls)
+    finally:
+        await relay.stop()
+        await share.stop()
+
+    share_requests = sum(share.requests.values())
+    direct = devices * (2 + rounds + 2)     # Each display: authenticate, login, backfill, rounds, update
+    wrong = [c.get_glucose_value() for c in clients if c.get_glucose_value() != 77]
+    not_modified = sum(c.not_modified for c in clients)
+    lines.append(f"Displays:    {devices}, {rounds} idle rounds: {not_modified} of {devices * rounds} "
+                 f"answered 304, {idle_bytes:.0f} bytes per idle fetch")
+    lines.append(f"New reading: {devices - len(wrong)} of {devices} displays show it after one relay fetch "
+                 f"({held} long-polls held until then)")
+    lines.append(f"Share:       {share_requests} requests through the relay ({share.requests}), "
+                 f"{direct} if every display polled Share itself")
+    if wrong or not all(results) or not all(updated):
+        lines.append(f"  displays with a wrong or failed reading: {wrong}")
+        ok = False
+    if held != devices:
+        lines.append("  long-polls weren't held until the new reading")
+        ok = False
+    if not_modified != devices * rounds:
+        lines.append("  idle fetches weren't answered 304")
+        ok = False
+    if share.requests.get("AuthenticatePublisherAccount") != 1 or share_requests != 2 + rounds + 2:
+        lines.append("  Share requests grew with the number of displays")
+        ok = False
+    return ok, lines
+
+
+async def serve(args):
+    accounts = [tuple(a.split(":", 1)) for a in args.account]
+    relay = Relay(accounts, base_url=args.share, is_us=not args.ous)
+    port = await relay.start(port=args.port)
+    print(f"Relay serving {len(accounts)} account(s) on port {port}")
+    for index, (user, _) in enumerate(accounts):
+        print(f"  /glucose/{index}: {user}")
+    pollers = [asyncio.create_task(relay.poll(index)) for index in range(len(accounts))]
+    try:
+        async with relay.server:
+            await relay.server.serve_forever()
+    finally:
+        for task in pollers:
+            task.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="LAN relay: one Share session fanned out to many displays")
+    parser.add_argument('--account', action='append', default=[], metavar='USER:PASS',
+                        help="Share account to relay (repeat for more; display RELAY_ACCOUNTS follow this order)")
+    parser.add_argument('--ous', action='store_true', help="Use the international Share servers")
+    parser.add_argument('--share', help="Share server URL override (e.g., http://127.0.0.1:8080)")
+    parser.add_argument('--port', type=int, default=8081, help="Port to listen on (default: 8081)")
+    parser.add_argument('--check', action='store_true', help="Check fan-out against fake_share.py and exit")
+    parser.add_argument('--devices', type=int, default=20, help="Emulated displays for --check (default: 20)")
+    parser.add_argument('--rounds', type=int, default=5, help="Idle fetch rounds for --check (default: 5)")
+    args = parser.parse_args()
+
+    bind_clock(RealClock(), dexcom, source, breaker, ntp)
+    if args.check:
+        ok, lines = asyncio.run(check(args.devices, args.rounds))
+        for line in lines:
+            print(line)
+        print("PASS" if ok else "FAIL")
+        sys.exit(0 if ok else 1)
+    if not args.account:
+        parser.error("at least one --account is needed")
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+"""
+Replay harness - run main.async_main against recorded Dexcom Share traces
+
+Drives the real async_main tasks (button_checker, glucose_fetcher,
+display_updater) with a virtual clock, the emulated display and a fake Share
+transport that serves recorded readings, so a day of operation runs in
+seconds on the host. Reports heap high-water mark, frames rendered, fetches
+issued and the timing of the display/fetch state machine.
+
+Trace format: JSON list of Share readings as returned by
+ReadPublisherLatestGlucoseValues, in any order:
+    [{"WT": "Date(1700000000000)", "Value": 120, "Trend": "Flat"}, ...]
+Record one with curl against your own account, or omit --trace to use a
+synthetic trace.
+
+Usage:
+    python host/replay.py                       # 24h synthetic trace
+    python host/replay.py --trace day.json --hours 48
+    python host/replay.py --fetch-delay 10     # Every fetch takes 10 s
+"""
+
+import argparse
+import io
+import json
+import math
+import os
+import random
+import sys
+import time as wall_time
+import tracemalloc
+import types
+from contextlib import redirect_stdout
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from emulator import VirtualClock, VirtualEventLoop, VirtualNtpServer, install, bind_clock, DEFAULT_START_EPOCH
+
+READING_INTERVAL = 300          # Dexcom reading cadence (seconds)
+
+
+def synth_trace(start_epoch, hours, seed=1):
+    """
+    Generate a synthetic Share trace with drifting glucose, fast swings and gaps
+
+    Args:
+        start_epoch: Epoch seconds of the first reading
+        hours: Trace length in hours
+        seed: Random seed (traces are reproducible)
+
+    Returns:
+        list: Share reading dicts (oldest first)
+    """
+    rng = random.Random(seed)
+    readings = []
+    count = int(hours * 3600 // READING_INTERVAL)
+    previous = None
+    for i in range(count):
+        if rng.random() < 0.01:
+            continue                                    # Dropped reading (signal loss)
+        t = start_epoch + i * READING_INTERVAL
+        value = 140 + 60 * math.sin(i / 18.0) + 35 * math.sin(i / 5.0) + rng.uniform(-4, 4)
+        value = int(max(40, min(400, value)))
+        if previous is None:
+            trend = "NotComputable"
+        else:
+            rate = (value - previous) / 5.0             # mg/dL/min over 5 minutes
+            if abs(rate) > 3.0:
+                trend = "RateOutOfRange"
+            elif rate > 2:
+                trend = "DoubleUp"
+            elif rate > 1:
+                trend = "SingleUp"
+            elif rate > 0.5:
+                trend = "FortyFiveUp"
+            elif rate >= -0.5:
+                trend = "Flat"
+            elif rate >= -1:
+                trend = "FortyFiveDown"
+            elif rate >= -2:
+                trend = "SingleDown"
+            else:
+                trend = "DoubleDown"
+        previous = value
+        readings.append({"WT": f"Date({t * 1000})", "ST": f"Date({t * 1000})",
+                         "DT": f"Date({t * 1000}+0000)", "Value": value, "Trend": trend})
+    return readings
+
+
+class _Response:
+    """Minimal urequests.Response stand-in"""
+
+    def __init__(self, status_code, text):
+        self.status_code = status_code
+        self.text = text
+
+    def json(self):
+        return json.loads(self.text)
+
+    def close(self):
+        pass
+
+
+class ShareReplay:
+    """
+    Fake Dexcom Share transport serving recorded readings by virtual time
+
+    Installed as dexcom's `ahttp` module so the real
+    DexcomClient runs end to end - authentication, login and
+    ReadPublisherLatestGlucoseValues are all answered from the trace. Only
+    readings whose WT is at or before the virtual clock are visible.
+
+    fetch_delay makes every async read take that many virtual seconds, to
+    check that the display keeps animating while a slow fetch is pending;
+    auth_delay does the same for authentication and login requests.
+    fetch_block adds synchronous time per read (TLS, JSON parsing) that
+    stalls the whole event loop. If `link` is set, requests made while it
+    returns False fail with OSError (as with no network) and are counted
+    in offline_requests. If `fault` is set, it is called with each
+    request's URL and may answer it instead with a (status, text) error
+    response (counted in faulted).
+    """
+
+    def __init__(self, readings, clock, fetch_delay=0.0, fetch_block=0.0, auth_delay=0.0):
+        from dexcom import parse_share_timestamp
+        self.clock = clock
+        self.readings = sorted(readings, key=lambda r: parse_share_timestamp(r["WT"]))
+        self.times = [parse_share_timestamp(r["WT"]) for r in self.readings]
+        self.fetches = 0
+        self.fetch_timing = IntervalStats()
+        self.auth_requests = 0
+        self.fetch_delay = fetch_delay
+        self.fetch_block = fetch_block
+        self.auth_delay = auth_delay
+        self.in_flight = 0              # Async requests currently waiting on a delay
+        self.link = None
+        self.offline_requests = 0
+        self.fault = None
+        self.faulted = 0
+
+    def post(self, url, json=None, headers=None, data=None):
+        """Answer a request synchronously (apost without the delays)"""
+        if self.link is not None and not self.link():
+            self.offline_requests += 1
+            raise OSError(113, "EHOSTUNREACH")
+        if self.fault is not None:
+            response = self.fault(url)
+            if response is not None:
+                self.faulted += 1
+                return _Response(*response)
+        if "ReadPublisherLatestGlucoseValues" in url:
+            return self._read_latest(url)
+        self.auth_requests += 1
+        return _Response(200, '"00000000-0000-0000-0000-000000000000"')
+
+    async def apost(self, url, payload=None, headers=None, timeout=None):
+        """ahttp.post stand-in"""
+        is_read = "ReadPublisherLatestGlucoseValues" in url
+        delay = self.fetch_delay if is_read else self.auth_delay
+        if delay:
+            import asyncio
+            self.in_flight += 1
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self.in_flight -= 1
+        if self.fetch_block and is_read:
+            self.clock.advance(self.fetch_block)
+        response = self.post(url, payload, headers)
+        return response.status_code, response.text
+
+    def _read_latest(self, url):
+        self.fetches += 1
+        now = self.clock.time()
+        self.fetch_timing.add(self.clock.monotonic())
+        params = dict(p.split("=", 1) for p in url.split("?", 1)[1].split("&"))
+        minutes = int(params.get("minutes", 10))
+        max_count = int(params.get("maxCount", 1))
+
+        # Newest first, limited to the requested window
+        result = []
+        i = self._index_at(now)
+        while i >= 0 and len(result) < max_count and self.times[i] >= now - minutes * 60:
+            result.append(self.readings[i])
+            i -= 1
+        return _Response(200, json.dumps(result))
+
+    def _index_at(self, now):
+        """Index of newest reading at or before now (binary search)"""
+        lo, hi = 0, len(self.times)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.times[mid] <= now:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo - 1
+
+
+class _NullWriter(io.TextIOBase):
+    """Discard device console output (it's thousands of lines per day)"""
+
+    def write(self, text):
+        return len(text)
+
+
+class IntervalStats:
+    """Running min/mean/max of intervals between events (constant memory)"""
+
+    def __init__(self):
+        self.count = 0
+        self.last = None
+        self.runs = 0                   # add() calls that started a run (no interval)
+        self.low = None
+        self.high = 0.0
+        self.total = 0.0
+
+    def add(self, t):
+        if self.last is None:
+            self.runs += 1
+        else:
+            interval = t - self.last
+            self.total += interval
+            self.high = max(self.high, interval)
+            self.low = interval if self.low is None else min(self.low, interval)
+        self.last = t
+        self.count += 1
+
+    def break_run(self):
+        """End the current run of events; the next add() starts a new one"""
+        self.last = None
+
+    def summary(self):
+        """Return (count, min, mean, max) in seconds"""
+        if self.low is None:
+            return (self.count, 0.0, 0.0, 0.0)
+        intervals = self.count - self.runs
+        return (self.count, self.low, self.total / intervals, self.high)
+
+
+class ReplayHarness:
+    """
+    Wires the real device modules to emulated hardware and a virtual clock
+
+    After construction, `main`, `display` and `dexcom` attributes hold the
+    imported device modules so callers can inspect or tweak them. Set
+    `wifi` to a WifiSupervisor to run the WiFi task too (by default the
+    network is assumed up), `self_test` to run the boot digit test, and
+    `boot` to a startup.BootTimeline to read the boot steps back. NTP
+    requests (made when `wifi` is set) go to `ntp_server`, a
+    VirtualNtpServer. `buttons` is the device's ButtonReader on emulated
+    pins; press them from a monitor with buttons.pins[i].press(). Set `ble`
+    to a ble_glucose.BLEGlucose to publish readings over the emulated BLE.
+    """
+
+    def __init__(self, readings=None, hours=24.0, start_epoch=DEFAULT_START_EPOCH, fetch_delay=0.0):
+        self.hours = hours
+        self.clock = VirtualClock(start_epoch)
+        if readings is None:
+            readings = synth_trace(start_epoch, hours + 1)
+
+        install()
+        import main
+        import display
+        import dexcom
+        import alerts
+        import power
+        import startup
+        import ntp
+        import buttons
+        import source
+        import breaker
+        self.main, self.display, self.dexcom, self.alerts = main, display, dexcom, alerts
+        self.power = power
+        bind_clock(self.clock, main, display, dexcom, source, breaker, alerts, power, startup, ntp, buttons)
+        self.ntp = ntp
+        ntp.clock = ntp.SyncedClock()
+        self.ntp_server = VirtualNtpServer(self.clock)
+        ntp.socket = self.ntp_server
+
+        self.share = ShareReplay(readings, self.clock, fetch_delay)
+        dexcom.ahttp = types.SimpleNamespace(post=self.share.apost)
+
+        self.gu = sys.modules['galactic'].GalacticUnicorn()
+        self.graphics = sys.modules['picographics'].PicoGraphics()
+        self.frame_timing = IntervalStats()
+        self.alert_timing = IntervalStats()             # Between consecutive alert frames
+        self.alert_fetch_timing = IntervalStats()       # Same, while a fetch is in flight
+        self.heap_blocks_peak = 0
+        self.gu.on_update = self._on_frame
+        self.client = dexcom.DexcomClient("replay", "replay", True)
+        self.wifi = None
+        self.self_test = False
+        self.boot = None
+        self.ble = None
+        self.buttons = buttons.ButtonReader((main.SWITCH_BRIGHTNESS_UP, main.SWITCH_BRIGHTNESS_DOWN))
+        self.disp = display.Display(self.gu, self.graphics, digit_spacing=main.DIGIT_SPACING,
+                                    delta_mode=main.DELTA_MODE)
+
+    def _on_frame(self, graphics):
+        now = self.clock.monotonic()
+        self.frame_timing.add(now)
+        if self.disp.alert_level == self.alerts.ALERT_NONE:
+            self.alert_timing.break_run()
+            self.alert_fetch_timing.break_run()
+        else:
+            self.alert_timing.add(now)
+            if self.share.in_flight:
+                self.alert_fetch_timing.add(now)
+            else:
+                self.alert_fetch_timing.break_run()
+        blocks = sys.getallocatedblocks()
+        if blocks > self.heap_blocks_peak:
+            self.heap_blocks_peak = blocks
+
+    async def _run_for(self, seconds, monitors=()):
+        import asyncio
+        watchers = [asyncio.create_task(monitor(self)) for monitor in monitors]
+        try:
+            await asyncio.wait_for(
+                self.main.async_main(self.gu, self.disp, self.client, self.main.BRIGHTNESS_DEFAULT,
+                                     self.wifi, self.self_test, self.boot, buttons=self.buttons,
+                                     ble=self.ble),
+                timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            for watcher in watchers:
+                watcher.cancel()
+            # A cancelled gather returns before its children finish: wind down what's left
+            leftover = asyncio.all_tasks() - {asyncio.current_task()}
+            for task in leftover:
+                task.cancel()
+            await asyncio.gather(*leftover, return_exceptions=True)
+
+    def run(self, quiet=True, trace_heap=False, monitors=()):
+        """
+        Run async_main for the configured duration
+
+        The heap high-water mark is always sampled once per frame as Python
+        allocated blocks. trace_heap adds a byte-accurate tracemalloc peak,
+        at roughly 7x the wall time.
+
+        Args:
+            quiet: Discard device console output (default: True)
+            trace_heap: Also measure heap bytes with tracemalloc (default: False)
+            monitors: Coroutine functions run alongside async_main, called with
+                the harness (e.g., samplers); cancelled when the run ends
+
+        Returns:
+            dict: Report (see format_report)
+        """
+        loop = VirtualEventLoop(self.clock)
+        out = _NullWriter() if quiet else sys.stdout
+        if trace_heap:
+            tracemalloc.start()
+        wall_start = wall_time.perf_counter()
+        try:
+            with redirect_stdout(out):
+                loop.run_until_complete(self._run_for(self.hours * 3600, monitors))
+        finally:
+            loop.close()
+        wall_elapsed = wall_time.perf_counter() - wall_start
+        current = peak = None
+        if trace_heap:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+        return {
+            'virtual_seconds': self.clock.monotonic(),
+            'wall_seconds': wall_elapsed,
+            'heap_blocks_peak': self.heap_blocks_peak,
+            'heap_current': current,
+            'heap_peak': peak,
+            'frames': self.gu.frames,
+            'fetches': self.share.fetches,
+            'auth_requests': self.share.auth_requests,
+            'frame_intervals': self.frame_timing.summary(),
+            'fetch_intervals': self.share.fetch_timing.summary(),
+            'alert_intervals': self.alert_timing.summary(),
+            'alert_fetch_intervals': self.alert_fetch_timing.summary(),
+            'last_value': self.client.get_glucose_value(),
+            'last_trend': self.client.get_glucose_trend(),
+        }
+
+
+def format_report(report):
+    """Format a run report as printable lines"""
+    virtual = report['virtual_seconds']
+    wall = report['wall_seconds']
+    lines = [
+        "=" * 50,
+        "REPLAY REPORT",
+        "=" * 50,
+        f"Simulated:      {virtual / 3600:.1f} h in {wall:.1f} s wall ({virtual / max(wall, 1e-9):.0f}x)",
+        f"Heap peak:      {report['heap_blocks_peak']} allocated blocks",
+    ]
+    if report['heap_peak'] is not None:
+        lines.append(f"Traced heap:    peak {report['heap_peak'] / 1024:.1f} KB (current {report['heap_current'] / 1024:.1f} KB)")
+    lines += [
+        f"Frames:         {report['frames']}",
+        f"Fetches:        {report['fetches']} (auth requests: {report['auth_requests']})",
+    ]
+    for label, key in (("Frame interval", 'frame_intervals'), ("Fetch interval", 'fetch_intervals')):
+        count, low, mean, high = report[key]
+        lines.append(f"{label + ':':<16}min {low:.2f}s / mean {mean:.2f}s / max {high:.2f}s")
+    for label, key in (("Alert frames", 'alert_intervals'), ("  during fetch", 'alert_fetch_intervals')):
+        count, low, mean, high = report[key]
+        if count:
+            lines.append(f"{label + ':':<16}{count}, interval min {low * 1000:.0f}ms / "
+                         f"mean {mean * 1000:.0f}ms / max {high * 1000:.0f}ms")
+    lines.append(f"Last reading:   {report['last_value']} mg/dL ({report['last_trend']})")
+    lines.append("=" * 50)
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded Share traces through main.async_main")
+    parser.add_argument('--trace', help="Share trace JSON file (default: synthetic)")
+    parser.add_argument('--hours', type=float, default=24.0, help="Simulated duration (default: 24)")
+    parser.add_argument('--fetch-delay', type=float, default=0.0,
+                        help="Seconds each glucose fetch takes (default: 0)")
+    parser.add_argument('--trace-heap', action='store_true', help="Byte-accurate heap peak via tracemalloc (slower)")
+    parser.add_argument('--verbose', action='store_true', help="Show device console output")
+    args = parser.parse_args()
+
+    readings = None
+    start_epoch = DEFAULT_START_EPOCH
+    if args.trace:
+        with open(args.trace) as f:
+            readings = json.load(f)
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+        from dexcom import parse_share_timestamp
+        start_epoch = min(parse_share_timestamp(r["WT"]) for r in readings)
+
+    harness = ReplayHarness(readings, hours=args.hours, start_epoch=start_epoch,
+                            fetch_delay=args.fetch_delay)
+    report = harness.run(quiet=not args.verbose, trace_heap=args.trace_heap)
+    for line in format_report(report):
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
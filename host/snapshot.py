@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Display snapshots - render fixed scenarios through the real Display class
+
+Each scenario draws one frame on the emulated 53x11 matrix (virtual clock,
+so timer bar and delta-mode phase are deterministic) and is compared with
+the stored rendering in host/snapshots.txt. Pixels are written as the pen
+they were drawn with, so color and dimming changes show up too:
+
+    W/R/Y/G   full-brightness white/red/yellow/green (blue range) pen
+    w/r/y/g   dimmed pen (locally estimated trend, inactive account dot)
+    *         any other color (timer bar's growing pixel, alert pulse)
+    .         off
+
+Exits non-zero on any mismatch. After an intended layout change, review
+the diff and re-record with --update.
+
+Usage:
+    python host/snapshot.py                 # Compare against host/snapshots.txt
+    python host/snapshot.py --show          # Print every scenario
+    python host/snapshot.py --update        # Re-record snapshots
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from emulator import VirtualClock, GalacticUnicorn, PicoGraphics, install, bind_clock
+
+SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'snapshots.txt')
+
+PEN_CHARS = "WRYG"              # Display.pens order (COLOR_INDEX_*)
+DIM_CHARS = "wryg"
+
+# name -> draw settings; `at` is the virtual time in seconds of the captured frame
+# (the reading arrives at 0 s, `age` seconds after it was taken; delta mode
+# shows deltas when (at // 3) is odd)
+SCENARIOS = {
+    'in_range_flat': dict(value=128, trend="Flat", at=1),
+    'low_single_down': dict(value=62, trend="SingleDown", at=1),
+    'high_double_up': dict(value=245, trend="DoubleUp", at=1),
+    'two_digit_local_trend': dict(value=85, trend="FortyFiveDown", local=True, at=1),
+    'no_data': dict(value=None, trend=None, at=1),
+    'timer_bar_75s': dict(value=128, trend="Flat", at=75),
+    'multi_account': dict(value=150, trend="FortyFiveUp", account=(1, 3), at=1),
+    'delta_mode_arrow_phase': dict(value=128, trend="Flat", delta=3, change=12, delta_mode=True, at=1),
+    'delta_mode_delta_phase': dict(value=128, trend="Flat", delta=3, change=12, delta_mode=True, at=4),
+    'delta_mode_falling': dict(value=95, trend="SingleDown", delta=-8, change=-27, delta_mode=True, at=4),
+    'delta_mode_no_change': dict(value=110, trend="Flat", delta=0, change=None, delta_mode=True, at=4),
+    'delta_mode_double_up': dict(value=300, trend="DoubleUp", delta=15, change=120, delta_mode=True, at=4),
+    'alert_low_dim_step': dict(value=62, trend="SingleDown", alert=(2, 0), at=1),
+    'alert_urgent_flash_step': dict(value=48, trend="DoubleDown", alert=(3, 10), at=1),
+    'reading_age_200s': dict(value=128, trend="Flat", age=200, at=1),
+    'stale_low_reading': dict(value=62, trend="SingleDown", alert=(2, 0), age=1000, at=1),
+}
+
+
+def render(scenario):
+    """
+    Render one scenario
+
+    Returns:
+        list: Text rows (plus a "text: ..." row for built-in font text)
+    """
+    install()
+    import display as display_module
+    clock = VirtualClock()
+    bind_clock(clock, display_module)
+
+    graphics = PicoGraphics()
+    display = display_module.Display(GalacticUnicorn(), graphics, digit_spacing=1,
+                                     delta_mode=scenario.get('delta_mode', False))
+    if 'account' in scenario:
+        display.set_account(*scenario['account'])
+    if 'alert' in scenario:
+        display.set_alert(*scenario['alert'])       # (level, pulse step)
+
+    reading_ticks = None
+    if 'age' in scenario:
+        reading_ticks = clock.ticks_add(clock.ticks_ms(), -scenario['age'] * 1000)
+    args = (scenario['value'], scenario['trend'], scenario.get('local', False),
+            scenario.get('delta'), scenario.get('change'), reading_ticks)
+    display.draw_glucose(*args)
+    clock.advance(scenario['at'])
+    display.draw_glucose(*args)
+
+    chars = {0: '.'}
+    for i, pen in enumerate(display.dim_pens):
+        chars.setdefault(pen, DIM_CHARS[i])
+    for i, pen in enumerate(display.pens):
+        chars[pen] = PEN_CHARS[i]
+
+    rows = []
+    for y in range(graphics.height):
+        row = graphics.framebuffer[y * graphics.width:(y + 1) * graphics.width]
+        rows.append(''.join(chars.get(color, '*') for color in row))
+    for text, x, y, scale in graphics.texts:
+        rows.append(f"text: {text!r} at ({x}, {y}) scale {scale}")
+    return rows
+
+
+def render_all():
+    return {name: render(scenario) for name, scenario in SCENARIOS.items()}
+
+
+def load_snapshots(path=SNAPSHOT_PATH):
+    """Parse snapshots.txt into {name: rows}"""
+    snapshots = {}
+    if not os.path.exists(path):
+        return snapshots
+    rows = None
+    with open(path) as f:
+        for line in f.read().splitlines():
+            if line.startswith('== ') and line.endswith(' =='):
+                rows = []
+                snapshots[line[3:-3]] = rows
+            elif line and rows is not None:
+                rows.append(line)
+    return snapshots
+
+
+def save_snapshots(snapshots, path=SNAPSHOT_PATH):
+    lines = []
+    for name, rows in snapshots.items():
+        lines.append(f"== {name} ==")
+        lines.extend(rows)
+        lines.append("")
+    with open(path, 'w') as f:
+        f.write("\n".join(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Display renderings with stored snapshots")
+    parser.add_argument('--update', action='store_true', help="Re-record host/snapshots.txt")
+    parser.add_argument('--show', action='store_true', help="Print every rendered scenario")
+    args = parser.parse_args()
+
+    rendered = render_all()
+    if args.update:
+        save_snapshots(rendered)
+        print(f"Recorded {len(rendered)} snapshots to {SNAPSHOT_PATH}")
+        return
+
+    stored = load_snapshots()
+    failed = 0
+    for name, rows in rendered.items():
+        expected = stored.get(name)
+        if args.show:
+            print(f"== {name} ==")
+            print("\n".join(rows))
+        if expected == rows:
+            print(f"  {name:<28} ok")
+            continue
+        failed += 1
+        print(f"  {name:<28} {'MISSING' if expected is None else 'CHANGED'}")
+        if expected is not None:
+            for y, (old, new) in enumerate(zip(expected, rows)):
+                if old != new:
+                    print(f"    row {y}: expected {old}")
+                    print(f"    row {y}:      got {new}")
+            if len(expected) != len(rows):
+                print(f"    {len(expected)} rows expected, got {len(rows)}")
+
+    for name in stored:
+        if name not in rendered:
+            print(f"  {name:<28} stale (no such scenario)")
+
+    if failed:
+        print(f"FAIL: {failed} snapshot(s) differ - review, then run with --update if intended")
+        sys.exit(1)
+    print("PASS")
+
+
+if __name__ == "__main__":
+    main()
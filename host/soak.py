@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+Soak test - run the real device tasks for simulated weeks and track allocations
+
+Builds on the replay harness (virtual clock, emulated display, Share trace)
+and samples allocation behaviour once per fetch cycle (DEXCOM_UPDATE_INTERVAL):
+- Every --sample-every cycles, tracemalloc traces one full cycle. Blocks still
+  alive at the end of the cycle are attributed to the device task (the async
+  def in main.py that owns the stack) and to the innermost src/ function.
+- After every --meter-every traced cycles, one cycle before the next traced
+  one (picked at random) runs under AllocationMeter, which charges every
+  allocation - short-lived ones included, the churn that drives GC pauses -
+  to the same task and function.
+- The traced peak during a traced cycle gives the transient high-water mark.
+- Python allocated blocks are sampled after a gc.collect() on the traced
+  cycles, and a least-squares slope over the steady state gives heap growth
+  per day.
+
+Exits non-zero if steady-state allocation per cycle (bytes or blocks),
+retained allocation per cycle (device tasks only - CPython asyncio's own
+bookkeeping is reported as "(loop/other)" but not budgeted, uasyncio doesn't
+allocate there) or heap growth per day goes above budget, so hot-path
+allocation work has a number to beat.
+
+Note: CPython frees temporaries immediately, so "retained per cycle" counts
+objects that outlive the cycle (state, readings, timer handles) - the ones
+that fragment a MicroPython heap. CPython's float and tuple free lists also
+keep slots traced, so hot-path float/tuple churn (boxed heap objects on
+MicroPython) shows up there too. Allocation counts leave out what only
+CPython allocates (see AllocationMeter).
+
+Usage:
+    python host/soak.py                         # 7 simulated days
+    python host/soak.py --days 14 --budget 2048 --growth-budget 500
+    python host/soak.py --alloc-budget 512 --block-budget 8
+"""
+
+import argparse
+import array
+import ast
+import asyncio
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from emulator import SRC_DIR
+from replay import ReplayHarness, format_report
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+TRACE_FRAMES = 16               # Stack depth kept per allocation
+WARMUP_CYCLES = 120             # Cycles ignored at start (1 hour at 30s)
+DEFAULT_SAMPLE_EVERY = 60       # Trace one cycle in N (tracemalloc is slow)
+DEFAULT_METER_EVERY = 4         # Meter one cycle per N traced ones (the meter is slower still)
+DEFAULT_BUDGET = 4096           # Max steady-state retained bytes per cycle
+DEFAULT_ALLOC_BUDGET = 1024     # Max steady-state allocated bytes per cycle
+DEFAULT_BLOCK_BUDGET = 16       # Max steady-state allocated blocks per cycle
+DEFAULT_GROWTH_BUDGET = 1000    # Max heap growth in allocated blocks per simulated day
+UNATTRIBUTED = "(loop/other)"   # Allocations outside any device task
+HOST_STAND_INS = "(host stand-ins)"     # Allocations inside emulator/replay code called from src/
+NATIVE_ON_DEVICE = (            # src/ functions that are native code on the device (viper kernels)
+    "raster._fill_rect_python",
+    "raster._fill_blocks_python",
+    "raster._fill_coords_python",
+)
+UNATTRIBUTED_OWNER = (UNATTRIBUTED, "(outside src/)")
+INT_SIZES = (28, 32)            # Traced sizes of a one- and two-digit CPython int
+
+
+class FunctionIndex:
+    """Maps (filename, lineno) in src/ to the enclosing function name"""
+
+    def __init__(self, src_dir=SRC_DIR):
+        self.src_dir = os.path.realpath(src_dir)
+        self.ranges = {}        # realpath -> [(start, end, name, is_async)]
+
+    def _load(self, path):
+        ranges = []
+        try:
+            with open(path) as f:
+                tree = ast.parse(f.read())
+        except (OSError, SyntaxError):
+            tree = None
+        if tree is not None:
+            module = os.path.splitext(os.path.basename(path))[0]
+            for node in ast.walk(tree):
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    # Code objects of decorated functions start at the first decorator
+                    start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+                    ranges.append((start, node.end_lineno, f"{module}.{node.name}",
+                                   isinstance(node, ast.AsyncFunctionDef)))
+        self.ranges[path] = ranges
+        return ranges
+
+    def lookup(self, filename, lineno):
+        """
+        Find the innermost src/ function containing a line
+
+        Returns:
+            tuple: (qualified name, is_async) or None if not in src/
+        """
+        path = os.path.realpath(filename)
+        if not path.startswith(self.src_dir + os.sep):
+            return None
+        ranges = self.ranges.get(path)
+        if ranges is None:
+            ranges = self._load(path)
+        best = None
+        for start, end, name, is_async in ranges:
+            if start <= lineno <= end and (best is None or start >= best[0]):
+                best = (start, name, is_async)
+        return (best[1], best[2]) if best else None
+
+
+class AllocationMeter:
+    """
+    Charges bytes and blocks allocated by src/ code to its task and function
+
+    Runs as the sys.settrace hook during a metered cycle, with opcode events
+    in src/ frames. At every trace event the traced peak since the previous
+    event (reset after each one) is what the code in between allocated,
+    short-lived objects included, and is charged to the task and function
+    that were running. Blocks are the net change in sys.getallocatedblocks(),
+    at least one when anything was allocated.
+
+    Left out, as they don't allocate on the device:
+    - Single int boxes (INT_SIZES): CPython boxes every int above 256,
+      MicroPython stores ints up to 2**30 in the pointer.
+    - Frame objects CPython makes for the trace hook itself (for every call,
+      and for coroutines resumed for the first time while metering).
+    - Host stand-ins called from src/ (emulator.py, the replay transport; C
+      modules on the device) and the pure-Python fallbacks of the viper
+      kernels, charged to HOST_STAND_INS.
+    - asyncio called from src/ (uasyncio's sleeps don't allocate), charged to
+      UNATTRIBUTED like the rest of the event loop.
+
+    A lower bound: temporaries made and freed within one opcode (inside a
+    built-in call, say) only count up to their peak, and CPython's float and
+    tuple free lists serve some allocations without the traced allocator.
+
+    With `task` set, only that task's allocations are charged.
+    """
+
+    def __init__(self, index, host_dir=HOST_DIR, task=None):
+        self.index = index
+        self.task = task
+        self.host_dir = os.path.realpath(host_dir) + os.sep
+        self.loop_dir = os.path.realpath(os.path.dirname(asyncio.__file__)) + os.sep
+        self.codes = {}             # code -> (function name, is_async) or None
+        self.stand_ins = {}         # code filename -> owner label, or None for other code
+        self.by_task = {}           # task -> [bytes, blocks]
+        self.by_function = {}       # function -> [bytes, blocks]
+        self.owner = UNATTRIBUTED_OWNER
+        self.mark = 0
+        self.blocks = 0
+        self.high = 0               # Traced peak since start() (the hook resets tracemalloc's)
+        self.local_hook = self._local   # Bound once: a new bound method per event would be charged
+
+    def _function(self, code):
+        found = self.codes.get(code, False)
+        if found is False:
+            found = self.index.lookup(code.co_filename, code.co_firstlineno)
+            self.codes[code] = found
+        return found
+
+    def _stand_in(self, code):
+        """Owner label for host stand-in and event loop code, None for other code"""
+        filename = code.co_filename
+        if filename not in self.stand_ins:
+            path = os.path.realpath(filename)
+            if path.startswith(self.host_dir):
+                self.stand_ins[filename] = (HOST_STAND_INS, HOST_STAND_INS)
+            elif path.startswith(self.loop_dir):
+                self.stand_ins[filename] = UNATTRIBUTED_OWNER
+            else:
+                self.stand_ins[filename] = None
+        return self.stand_ins[filename]
+
+    def _new_frame(self, frame):
+        """
+        True if the frame object was made for this 'call' event
+
+        That's a frame's first call, but also a coroutine resuming that no
+        hook has seen yet: CPython only makes frame objects when asked for one.
+        """
+        return frame.f_trace is None
+
+    def _owner(self, frame):
+        """(task, function) for a src/ frame: outermost task, innermost function"""
+        task = UNATTRIBUTED
+        function = None
+        while frame is not None:
+            found = self._function(frame.f_code)
+            if found is not None:
+                name, is_async = found
+                if function is None:
+                    function = name
+                if is_async and name.startswith("main.") and name != "main.async_main":
+                    task = name
+            frame = frame.f_back
+        return (task, function or "(outside src/)")
+
+    def _charge(self, frame, event):
+        """Charge what was allocated since the previous event to the current owner"""
+        peak = tracemalloc.get_traced_memory()[1]
+        count = sys.getallocatedblocks() - self.blocks
+        if peak > self.high:
+            self.high = peak
+        size = peak - self.mark
+        if event == 'call' and self._new_frame(frame):
+            size -= sys.getsizeof(frame)
+            count -= 1
+        if size > 0 and size not in INT_SIZES and (self.task is None or self.owner[0] == self.task):
+            task, function = self.owner
+            count = count if count > 0 else 1
+            for table, key in ((self.by_task, task), (self.by_function, function)):
+                entry = table.get(key)
+                if entry is None:
+                    table[key] = [size, count]
+                else:
+                    entry[0] += size
+                    entry[1] += count
+
+    def _rearm(self):
+        """Start the next measurement from the heap as the hook leaves it"""
+        self.blocks = sys.getallocatedblocks()
+        self.mark = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+
+    def _global(self, frame, event, arg):
+        self._charge(frame, event)
+        local = None
+        found = self._function(frame.f_code)
+        if found is not None and found[0] not in NATIVE_ON_DEVICE:
+            self.owner = self._owner(frame)
+            frame.f_trace_opcodes = True
+            frame.f_trace_lines = False
+            local = self.local_hook
+        elif found is not None:
+            self.owner = (HOST_STAND_INS, HOST_STAND_INS)
+            frame.f_trace_lines = False
+            local = self.local_hook
+        elif frame.f_back is not None and self._function(frame.f_back.f_code) is not None:
+            # Called from src/: stand-ins take the charge until they return
+            owner = self._stand_in(frame.f_code)
+            if owner is not None:
+                self.owner = owner
+                frame.f_trace_lines = False
+                local = self.local_hook
+        self._rearm()
+        return local
+
+    def _local(self, frame, event, arg):
+        self._charge(frame, event)
+        if event == 'return':
+            caller = frame.f_back
+            if caller is not None and self._function(caller.f_code) is not None:
+                self.owner = self._owner(caller)
+            else:
+                self.owner = UNATTRIBUTED_OWNER
+        self._rearm()
+        return self.local_hook
+
+    def start(self):
+        """Start metering (tracemalloc must be tracing)"""
+        self.owner = UNATTRIBUTED_OWNER
+        self.high = 0
+        self._rearm()
+        sys.settrace(self._global)
+
+    def stop(self):
+        sys.settrace(None)
+
+    def take(self):
+        """
+        Return and clear what was charged since the last take()
+
+        Returns:
+            tuple: (by_task, by_function) dicts of name -> [bytes, blocks]
+        """
+        by_task, by_function = self.by_task, self.by_function
+        self.by_task = {}
+        self.by_function = {}
+        return by_task, by_function
+
+
+class AllocationSampler:
+    """Collects per-task and per-function allocation samples during a run"""
+
+    def __init__(self, cycle_seconds, sample_every=DEFAULT_SAMPLE_EVERY, warmup=WARMUP_CYCLES,
+                 meter_every=DEFAULT_METER_EVERY):
+        self.cycle_seconds = cycle_seconds
+        self.sample_every = sample_every
+        self.meter_every = meter_every
+        self.warmup = warmup
+        self.index = FunctionIndex()
+        self.meter = AllocationMeter(self.index)
+        self.samples = 0
+        self.by_task = {}           # task -> [bytes, blocks] retained, summed over samples
+        self.by_function = {}       # function -> [bytes, blocks]
+        self.alloc_by_task = {}     # task -> [bytes, blocks] allocated, summed over samples
+        self.alloc_by_function = {} # function -> [bytes, blocks]
+        # Arrays grow in place, so the sampler doesn't add heap blocks itself
+        self.retained = array.array('q')        # Retained device-task bytes per sampled cycle
+        self.allocated = array.array('q')       # Allocated device-task bytes per sampled cycle
+        self.allocated_blocks = array.array('q')    # Allocated device-task blocks per sampled cycle
+        self.peaks = array.array('q')           # Traced peak bytes per sampled cycle
+        self.sample_cycles = array.array('q')   # Cycle number of each heap sample
+        self.heap_blocks = array.array('q')     # Allocated blocks after gc.collect()
+
+    def _attribute(self, traceback):
+        """Return (task, function) for an allocation traceback"""
+        task = None
+        function = None
+        # Frames run oldest -> newest: first async def in main.py is the task,
+        # the newest src/ frame is the allocating function
+        for frame in traceback:
+            found = self.index.lookup(frame.filename, frame.lineno)
+            if found is None:
+                continue
+            name, is_async = found
+            if task is None and is_async and name.startswith("main.") and name != "main.async_main":
+                task = name
+            function = name
+        return (task or UNATTRIBUTED, function or "(outside src/)")
+
+    def _record(self, snapshot, peak):
+        retained = 0
+        for stat in snapshot.statistics('traceback'):
+            task, function = self._attribute(stat.traceback)
+            for table, key in ((self.by_task, task), (self.by_function, function)):
+                entry = table.setdefault(key, [0, 0])
+                entry[0] += stat.size
+                entry[1] += stat.count
+            if task != UNATTRIBUTED:
+                retained += stat.size
+        self.retained.append(retained)
+        self.peaks.append(peak)
+        self.samples += 1
+
+    def _record_allocations(self):
+        allocated = blocks = 0
+        by_task, by_function = self.meter.take()
+        for totals, table in ((self.alloc_by_task, by_task), (self.alloc_by_function, by_function)):
+            for key, (size, count) in table.items():
+                entry = totals.setdefault(key, [0, 0])
+                entry[0] += size
+                entry[1] += count
+        for task, (size, count) in by_task.items():
+            if task not in (UNATTRIBUTED, HOST_STAND_INS):
+                allocated += size
+                blocks += count
+        self.allocated.append(allocated)
+        self.allocated_blocks.append(blocks)
+
+    async def run(self, harness):
+        """Monitor coroutine for ReplayHarness.run(monitors=...)"""
+        this_file = os.path.abspath(__file__)
+        # The allocation meter runs on a cycle between traced ones (the frame
+        # objects its trace hook makes CPython create would otherwise show up
+        # as retained), picked at random so that over the run it sees every
+        # phase of the fetch schedule. Its last warmup cycle only primes the
+        # meter's caches, so they don't count as heap growth.
+        rng = random.Random(1)
+        meter_cycle = self.warmup - 1
+        cycle = 0
+        while True:
+            sampling = cycle >= self.warmup and (cycle - self.warmup) % self.sample_every == 0
+            if sampling and self.samples % self.meter_every == 0:
+                meter_cycle = cycle + (rng.randrange(1, self.sample_every) if self.sample_every > 1 else 0)
+            metering = cycle == meter_cycle
+            if sampling:
+                gc.collect()
+                self.sample_cycles.append(cycle)
+                self.heap_blocks.append(sys.getallocatedblocks())
+            if sampling or metering:
+                tracemalloc.start(TRACE_FRAMES)
+            if metering:
+                self.meter.start()
+            try:
+                await asyncio.sleep(self.cycle_seconds)
+            finally:
+                if metering:
+                    self.meter.stop()
+                    if cycle >= self.warmup:
+                        self._record_allocations()
+                    else:
+                        self.meter.take()
+                if sampling:
+                    peak = max(self.meter.high, tracemalloc.get_traced_memory()[1]) if metering \
+                        else tracemalloc.get_traced_memory()[1]
+                    snapshot = tracemalloc.take_snapshot().filter_traces(
+                        (tracemalloc.Filter(False, this_file),
+                         tracemalloc.Filter(False, tracemalloc.__file__)))
+                    self._record(snapshot, peak)
+                if sampling or metering:
+                    tracemalloc.stop()
+            cycle += 1
+
+    def growth_per_day(self):
+        """Least-squares slope of allocated blocks, scaled to blocks per day"""
+        points = list(zip(self.sample_cycles, self.heap_blocks))
+        if len(points) < 3:
+            return 0.0
+        n = len(points)
+        mean_x = sum(x for x, _ in points) / n
+        mean_y = sum(y for _, y in points) / n
+        sxx = sum((x - mean_x) ** 2 for x, _ in points)
+        sxy = sum((x - mean_x) * (y - mean_y) for x, y in points)
+        slope = sxy / sxx if sxx else 0.0     # Blocks per cycle
+        return slope * 86400 / self.cycle_seconds
+
+    def retained_per_cycle(self):
+        return sum(self.retained) / len(self.retained) if self.retained else 0.0
+
+    def allocated_per_cycle(self):
+        """Mean device-task (bytes, blocks) allocated per sampled cycle"""
+        if not self.allocated:
+            return (0.0, 0.0)
+        return (sum(self.allocated) / len(self.allocated),
+                sum(self.allocated_blocks) / len(self.allocated_blocks))
+
+    def peak_per_cycle(self):
+        return max(self.peaks) if self.peaks else 0
+
+    def format(self, top=10):
+        """Format per-task and per-function tables as printable lines"""
+        n = max(self.samples, 1)
+        metered = max(len(self.allocated), 1)
+        lines = [f"Sampled cycles: {self.samples} traced, {len(self.allocated)} metered "
+                 f"(every {self.sample_every} x {self.cycle_seconds}s)",
+                 "Per cycle: bytes/blocks allocated (short-lived included) and retained at the end", ""]
+
+        def table(title, allocated, retained, limit=None):
+            lines.append(f"{title:<32}{'alloc B':>10}{'alloc blk':>11}{'kept B':>9}{'kept blk':>10}")
+            names = sorted(set(allocated) | set(retained),
+                           key=lambda name: -allocated.get(name, (0, 0))[0])
+            for name in names[:limit]:
+                size, count = allocated.get(name, (0, 0))
+                kept_size, kept_count = retained.get(name, (0, 0))
+                lines.append(f"{name:<32}{size / metered:>10.0f}{count / metered:>11.1f}"
+                             f"{kept_size / n:>9.0f}{kept_count / n:>10.1f}")
+
+        table("Task", self.alloc_by_task, self.by_task)
+        lines.append("")
+        table("Function", self.alloc_by_function, self.by_function, top)
+        return lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-compressed soak test for heap growth and allocation rate")
+    parser.add_argument('--days', type=float, default=7.0, help="Simulated duration (default: 7)")
+    parser.add_argument('--sample-every', type=int, default=DEFAULT_SAMPLE_EVERY,
+                        help=f"Trace one fetch cycle in N (default: {DEFAULT_SAMPLE_EVERY})")
+    parser.add_argument('--meter-every', type=int, default=DEFAULT_METER_EVERY,
+                        help=f"Meter allocations on one cycle per N traced ones (default: {DEFAULT_METER_EVERY})")
+    parser.add_argument('--budget', type=int, default=DEFAULT_BUDGET,
+                        help=f"Max retained bytes per cycle (default: {DEFAULT_BUDGET})")
+    parser.add_argument('--alloc-budget', type=int, default=DEFAULT_ALLOC_BUDGET,
+                        help=f"Max allocated bytes per cycle (default: {DEFAULT_ALLOC_BUDGET})")
+    parser.add_argument('--block-budget', type=int, default=DEFAULT_BLOCK_BUDGET,
+                        help=f"Max allocated blocks per cycle (default: {DEFAULT_BLOCK_BUDGET})")
+    parser.add_argument('--growth-budget', type=int, default=DEFAULT_GROWTH_BUDGET,
+                        help=f"Max heap growth in blocks per day (default: {DEFAULT_GROWTH_BUDGET})")
+    parser.add_argument('--top', type=int, default=10, help="Functions to list (default: 10)")
+    args = parser.parse_args()
+
+    harness = ReplayHarness(hours=args.days * 24)
+    sampler = AllocationSampler(harness.main.DEXCOM_UPDATE_INTERVAL, sample_every=args.sample_every,
+                                meter_every=args.meter_every)
+    report = harness.run(monitors=(sampler.run,))
+
+    for line in format_report(report):
+        print(line)
+    print("SOAK ALLOCATIONS")
+    print("=" * 50)
+    for line in sampler.format(top=args.top):
+        print(line)
+    print("=" * 50)
+
+    retained = sampler.retained_per_cycle()
+    allocated, blocks = sampler.allocated_per_cycle()
+    growth = sampler.growth_per_day()
+    print(f"Allocated/cycle: {allocated:.0f} bytes (budget {args.alloc_budget}), "
+          f"{blocks:.1f} blocks (budget {args.block_budget})")
+    print(f"Retained/cycle: {retained:.0f} bytes (budget {args.budget})")
+    print(f"Transient peak: {sampler.peak_per_cycle()} bytes")
+    print(f"Heap growth:    {growth:.0f} blocks/day (budget {args.growth_budget})")
+
+    failed = False
+    if allocated > args.alloc_budget or blocks > args.block_budget:
+        print("FAIL: steady-state allocation rate per cycle over budget")
+        failed = True
+    if retained > args.budget:
+        print("FAIL: steady-state retained allocation per cycle over budget")
+        failed = True
+    if growth > args.growth_budget:
+        print("FAIL: heap grows over budget - possible leak")
+        failed = True
+    if not failed:
+        print("PASS")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
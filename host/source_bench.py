@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Data source benchmark - every backend against local fakes, on one trace
+
+Runs the device tasks through the replay harness once per backend, each
+serving the same synthetic trace (readings reach Share and Nightscout
+UPLOAD_LAG seconds after their timestamp, as in push_check.py):
+- share:      DexcomClient against ShareReplay (the harness default)
+- nightscout: NightscoutClient against NightscoutReplay, the entries API
+              with count and find[date][$gt]
+- relay:      RelayClient long-polling host/relay.py in the same event
+              loop, the relay polling ShareReplay
+- replay:     ReplaySource over a glucose log written from the trace
+
+For each it reports display requests and response bytes per hour, readings
+shown and missed, and the latency from a reading reaching the source to
+the display. Checks that no backend misses a reading and that Nightscout's
+since-queries cost fewer bytes than Share's windows.
+
+Exits non-zero on any failure.
+
+Usage:
+    python host/source_bench.py
+    python host/source_bench.py --hours 24 --backends share,nightscout
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import types
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from replay import ReplayHarness
+from push_check import RelayLink, UPLOAD_LAG
+
+BACKENDS = ("share", "nightscout", "relay", "replay")
+_NIGHTSCOUT_DIRECTIONS = {"NotComputable": "NOT COMPUTABLE", "RateOutOfRange": "RATE OUT OF RANGE"}
+
+
+class Meter:
+    """Wraps an async transport function, counting requests and response bytes"""
+
+    def __init__(self, request):
+        self.request = request
+        self.requests = 0
+        self.bytes = 0
+
+    async def __call__(self, url, *args, **kwargs):
+        self.requests += 1
+        status, text = await self.request(url, *args, **kwargs)
+        self.bytes += len(text or "")
+        return status, text
+
+
+class NightscoutReplay:
+    """
+    Fake Nightscout entries API over a ShareReplay's readings
+
+    Answers GET /api/v1/entries/sgv.json with the readings visible at the
+    virtual time (same visibility as the ShareReplay), newest first,
+    honouring count and find[date][$gt] (epoch ms).
+    """
+
+    def __init__(self, share):
+        self.share = share
+
+    async def get(self, url, headers=None, timeout=None):
+        from dexcom import parse_share_timestamp
+        query = parse_qs(urlsplit(url).query)
+        count = int(query.get("count", ["10"])[0])
+        after = int(query.get("find[date][$gt]", ["0"])[0]) // 1000
+        result = []
+        i = self.share._index_at(self.share.clock.time())
+        while i >= 0 and len(result) < count:
+            reading = self.share.readings[i]
+            t = parse_share_timestamp(reading["WT"])
+            if t <= after:
+                break
+            result.append({"type": "sgv", "date": t * 1000, "sgv": reading["Value"],
+                           "direction": _NIGHTSCOUT_DIRECTIONS.get(reading["Trend"], reading["Trend"])})
+            i -= 1
+        return 200, json.dumps(result)
+
+
+def run(backend, hours, scratch):
+    """
+    Run the device on one backend
+
+    Returns:
+        dict: meter, shown {timestamp: virtual time}, visible {timestamp:
+            virtual time the source had it}, source
+    """
+    harness = ReplayHarness(hours=hours)
+    rng = random.Random(3)
+    trace_times = list(harness.share.times)
+    harness.share.times = [t + rng.randint(*UPLOAD_LAG) for t in trace_times]
+    visible = dict(zip(trace_times, harness.share.times))
+    monitors = ()
+
+    if backend == "share":
+        meter = Meter(harness.share.apost)
+        harness.dexcom.ahttp = types.SimpleNamespace(post=meter)
+        source = harness.client
+    elif backend == "nightscout":
+        import nightscout
+        meter = Meter(NightscoutReplay(harness.share).get)
+        nightscout.ahttp = types.SimpleNamespace(get=meter)
+        source = nightscout.NightscoutClient("http://nightscout")
+    elif backend == "relay":
+        import relay as relay_module
+        import relay_client
+        relay = relay_module.Relay([("replay", "replay")])
+        meter = Meter(RelayLink(relay, harness.clock).get)
+        relay_client.ahttp = types.SimpleNamespace(get=meter, HTTP_TIMEOUT=relay_client.ahttp.HTTP_TIMEOUT)
+        source = relay_client.RelayClient("http://relay", 0)
+
+        async def relay_poller(h):
+            await relay.poll(0)
+        monitors = (relay_poller,)
+    else:
+        import glucose_log
+        import replay_source
+        from dexcom import parse_share_timestamp
+        path = os.path.join(scratch, "replay")
+        recording = glucose_log.GlucoseLog(path)
+        for reading in harness.share.readings:
+            recording.append(parse_share_timestamp(reading["WT"]), reading["Value"], reading["Trend"])
+        meter = Meter(None)
+        source = replay_source.ReplaySource(path)
+        visible = None                  # Readings are due at their shifted timestamp
+
+    shown = {}
+    apply_readings = source._apply_readings
+
+    def recording_apply(readings):
+        for t, _, _ in readings:
+            shown.setdefault(t, harness.clock.time())
+        return apply_readings(readings)
+
+    source._apply_readings = recording_apply
+    harness.client = source
+    harness.run(monitors=monitors)
+    return {'meter': meter, 'shown': shown, 'visible': visible, 'source': source,
+            'end': harness.clock.time(), 'recorded': trace_times}
+
+
+def report(backend, result, hours):
+    """
+    Score one run
+
+    Returns:
+        tuple: (ok, line, bytes per hour)
+    """
+    shown = result['shown']
+    first = min(shown.values())                     # The first fetch is a backfill, not news
+    if result['visible'] is None:
+        source = result['source']
+        recorded = set(result['recorded'])
+        latencies = [at - t for t, at in shown.items() if at > first]
+        stray = [t for t in shown if t - source.offset not in recorded]
+        span = [t for t in shown if shown[t] > first]
+        expected = len([t for t in recorded if first < t + source.offset <= result['end'] - 60])
+        missed = max(0, expected - len(span)) + len(stray)
+    else:
+        visible = result['visible']
+        latencies = [at - visible[t] for t, at in shown.items() if at > first]
+        due = [t for t, at in visible.items() if first < at <= result['end'] - 60]
+        missed = len([t for t in due if t not in shown])
+    meter = result['meter']
+    per_hour = meter.bytes / hours
+    median = statistics.median(latencies) if latencies else 0
+    worst = max(latencies) if latencies else 0
+    line = (f"{backend:<11} {meter.requests / hours:6.1f} requests/h {per_hour:8.0f} bytes/h  "
+            f"{len(shown):4d} shown {missed:3d} missed  latency median {median:5.1f} s, max {worst:5.1f} s")
+    return missed == 0, line, per_hour
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the glucose data sources against local fakes")
+    parser.add_argument('--hours', type=float, default=8.0, help="Virtual hours per backend (default: 8)")
+    parser.add_argument('--backends', default=",".join(BACKENDS),
+                        help=f"Comma-separated backends (default: {','.join(BACKENDS)})")
+    args = parser.parse_args()
+    backends = args.backends.split(",")
+    unknown = [b for b in backends if b not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backends: {unknown}")
+
+    ok = True
+    rates = {}
+    with tempfile.TemporaryDirectory() as scratch:
+        for backend in backends:
+            backend_ok, line, rates[backend] = report(backend, run(backend, args.hours, scratch), args.hours)
+            print(line)
+            if not backend_ok:
+                print(f"  {backend} missed readings")
+                ok = False
+    if "share" in rates and "nightscout" in rates and rates["nightscout"] >= rates["share"]:
+        print("  Nightscout since-queries cost no fewer bytes than Share windows")
+        ok = False
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
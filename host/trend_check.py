@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Trend check - src/trend.py estimator against Dexcom's trend labels
+
+Replays synthetic traces through TrendEstimator.add and compares the
+estimated trend with the label Dexcom gives the same readings:
+- Buckets: one trace per arrow (all 7), glucose moving at a rate in the
+  middle of the bucket with a little noise. Every reading whose 15-minute
+  history lies inside the trace must get Dexcom's label. rate_to_trend is
+  also checked either side of each bucket boundary.
+- Gaps: a signal loss longer than TREND_MAX_GAP_SECONDS between a fast rise
+  and a fall must reset the history (no trend and no delta on the first
+  reading after it, the fall's label from the second on); a single dropped
+  reading must not.
+- Repeats: every reading polled three times and an older reading sent
+  again. Repeats must be reported as such and leave rate, delta, change and
+  trend exactly as a run without them.
+
+Exits non-zero on any mismatch.
+
+Usage:
+    python host/trend_check.py
+    python host/trend_check.py --seed 4 --noise 1
+"""
+
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from emulator import install, DEFAULT_START_EPOCH
+
+READING_INTERVAL = 300          # Dexcom reading cadence (seconds)
+SIGNAL_LOSS_SECONDS = 1800      # Long gap in the gap trace (30 minutes)
+BUCKET_RATES = (                # Dexcom label -> rate in mg/dL/min (middle of bucket)
+    ("DoubleUp", 3.0),
+    ("SingleUp", 1.5),
+    ("FortyFiveUp", 0.75),
+    ("Flat", 0.0),
+    ("FortyFiveDown", -0.75),
+    ("SingleDown", -1.5),
+    ("DoubleDown", -3.0),
+)
+BOUNDARIES = (                  # Rate in tenths of mg/dL/min -> expected trend
+    (5, "Flat"), (6, "FortyFiveUp"), (10, "FortyFiveUp"), (11, "SingleUp"),
+    (20, "SingleUp"), (21, "DoubleUp"), (-5, "Flat"), (-6, "FortyFiveDown"),
+    (-10, "FortyFiveDown"), (-11, "SingleDown"), (-20, "SingleDown"),
+    (-21, "DoubleDown"), (None, None),
+)
+
+
+def segment(start_epoch, start_value, rate, minutes, label, rng, noise):
+    """
+    Generate readings at the Dexcom cadence moving at a constant rate
+
+    Args:
+        start_epoch: Epoch seconds of the first reading
+        start_value: Glucose of the first reading before noise (mg/dL)
+        rate: Rate of change in mg/dL/min
+        minutes: Segment length in minutes
+        label: Dexcom trend label for every reading in the segment
+        rng: random.Random for the noise
+        noise: Noise amplitude in mg/dL (uniform, rounded to whole mg/dL)
+
+    Returns:
+        list: (timestamp, value, label) tuples (oldest first)
+    """
+    readings = []
+    for i in range(minutes * 60 // READING_INTERVAL):
+        elapsed = i * READING_INTERVAL
+        value = start_value + rate * elapsed / 60 + rng.uniform(-noise, noise)
+        readings.append((start_epoch + elapsed, int(round(value)), label))
+    return readings
+
+
+def check_buckets(trend, rng, noise):
+    """
+    Replay one trace per arrow bucket and compare with Dexcom's label
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    ok = True
+    lines = []
+    warmup = trend.TREND_HISTORY_SIZE - 1
+    for label, rate in BUCKET_RATES:
+        estimator = trend.TrendEstimator()
+        readings = segment(DEFAULT_START_EPOCH, 200 - rate * 30, rate, 60, label, rng, noise)
+        compared = matched = 0
+        wrong = []
+        for index, (t, value, expected) in enumerate(readings):
+            estimator.add(t, value)
+            if index < warmup:
+                continue
+            compared += 1
+            if estimator.get_trend() == expected:
+                matched += 1
+            else:
+                wrong.append(estimator.get_trend())
+        lines.append(f"{label:<14} {rate:+.2f} mg/dL/min: {matched}/{compared} match"
+                     + (f" (got {sorted(set(map(str, wrong)))})" if wrong else ""))
+        if wrong:
+            ok = False
+
+    misses = [(rate, expected, trend.rate_to_trend(rate)) for rate, expected in BOUNDARIES
+              if trend.rate_to_trend(rate) != expected]
+    lines.append(f"Boundaries:    {len(BOUNDARIES) - len(misses)}/{len(BOUNDARIES)} rates mapped as expected")
+    for rate, expected, got in misses:
+        lines.append(f"  rate_to_trend({rate}) = {got}, expected {expected}")
+        ok = False
+    return ok, lines
+
+
+def check_gaps(trend, rng, noise):
+    """
+    Replay traces with a long signal loss and a single dropped reading
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    ok = True
+    lines = []
+
+    # Fast rise, 30 minutes of signal loss, then a fall
+    rise = segment(DEFAULT_START_EPOCH, 100, 3.0, 60, "DoubleUp", rng, noise)
+    fall_start = rise[-1][0] + SIGNAL_LOSS_SECONDS
+    fall = segment(fall_start, 250, -1.5, 60, "SingleDown", rng, noise)
+    estimator = trend.TrendEstimator()
+    for t, value, _ in rise:
+        estimator.add(t, value)
+    failures = []
+    for index, (t, value, expected) in enumerate(fall):
+        estimator.add(t, value)
+        if index == 0:
+            if estimator.get_trend() is not None or estimator.get_delta() is not None:
+                failures.append(f"first reading after the gap: trend {estimator.get_trend()}, "
+                                f"delta {estimator.get_delta()} (history not reset)")
+        elif estimator.get_trend() != expected:
+            failures.append(f"reading {index} after the gap: {estimator.get_trend()}, expected {expected}")
+    lines.append(f"Long gap:      {len(fall) - len(failures)}/{len(fall)} readings after "
+                 f"{(fall_start - rise[-1][0]) // 60} min of signal loss as expected")
+
+    # One dropped reading inside a steady fall keeps the history
+    readings = segment(DEFAULT_START_EPOCH, 200, -0.75, 60, "FortyFiveDown", rng, noise)
+    dropped = len(readings) // 2
+    del readings[dropped]
+    estimator = trend.TrendEstimator()
+    short = []
+    for index, (t, value, expected) in enumerate(readings):
+        estimator.add(t, value)
+        if index >= trend.TREND_HISTORY_SIZE - 1 and estimator.get_trend() != expected:
+            short.append(f"reading {index} around a dropped reading: {estimator.get_trend()}, expected {expected}")
+        if index == dropped and estimator.get_delta() is None:
+            short.append("delta reset by a single dropped reading")
+    lines.append(f"Short gap:     {'history kept' if not short else 'history lost'} across one dropped reading")
+
+    for failure in failures + short:
+        lines.append(f"  {failure}")
+        ok = False
+    return ok, lines
+
+
+def check_repeats(trend, rng, noise):
+    """
+    Replay a trace with every reading polled several times and a stale resend
+
+    Returns:
+        tuple: (ok, report lines)
+    """
+    readings = (segment(DEFAULT_START_EPOCH, 120, 1.5, 30, "SingleUp", rng, noise)
+                + segment(DEFAULT_START_EPOCH + 1800, 165, -3.0, 30, "DoubleDown", rng, noise))
+    plain = trend.TrendEstimator()
+    polled = trend.TrendEstimator()
+    failures = []
+
+    def state(estimator):
+        return (estimator.get_rate(), estimator.get_delta(), estimator.get_change(), estimator.get_trend())
+
+    for index, (t, value, _) in enumerate(readings):
+        plain.add(t, value)
+        if not polled.add(t, value):
+            failures.append(f"reading {index} reported as a repeat")
+        for _ in range(2):
+            if polled.add(t, value):
+                failures.append(f"repeat of reading {index} reported as new")
+        if index and polled.add(*readings[index - 1][:2]):
+            failures.append(f"older reading resent after reading {index} reported as new")
+        if state(polled) != state(plain):
+            failures.append(f"reading {index}: {state(polled)} with repeats, {state(plain)} without")
+
+    lines = [f"Repeats:       {len(readings)} readings polled 3 times each, "
+             f"{len(failures)} mismatches against a run without repeats"]
+    lines.extend(f"  {failure}" for failure in failures)
+    return not failures, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check local trend estimation against Dexcom's trend labels")
+    parser.add_argument('--seed', type=int, default=1, help="Noise seed (default: 1)")
+    parser.add_argument('--noise', type=float, default=1.0, help="Reading noise in mg/dL (default: 1)")
+    args = parser.parse_args()
+
+    install()
+    import trend
+    rng = random.Random(args.seed)
+
+    ok = True
+    for check in (check_buckets, check_gaps, check_repeats):
+        passed, lines = check(trend, rng, args.noise)
+        for line in lines:
+            print(line)
+        ok = ok and passed
+
+    print("PASS" if ok else "FAIL")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+WiFi supervisor check - simulated drops against the real device tasks
+
+Runs the replay harness with the WiFi supervisor and an emulated WLAN whose
+access point misbehaves on a schedule:
+- outage: the access point disappears for --outage seconds
+- blip:   the link drops once, the access point stays up
+- flaky:  the link drops and the next three connect attempts fail
+
+Checks that the display keeps drawing through every outage, that fetching
+pauses while the link is down (at most one request per drop, made before
+the supervisor notices), that retries back off (a handful of
+attempts per outage, not one per poll), that the link comes back within
+the backoff cap once the access point returns, and that reconnects ask for
+the cached BSSID and channel first, without ever scanning.
+
+Exits non-zero on any failure.
+
+Usage:
+    python host/wifi_check.py
+    python host/wifi_check.py --outage 1800 --hours 4
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from replay import ReplayHarness, format_report
+from emulator import bind_clock
+
+CONNECT_POLLS = 8               # Association takes 8 status polls (2 s at 250 ms)
+MAX_FRAME_GAP = 1.1             # Seconds - display must keep its 1 s timer updates
+MAX_OUTAGE_ATTEMPTS = 20        # Connect attempts allowed during one outage
+
+
+class DropMonitor:
+    """Applies the drop schedule and records what the device did about it"""
+
+    def __init__(self, harness, wlan, schedule):
+        self.harness = harness
+        self.wlan = wlan
+        self.schedule = schedule            # [(start seconds, duration, kind)]
+        self.events = []                    # (kind, start, ap back, link back, attempts)
+
+    async def run(self, harness):
+        clock = harness.clock
+        wifi = harness.wifi
+        for start, duration, kind in self.schedule:
+            await asyncio.sleep(start - clock.monotonic())
+            attempts = wifi.attempts
+            self.wlan.drop()
+            if kind == 'outage':
+                self.wlan.ap_up = False
+            elif kind == 'flaky':
+                self.wlan.fail_connects = 3
+            # Wait for the supervisor to notice before timing the recovery
+            while wifi.connected.is_set():
+                await asyncio.sleep(0.1)
+            if duration:
+                await asyncio.sleep(duration)
+            self.wlan.ap_up = True
+            ap_back = clock.monotonic()
+            while not wifi.connected.is_set():
+                await asyncio.sleep(0.1)
+            self.events.append((kind, start, ap_back, clock.monotonic(), wifi.attempts - attempts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check WiFi reconnect behaviour with simulated drops")
+    parser.add_argument('--hours', type=float, default=3.0, help="Simulated duration (default: 3)")
+    parser.add_argument('--outage', type=float, default=600.0,
+                        help="Seconds the access point is gone in the outage (default: 600)")
+    parser.add_argument('--seed', type=int, default=1, help="Backoff jitter seed (default: 1)")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    harness = ReplayHarness(hours=args.hours)
+    network = sys.modules['network']
+    import wifi as wifi_module
+    bind_clock(harness.clock, wifi_module)
+
+    wlan = network.WLAN(network.STA_IF)
+    wlan.connect_polls = CONNECT_POLLS
+    harness.wifi = wifi_module.WifiSupervisor(wlan, "home", "secret")
+    harness.wifi.start_connect()
+    # Requests fail while the link is down; the supervisor should keep the
+    # fetcher from trying (bar the odd one in the second before it notices)
+    harness.share.link = wlan.isconnected
+
+    schedule = [(1800, args.outage, 'outage'), (1800 + args.outage + 1800, 0, 'blip'),
+                (1800 + args.outage + 3600, 0, 'flaky')]
+    monitor = DropMonitor(harness, wlan, schedule)
+    report = harness.run(monitors=(monitor.run,))
+
+    for line in format_report(report):
+        print(line)
+
+    backoff_cap = (wifi_module.BACKOFF_MAX_MS * (100 + wifi_module.BACKOFF_JITTER_PCT) // 100
+                   + 3 * wifi_module.CONNECT_TIMEOUT_MS) / 1000
+    failed = []
+    for kind, start, ap_back, link_back, attempts in monitor.events:
+        print(f"{kind:<7} at {start / 60:5.1f} min: link back {link_back - ap_back:5.1f}s after "
+              f"access point, {attempts} attempt(s)")
+        if link_back - ap_back > backoff_cap:
+            failed.append(f"{kind}: reconnect took longer than the backoff cap ({backoff_cap:.0f}s)")
+        if attempts > MAX_OUTAGE_ATTEMPTS:
+            failed.append(f"{kind}: {attempts} connect attempts - backoff not working")
+    if len(monitor.events) != len(schedule):
+        failed.append(f"only {len(monitor.events)} of {len(schedule)} drops recovered")
+
+    bssid_retries = sum(1 for kwargs in wlan.connect_kwargs
+                        if kwargs.get('bssid') == wlan.AP_BSSID and kwargs.get('channel') == wlan.AP_CHANNEL)
+    print(f"Drops noticed:  {harness.wifi.drops}, connects {wlan.connects} "
+          f"({bssid_retries} with cached BSSID and channel), scans {wlan.scans}")
+    print(f"Requests while down: {harness.share.offline_requests}")
+
+    if not bssid_retries:
+        failed.append("reconnects never used the cached BSSID and channel")
+    if wlan.scans:
+        failed.append(f"{wlan.scans} scans - scans block the event loop")
+    if harness.share.offline_requests > len(schedule):
+        failed.append("fetches kept running while WiFi was down")
+    if report['frame_intervals'][3] > MAX_FRAME_GAP:
+        failed.append(f"display stalled for {report['frame_intervals'][3]:.2f}s")
+
+    for message in failed:
+        print(f"FAIL: {message}")
+    if not failed:
+        print("PASS")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
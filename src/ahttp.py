@@ -0,0 +1,113 @@
+"""
+Minimal async HTTP client for uasyncio
+Lets Dexcom requests run without blocking the event loop (urequests blocks)
+
+Supports what the Share API needs: HTTP/1.0 POST with an optional JSON body
+over TCP or TLS, returning (status, text) - and GET, for the LAN relay.
+Connections are closed after each request, matching urequests.
+"""
+
+import json
+import uasyncio as asyncio
+
+# Configuration
+HTTP_TIMEOUT = 15               # Seconds before a request is abandoned
+
+
+def split_url(url):
+    """
+    Split a URL into its connection parts
+
+    Args:
+        url: Full URL (e.g., "https://share2.dexcom.com/Share/...?a=1")
+
+    Returns:
+        tuple: (host, port, path, use_ssl)
+    """
+    scheme, _, rest = url.partition("://")
+    use_ssl = scheme == "https"
+    host, slash, path = rest.partition("/")
+    path = slash + path if slash else "/"
+    port = 443 if use_ssl else 80
+    if ":" in host:
+        host, port_str = host.split(":", 1)
+        port = int(port_str)
+    return host, port, path, use_ssl
+
+
+async def _request(method, url, body, headers):
+    """Send one request and read the full response"""
+    host, port, path, use_ssl = split_url(url)
+    reader, writer = await asyncio.open_connection(host, port, ssl=True if use_ssl else None)
+    try:
+        head = f"{method} {path} HTTP/1.0\r\nHost: {host}\r\n"
+        for name in headers:
+            head += f"{name}: {headers[name]}\r\n"
+        head += f"Content-Length: {len(body)}\r\n\r\n"
+        writer.write(head.encode() + body)
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise OSError("Connection closed before response")
+        status = int(status_line.split(None, 2)[1])
+
+        length = None
+        while True:
+            line = await reader.readline()
+            if not line or line == b"\r\n":
+                break
+            name, _, value = line.decode().partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value.strip())
+
+        if length is None:
+            content = await reader.read(-1)
+        else:
+            content = await reader.readexactly(length)
+        return status, content.decode()
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def post(url, payload=None, headers=None, timeout=HTTP_TIMEOUT):
+    """
+    POST to a URL without blocking the event loop
+
+    Args:
+        url: Full URL (http:// or https://)
+        payload: Object to send as JSON body (or None for an empty body)
+        headers: Extra request headers (dict)
+        timeout: Seconds before raising asyncio.TimeoutError
+
+    Returns:
+        tuple: (status code, response text)
+    """
+    request_headers = {"Connection": "close"}
+    if payload is None:
+        body = b""
+    else:
+        body = json.dumps(payload).encode()
+        request_headers["Content-Type"] = "application/json"
+    if headers:
+        request_headers.update(headers)
+    return await asyncio.wait_for(_request("POST", url, body, request_headers), timeout)
+
+
+async def get(url, headers=None, timeout=HTTP_TIMEOUT):
+    """
+    GET a URL without blocking the event loop
+
+    Args:
+        url: Full URL (http:// or https://)
+        headers: Extra request headers (dict)
+        timeout: Seconds before raising asyncio.TimeoutError
+
+    Returns:
+        tuple: (status code, response text)
+    """
+    request_headers = {"Connection": "close"}
+    if headers:
+        request_headers.update(headers)
+    return await asyncio.wait_for(_request("GET", url, b"", request_headers), timeout)
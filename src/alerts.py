@@ -0,0 +1,140 @@
+"""
+Low glucose alerts
+Decides when the display should flash for a low, urgent low or predicted low
+
+Alert levels are evaluated on each new reading from the value and the local
+rate of change (see trend.py). A predicted low looks PREDICT_MINUTES ahead
+along the current rate, the way Dexcom's "urgent low soon" does, so the
+warning starts before the value actually crosses the threshold.
+
+Snoozing (LUX buttons in main.py) silences the current level for a while;
+the alert comes back early if it escalates, and the snooze is dropped once
+glucose recovers. Timing uses ticks_ms so nothing allocates per frame.
+
+The animation itself is a precomputed pulse table: PULSE_TABLE[step] is an
+intensity in 0-255 for each of PULSE_STEPS frames, which Display turns into
+pens once per brightness change.
+"""
+
+import time
+
+# Alert levels (ordered by severity)
+ALERT_NONE = 0
+ALERT_PREDICTED_LOW = 1         # Above LOW now, below URGENT_LOW within PREDICT_MINUTES
+ALERT_LOW = 2
+ALERT_URGENT_LOW = 3
+
+# Configuration
+ALERT_LOW_THRESHOLD = 70           # mg/dL - low alert below this (matches display GLUCOSE_LOW)
+ALERT_URGENT_LOW_THRESHOLD = 55    # mg/dL - urgent low below this
+PREDICT_MINUTES = 20               # Lookahead for predicted urgent low
+SNOOZE_SECONDS = 1800              # Snooze for low / predicted low (30 minutes)
+URGENT_SNOOZE_SECONDS = 300        # Urgent low can only be snoozed briefly (5 minutes)
+
+# Animation
+ALERT_FRAME_MS = 50             # Alert frame period (20 fps)
+PULSE_STEPS = 20                # Frames per pulse cycle (1 second at 20 fps)
+PULSE_MIN = 40                  # Dimmest pulse intensity (0-255)
+
+
+def _build_pulse_table(steps, low):
+    """Triangle wave from `low` up to 255 and back over `steps` frames"""
+    half = steps // 2
+    table = bytearray(steps)
+    for i in range(steps):
+        distance = i if i <= half else steps - i
+        table[i] = low + (255 - low) * distance // half
+    return bytes(table)
+
+
+PULSE_TABLE = _build_pulse_table(PULSE_STEPS, PULSE_MIN)
+
+
+class AlertEngine:
+    """
+    Low alert state for one followed account
+
+    update() is called with each reading; level() gives the level to show
+    right now (snooze expiry is checked against ticks_ms, so it ends on time
+    even if no new reading arrives).
+    """
+
+    def __init__(self, low=ALERT_LOW_THRESHOLD, urgent_low=ALERT_URGENT_LOW_THRESHOLD,
+                 predict_minutes=PREDICT_MINUTES):
+        """
+        Initialize alert engine
+
+        Args:
+            low: Low threshold in mg/dL (default: 70)
+            urgent_low: Urgent low threshold in mg/dL (default: 55)
+            predict_minutes: Predicted-low lookahead in minutes (default: 20)
+        """
+        self.low = low
+        self.urgent_low = urgent_low
+        self.predict_minutes = predict_minutes
+        self.raw_level = ALERT_NONE     # Level from the latest reading, ignoring snooze
+        self.snoozed_level = ALERT_NONE # Level silenced by the current snooze
+        self.snooze_ticks = 0           # ticks_ms when the snooze started
+        self.snooze_ms = 0              # Snooze length (0 = not snoozed)
+
+    def evaluate(self, value, rate_x10):
+        """
+        Alert level for a reading, ignoring snooze
+
+        Args:
+            value: Glucose in mg/dL (or None)
+            rate_x10: Rate in tenths of mg/dL/min (or None if unknown)
+
+        Returns:
+            int: ALERT_* level
+        """
+        if value is None:
+            return ALERT_NONE
+        if value < self.urgent_low:
+            return ALERT_URGENT_LOW
+        if value < self.low:
+            return ALERT_LOW
+        if rate_x10 is not None and rate_x10 < 0:
+            predicted = value + rate_x10 * self.predict_minutes // 10
+            if predicted < self.urgent_low:
+                return ALERT_PREDICTED_LOW
+        return ALERT_NONE
+
+    def update(self, value, rate_x10):
+        """
+        Re-evaluate with a new reading
+
+        Escalating past the snoozed level, or recovering, ends the snooze.
+
+        Returns:
+            int: Level to show now (see level())
+        """
+        self.raw_level = self.evaluate(value, rate_x10)
+        if self.raw_level == ALERT_NONE or self.raw_level > self.snoozed_level:
+            self.snooze_ms = 0
+            self.snoozed_level = ALERT_NONE
+        return self.level()
+
+    def level(self):
+        """Alert level to show now (ALERT_NONE while snoozed)"""
+        if self.snooze_ms:
+            if time.ticks_diff(time.ticks_ms(), self.snooze_ticks) < self.snooze_ms:
+                return ALERT_NONE
+            self.snooze_ms = 0
+            self.snoozed_level = ALERT_NONE
+        return self.raw_level
+
+    def snooze(self):
+        """
+        Silence the current alert
+
+        Returns:
+            bool: True if an alert was active and is now snoozed
+        """
+        if self.level() == ALERT_NONE:
+            return False
+        self.snoozed_level = self.raw_level
+        self.snooze_ticks = time.ticks_ms()
+        seconds = URGENT_SNOOZE_SECONDS if self.raw_level == ALERT_URGENT_LOW else SNOOZE_SECONDS
+        self.snooze_ms = seconds * 1000
+        return True
@@ -0,0 +1,145 @@
+"""
+BLE glucose broadcaster
+Publishes each followed account's reading as a GATT characteristic
+
+Phones and watches nearby can follow the display over Bluetooth LE instead
+of polling Share themselves. The service (GLUCOSE_SERVICE_UUID) has one
+readable, notifying characteristic per account (GLUCOSE_CHAR_UUIDS, in
+account order) holding the reading as one packed GLUCOSE_SIZE-byte struct,
+little-endian:
+
+    u32  reading timestamp, epoch seconds (0 = no reading yet)
+    u16  glucose, mg/dL (0 = no reading yet)
+    u8   trend index (trend.TRENDS)
+    u8   flags (FLAG_STALE, FLAG_LOCAL)
+
+Airtime is kept down on both sides: a notification goes out only when an
+account's packed struct actually changes (a new reading, or the reading
+going stale) - about one 8-byte packet per reading - and advertising runs
+at ADV_INTERVAL_US. The reading's age isn't sent; a central works it out
+from the timestamp.
+
+MicroPython stops advertising when a central connects, so advertising
+restarts after every connect (until MAX_CONNECTIONS) and disconnect.
+"""
+
+import struct
+import bluetooth
+from micropython import const
+
+from trend import trend_index
+
+# Configuration
+ADV_INTERVAL_US = 500000        # Advertising interval (500 ms - phones still find it in a second or two)
+MAX_CONNECTIONS = 3             # Centrals served at once
+
+GLUCOSE_SERVICE_UUID = bluetooth.UUID("9c1f0000-6d2b-4e7a-9a41-67a1c0de0b5e")
+GLUCOSE_CHAR_UUIDS = (
+    bluetooth.UUID("9c1f0001-6d2b-4e7a-9a41-67a1c0de0b5e"),
+    bluetooth.UUID("9c1f0002-6d2b-4e7a-9a41-67a1c0de0b5e"),
+    bluetooth.UUID("9c1f0003-6d2b-4e7a-9a41-67a1c0de0b5e"),
+    bluetooth.UUID("9c1f0004-6d2b-4e7a-9a41-67a1c0de0b5e"),
+)
+
+# Reading layout (see module docstring)
+GLUCOSE_FORMAT = "<IHBB"
+GLUCOSE_SIZE = 8
+FLAG_STALE = 1                  # Reading is STALE_SECONDS old or more
+FLAG_LOCAL = 2                  # Trend was estimated locally
+
+_IRQ_CENTRAL_CONNECT = const(1)
+_IRQ_CENTRAL_DISCONNECT = const(2)
+_FLAG = bluetooth.FLAG_READ | bluetooth.FLAG_NOTIFY
+
+
+def pack_reading(buf, timestamp, value, trend, stale=False, local=False):
+    """
+    Pack a reading into buf (GLUCOSE_SIZE bytes)
+
+    Args:
+        buf: Writable buffer of at least GLUCOSE_SIZE bytes
+        timestamp: Reading time in epoch seconds (None = no reading)
+        value: Glucose in mg/dL (None = no reading)
+        trend: Dexcom trend string (None = unknown)
+        stale: Reading is stale (default: False)
+        local: Trend was estimated locally (default: False)
+    """
+    flags = (FLAG_STALE if stale else 0) | (FLAG_LOCAL if local else 0)
+    struct.pack_into(GLUCOSE_FORMAT, buf, 0, timestamp or 0, value or 0, trend_index(trend), flags)
+
+
+def advertising_payload(service):
+    """Advertising data: flags (general discoverable, no BR/EDR) and a 128-bit service UUID"""
+    uuid = bytes(service)
+    return b'\x02\x01\x06' + bytes((len(uuid) + 1, 0x07)) + uuid
+
+
+class BLEGlucose:
+    """GATT server publishing one packed reading characteristic per account"""
+
+    def __init__(self, accounts=1, name="Glucose", ble=None):
+        """
+        Register the service and start advertising
+
+        Args:
+            accounts: Followed accounts (at most len(GLUCOSE_CHAR_UUIDS))
+            name: Device name, sent in the scan response (default: "Glucose")
+            ble: bluetooth.BLE instance (default: a new one)
+        """
+        if not 0 < accounts <= len(GLUCOSE_CHAR_UUIDS):
+            raise ValueError(f"BLE broadcasts 1-{len(GLUCOSE_CHAR_UUIDS)} accounts, not {accounts}")
+        self.ble = ble or bluetooth.BLE()
+        self.ble.active(True)
+        self.connections = set()
+        self.notifications = 0          # Notifications sent (all centrals)
+        self.ble.irq(self._irq)
+
+        characteristics = tuple((GLUCOSE_CHAR_UUIDS[n], _FLAG) for n in range(accounts))
+        self.handles = self.ble.gatts_register_services(((GLUCOSE_SERVICE_UUID, characteristics),))[0]
+        self.values = [bytearray(GLUCOSE_SIZE) for _ in range(accounts)]    # As last written
+        self._scratch = bytearray(GLUCOSE_SIZE)
+        for handle, value in zip(self.handles, self.values):
+            self.ble.gatts_write(handle, value)
+
+        self._adv_data = advertising_payload(GLUCOSE_SERVICE_UUID)
+        self._resp_data = bytes((len(name) + 1, 0x09)) + name.encode()
+        self.advertise()
+
+    def advertise(self):
+        """(Re)start advertising, unless MAX_CONNECTIONS centrals are connected"""
+        if len(self.connections) < MAX_CONNECTIONS:
+            self.ble.gap_advertise(ADV_INTERVAL_US, adv_data=self._adv_data, resp_data=self._resp_data)
+
+    def _irq(self, event, data):
+        if event == _IRQ_CENTRAL_CONNECT:
+            self.connections.add(data[0])
+            self.advertise()
+        elif event == _IRQ_CENTRAL_DISCONNECT:
+            self.connections.discard(data[0])
+            self.advertise()
+
+    def update(self, index, timestamp, value, trend, stale=False, local=False):
+        """
+        Publish an account's reading, notifying centrals only if it changed
+
+        Args:
+            index: Account index
+            timestamp, value, trend, stale, local: As for pack_reading
+
+        Returns:
+            bool: True if the characteristic changed
+        """
+        pack_reading(self._scratch, timestamp, value, trend, stale, local)
+        current = self.values[index]
+        if self._scratch == current:
+            return False
+        current[:] = self._scratch
+        handle = self.handles[index]
+        self.ble.gatts_write(handle, current)
+        for conn in tuple(self.connections):
+            try:
+                self.ble.gatts_notify(conn, handle)
+                self.notifications += 1
+            except OSError:
+                self.connections.discard(conn)  # Gone without a disconnect event
+        return True
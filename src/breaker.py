@@ -0,0 +1,145 @@
+"""
+Circuit breaker
+Backs a data source off while its server is failing
+
+Without one, a Share outage meant a fetch - and a re-authentication on
+every 401/403/500 - every DEXCOM_UPDATE_INTERVAL for as long as it lasted:
+up to three TLS requests every 30 seconds, each costing heap, CPU and a
+blocked loop, and repeated logins risk locking the account.
+
+CircuitBreaker counts consecutive failures per endpoint (authenticate,
+login, read). After FAILURE_THRESHOLD in a row on any of them the circuit
+opens and no requests go out for the backoff delay; then one probe fetch is
+let through (half-open). If it works the circuit closes, if not it opens
+again for twice as long, up to BACKOFF_MAX_SECONDS. Every delay gets random
+jitter so displays don't retry in lockstep after an outage (as wifi.py).
+
+Rejected credentials are different: retrying can't fix them and only
+counts towards a lockout, so a single auth failure opens the circuit, for
+AUTH_BACKOFF_SECONDS and doubling. error_level() tells the display which
+of the two it is.
+"""
+
+import time
+import random
+
+# Configuration
+FAILURE_THRESHOLD = 3           # Consecutive failures on one endpoint that open the circuit
+BACKOFF_MIN_SECONDS = 60        # First open period after server errors
+BACKOFF_MAX_SECONDS = 1800      # Open period cap after server errors
+AUTH_BACKOFF_SECONDS = 900      # First open period after rejected credentials
+AUTH_BACKOFF_MAX_SECONDS = 14400    # Open period cap after rejected credentials
+BACKOFF_JITTER_PCT = 25         # Up to this much extra random delay per open period
+PROBE_TIMEOUT_SECONDS = 120     # A probe never recorded (lost task) is given up after this
+
+# Circuit states
+CLOSED = 0                      # Requests go out
+OPEN = 1                        # No requests until the backoff delay is over
+HALF_OPEN = 2                   # One probe fetch in flight
+
+# Endpoints (a successful read is what closes the circuit)
+ENDPOINT_AUTH = "auth"
+ENDPOINT_LOGIN = "login"
+ENDPOINT_READ = "read"
+
+# Failure kinds
+FAIL_SERVER = 0                 # 5xx, timeouts, network errors
+FAIL_AUTH = 1                   # Credentials rejected (or account locked)
+
+# Error indicator levels (see Display.set_source_error)
+SOURCE_OK = 0
+SOURCE_BACKOFF = 1              # Server failing, backing off
+SOURCE_AUTH = 2                 # Credentials rejected - needs fixing in secrets.py
+
+STATE_NAMES = ("closed", "open", "half-open")
+
+
+class CircuitBreaker:
+    """Failure counters, backoff and probe state for one source"""
+
+    def __init__(self):
+        self.state = CLOSED
+        self.failures = {}              # Endpoint -> consecutive failures
+        self.kind = FAIL_SERVER         # Failure kind that opened the circuit
+        self.backoff = 0                # Seconds of the current open period (before jitter)
+        self.opened_ticks = 0
+        self.open_ms = 0                # Open period including jitter
+        self.trips = 0                  # Times the circuit opened
+
+    def allow(self):
+        """
+        True if a fetch may go out now
+
+        Once the open period is over the first caller gets the probe and the
+        circuit goes half-open; nothing else goes out until the probe is
+        recorded (or PROBE_TIMEOUT_SECONDS pass without it).
+        """
+        if self.state == CLOSED:
+            return True
+        if time.ticks_diff(time.ticks_ms(), self.opened_ticks) >= self.open_ms:
+            if self.state == OPEN:
+                print("Circuit half-open - probing")
+            self.state = HALF_OPEN
+            self.opened_ticks = time.ticks_ms()
+            self.open_ms = PROBE_TIMEOUT_SECONDS * 1000
+            return True
+        return False
+
+    def success(self, endpoint):
+        """
+        Record a request that worked
+
+        A successful read closes the circuit; authenticate and login only
+        clear their own counter (the read may still be failing).
+        """
+        self.failures[endpoint] = 0
+        if endpoint != ENDPOINT_READ:
+            return
+        if self.state != CLOSED:
+            print("Circuit closed")
+        self.state = CLOSED
+        self.backoff = 0
+        for name in self.failures:
+            self.failures[name] = 0
+
+    def failure(self, endpoint, kind=FAIL_SERVER):
+        """
+        Record a failed request, opening the circuit if it's time
+
+        Args:
+            endpoint: ENDPOINT_* name
+            kind: FAIL_SERVER or FAIL_AUTH
+        """
+        count = self.failures.get(endpoint, 0) + 1
+        self.failures[endpoint] = count
+        if self.state == HALF_OPEN or kind == FAIL_AUTH or count >= FAILURE_THRESHOLD:
+            self._open(kind)
+
+    def _open(self, kind):
+        """Open the circuit for the next backoff delay (doubling, with jitter)"""
+        if kind == FAIL_AUTH:
+            low, high = AUTH_BACKOFF_SECONDS, AUTH_BACKOFF_MAX_SECONDS
+        else:
+            low, high = BACKOFF_MIN_SECONDS, BACKOFF_MAX_SECONDS
+        if kind != self.kind:
+            self.backoff = 0            # Server errors after an auth failure start over
+        self.backoff = max(low, min(self.backoff * 2, high))
+        self.kind = kind
+        self.state = OPEN
+        self.trips += 1
+        self.opened_ticks = time.ticks_ms()
+        self.open_ms = self.backoff * 1000 + random.randint(0, self.backoff * 10 * BACKOFF_JITTER_PCT)
+        reason = "credentials rejected" if kind == FAIL_AUTH else "server failing"
+        print(f"Circuit open ({reason}) - next try in {self.open_ms // 1000} s")
+
+    def retry_in(self):
+        """Seconds until allow() lets a probe through (0 if it would now)"""
+        if self.state != OPEN:
+            return 0
+        return max(0, (self.open_ms - time.ticks_diff(time.ticks_ms(), self.opened_ticks)) // 1000)
+
+    def error_level(self):
+        """SOURCE_* level for the display's error indicator"""
+        if self.state == CLOSED:
+            return SOURCE_OK
+        return SOURCE_AUTH if self.kind == FAIL_AUTH else SOURCE_BACKOFF
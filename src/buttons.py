@@ -0,0 +1,158 @@
+"""
+Button input
+Interrupt-driven LUX button capture with debounce, long press and repeat
+
+Polling gu.is_pressed() every 50 ms woke the CPU 20 times a second for
+nothing, and missed any press that started and ended between two polls -
+including every press made while the event loop was stuck in a blocking
+network call.
+
+Instead, a hard IRQ on each button's GPIO records every edge (button, level
+and ticks_ms) into a fixed-size ring buffer of preallocated arrays. The
+handler doesn't allocate, so it runs as a hard IRQ even while core 0 is
+blocked in a socket call or the GC. ButtonReader.poll() drains the ring in
+order and decodes the timestamped edges, so a press made during a blocking
+call is still seen, late but intact:
+- EVENT_PRESS as soon as a button goes down. Edges within DEBOUNCE_MS of the
+  last accepted change are contact bounce; the level they settle at is
+  taken once DEBOUNCE_MS has passed.
+- EVENT_LONG_PRESS once held for LONG_PRESS_MS, then EVENT_REPEAT every
+  REPEAT_MS while still held.
+- EVENT_RELEASE when it comes back up.
+
+Each edge also sets `flag` (a ThreadSafeFlag), so the consumer task can
+sleep until something happens instead of polling.
+"""
+
+import time
+import machine
+import uasyncio as asyncio
+from array import array
+
+# Configuration
+DEBOUNCE_MS = 20                # Edges this soon after an accepted change are bounce
+LONG_PRESS_MS = 600             # Hold this long for EVENT_LONG_PRESS...
+REPEAT_MS = 200                 # ...then EVENT_REPEAT this often
+EDGE_QUEUE_SIZE = 32            # Edges buffered between polls (power of two)
+
+# Events passed to poll()'s callback
+EVENT_PRESS = 0
+EVENT_RELEASE = 1
+EVENT_LONG_PRESS = 2
+EVENT_REPEAT = 3
+EVENT_NAMES = ("press", "release", "long press", "repeat")
+
+_EDGE_MASK = EDGE_QUEUE_SIZE - 1
+
+
+class ButtonReader:
+    """Edge ring buffer fed by pin IRQs, decoded into button events"""
+
+    def __init__(self, pin_ids, active_low=True):
+        """
+        Initialize button reader and attach the pin IRQs
+
+        Args:
+            pin_ids: GPIO numbers, one per button (events carry the index)
+            active_low: Buttons pull the pin low when pressed (default: True)
+        """
+        self.count = len(pin_ids)
+        self.active_low = active_low
+        self.flag = asyncio.ThreadSafeFlag()
+
+        # Ring buffer: written by the IRQ handler only at head, read only at tail
+        self.edge_ticks = array('i', [0] * EDGE_QUEUE_SIZE)
+        self.edge_info = bytearray(EDGE_QUEUE_SIZE)     # button << 1 | pressed
+        self.head = 0
+        self.tail = 0
+        self.overflows = 0              # Edges overwritten with the ring full
+
+        # Decoder state per button
+        now = time.ticks_ms()
+        self.down = bytearray(self.count)           # Debounced state
+        self.raw = bytearray(self.count)            # Level of the latest edge
+        self.changed = array('i', [time.ticks_add(now, -DEBOUNCE_MS)] * self.count)
+        self.next_ms = array('i', [0] * self.count)  # Next long press / repeat
+        self.held_long = bytearray(self.count)
+
+        pull = machine.Pin.PULL_UP if active_low else machine.Pin.PULL_DOWN
+        self.pins = [machine.Pin(pin_id, machine.Pin.IN, pull) for pin_id in pin_ids]
+        for index, pin in enumerate(self.pins):
+            pin.irq(self._handler(index), machine.Pin.IRQ_FALLING | machine.Pin.IRQ_RISING, hard=True)
+
+    def _handler(self, button):
+        """IRQ handler for one button (closure made once, at setup)"""
+        def edge(pin):
+            pressed = 1 if (pin.value() == 0) == self.active_low else 0
+            head = self.head
+            following = (head + 1) & _EDGE_MASK
+            if following == self.tail:
+                # Full: overwrite the newest edge so the last level still gets through
+                self.overflows += 1
+                head = (head - 1) & _EDGE_MASK
+                following = self.head
+            self.edge_ticks[head] = time.ticks_ms()
+            self.edge_info[head] = button << 1 | pressed
+            self.head = following
+            self.flag.set()
+        return edge
+
+    def poll(self, now, on_event):
+        """
+        Decode buffered edges and due long press / repeat timers
+
+        Allocation-free: events are delivered through on_event.
+
+        Args:
+            now: Current ticks_ms
+            on_event: Called as on_event(button, event) for each event
+
+        Returns:
+            int: ms until a timer is due (a button is held or settling),
+                 or -1 if nothing happens until the next edge
+        """
+        while self.tail != self.head:
+            tail = self.tail
+            info = self.edge_info[tail]
+            at = self.edge_ticks[tail]
+            self.tail = (tail + 1) & _EDGE_MASK
+            button = info >> 1
+            self._timers(button, at, on_event)
+            self.raw[button] = info & 1
+            if info & 1 != self.down[button] and time.ticks_diff(at, self.changed[button]) >= DEBOUNCE_MS:
+                self._change(button, info & 1, at, on_event)
+
+        wait = -1
+        for button in range(self.count):
+            due = self._timers(button, now, on_event)
+            if due >= 0 and (wait < 0 or due < wait):
+                wait = due
+        return wait
+
+    def _timers(self, button, now, on_event):
+        """Settle bounce and fire long press / repeat for one button at `now`"""
+        since = time.ticks_diff(now, self.changed[button])
+        if self.raw[button] != self.down[button]:
+            if since < DEBOUNCE_MS:
+                return DEBOUNCE_MS - since
+            self._change(button, self.raw[button], time.ticks_add(self.changed[button], DEBOUNCE_MS), on_event)
+        if not self.down[button]:
+            return -1
+        due = time.ticks_diff(self.next_ms[button], now)
+        if due <= 0:
+            on_event(button, EVENT_REPEAT if self.held_long[button] else EVENT_LONG_PRESS)
+            self.held_long[button] = 1
+            self.next_ms[button] = time.ticks_add(now, REPEAT_MS)
+            due = REPEAT_MS
+        return due
+
+    def _change(self, button, pressed, at, on_event):
+        """Accept a debounced state change"""
+        self.down[button] = pressed
+        self.changed[button] = at
+        if pressed:
+            self.held_long[button] = 0
+            self.next_ms[button] = time.ticks_add(at, LONG_PRESS_MS)
+            on_event(button, EVENT_PRESS)
+        else:
+            on_event(button, EVENT_RELEASE)
@@ -1,19 +1,105 @@
 """
 Dexcom Share API Client
 Handles authentication and glucose data fetching
+
+Requests go through ahttp, so fetches run concurrently under uasyncio
+without blocking the display. Readings, trend and log handling come from
+source.GlucoseSource.
+
+Every request is recorded on the source's circuit breaker (breaker.py):
+while Share keeps failing, fetches are skipped for a growing backoff
+instead of retried every poll. Only an expired session (401/403, or a
+session error code) is worth logging in again for, once per fetch; other
+errors are counted, and rejected credentials open the circuit straight
+away.
 """
 
-import time
 import json
-import urequests
+import ahttp
+
+from source import GlucoseSource
+from breaker import ENDPOINT_AUTH, ENDPOINT_LOGIN, ENDPOINT_READ, FAIL_SERVER, FAIL_AUTH
 
 # Constants
 DEXCOM_APP_ID = "d89443d2-327c-4a6f-89e5-496bbb0317db"
 
-class DexcomClient:
+# Share error codes (in the body of 500 responses)
+SESSION_ERRORS = ("SessionIdNotFound", "SessionNotValid")
+AUTH_ERRORS = ("AccountPasswordInvalid", "PasswordInvalid", "AccountNotFound", "MaxAttempts")
+
+
+def parse_share_timestamp(share_date):
+    """
+    Parse a Dexcom Share date string into epoch seconds
+    
+    Args:
+        share_date: Share date string (e.g., "Date(1697040000000)" or "/Date(1697040000000-0400)/")
+        
+    Returns:
+        int: Epoch seconds (UTC) or None if unparseable
+    """
+    if not share_date:
+        return None
+    start = share_date.find("(")
+    if start < 0:
+        return None
+    end = start + 1
+    while end < len(share_date) and share_date[end].isdigit():
+        end += 1
+    if end == start + 1:
+        return None
+    return int(share_date[start + 1:end]) // 1000
+
+
+def parse_share_readings(content):
+    """
+    Parse a ReadPublisherLatestGlucoseValues response into reading records
+    
+    Args:
+        content: Response text (JSON list of readings with WT, Value, Trend)
+        
+    Returns:
+        list: (epoch seconds, mg/dL, trend) records, newest first
+    """
+    data = json.loads(content) if content else []
+    return [(parse_share_timestamp(r.get("WT")), r.get("Value"), r.get("Trend")) for r in data]
+
+
+def share_failure_kind(status, content):
+    """
+    Classify a failed Share response for the circuit breaker
+    
+    Args:
+        status: HTTP status code
+        content: Response text
+        
+    Returns:
+        int: breaker.FAIL_AUTH if the credentials were rejected (or the
+            account is locked), else breaker.FAIL_SERVER
+    """
+    if status in (401, 403):
+        return FAIL_AUTH
+    content = content or ""
+    for code in AUTH_ERRORS:
+        if code in content:
+            return FAIL_AUTH
+    return FAIL_SERVER
+
+
+def share_session_expired(status, content):
+    """True if a failed read means the session needs logging in again"""
+    if status in (401, 403):
+        return True
+    content = content or ""
+    for code in SESSION_ERRORS:
+        if code in content:
+            return True
+    return False
+
+class DexcomClient(GlucoseSource):
     """Client for Dexcom Share API"""
     
-    def __init__(self, username, password, is_us=True):
+    def __init__(self, username, password, is_us=True, base_url=None):
         """
         Initialize Dexcom client
         
@@ -21,54 +107,118 @@ class DexcomClient:
             username: Dexcom Share username
             password: Dexcom Share password
             is_us: True for US servers, False for international
+            base_url: Override Share server URL (e.g., a local fake server)
         """
+        super().__init__()
         self.username = username
         self.password = password
-        self.base_url = "https://share2.dexcom.com" if is_us else "https://shareous1.dexcom.com"
+        if base_url:
+            self.base_url = base_url
+        else:
+            self.base_url = "https://share2.dexcom.com" if is_us else "https://shareous1.dexcom.com"
         self.account_id = None
         self.session_id = None
-        self.glucose_value = None
-        self.glucose_trend = None
     
-    def authenticate(self):
-        """
-        Step 1: Authenticate to get Account ID
-        Returns: Account ID or None
-        """
+    # --- Request building and response handling ---
+    
+    def _auth_request(self):
+        """Build (url, payload) for AuthenticatePublisherAccount"""
         url = f"{self.base_url}/ShareWebServices/Services/General/AuthenticatePublisherAccount"
-        headers = {"Content-Type": "application/json"}
         payload = {
             "applicationId": DEXCOM_APP_ID,
             "accountName": self.username,
             "password": self.password
         }
+        return url, payload
+    
+    def _handle_auth(self, status, content):
+        """Parse the account ID from an authentication response"""
+        if status == 200:
+            self.account_id = json.loads(content) if content else None
+            self.account_id = self.account_id.strip('"') if isinstance(self.account_id, str) else self.account_id
+            print(f"Authentication successful. Account ID: {self.account_id[:8]}...")
+            self.breaker.success(ENDPOINT_AUTH)
+            return self.account_id
+        else:
+            print(f"Authentication failed: {status} - {content}")
+            self.breaker.failure(ENDPOINT_AUTH, share_failure_kind(status, content))
+            return None
+    
+    def _login_request(self):
+        """Build (url, payload) for LoginPublisherAccountById"""
+        url = f"{self.base_url}/ShareWebServices/Services/General/LoginPublisherAccountById"
+        payload = {
+            "applicationId": DEXCOM_APP_ID,
+            "accountId": self.account_id,
+            "password": self.password
+        }
+        return url, payload
+    
+    def _handle_login(self, status, content):
+        """Parse the session ID from a login response"""
+        if status == 200:
+            self.session_id = json.loads(content) if content else None
+            self.session_id = self.session_id.strip('\"') if isinstance(self.session_id, str) else self.session_id
+            print(f"Login successful. Session ID: {self.session_id[:8]}...")
+            self.breaker.success(ENDPOINT_LOGIN)
+            return self.session_id
+        else:
+            print(f"Login failed: {status} - {content}")
+            self.breaker.failure(ENDPOINT_LOGIN, share_failure_kind(status, content))
+            return None
+    
+    def _fetch_url(self):
+        """Build the ReadPublisherLatestGlucoseValues URL (see _fetch_window)"""
+        minutes, max_count = self._fetch_window()
+        return f"{self.base_url}/ShareWebServices/Services/Publisher/ReadPublisherLatestGlucoseValues?sessionId={self.session_id}&minutes={minutes}&maxCount={max_count}"
+    
+    def _handle_fetch(self, status, content):
+        """
+        Apply readings from a fetch response, recording it on the breaker
+        
+        Returns:
+            bool: True if there was a reading, or None if the session
+                expired (log in again and retry)
+        """
+        if status == 200:
+            self.breaker.success(ENDPOINT_READ)
+            return self._apply_readings(parse_share_readings(content))
+        print(f"Fetch failed: {status}")
+        if share_session_expired(status, content):
+            self.session_id = None
+            return None
+        self.breaker.failure(ENDPOINT_READ)
+        return False
+    
+    # --- Async API (non-blocking under uasyncio) ---
+    
+    async def connect_async(self):
+        """Authenticate and log in unless a session is already open"""
+        if self.session_id:
+            return True
+        return bool(await self.authenticate_async() and await self.login_async())
+    
+    async def authenticate_async(self):
+        """
+        Step 1: Authenticate to get Account ID
+        Returns: Account ID or None
+        """
+        url, payload = self._auth_request()
         
         print("Authenticating with Dexcom...")
         try:
-            response = urequests.post(url, json=payload, headers=headers)
-            status = response.status_code
-            content = response.text
-            response.close()
-            
-            if status == 200:
-                # Parse the account ID from response
-                self.account_id = json.loads(content) if content else None
-                self.account_id = self.account_id.strip('"') if isinstance(self.account_id, str) else self.account_id
-                print(f"Authentication successful. Account ID: {self.account_id[:8]}...")
-                return self.account_id
-            else:
-                print(f"Authentication failed: {status} - {content}")
-                return None
+            status, content = await ahttp.post(url, payload)
+            return self._handle_auth(status, content)
         except OSError as e:
-            # Network errors (e.g., -104 ECONNRESET)
             print(f"Network error during authentication: {e}")
-            print("This often means the connection was reset. Try again in a moment.")
+            self.breaker.failure(ENDPOINT_AUTH)
             return None
         except Exception as e:
             print(f"Authentication error: {e}")
+            self.breaker.failure(ENDPOINT_AUTH)
             return None
     
-    def login(self):
+    async def login_async(self):
         """
         Step 2: Login with Account ID to get Session ID
         Returns: Session ID or None
@@ -77,90 +227,55 @@ class DexcomClient:
             print("No account ID - cannot login")
             return None
         
-        url = f"{self.base_url}/ShareWebServices/Services/General/LoginPublisherAccountById"
-        headers = {"Content-Type": "application/json"}
-        payload = {
-            "applicationId": DEXCOM_APP_ID,
-            "accountId": self.account_id,
-            "password": self.password
-        }
+        url, payload = self._login_request()
         
         print("Logging in to Dexcom...")
         try:
-            response = urequests.post(url, json=payload, headers=headers)
-            status = response.status_code
-            content = response.text
-            response.close()
-            
-            if status == 200:
-                # Parse the session ID from response
-                self.session_id = json.loads(content) if content else None
-                self.session_id = self.session_id.strip('\"') if isinstance(self.session_id, str) else self.session_id
-                print(f"Login successful. Session ID: {self.session_id[:8]}...")
-                return self.session_id
-            else:
-                print(f"Login failed: {status} - {content}")
-                return None
+            status, content = await ahttp.post(url, payload)
+            return self._handle_login(status, content)
         except OSError as e:
-            # Network errors (e.g., -104 ECONNRESET)
             print(f"Network error during login: {e}")
-            print("This often means the connection was reset. Try again in a moment.")
+            self.breaker.failure(ENDPOINT_LOGIN)
             return None
         except Exception as e:
             print(f"Login error: {e}")
+            self.breaker.failure(ENDPOINT_LOGIN)
             return None
     
-    def fetch_glucose(self, _retry_count=0):
+    async def fetch_glucose_async(self, _retry_count=0):
         """
-        Step 3: Fetch latest glucose reading
+        Step 3: Fetch latest glucose readings
+        
+        A client without a session (boot, or a failed login earlier)
+        authenticates first. Skipped while the circuit breaker is open.
+        
         Returns: True if successful, False otherwise
         """
-        if not self.session_id:
-            print("Error: No session ID available")
+        if _retry_count == 0 and not self.breaker.allow():
+            print(f"Share backing off - next try in {self.breaker.retry_in()} s")
+            return False
+        if not await self.connect_async():
             return False
-        
-        url = f"{self.base_url}/ShareWebServices/Services/Publisher/ReadPublisherLatestGlucoseValues?sessionId={self.session_id}&minutes=10&maxCount=1"
         
         print("Fetching glucose data...")
         try:
-            response = urequests.post(url)
-            status = response.status_code
-            content = response.text
-            response.close()
+            status, content = await ahttp.post(self._fetch_url())
+            result = self._handle_fetch(status, content)
+            if result is not None:
+                return result
             
-            if status == 200:
-                data = json.loads(content) if content else []
-                
-                if data and len(data) > 0:
-                    reading = data[0]
-                    self.glucose_value = reading.get("Value")
-                    self.glucose_trend = reading.get("Trend")
-                    print(f"Glucose: {self.glucose_value} mg/dL, Trend: {self.glucose_trend}")
-                    return True
-                else:
-                    print("No recent glucose data available")
-                    return False
-            else:
-                print(f"Fetch failed: {status}")
-                
-                # Session might have expired - try re-authenticating once
-                if status in [401, 403, 500] and _retry_count == 0:
-                    print("Session expired - re-authenticating...")
-                    self.session_id = None
-                    if self.authenticate() and self.login():
-                        return self.fetch_glucose(_retry_count=1)  # Retry once with protection
-            # Network errors (e.g., -104 ECONNRESET)
+            # Session expired - log in again once
+            if _retry_count == 0:
+                print("Session expired - re-authenticating...")
+                return await self.fetch_glucose_async(_retry_count=1)
+            self.breaker.failure(ENDPOINT_READ)
+            return False
+        except OSError as e:
             print(f"Network error during fetch: {e}")
             print("Connection reset - will retry on next cycle")
+            self.breaker.failure(ENDPOINT_READ)
             return False
         except Exception as e:
             print(f"Fetch error: {e}")
+            self.breaker.failure(ENDPOINT_READ)
             return False
-    
-    def get_glucose_value(self):
-        """Get current glucose value"""
-        return self.glucose_value
-    
-    def get_glucose_trend(self):
-        """Get current glucose trend"""
-        return self.glucose_trend
@@ -5,19 +5,65 @@ Handles all graphics rendering logic for glucose display with custom fonts
 
 import time
 
+from alerts import ALERT_NONE, ALERT_URGENT_LOW, PULSE_TABLE, PULSE_STEPS
+from breaker import SOURCE_OK, SOURCE_AUTH
+from raster import framebuffer, fill_blocks, fill_rect
+
 # Import custom font system
 try:
     from font import CUSTOM_FONT, draw_char_blocks
+    from font import GLYPH_INDEX, GLYPH_ADVANCE, GLYPH_COUNT, KERNING, glyph_width
+    from font import COMPACT_FONT, COMPACT_ADVANCE, COMPACT_HEIGHT
+    from font import PACKED_FONT, PACKED_COMPACT
 except ImportError:
+    # No custom font: draw_glucose uses the built-in text font instead. The
+    # metrics stand in for one blank glyph (index 0, the width of a digit),
+    # so anything measuring or laying out digits still gets sane values.
     CUSTOM_FONT = {}
     draw_char_blocks = None
+    GLYPH_INDEX = {}
+    GLYPH_COUNT = 1
+    GLYPH_ADVANCE = bytes((6,))
+    KERNING = bytes(1)
+    COMPACT_FONT = {}
+    COMPACT_ADVANCE = 3
+    COMPACT_HEIGHT = 5
+    PACKED_FONT = {}
+    PACKED_COMPACT = {}
+
+    def glyph_width(indices, spacing=1, kerning=True):
+        """Stand-in for font.glyph_width: every glyph advances GLYPH_ADVANCE[0]"""
+        count = len(indices)
+        return count * (GLYPH_ADVANCE[0] + spacing) - spacing if count else 0
+
+# Digit glyphs indexed 0-9, index 10 = blank (lets draw_glucose skip str())
+DIGIT_BLANK = 10
+DIGIT_GLYPHS = tuple(CUSTOM_FONT.get(c, []) for c in "0123456789 ")
+DIGIT_PACKED = tuple(PACKED_FONT.get(c, b'') for c in "0123456789 ")     # For the raster kernels
+# Same digits as font.GLYPH_INDEX values, for metrics lookups
+DIGIT_GLYPH_IDS = bytes(GLYPH_INDEX.get(c, 0) for c in "0123456789 ")
+
+# Compact glyphs indexed 0-9, then sign glyphs (delta mode)
+COMPACT_PLUS = 10
+COMPACT_MINUS = 11
+COMPACT_GLYPHS = tuple(COMPACT_FONT.get(c, []) for c in "0123456789+-")
+COMPACT_PACKED = tuple(PACKED_COMPACT.get(c, b'') for c in "0123456789+-")
 
 # Display configuration
-DISPLAY_X = 6                   # X offset (pixels from left edge, for centering)
+CENTER_LAYOUT = True            # Center value + arrow each frame from glyph metrics
+DISPLAY_X = 6                   # X offset when CENTER_LAYOUT is False
 DISPLAY_Y = 0                   # Y offset (pixels from top edge)
+ARROW_GAP = 2                   # Extra pixels between last digit and arrow (after digit spacing)
 CUSTOM_FONT_CHAR_WIDTH = 6      # Width of each digit in custom font
 CUSTOM_FONT_SPACING = 0         # Additional spacing between font characters
 DISPLAY_BRIGHTNESS = 1.0        # Overall LED brightness (0.0-1.0, matches main.py setting)
+LOCAL_TREND_DIM = 0.5           # Arrow intensity when trend is estimated locally
+
+# Delta mode: arrow slot alternates with change since last reading / over 15 min
+DELTA_ALTERNATE_SECONDS = 3     # Seconds each of arrow and deltas is shown
+DELTA_LINE_GAP = 1              # Rows between the two compact lines
+DELTA_MAX = 999                 # Deltas are clamped to +/-999
+COMPACT_SPACING = 1             # Pixel gap between compact glyphs
 
 # Fallback for built-in font
 DISPLAY_SCALE = 2
@@ -29,6 +75,13 @@ COLOR_RED = (255, 0, 0)
 COLOR_YELLOW = (255, 89, 18)
 COLOR_GREEN = (92, 115, 255)
 
+# Color indices into the cached pen tables (see Display._rebuild_pens)
+COLOR_INDEX_WHITE = 0
+COLOR_INDEX_RED = 1
+COLOR_INDEX_YELLOW = 2
+COLOR_INDEX_GREEN = 3
+GLUCOSE_COLORS = (COLOR_WHITE, COLOR_RED, COLOR_YELLOW, COLOR_GREEN)
+
 # Glucose thresholds (mg/dL)
 GLUCOSE_LOW = 70
 GLUCOSE_HIGH = 180
@@ -40,15 +93,56 @@ TIMER_BAR_HEIGHT = 11           # Max height (full display height)
 TIMER_UPDATE_SECONDS = 30       # Seconds per pixel increase
 TIMER_MAX_SECONDS = 330         # Total time to fill (11 pixels * 30 seconds)
 
+# Stale mode: reading older than this is drawn dimmed white, without arrow or alert
+STALE_SECONDS = 900             # 3 missed readings (15 minutes)
+
+# Account indicator (multi-account): one dot per account in the left margin
+ACCOUNT_DOT_X = 1               # Column for indicator dots
+ACCOUNT_MAX_DOTS = 5            # Dots fit on rows 1, 3, 5, 7, 9
+
+# Source error indicator: one dot in the bottom-left corner while the data
+# source backs off (yellow) or its credentials were rejected (red)
+ERROR_DOT_X = 0
+ERROR_DOT_Y = 10
+
+# Centered layout area: left edge (after the account dots when shown) up to the timer bar
+LAYOUT_LEFT = 0
+LAYOUT_LEFT_ACCOUNTS = ACCOUNT_DOT_X + 2
+LAYOUT_RIGHT = TIMER_BAR_X
+
+# Dexcom trend string -> CUSTOM_FONT arrow key
+TREND_ARROWS = {
+    "DoubleUp": "double_up",          # ⇈ >2 mg/dL/min
+    "SingleUp": "single_up",          # ↑ 1-2 mg/dL/min
+    "FortyFiveUp": "forty_five_up",   # ↗ 0.5-1 mg/dL/min
+    "Flat": "flat",                   # → ±0.5 mg/dL/min
+    "FortyFiveDown": "forty_five_down",   # ↘ 0.5-1 mg/dL/min
+    "SingleDown": "single_down",      # ↓ 1-2 mg/dL/min
+    "DoubleDown": "double_down",      # ⇊ <-2 mg/dL/min
+    "NotComputable": "flat",          # Unknown - show flat (dexcom.py estimates locally)
+    "RateOutOfRange": "flat"          # Unknown - show flat (dexcom.py estimates locally)
+}
+
 class Display:
     """
     Display manager for glucose readings with custom pixel art fonts
     
     Renders 3-digit glucose values with color coding and custom trend arrows
     on a 53x11 LED matrix. Supports custom block-based fonts defined in font.py.
+    
+    The per-frame path (draw_glucose) is allocation-free in steady state:
+    pens are precomputed whenever brightness changes, digits go through a
+    preallocated index buffer, and timer maths is integer-only on ticks_ms.
+    This keeps MicroPython's GC from pausing the timer animation. Glyphs and
+    the timer bar are filled straight into the framebuffer by the raster
+    kernels (raster.py) when PicoGraphics exposes one.
+    
+    The frame path sticks to comparisons and while loops (no min/max,
+    iterators or dict.get), so CPython doesn't allocate either and
+    host/frame_check.py can require zero bytes per frame.
     """
     
-    def __init__(self, galactic_unicorn, picographics, digit_spacing=1):
+    def __init__(self, galactic_unicorn, picographics, digit_spacing=1, delta_mode=False):
         """
         Initialize display
         
@@ -56,15 +150,43 @@ class Display:
             galactic_unicorn: GalacticUnicorn instance
             picographics: PicoGraphics instance
             digit_spacing: Pixel gap between digits (default: 1)
+            delta_mode: Alternate the arrow with glucose deltas (default: False)
         """
         self.gu = galactic_unicorn
         self.graphics = picographics
+        self.framebuffer = framebuffer(picographics)    # None: draw through graphics.pixel
         self.digit_spacing = digit_spacing
+        self.delta_mode = delta_mode
         self.brightness = DISPLAY_BRIGHTNESS  # Current brightness level
         
-        # Timer bar state
+        # Preallocated render state
+        self.digits = bytearray(3)      # Digit indices for current value (DIGIT_BLANK = space)
+        self.digit_glyphs = bytearray(3)    # Same digits as font glyph indices
+        self.delta_glyphs = bytearray(4)    # Compact glyph indices: change since last reading
+        self.change_glyphs = bytearray(4)   # Compact glyph indices: change over 15 minutes
+        self.pens = []                  # Full-brightness pen per color index
+        self.dim_pens = []              # Locally estimated trend arrow pen per color index
+        self.timer_pens = []            # Per color index: pen per second of timer interval
+        self.pulse_pens = []            # Per color index: pen per alert animation step
+        self.black_pen = 0
+        self.placeholder_pen = 0        # "---" while there's no reading (full white)
+        self._rebuild_pens()
+        
+        # Alert animation (see set_alert)
+        self.alert_level = ALERT_NONE
+        self.alert_step = 0
+        
+        # Timer bar fallback when draw_glucose gets no reading time (digit test,
+        # font editor preview): restarts whenever the value changes
         self.last_glucose_value = None
-        self.last_update_time = time.time()
+        self.last_update_ticks = time.ticks_ms()
+        
+        # Followed accounts (see set_account)
+        self.account_index = 0
+        self.account_count = 1
+        
+        # Data source state of the account shown (see set_source_error)
+        self.source_error = SOURCE_OK
     
     def set_brightness(self, brightness):
         """
@@ -74,6 +196,115 @@ class Display:
             brightness: Brightness level (0.0-1.0)
         """
         self.brightness = max(0.0, min(1.0, brightness))
+        self._rebuild_pens()
+    
+    def _rebuild_pens(self):
+        """
+        Precompute every pen used by draw_glucose for the current brightness
+        
+        Runs only when brightness changes, so the per-frame path never
+        creates color tuples or pens.
+        """
+        create_pen = self.graphics.create_pen
+        self.pens = []
+        self.dim_pens = []
+        self.timer_pens = []
+        self.pulse_pens = []
+        self.black_pen = create_pen(0, 0, 0)
+        self.placeholder_pen = create_pen(*COLOR_WHITE)
+        for color in GLUCOSE_COLORS:
+            self.pens.append(create_pen(*(int(c * self.brightness) for c in color)))
+            self.dim_pens.append(create_pen(*(int(c * self.brightness * LOCAL_TREND_DIM) for c in color)))
+            # Growing timer pixel fades from 0% to display brightness over one interval
+            self.timer_pens.append([
+                create_pen(*(int(c * (step / TIMER_UPDATE_SECONDS * self.brightness)) for c in color))
+                for step in range(TIMER_UPDATE_SECONDS)
+            ])
+            # Alert pulse follows alerts.PULSE_TABLE (0-255 per frame)
+            self.pulse_pens.append([
+                create_pen(*(int(c * level * self.brightness) // 255 for c in color))
+                for level in PULSE_TABLE
+            ])
+    
+    def set_alert(self, level, step):
+        """
+        Set the alert animation frame used by the next draw_glucose
+        
+        Args:
+            level: alerts.ALERT_* level (ALERT_NONE draws normally)
+            step: Animation step (index into alerts.PULSE_TABLE)
+        """
+        self.alert_level = level
+        self.alert_step = step % PULSE_STEPS
+    
+    def set_account(self, index, count):
+        """
+        Select which followed account is drawn next
+        
+        Timer bars follow each reading's own timestamp, so rotating between
+        accounts doesn't need to save any timer state.
+        
+        Args:
+            index: Account index (0-based)
+            count: Number of followed accounts (indicator shown when > 1)
+        """
+        self.account_index = index
+        self.account_count = count
+    
+    def set_source_error(self, level):
+        """
+        Set the data source error indicator drawn by draw_glucose
+        
+        Args:
+            level: breaker.SOURCE_* level (SOURCE_OK draws no indicator)
+        """
+        self.source_error = level
+    
+    def draw_source_error(self):
+        """Draw the source error dot: red for rejected credentials, else yellow"""
+        if self.source_error == SOURCE_AUTH:
+            self.graphics.set_pen(self.pens[COLOR_INDEX_RED])
+        else:
+            self.graphics.set_pen(self.pens[COLOR_INDEX_YELLOW])
+        self.graphics.pixel(ERROR_DOT_X, ERROR_DOT_Y)
+    
+    def draw_account_indicator(self, color_index):
+        """
+        Draw one dot per followed account in the left margin, current one bright
+        
+        Args:
+            color_index: COLOR_INDEX_* constant matching glucose color
+        """
+        dots = self.account_count
+        if dots > ACCOUNT_MAX_DOTS:
+            dots = ACCOUNT_MAX_DOTS
+        i = 0
+        while i < dots:
+            if i == self.account_index % ACCOUNT_MAX_DOTS:
+                self.graphics.set_pen(self.pens[color_index])
+            else:
+                self.graphics.set_pen(self.dim_pens[color_index])
+            self.graphics.pixel(ACCOUNT_DOT_X, 1 + 2 * i)
+            i += 1
+    
+    def get_glucose_color_index(self, glucose_value):
+        """
+        Determine pen table color index based on glucose value
+        
+        Args:
+            glucose_value: Glucose in mg/dL (or None)
+            
+        Returns:
+            int: COLOR_INDEX_* constant (same ranges as get_glucose_color)
+        """
+        if glucose_value is None:
+            return COLOR_INDEX_WHITE
+        elif glucose_value < GLUCOSE_LOW:
+            return COLOR_INDEX_RED
+        elif glucose_value > GLUCOSE_HIGH:
+            return COLOR_INDEX_YELLOW
+        else:
+            return COLOR_INDEX_GREEN
     
     def get_glucose_color(self, glucose_value):
         """
@@ -104,22 +335,10 @@ class Display:
         Returns:
             str: Symbol key for CUSTOM_FONT (e.g., "double_up", "flat")
         """
-        if not glucose_trend:
+        if not glucose_trend or glucose_trend not in TREND_ARROWS:
             return "flat"
         
-        trend_map = {
-            "DoubleUp": "double_up",          # ⇈ >2 mg/dL/min
-            "SingleUp": "single_up",          # ↑ 1-2 mg/dL/min
-            "FortyFiveUp": "forty_five_up",   # ↗ 0.5-1 mg/dL/min
-            "Flat": "flat",                   # → ±0.5 mg/dL/min
-            "FortyFiveDown": "forty_five_down",   # ↘ 0.5-1 mg/dL/min
-            "SingleDown": "single_down",      # ↓ 1-2 mg/dL/min
-            "DoubleDown": "double_down",      # ⇊ <-2 mg/dL/min
-            "NotComputable": "flat",          # Unknown - show flat
-            "RateOutOfRange": "flat"          # Unknown - show flat
-        }
-        
-        return trend_map.get(glucose_trend, "flat")
+        return TREND_ARROWS[glucose_trend]
     
     def draw_custom_text(self, text, x, y, color):
         """
@@ -140,68 +359,203 @@ class Display:
             self.graphics.text(text, x, y, scale=DISPLAY_SCALE)
             return x + len(text) * 12
         
+        pen = self.graphics.create_pen(*color)
         current_x = x
+        previous = -1
         for char in text:
-            if char in CUSTOM_FONT:
-                pen = self.graphics.create_pen(*color)
+            index = GLYPH_INDEX.get(char, -1)
+            if index >= 0:
+                # Proportional advance, tightened by the pair's kerning
+                if previous >= 0:
+                    current_x += KERNING[previous * GLYPH_COUNT + index]
                 draw_char_blocks(self.graphics, CUSTOM_FONT[char], current_x, y, pen)
-                current_x += CUSTOM_FONT_CHAR_WIDTH + self.digit_spacing
+                current_x += GLYPH_ADVANCE[index] + self.digit_spacing
             else:
                 # Skip unknown characters but reserve space
                 current_x += CUSTOM_FONT_CHAR_WIDTH + self.digit_spacing
+            previous = index
         
         return current_x
     
-    def draw_timer_bar(self, color):
+    def set_digits(self, glucose_value):
         """
-        Draw vertical timer bar on right edge showing time since last update
+        Fill the digit index buffer with a right-aligned 3-digit value
+        
+        Examples: 120 -> [1, 2, 0], 85 -> [blank, 8, 5], 9 -> [blank, blank, 9]
+        
+        Args:
+            glucose_value: Glucose in mg/dL (clamped to 0-999)
+        """
+        value = glucose_value
+        if value < 0:
+            value = 0
+        elif value > 999:
+            value = 999
+        digits = self.digits
+        i = 2
+        while i >= 0:
+            if value or i == 2:
+                digits[i] = value % 10
+                value //= 10
+            else:
+                digits[i] = DIGIT_BLANK
+            self.digit_glyphs[i] = DIGIT_GLYPH_IDS[digits[i]]
+            i -= 1
+    
+    def draw_digits(self, x, y, pen):
+        """
+        Draw the digit index buffer using the custom font
+        
+        Digits advance by their own width but aren't kerned, so a changing
+        reading keeps each digit in its column.
+        
+        Args:
+            x: Starting X coordinate
+            y: Starting Y coordinate
+            pen: Pen created with graphics.create_pen()
+            
+        Returns:
+            int: X coordinate after last digit (for positioning next element)
+        """
+        spacing = self.digit_spacing
+        glyph_ids = self.digit_glyphs
+        fb = self.framebuffer
+        i = 0
+        while i < 3:
+            if fb is not None:
+                glyph = DIGIT_PACKED[self.digits[i]]
+                fill_blocks(fb, glyph, len(glyph), x, y, pen)
+            else:
+                draw_char_blocks(self.graphics, DIGIT_GLYPHS[self.digits[i]], x, y, pen)
+            x += GLYPH_ADVANCE[glyph_ids[i]] + spacing
+            i += 1
+        return x
+    
+    def set_signed(self, buffer, value):
+        """
+        Fill a compact glyph buffer with a signed value (e.g., "+12", "-3", "0")
+        
+        Args:
+            buffer: bytearray(4) of COMPACT_GLYPHS indices
+            value: Change in mg/dL (clamped to +/-DELTA_MAX)
+            
+        Returns:
+            int: Number of glyphs used
+        """
+        if value == 0:
+            buffer[0] = 0
+            return 1
+        
+        buffer[0] = COMPACT_MINUS if value < 0 else COMPACT_PLUS
+        magnitude = value if value > 0 else -value
+        if magnitude > DELTA_MAX:
+            magnitude = DELTA_MAX
+        count = 2 if magnitude < 10 else 3 if magnitude < 100 else 4
+        i = count - 1
+        while i > 0:
+            buffer[i] = magnitude % 10
+            magnitude //= 10
+            i -= 1
+        return count
+    
+    def compact_width(self, count):
+        """Width in pixels of `count` compact glyphs"""
+        if not count:
+            return 0
+        return count * (COMPACT_ADVANCE + COMPACT_SPACING) - COMPACT_SPACING
+    
+    def draw_compact(self, buffer, count, x, y, pen):
+        """
+        Draw a compact glyph buffer
+        
+        Args:
+            buffer: COMPACT_GLYPHS indices (see set_signed)
+            count: Number of glyphs to draw
+            x: Starting X coordinate
+            y: Starting Y coordinate
+            pen: Pen created with graphics.create_pen()
+        """
+        fb = self.framebuffer
+        i = 0
+        while i < count:
+            if fb is not None:
+                glyph = COMPACT_PACKED[buffer[i]]
+                fill_blocks(fb, glyph, len(glyph), x, y, pen)
+            else:
+                draw_char_blocks(self.graphics, COMPACT_GLYPHS[buffer[i]], x, y, pen)
+            x += COMPACT_ADVANCE + COMPACT_SPACING
+            i += 1
+    
+    def layout_x(self, width):
+        """
+        X position for content of a given width
+        
+        Centers it between the left margin (past the account dots when shown)
+        and the timer bar, or uses DISPLAY_X when CENTER_LAYOUT is off.
+        
+        Args:
+            width: Content width in pixels (see font.glyph_width)
+            
+        Returns:
+            int: Left X coordinate
+        """
+        if not CENTER_LAYOUT:
+            return DISPLAY_X
+        left = LAYOUT_LEFT_ACCOUNTS if self.account_count > 1 else LAYOUT_LEFT
+        x = left + (LAYOUT_RIGHT - left - width) // 2
+        return x if x > left else left
+    
+    def draw_timer_bar(self, color_index, elapsed):
+        """
+        Draw vertical timer bar on right edge showing the reading's age
         
         Fills rightmost 2 columns from bottom to top over 330 seconds.
         Each pixel grows progressively brighter over 30 seconds, then a new
         pixel is added above it. Creates a smooth animated loading effect.
-        Uses the same color as the glucose display.
+        Uses the same color as the glucose display, dimmed once stale.
         
         Args:
-            color: RGB tuple matching glucose color (red/yellow/green)
+            color_index: COLOR_INDEX_* constant matching glucose color
+            elapsed: Seconds since the reading was taken
         """
-        elapsed = time.time() - self.last_update_time
-        
         # Calculate number of fully-lit pixels (completed 30s intervals)
-        full_pixels = min(int(elapsed / TIMER_UPDATE_SECONDS), TIMER_BAR_HEIGHT)
+        full_pixels = elapsed // TIMER_UPDATE_SECONDS
+        if full_pixels > TIMER_BAR_HEIGHT:
+            full_pixels = TIMER_BAR_HEIGHT
         
-        # Calculate brightness of current growing pixel (0.0 to 1.0)
-        time_in_current_interval = elapsed % TIMER_UPDATE_SECONDS
-        brightness = time_in_current_interval / TIMER_UPDATE_SECONDS
+        # Seconds into the current interval select the growing pixel's pen
+        step = elapsed % TIMER_UPDATE_SECONDS
         
-        # Determine if we have a growing pixel (not at max height yet)
-        has_growing_pixel = full_pixels < TIMER_BAR_HEIGHT
+        fb = self.framebuffer
         
         # Draw fully-lit pixels from bottom up
         if full_pixels > 0:
-            # Apply display brightness to full pixels
-            full_color = tuple(int(c * self.brightness) for c in color)
-            pen = self.graphics.create_pen(*full_color)
-            self.graphics.set_pen(pen)
-            
+            if elapsed >= STALE_SECONDS:
+                pen = self.dim_pens[color_index]
+            else:
+                pen = self.pens[color_index]
             start_y = TIMER_BAR_HEIGHT - full_pixels
-            for y in range(start_y, TIMER_BAR_HEIGHT):
-                for x in range(TIMER_BAR_X, TIMER_BAR_X + TIMER_BAR_WIDTH):
-                    self.graphics.pixel(x, y)
-        
-        # Draw growing pixel with progressive brightness
-        if has_growing_pixel and brightness > 0:
-            # Scale color by brightness (0.0 to self.brightness)
-            # Fades from 0% to the configured display brightness level
-            scaled_brightness = brightness * self.brightness
-            dim_color = tuple(int(c * scaled_brightness) for c in color)
-            pen = self.graphics.create_pen(*dim_color)
-            self.graphics.set_pen(pen)
-            
+            if fb is not None:
+                fill_rect(fb, TIMER_BAR_X, start_y, TIMER_BAR_WIDTH, full_pixels, pen)
+            else:
+                self.graphics.set_pen(pen)
+                for y in range(start_y, TIMER_BAR_HEIGHT):
+                    for x in range(TIMER_BAR_X, TIMER_BAR_X + TIMER_BAR_WIDTH):
+                        self.graphics.pixel(x, y)
+        
+        # Draw growing pixel with progressive brightness (not at max height yet)
+        if full_pixels < TIMER_BAR_HEIGHT and step > 0:
+            pen = self.timer_pens[color_index][step]
             growing_y = TIMER_BAR_HEIGHT - full_pixels - 1
-            for x in range(TIMER_BAR_X, TIMER_BAR_X + TIMER_BAR_WIDTH):
-                self.graphics.pixel(x, growing_y)
+            if fb is not None:
+                fill_rect(fb, TIMER_BAR_X, growing_y, TIMER_BAR_WIDTH, 1, pen)
+            else:
+                self.graphics.set_pen(pen)
+                for x in range(TIMER_BAR_X, TIMER_BAR_X + TIMER_BAR_WIDTH):
+                    self.graphics.pixel(x, growing_y)
     
-    def draw_glucose(self, glucose_value, glucose_trend):
+    def draw_glucose(self, glucose_value, glucose_trend, trend_is_local=False,
+                     glucose_delta=None, glucose_change=None, reading_ticks=None):
         """
         Render complete glucose display: value + trend arrow + timer bar
         
@@ -209,59 +563,135 @@ class Display:
         followed by a custom pixel art trend arrow, with a timer bar on the right.
         
         Layout on 53x11 matrix:
-        - Glucose: 6px offset from left (DISPLAY_X) for centering
-        - Format: "###" (3 digits, space-padded) + 2px gap + arrow symbol
+        - Glucose + arrow centered left of the timer bar (CENTER_LAYOUT),
+          width measured from glyph metrics each frame
+        - Format: "###" (3 digits, space-padded) + ARROW_GAP + arrow symbol
         - Colors: Red (<70), Green (70-180), Yellow (>180 mg/dL)
-        - Timer bar: Rightmost 2 columns, fills bottom-to-top over 330s
+        - Timer bar: Rightmost 2 columns, fills bottom-to-top over 330s from
+          the reading's own timestamp (reading_ticks)
+        - Stale mode: a reading STALE_SECONDS old is drawn dimmed white with
+          no arrow, deltas or alert pulse, and a dimmed full timer bar
+        - Locally estimated trends are drawn dimmed (LOCAL_TREND_DIM)
+        - Multi-account: indicator dots in the left margin (ACCOUNT_DOT_X)
+        - Source errors (set_source_error): a red or yellow dot in the
+          bottom-left corner while fetching is backed off
+        - Alerts (set_alert): value and arrow pulse through the precomputed
+          pulse pens; urgent low also flashes the background every half cycle
+        - Delta mode: every DELTA_ALTERNATE_SECONDS the arrow slot shows the
+          change since the last reading over the 15-minute change (compact font);
+          the slot is sized for both so the value doesn't move
         
         Args:
             glucose_value: Glucose reading in mg/dL (or None if unavailable)
             glucose_trend: Dexcom trend string (e.g., "DoubleUp", "Flat")
+            trend_is_local: True if trend was estimated locally (default: False)
+            glucose_delta: mg/dL since previous reading (or None)
+            glucose_change: mg/dL over 15 minutes (or None)
+            reading_ticks: ticks_ms when the reading was taken (None = time from
+                the last value change, for callers without timestamps)
         """
         # Clear display with black background
         self.graphics.set_pen(0)
         self.graphics.clear()
         
-        # Check if glucose value changed (new reading received)
-        if glucose_value is not None and glucose_value != self.last_glucose_value:
-            self.last_glucose_value = glucose_value
-            self.last_update_time = time.time()  # Reset timer
+        # Age of the reading drives the timer bar and stale mode
+        now = time.ticks_ms()
+        if reading_ticks is None:
+            if glucose_value is not None and glucose_value != self.last_glucose_value:
+                self.last_glucose_value = glucose_value
+                self.last_update_ticks = now
+            reading_ticks = self.last_update_ticks
+        elapsed = time.ticks_diff(now, reading_ticks) // 1000
+        stale = glucose_value is not None and elapsed >= STALE_SECONDS
+        
+        if stale:
+            color_index = COLOR_INDEX_WHITE
+        else:
+            color_index = self.get_glucose_color_index(glucose_value)
         
         if glucose_value is not None:
-            glucose_color = self.get_glucose_color(glucose_value)
-            
-            # Apply display brightness to glucose color
-            display_color = tuple(int(c * self.brightness) for c in glucose_color)
-            
-            # Right-align glucose value in 3-digit space
-            # Examples: "120" → "120", "85" → " 85", "9" → "  9"
-            glucose_str = str(glucose_value)
-            while len(glucose_str) < 3:
-                glucose_str = ' ' + glucose_str
+            pen = self.pens[color_index]
+            if stale:
+                pen = self.dim_pens[color_index]
+            elif self.alert_level != ALERT_NONE:
+                pen = self.pulse_pens[color_index][self.alert_step]
+                # Urgent low: second half of each pulse is drawn inverted
+                if self.alert_level == ALERT_URGENT_LOW and self.alert_step >= PULSE_STEPS // 2:
+                    self.graphics.set_pen(pen)
+                    self.graphics.clear()
+                    pen = self.black_pen
             
             if CUSTOM_FONT and draw_char_blocks:
+                # Measure digits (right-aligned in 3-digit space) + arrow to center them
+                self.set_digits(glucose_value)
+                arrow_key = self.get_trend_arrow(glucose_trend)
+                arrow_index = -1
+                if not stale and arrow_key in GLYPH_INDEX:
+                    arrow_index = GLYPH_INDEX[arrow_key]
+                slot_width = GLYPH_ADVANCE[arrow_index] if arrow_index >= 0 else 0
+                
+                # Delta mode: size the slot for arrow and deltas, pick this frame's phase
+                show_deltas = False
+                if self.delta_mode and not stale and glucose_delta is not None and COMPACT_FONT:
+                    delta_count = self.set_signed(self.delta_glyphs, glucose_delta)
+                    change_count = 0
+                    if glucose_change is not None:
+                        change_count = self.set_signed(self.change_glyphs, glucose_change)
+                    delta_width = self.compact_width(delta_count)
+                    change_width = self.compact_width(change_count)
+                    deltas_width = delta_width if delta_width > change_width else change_width
+                    if deltas_width > slot_width:
+                        slot_width = deltas_width
+                    show_deltas = (time.ticks_ms() // 1000 // DELTA_ALTERNATE_SECONDS) % 2 == 1
+                
+                width = glyph_width(self.digit_glyphs, self.digit_spacing, False)
+                if slot_width:
+                    width += self.digit_spacing + ARROW_GAP + slot_width
+                
                 # Render custom font digits
-                end_x = self.draw_custom_text(glucose_str, DISPLAY_X, DISPLAY_Y, display_color)
+                end_x = self.draw_digits(self.layout_x(width), DISPLAY_Y, pen)
                 
-                # Render custom arrow symbol
-                arrow_key = self.get_trend_arrow(glucose_trend)
-                if arrow_key in CUSTOM_FONT:
-                    arrow_x = end_x + 2  # 2px gap between glucose and arrow
+                if show_deltas:
+                    # Right-align both lines in the slot
+                    slot_x = end_x + ARROW_GAP
+                    self.draw_compact(self.delta_glyphs, delta_count,
+                                      slot_x + deltas_width - delta_width, DISPLAY_Y, pen)
+                    self.draw_compact(self.change_glyphs, change_count,
+                                      slot_x + deltas_width - change_width,
+                                      DISPLAY_Y + COMPACT_HEIGHT + DELTA_LINE_GAP, pen)
+                elif arrow_index >= 0:
+                    # Render custom arrow symbol
+                    arrow_x = end_x + ARROW_GAP
                     arrow_y = DISPLAY_Y
-                    pen = self.graphics.create_pen(*display_color)
-                    draw_char_blocks(self.graphics, CUSTOM_FONT[arrow_key], arrow_x, arrow_y, pen)
+                    if trend_is_local and self.alert_level == ALERT_NONE:
+                        pen = self.dim_pens[color_index]
+                    if self.framebuffer is not None:
+                        glyph = PACKED_FONT[arrow_key]
+                        fill_blocks(self.framebuffer, glyph, len(glyph), arrow_x, arrow_y, pen)
+                    else:
+                        draw_char_blocks(self.graphics, CUSTOM_FONT[arrow_key], arrow_x, arrow_y, pen)
             else:
                 # Fallback to built-in font (if custom font fails to load)
-                self.graphics.set_pen(self.graphics.create_pen(*display_color))
+                glucose_str = str(glucose_value)
+                while len(glucose_str) < 3:
+                    glucose_str = ' ' + glucose_str
+                self.graphics.set_pen(pen)
                 self.graphics.text(glucose_str, DISPLAY_X, DISPLAY_Y, scale=DISPLAY_SCALE)
         else:
-            # No data available - show placeholder
-            self.graphics.set_pen(self.graphics.create_pen(*COLOR_WHITE))
+            # No data available - show placeholder (timer bar also uses white)
+            self.graphics.set_pen(self.placeholder_pen)
             self.graphics.text("---", 10, 0, scale=DISPLAY_SCALE)
-            glucose_color = COLOR_WHITE  # Use white for timer bar when no data
         
-        # Draw timer bar showing time since last update (matches glucose color)
-        self.draw_timer_bar(glucose_color)
+        # Show which account is on screen when following several
+        if self.account_count > 1:
+            self.draw_account_indicator(color_index)
+        
+        # Show that the data source is backing off (breaker.py)
+        if self.source_error != SOURCE_OK:
+            self.draw_source_error()
+        
+        # Draw timer bar showing the reading's age (matches glucose color)
+        self.draw_timer_bar(color_index, elapsed)
         
         # Push frame to LED matrix
         self.gu.update(self.graphics)
@@ -0,0 +1,95 @@
+"""
+Multi-account glucose following
+Fetches several accounts concurrently for one display
+
+Each account is its own GlucoseSource (own session and reading history) -
+usually a DexcomClient, or any other backend (see source.py).
+fetch_all() runs the async fetches through a small worker pool, so total
+fetch time tracks the slowest account rather than the sum of all of them,
+while FETCH_CONCURRENCY caps how many TLS sessions are open at once (each
+costs tens of KB of heap on the Pico).
+"""
+
+import uasyncio as asyncio
+
+from dexcom import DexcomClient
+
+# Configuration
+FETCH_CONCURRENCY = 2           # Max simultaneous Share requests
+
+
+class FollowerGroup:
+    """Group of GlucoseSources fetched concurrently under a concurrency limit"""
+
+    def __init__(self, clients, concurrency=FETCH_CONCURRENCY):
+        """
+        Initialize follower group
+
+        Args:
+            clients: List of GlucoseSource instances (one per account)
+            concurrency: Max simultaneous fetches (default: 2)
+        """
+        self.clients = list(clients)
+        self.concurrency = max(1, concurrency)
+
+    @classmethod
+    def from_accounts(cls, accounts, concurrency=FETCH_CONCURRENCY):
+        """
+        Build a group of Dexcom Share clients from account credentials
+
+        Args:
+            accounts: List of (username, password, is_us) tuples
+            concurrency: Max simultaneous fetches (default: 2)
+        """
+        return cls([DexcomClient(user, password, is_us) for user, password, is_us in accounts], concurrency)
+
+    def __len__(self):
+        return len(self.clients)
+
+    async def fetch_all(self):
+        """
+        Fetch every account, at most `concurrency` at a time
+
+        Returns:
+            list: True/False per client (same order as self.clients)
+        """
+        return await self._each(_fetch, "fetching")
+
+    async def authenticate_all(self):
+        """
+        Connect every account (Share: authenticate and log in) that isn't yet
+
+        Used at boot so sessions are ready before the first fetch (and can
+        overlap with NTP); fetch_all() would otherwise do it itself.
+
+        Returns:
+            list: True/False per client (same order as self.clients)
+        """
+        return await self._each(_authenticate, "authenticating")
+
+    async def _each(self, job, action):
+        """Run an async job(client) for every client through the worker pool"""
+        results = [False] * len(self.clients)
+        next_index = [0]
+
+        async def worker():
+            # Workers pull the next unprocessed account until none are left
+            while next_index[0] < len(self.clients):
+                index = next_index[0]
+                next_index[0] += 1
+                try:
+                    results[index] = await job(self.clients[index])
+                except Exception as e:
+                    print(f"Error {action} account {index}: {e}")
+
+        workers = min(self.concurrency, len(self.clients))
+        await asyncio.gather(*[worker() for _ in range(workers)])
+        return results
+
+
+async def _fetch(client):
+    return await client.fetch_glucose_async()
+
+
+async def _authenticate(client):
+    return await client.connect_async()
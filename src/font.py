@@ -15,6 +15,9 @@ Font Design:
   - forty_five_up/down: 10x10
   - flat: 10x10
 
+Glyph metrics (advance widths and a kerning table) are derived from the blocks
+at import, so they always match the glyphs - see glyph_width() / text_width().
+
 Use font_editor.py in host/ to create or modify characters.
 """
 
@@ -172,10 +175,222 @@ CUSTOM_ARROWS = {
     'double_down': [],
 }
 
+# Compact 3x5 font for secondary numbers (delta mode), same block format
+# Digits 0-9 plus '+' and '-'; every glyph advances COMPACT_ADVANCE pixels
+COMPACT_ADVANCE = 3
+COMPACT_HEIGHT = 5
+COMPACT_FONT = {
+    '0': [
+    (0, 0, 3, 1),  # Block 1
+    (0, 1, 1, 4),  # Block 2
+    (2, 1, 1, 4),  # Block 3
+    (1, 4, 1, 1),  # Block 4
+    ],
+    '1': [
+    (1, 0, 1, 5),  # Block 1
+    (0, 1, 1, 1),  # Block 2
+    (0, 4, 1, 1),  # Block 3
+    (2, 4, 1, 1),  # Block 4
+    ],
+    '2': [
+    (0, 0, 3, 1),  # Block 1
+    (2, 1, 1, 2),  # Block 2
+    (0, 2, 2, 1),  # Block 3
+    (0, 3, 1, 2),  # Block 4
+    (1, 4, 2, 1),  # Block 5
+    ],
+    '3': [
+    (0, 0, 3, 1),  # Block 1
+    (2, 1, 1, 4),  # Block 2
+    (1, 2, 1, 1),  # Block 3
+    (0, 4, 2, 1),  # Block 4
+    ],
+    '4': [
+    (0, 0, 1, 3),  # Block 1
+    (2, 0, 1, 5),  # Block 2
+    (1, 2, 1, 1),  # Block 3
+    ],
+    '5': [
+    (0, 0, 3, 1),  # Block 1
+    (0, 1, 1, 2),  # Block 2
+    (1, 2, 2, 1),  # Block 3
+    (2, 3, 1, 2),  # Block 4
+    (0, 4, 2, 1),  # Block 5
+    ],
+    '6': [
+    (0, 0, 3, 1),  # Block 1
+    (0, 1, 1, 4),  # Block 2
+    (1, 2, 2, 1),  # Block 3
+    (2, 3, 1, 2),  # Block 4
+    (1, 4, 1, 1),  # Block 5
+    ],
+    '7': [
+    (0, 0, 3, 1),  # Block 1
+    (2, 1, 1, 4),  # Block 2
+    ],
+    '8': [
+    (0, 0, 3, 1),  # Block 1
+    (0, 1, 1, 4),  # Block 2
+    (2, 1, 1, 4),  # Block 3
+    (1, 2, 1, 1),  # Block 4
+    (1, 4, 1, 1),  # Block 5
+    ],
+    '9': [
+    (0, 0, 3, 1),  # Block 1
+    (0, 1, 1, 2),  # Block 2
+    (2, 1, 1, 4),  # Block 3
+    (1, 2, 1, 1),  # Block 4
+    (0, 4, 2, 1),  # Block 5
+    ],
+    '+': [
+    (1, 1, 1, 3),  # Block 1
+    (0, 2, 1, 1),  # Block 2
+    (2, 2, 1, 1),  # Block 3
+    ],
+    '-': [
+    (0, 2, 3, 1),  # Block 1
+    ],
+}
+
+# Glyph metrics - computed once at import from the block bounds
+#
+# Glyphs are addressed by index (GLYPH_INDEX[name]) so per-frame layout can
+# look up advances and kerning without building strings or tuples.
+# - GLYPH_ADVANCE[i]: ink width of glyph i (EMPTY_GLYPH_ADVANCE if it has no blocks)
+# - KERNING[left * GLYPH_COUNT + right]: columns (<= 0) the pair can move closer
+#   while every row keeps at least the caller's spacing between ink
+
+from array import array
+
+EMPTY_GLYPH_ADVANCE = 6         # Advance for glyphs with no blocks (space = one digit)
+KERN_MAX = 2                    # Max columns a pair may be tightened
+GLYPH_ROWS = 11                 # Rows scanned for kerning profiles (matrix height)
+
+GLYPH_NAMES = tuple(CUSTOM_FONT)
+GLYPH_INDEX = {name: i for i, name in enumerate(GLYPH_NAMES)}
+GLYPH_COUNT = len(GLYPH_NAMES)
+GLYPH_ADVANCE = array('b', [0] * GLYPH_COUNT)
+KERNING = array('b', [0] * (GLYPH_COUNT * GLYPH_COUNT))
+
+
+def _row_profile(blocks):
+    """Per-row (first inked column, last inked column + 1), or None for empty rows"""
+    profile = [None] * GLYPH_ROWS
+    for x, y, w, h in blocks:
+        for row in range(y, min(y + h, GLYPH_ROWS)):
+            span = profile[row]
+            if span is None:
+                profile[row] = (x, x + w)
+            else:
+                profile[row] = (min(span[0], x), max(span[1], x + w))
+    return profile
+
+
+def build_metrics(font=CUSTOM_FONT):
+    """
+    Fill GLYPH_ADVANCE and KERNING from a font's blocks
+
+    Runs once at import; host tools call it again with edited glyphs.
+
+    Args:
+        font: Dict of glyph name -> blocks (names outside GLYPH_NAMES are ignored)
+    """
+    profiles = []
+    for i, name in enumerate(GLYPH_NAMES):
+        blocks = font.get(name, [])
+        GLYPH_ADVANCE[i] = max(x + w for x, y, w, h in blocks) if blocks else EMPTY_GLYPH_ADVANCE
+        profiles.append(_row_profile(blocks) if blocks else None)
+
+    for left in range(GLYPH_COUNT):
+        left_profile = profiles[left]
+        if left_profile is None:
+            continue
+        advance = GLYPH_ADVANCE[left]
+        for right in range(GLYPH_COUNT):
+            right_profile = profiles[right]
+            if right_profile is None:
+                continue
+            # Smallest blank gap over rows where both glyphs have ink
+            gap = KERN_MAX
+            for row in range(GLYPH_ROWS):
+                if left_profile[row] is not None and right_profile[row] is not None:
+                    gap = min(gap, advance - left_profile[row][1] + right_profile[row][0])
+            KERNING[left * GLYPH_COUNT + right] = -gap
+
+
+build_metrics()
+
+
+def glyph_width(indices, spacing=1, kerning=True):
+    """
+    Width in pixels of a glyph index sequence, without drawing
+
+    O(len) with no allocation, so layout can be decided every frame.
+
+    Args:
+        indices: Sequence of GLYPH_INDEX values (e.g., a bytearray)
+        spacing: Pixel gap between glyphs
+        kerning: Apply KERNING between adjacent glyphs (default: True)
+
+    Returns:
+        int: Width from the first glyph's origin to the last glyph's ink edge
+    """
+    width = 0
+    previous = -1
+    i = 0
+    count = len(indices)
+    while i < count:
+        index = indices[i]
+        if previous >= 0:
+            width += spacing
+            if kerning:
+                width += KERNING[previous * GLYPH_COUNT + index]
+        width += GLYPH_ADVANCE[index]
+        previous = index
+        i += 1
+    return width
+
+
+def text_width(text, spacing=1, kerning=True):
+    """
+    Width in pixels of a string of single-character glyph names
+
+    Characters not in CUSTOM_FONT are skipped (same as drawing them).
+
+    Args:
+        text: String to measure (e.g., "120")
+        spacing: Pixel gap between glyphs
+        kerning: Apply KERNING between adjacent glyphs (default: True)
+
+    Returns:
+        int: Width in pixels
+    """
+    width = 0
+    previous = -1
+    for char in text:
+        index = GLYPH_INDEX.get(char, -1)
+        if index < 0:
+            continue
+        if previous >= 0:
+            width += spacing
+            if kerning:
+                width += KERNING[previous * GLYPH_COUNT + index]
+        width += GLYPH_ADVANCE[index]
+        previous = index
+    return width
+
 # Helper functions for rendering characters
-# These support multiple input formats for flexibility
+# These support multiple input formats for flexibility. Given a framebuffer
+# (raster.framebuffer(graphics)), they draw through the raster kernels
+# instead of graphics.pixel() - see raster.py
+
+from raster import fill_blocks, fill_coords, pack_blocks, pack_coords, pack_bitmap
+
+# Packed copies of the fonts for the raster kernels (same glyph names)
+PACKED_FONT = {name: pack_blocks(blocks) for name, blocks in CUSTOM_FONT.items()}
+PACKED_COMPACT = {name: pack_blocks(blocks) for name, blocks in COMPACT_FONT.items()}
 
-def draw_char_blocks(graphics, blocks, x_offset, y_offset, color):
+def draw_char_blocks(graphics, blocks, x_offset, y_offset, color, framebuffer=None):
     """
     Draw a character from optimized block format (RECOMMENDED)
     
@@ -185,17 +400,24 @@ def draw_char_blocks(graphics, blocks, x_offset, y_offset, color):
     Args:
         graphics: PicoGraphics instance
         blocks: List of (x, y, width, height) tuples defining rectangles
+            (with a framebuffer, may be packed: e.g., PACKED_FONT[name])
         x_offset: X position to draw at (pixels from left)
         y_offset: Y position to draw at (pixels from top)
         color: Pen color (created with graphics.create_pen())
+        framebuffer: Draw with the raster kernel into this buffer (optional)
     """
+    if framebuffer is not None:
+        if isinstance(blocks, list):
+            blocks = pack_blocks(blocks)
+        fill_blocks(framebuffer, blocks, len(blocks), x_offset, y_offset, color)
+        return
     graphics.set_pen(color)
     for x, y, w, h in blocks:
         for dy in range(h):
             for dx in range(w):
                 graphics.pixel(x_offset + x + dx, y_offset + y + dy)
 
-def draw_char_bitmap(graphics, bitmap, x_offset, y_offset, color):
+def draw_char_bitmap(graphics, bitmap, x_offset, y_offset, color, framebuffer=None):
     """
     Draw a character from 2D bitmap array (ALTERNATIVE FORMAT)
     
@@ -206,10 +428,17 @@ def draw_char_bitmap(graphics, bitmap, x_offset, y_offset, color):
     Args:
         graphics: PicoGraphics instance
         bitmap: 2D array where 1 = pixel on, 0 = pixel off
+            (with a framebuffer, may be packed with pack_bitmap)
         x_offset: X position to draw at
         y_offset: Y position to draw at
         color: Pen color (created with graphics.create_pen())
+        framebuffer: Draw with the raster kernel into this buffer (optional)
     """
+    if framebuffer is not None:
+        if isinstance(bitmap, list):
+            bitmap = pack_bitmap(bitmap)
+        fill_coords(framebuffer, bitmap, len(bitmap), x_offset, y_offset, color)
+        return
     graphics.set_pen(color)
     for y, row in enumerate(bitmap):
         for x, pixel in enumerate(row):
@@ -217,17 +446,24 @@ def draw_char_bitmap(graphics, bitmap, x_offset, y_offset, color):
                 graphics.pixel(x_offset + x, y_offset + y)
 
 # Helper function to draw from coordinates
-def draw_char_coords(graphics, coords, x_offset, y_offset, color):
+def draw_char_coords(graphics, coords, x_offset, y_offset, color, framebuffer=None):
     """
     Draw a character defined by coordinate list at the given offset
     
     Args:
         graphics: PicoGraphics instance
         coords: List of (x, y) tuples
+            (with a framebuffer, may be packed with pack_coords)
         x_offset: X position to draw at
         y_offset: Y position to draw at
         color: Pen color to use
+        framebuffer: Draw with the raster kernel into this buffer (optional)
     """
+    if framebuffer is not None:
+        if isinstance(coords, list):
+            coords = pack_coords(coords)
+        fill_coords(framebuffer, coords, len(coords), x_offset, y_offset, color)
+        return
     graphics.set_pen(color)
     for x, y in coords:
         graphics.pixel(x_offset + x, y_offset + y)
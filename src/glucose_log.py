@@ -0,0 +1,291 @@
+"""
+Glucose log
+Append-only binary log of readings on flash, with a sparse time index
+
+Readings only lived in the data source, so a reboot lost everything. The log
+keeps every new reading as a fixed-size RECORD_SIZE record (seconds since
+LOG_EPOCH, value, trend index, flags) appended to segment files of
+SEGMENT_RECORDS records each, named by segment number:
+
+    <path>/000012.seg   full segments, never written again
+    <path>/000013.seg   tail segment, appended to
+    <path>/index        sparse time index
+
+Record n of the log is record n % SEGMENT_RECORDS of segment
+n // SEGMENT_RECORDS. Timestamps only ever increase (repeats and older
+readings are refused), so the log is sorted by time. Every INDEX_STRIDE-th
+record's timestamp goes into the index (also append-only, kept in RAM as
+two arrays): a range query binary-searches it and reads forward from the
+nearest entry, at most INDEX_STRIDE - 1 records before the first match.
+
+Flash wear is kept down by never rewriting a record: appends only add
+RECORD_SIZE bytes to the tail segment, and compaction retires whole
+segments - once more than MAX_SEGMENTS exist, the oldest file is deleted
+and the (small) index rewritten, once per SEGMENT_RECORDS readings.
+
+Boot recovery reads the index and the tail segment only. A record cut
+short by a power loss mid-append is dropped, and index entries the tail
+should have (or that point past its end) are fixed up from it.
+"""
+
+import os
+import struct
+from array import array
+
+from trend import TRENDS, trend_index
+
+# Configuration
+SEGMENT_RECORDS = 512           # Records per segment file (4 KB, one flash block: ~42 hours)
+MAX_SEGMENTS = 16               # Segments kept before the oldest is deleted (~28 days)
+INDEX_STRIDE = 64               # Records per index entry (divides SEGMENT_RECORDS)
+READ_RECORDS = 32               # Records read per file read in queries
+
+# Record layout: seconds since LOG_EPOCH (u32), value (u16), trend index (u8), flags (u8)
+RECORD_FORMAT = "<IHBB"
+RECORD_SIZE = 8
+INDEX_FORMAT = "<II"            # Seconds since LOG_EPOCH, record number
+INDEX_SIZE = 8
+LOG_EPOCH = 1700000000          # 2023-11-14 (relative seconds fit a small int until 2057)
+FLAG_LOCAL = 1                  # Trend was estimated locally
+
+_SEGMENT_SUFFIX = ".seg"
+
+
+def _makedirs(path):
+    """Create path and its parents (MicroPython's os has no makedirs)"""
+    built = "/" if path.startswith("/") else ""
+    for part in path.split("/"):
+        if not part:
+            continue
+        built += part
+        try:
+            os.mkdir(built)
+        except OSError:
+            pass                        # Already there
+        built += "/"
+
+
+def _read_file(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError:
+        return b""
+
+
+class GlucoseLog:
+    """Segmented append-only reading log with a sparse in-RAM time index"""
+
+    def __init__(self, path, segment_records=SEGMENT_RECORDS, max_segments=MAX_SEGMENTS,
+                 index_stride=INDEX_STRIDE):
+        """
+        Open (or create) a log and recover its state from flash
+
+        Args:
+            path: Directory holding the log (created if missing)
+            segment_records: Records per segment file (default: 512)
+            max_segments: Segments kept before compaction (default: 16)
+            index_stride: Records per index entry; must divide
+                segment_records (default: 64)
+        """
+        self.path = path
+        self.segment_records = segment_records
+        self.max_segments = max_segments
+        self.index_stride = index_stride
+        self.start = 0                  # Record number of the oldest record kept
+        self.end = 0                    # Record number the next append gets
+        self.last = None                # Newest record (seconds, value, trend index, flags)
+        self.index_times = array('I')   # Seconds since LOG_EPOCH...
+        self.index_records = array('I')  # ...of these record numbers
+        self._record = bytearray(RECORD_SIZE)
+        self._entry = bytearray(INDEX_SIZE)
+        _makedirs(path)
+        self._recover()
+
+    def __len__(self):
+        return self.end - self.start
+
+    def _segment_path(self, segment):
+        return "%s/%06d%s" % (self.path, segment, _SEGMENT_SUFFIX)
+
+    def _segments(self):
+        """Segment numbers on flash, oldest first"""
+        return sorted(int(name[:-len(_SEGMENT_SUFFIX)]) for name in os.listdir(self.path)
+                      if name.endswith(_SEGMENT_SUFFIX))
+
+    def _recover(self):
+        """Find the tail segment, drop a torn record and bring the index up to date"""
+        segments = self._segments()
+        data = b""
+        while segments:
+            tail = segments[-1]
+            data = _read_file(self._segment_path(tail))
+            whole = len(data) // RECORD_SIZE
+            if len(data) != whole * RECORD_SIZE:
+                # Power lost mid-append: keep the whole records only
+                data = data[:whole * RECORD_SIZE]
+                with open(self._segment_path(tail), "wb") as f:
+                    f.write(data)
+            if whole:
+                break
+            os.remove(self._segment_path(tail))         # Nothing in it
+            segments.pop()
+
+        if segments:
+            self.start = segments[0] * self.segment_records
+            tail_start = segments[-1] * self.segment_records
+            self.end = tail_start + len(data) // RECORD_SIZE
+            self.last = struct.unpack_from(RECORD_FORMAT, data, len(data) - RECORD_SIZE)
+        else:
+            tail_start = 0
+
+        # Entries for the full segments come from the index file...
+        saved = _read_file(self.path + "/index")
+        entries = len(saved) // INDEX_SIZE
+        kept = in_tail = 0
+        for offset in range(0, entries * INDEX_SIZE, INDEX_SIZE):
+            seconds, record = struct.unpack_from(INDEX_FORMAT, saved, offset)
+            if self.start <= record < tail_start:
+                self.index_times.append(seconds)
+                self.index_records.append(record)
+                kept += 1
+            elif tail_start <= record < self.end:
+                in_tail += 1
+        # ...and the tail's straight from its records
+        for k in range(0, self.end - tail_start, self.index_stride):
+            self.index_times.append(struct.unpack_from(RECORD_FORMAT, data, k * RECORD_SIZE)[0])
+            self.index_records.append(tail_start + k)
+        # Rewrite if entries were compacted away, lost with the tail, or never written
+        if kept + in_tail != entries or len(self.index_records) != entries or len(saved) % INDEX_SIZE:
+            self._write_index()
+
+    def _write_index(self):
+        """Rewrite the index file from RAM (after compaction or recovery)"""
+        data = bytearray(INDEX_SIZE * len(self.index_records))
+        for n in range(len(self.index_records)):
+            struct.pack_into(INDEX_FORMAT, data, n * INDEX_SIZE, self.index_times[n], self.index_records[n])
+        with open(self.path + "/index.tmp", "wb") as f:
+            f.write(data)
+        os.rename(self.path + "/index.tmp", self.path + "/index")
+
+    def append(self, timestamp, value, trend=None, local=False):
+        """
+        Append a reading
+
+        Args:
+            timestamp: Reading time in epoch seconds
+            value: Glucose in mg/dL
+            trend: Dexcom trend string (default: None)
+            local: Trend was estimated locally (default: False)
+
+        Returns:
+            bool: True if written, False for a repeat, an older reading or
+                no value
+        """
+        if value is None or timestamp is None:
+            return False
+        seconds = timestamp - LOG_EPOCH
+        if seconds < 0 or (self.last is not None and seconds <= self.last[0]):
+            return False
+        flags = FLAG_LOCAL if local else 0
+        trend = trend_index(trend)
+        struct.pack_into(RECORD_FORMAT, self._record, 0, seconds, value, trend, flags)
+        with open(self._segment_path(self.end // self.segment_records), "ab") as f:
+            f.write(self._record)
+
+        if self.end % self.index_stride == 0:
+            struct.pack_into(INDEX_FORMAT, self._entry, 0, seconds, self.end)
+            with open(self.path + "/index", "ab") as f:
+                f.write(self._entry)
+            self.index_times.append(seconds)
+            self.index_records.append(self.end)
+        self.end += 1
+        self.last = (seconds, value, trend, flags)
+
+        if self.end % self.segment_records == 1 and self.end > 1:
+            self.compact()
+        return True
+
+    def compact(self):
+        """Delete the oldest segments beyond max_segments"""
+        first = self.start // self.segment_records
+        tail = (self.end - 1) // self.segment_records if self.end else first
+        if tail - first + 1 <= self.max_segments:
+            return
+        keep = tail - self.max_segments + 1
+        for segment in range(first, keep):
+            try:
+                os.remove(self._segment_path(segment))
+            except OSError:
+                pass
+        self.start = keep * self.segment_records
+        drop = 0
+        while drop < len(self.index_records) and self.index_records[drop] < self.start:
+            drop += 1
+        self.index_times = self.index_times[drop:]
+        self.index_records = self.index_records[drop:]
+        self._write_index()
+
+    def latest(self):
+        """
+        Newest reading in the log
+
+        Returns:
+            tuple: (epoch seconds, value, trend, local) or None if empty
+        """
+        if self.last is None:
+            return None
+        seconds, value, trend, flags = self.last
+        return (seconds + LOG_EPOCH, value, TRENDS[trend], bool(flags & FLAG_LOCAL))
+
+    def _seek(self, seconds):
+        """Record number to start reading from for readings at or after `seconds`"""
+        lo = 0
+        hi = len(self.index_times)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.index_times[mid] <= seconds:
+                lo = mid + 1
+            else:
+                hi = mid
+        return self.index_records[lo - 1] if lo else self.start
+
+    def between(self, start=None, end=None):
+        """
+        Readings from start to end, oldest first (generator)
+
+        Args:
+            start: Epoch seconds, inclusive (default: oldest kept)
+            end: Epoch seconds, inclusive (default: newest)
+
+        Yields:
+            tuple: (epoch seconds, value, trend, local)
+        """
+        low = 0 if start is None else start - LOG_EPOCH
+        high = None if end is None else end - LOG_EPOCH
+        if self.last is None or (high is not None and high < low):
+            return
+        record = self._seek(low)
+        buf = bytearray(READ_RECORDS * RECORD_SIZE)
+        while record < self.end:
+            segment = record // self.segment_records
+            try:
+                f = open(self._segment_path(segment), "rb")
+            except OSError:
+                return                                  # Compacted away meanwhile
+            try:
+                f.seek((record % self.segment_records) * RECORD_SIZE)
+                segment_end = min(self.end, (segment + 1) * self.segment_records)
+                while record < segment_end:
+                    count = f.readinto(buf) // RECORD_SIZE
+                    if not count:
+                        return
+                    for k in range(min(count, segment_end - record)):
+                        seconds, value, trend, flags = struct.unpack_from(RECORD_FORMAT, buf, k * RECORD_SIZE)
+                        if high is not None and seconds > high:
+                            return
+                        if seconds >= low:
+                            yield (seconds + LOG_EPOCH, value, TRENDS[trend], bool(flags & FLAG_LOCAL))
+                    record += count
+            finally:
+                f.close()
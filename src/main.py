@@ -5,7 +5,7 @@ Main application entry point
 
 import time
 import network
-import ntptime
+import micropython
 import uasyncio as asyncio
 from galactic import GalacticUnicorn
 from picographics import PicoGraphics, DISPLAY_GALACTIC_UNICORN
@@ -17,14 +17,40 @@ except ImportError:
     print("ERROR: secrets.mpy not found!")
     raise
 
-from dexcom import DexcomClient
-from display import Display
+from display import Display, STALE_SECONDS, GLUCOSE_LOW, GLUCOSE_HIGH
+from source import READING_INTERVAL
+from state import AppState, FIELD_READING, FIELD_BRIGHTNESS, FIELD_ALERT, FIELD_SELF_TEST
+from followers import FollowerGroup, FETCH_CONCURRENCY
+from alerts import AlertEngine, ALERT_NONE, ALERT_FRAME_MS
+from power import PowerScheduler, PROFILE_CHECK_SECONDS, PROFILE_NAMES
+from wifi import WifiSupervisor
+from startup import BootTimeline, BootGraph
+from ntp import NtpClient
+from renderer import Renderer
+from buttons import ButtonReader, EVENT_PRESS, EVENT_LONG_PRESS, EVENT_REPEAT
+from glucose_log import GlucoseLog
+from relay_client import RelayClient
+from nightscout import NightscoutClient
+from replay_source import ReplaySource
+from ble_glucose import BLEGlucose
 
 # Configuration
-DEXCOM_UPDATE_INTERVAL = 30    # Seconds between glucose fetches (min: 30)
+DEXCOM_UPDATE_INTERVAL = 30    # Seconds between glucose fetches while a reading is due (min: 30)
+READING_UPLOAD_LAG = 15         # Seconds after a reading's timestamp before Share usually has it
 DISPLAY_UPDATE_INTERVAL = 1     # Deprecated: No longer used in async version (kept for reference)
 DIGIT_SPACING = 1               # Pixel gap between digits for readability
 TEST_MODE = True                # Run diagnostic test on startup (set False for production)
+DEBUG_ALLOC_GUARD = False       # Lock the heap while drawing - any allocation per frame raises
+ACCOUNT_ROTATE_SECONDS = 5      # Seconds each account is shown (multi-account only)
+DELTA_MODE = False              # Alternate the trend arrow with delta / 15-min change
+DUAL_CORE = False               # Render on core 1 (renderer.py) - LEDs keep going through network stalls and GC
+LOG_READINGS = True             # Keep readings on flash (glucose_log.py), restored after a reboot
+LOG_DIR = "/glucose"            # One log directory per account under here
+RELAY_PUSH = True               # Relay mode: long-poll the relay, new readings show the moment it has them
+PUSH_WAIT_SECONDS = 330         # Longest the relay holds a long-poll (> one reading interval)
+BLE_BROADCAST = False           # Publish readings over Bluetooth LE (ble_glucose.py) for phones and watches nearby
+BLE_NAME = "Glucose"            # Name the display advertises as
+BLE_STALE_CHECK_SECONDS = 30    # How often readings are checked for going stale (BLE only)
 
 # Brightness configuration
 BRIGHTNESS_MIN = 0.2           # Minimum brightness (20%)
@@ -32,45 +58,18 @@ BRIGHTNESS_MAX = 1.0           # Maximum brightness (100%)
 BRIGHTNESS_STEP = 0.1          # Brightness adjustment step (10%)
 BRIGHTNESS_DEFAULT = 0.5       # Default brightness (50%)
 
+# Brightness as integer percent (button events avoid float maths until a level changes)
+_BRIGHTNESS_MIN_PCT = int(BRIGHTNESS_MIN * 100 + 0.5)
+_BRIGHTNESS_MAX_PCT = int(BRIGHTNESS_MAX * 100 + 0.5)
+_BRIGHTNESS_STEP_PCT = int(BRIGHTNESS_STEP * 100 + 0.5)
+
 # Galactic Unicorn button constants (from galactic.py)
-# LUX buttons on Galactic Unicorn for brightness control
+# LUX buttons on Galactic Unicorn for brightness control (GPIO numbers, active low)
 SWITCH_BRIGHTNESS_UP = 21     # LUX + button (brightness up)
 SWITCH_BRIGHTNESS_DOWN = 26   # LUX - button (brightness down)
+BUTTON_HELD_POLL_MS = 50      # button_checker wake-up period while a button is held or settling
 
-def connect_wifi():
-    """Connect to WiFi"""
-    print(f"Connecting to WiFi: '{secrets.WIFI_SSID}'...")
-    wlan = network.WLAN(network.STA_IF)
-    wlan.active(True)
-    wlan.connect(secrets.WIFI_SSID, secrets.WIFI_PASS)
-    
-    # Wait for connection (max 30 seconds)
-    max_wait = 30
-    while max_wait > 0:
-        status = wlan.status()
-        if status < 0 or status >= 3:
-            break
-        max_wait -= 1
-        time.sleep(1)
-    
-    if wlan.status() != 3:
-        raise RuntimeError(f"WiFi connection failed (status: {wlan.status()})")
-    
-    print(f"Connected! IP: {wlan.ifconfig()[0]}")
-    return wlan
-
-
-def sync_time():
-    """Sync system time using NTP"""
-    print("Syncing time with NTP...")
-    try:
-        ntptime.settime()
-        print("Time synced successfully")
-    except Exception as e:
-        print(f"NTP sync failed: {e}")
-
-
-def run_digit_test(display):
+async def run_digit_test(display, state):
     """
     Run test mode cycling through glucose values 50-400 with all arrow types
     
@@ -78,8 +77,13 @@ def run_digit_test(display):
     glucose range to verify font rendering and arrow positioning.
     Duration: 10 seconds total, ~0.028s per value
     
+    Runs as a boot step while WiFi connects; display_updater leaves the
+    screen alone until it finishes. The test stops early once the first
+    real reading is in, so it never delays it.
+    
     Args:
         display: Display instance to render test values
+        state: Shared AppState
     """
     print("\n" + "=" * 50)
     print("RUNNING DIGIT TEST MODE")
@@ -92,7 +96,7 @@ def run_digit_test(display):
     
     # Calculate number of steps (one per value)
     num_values = end_value - start_value + 1  # 351 values
-    delay = duration / num_values  # ~0.071 seconds per value
+    delay_ms = duration * 1000 // num_values  # ~28 ms per value
     
     # Arrow trend cycle: 50 values per arrow type
     arrow_trends = [
@@ -105,15 +109,25 @@ def run_digit_test(display):
         "DoubleUp"         # 350-400
     ]
     
+    state.set_self_test(True)
     for value in range(start_value, end_value + 1):
+        if state.glucose_value is not None:
+            print("\nFirst reading in - digit test cut short")
+            break
+        
         # Calculate which arrow to show based on value
         trend_index = min((value - start_value) // 50, len(arrow_trends) - 1)
         trend = arrow_trends[trend_index]
         
         # Display current test value with appropriate trend
-        display.draw_glucose(value, trend)
+        if state.renderer is not None:
+            state.renderer.slot.post(value, trend, False, None, None, None,
+                                     int(state.brightness * 100 + 0.5), ALERT_NONE, 0, 1)
+        else:
+            display.draw_glucose(value, trend)
         print(f"Test: {value} mg/dL ({trend})", end='\r')
-        time.sleep(delay)
+        await asyncio.sleep_ms(delay_ms)
+    state.set_self_test(False)
     
     print("\n" + "=" * 50)
     print("DIGIT TEST COMPLETE")
@@ -124,9 +138,11 @@ def main():
     """
     Main application entry point
     
-    Initializes hardware, runs optional test mode, connects to WiFi,
-    authenticates with Dexcom Share API, and starts async event loop.
+    Initializes hardware, starts WiFi connecting and hands over to the async
+    event loop, whose boot pipeline runs the optional test mode, NTP and
+    Dexcom Share authentication concurrently with WiFi (see startup.py).
     """
+    boot = BootTimeline()
     print("=" * 50)
     print("Galactic Unicorn - Dexcom Glucose Monitor")
     print("=" * 50)
@@ -140,88 +156,158 @@ def main():
     gu.set_brightness(current_brightness)
     
     # Initialize display
-    display = Display(gu, graphics, digit_spacing=DIGIT_SPACING)
+    display = Display(gu, graphics, digit_spacing=DIGIT_SPACING, delta_mode=DELTA_MODE)
     display.set_brightness(current_brightness)
+    boot.mark("display")
     
-    # Initialize WiFi and Dexcom client
-    dexcom = DexcomClient(
-        secrets.DEXCOM_USER,
-        secrets.DEXCOM_PASS,
-        secrets.DEXCOM_US
-    )
-    
-    # Run digit test if enabled, while connecting to WiFi in parallel
-    if TEST_MODE:
-        print("Starting WiFi connection in parallel with self-test...")
-        wlan = network.WLAN(network.STA_IF)
-        wlan.active(True)
-        wlan.connect(secrets.WIFI_SSID, secrets.WIFI_PASS)
-        wifi_start_time = time.time()
-        
-        # Run test while WiFi connects in background
-        run_digit_test(display)
-        
-        # Check WiFi status after test
-        max_wait_remaining = 30 - (time.time() - wifi_start_time)
-        wait_count = 0
-        while max_wait_remaining > 0 and wait_count < max_wait_remaining:
-            status = wlan.status()
-            if status < 0 or status >= 3:
-                break
-            print(f"Waiting for WiFi... (status: {status})")
-            time.sleep(1)
-            wait_count += 1
-        
-        if wlan.status() == 3:
-            print(f"Connected! IP: {wlan.ifconfig()[0]}")
-        else:
-            print(f"WiFi connection failed after test (status: {wlan.status()})")
-            raise RuntimeError("WiFi connection failed")
-    else:
-        # Normal flow: connect WiFi first
-        connect_wifi()
+    # LUX buttons: edges captured by GPIO interrupts (buttons.py)
+    buttons = ButtonReader((SWITCH_BRIGHTNESS_UP, SWITCH_BRIGHTNESS_DOWN))
     
-    # Sync time
-    sync_time()
+    # Dual-core mode: core 1 owns the display from here on
+    renderer = None
+    if DUAL_CORE:
+        renderer = Renderer(gu, display)
+        renderer.start()
+        print("Rendering on core 1")
     
-    # Authenticate and fetch initial Dexcom data
-    if dexcom.authenticate() and dexcom.login():
-        dexcom.fetch_glucose()  # Initial fetch (optional)
-    else:
-        print("Warning: Dexcom authentication failed, will retry in main loop")
+    # One glucose source per followed account, from the backend set up in secrets.py
+    followers = make_followers()
+    if LOG_READINGS:
+        open_logs(followers)
+    ble = start_ble(len(followers)) if BLE_BROADCAST else None
+    
+    # Start connecting now; the WiFi supervisor task finishes the job (and
+    # keeps reconnecting) in the background
+    wlan = network.WLAN(network.STA_IF)
+    wifi = WifiSupervisor(wlan, secrets.WIFI_SSID, secrets.WIFI_PASS)
+    print(f"Connecting to WiFi: '{secrets.WIFI_SSID}'...")
+    wifi.start_connect()
     
-    # Start async event loop
+    # Start async event loop - the boot pipeline runs the digit test (if
+    # enabled) while WiFi connects, then NTP and Dexcom authentication
     print("Starting async event loop...")
     try:
-        asyncio.run(async_main(gu, display, dexcom, current_brightness))
+        asyncio.run(async_main(gu, display, followers, current_brightness, wifi,
+                               self_test=TEST_MODE, boot=boot, renderer=renderer, buttons=buttons, ble=ble))
     except KeyboardInterrupt:
         print("Interrupted by user")
 
 
-async def async_main(gu, display, dexcom, initial_brightness):
+def make_followers():
+    """
+    Build the followed accounts from secrets.py
+    
+    The first backend configured is used:
+    - RELAY_URL: a LAN relay (host/relay.py) polling Share for us
+      (RELAY_ACCOUNTS accounts)
+    - NIGHTSCOUT_URL: a Nightscout site (NIGHTSCOUT_TOKEN if it needs one)
+    - REPLAY_LOG: replay a glucose log directory (demo, no network needed)
+    - otherwise Dexcom Share (DEXCOM_ACCOUNTS, or DEXCOM_USER/PASS/US)
+    
+    Returns:
+        FollowerGroup: One GlucoseSource per account
+    """
+    relay_url = getattr(secrets, 'RELAY_URL', None)
+    nightscout_url = getattr(secrets, 'NIGHTSCOUT_URL', None)
+    replay_log = getattr(secrets, 'REPLAY_LOG', None)
+    if relay_url:
+        clients = [RelayClient(relay_url, index) for index in range(getattr(secrets, 'RELAY_ACCOUNTS', 1))]
+        print(f"Following {len(clients)} account(s) through relay {relay_url}")
+    elif nightscout_url:
+        clients = [NightscoutClient(nightscout_url, getattr(secrets, 'NIGHTSCOUT_TOKEN', None))]
+        print(f"Following Nightscout site {nightscout_url}")
+    elif replay_log:
+        clients = [ReplaySource(replay_log)]
+        print(f"Replaying glucose log {replay_log}")
+    else:
+        accounts = getattr(secrets, 'DEXCOM_ACCOUNTS', None) or [
+            (secrets.DEXCOM_USER, secrets.DEXCOM_PASS, secrets.DEXCOM_US)
+        ]
+        print(f"Following {len(accounts)} Dexcom account(s)")
+        return FollowerGroup.from_accounts(accounts, FETCH_CONCURRENCY)
+    return FollowerGroup(clients, FETCH_CONCURRENCY)
+
+
+def open_logs(followers):
+    """
+    Attach a flash reading log to every account (LOG_DIR/<account index>)
+    
+    Args:
+        followers: FollowerGroup instance
+    """
+    for index, client in enumerate(followers.clients):
+        try:
+            client.log = GlucoseLog(f"{LOG_DIR}/{index}")
+            print(f"Glucose log {index}: {len(client.log)} readings")
+        except OSError as e:
+            print(f"Glucose log {index} unavailable: {e}")
+
+
+def start_ble(accounts):
+    """
+    Start the BLE glucose service (BLE_BROADCAST)
+    
+    Args:
+        accounts: Number of followed accounts
+        
+    Returns:
+        BLEGlucose, or None if Bluetooth is unavailable
+    """
+    try:
+        ble = BLEGlucose(accounts, BLE_NAME)
+        print(f"BLE advertising as '{BLE_NAME}'")
+        return ble
+    except (OSError, ValueError) as e:
+        print(f"BLE unavailable: {e}")
+        return None
+
+
+async def async_main(gu, display, dexcom, initial_brightness, wifi=None, self_test=False, boot=None,
+                     renderer=None, buttons=None, ble=None):
     """
     Async main loop - coordinates all tasks
     
     Args:
         gu: GalacticUnicorn instance
         display: Display instance
-        dexcom: DexcomClient instance
+        dexcom: FollowerGroup, or a single GlucoseSource
         initial_brightness: Initial brightness value
+        wifi: WifiSupervisor (None = network assumed up, e.g. on the host)
+        self_test: Run the digit test while booting (default: False)
+        boot: BootTimeline to record boot steps in (default: new, from now)
+        renderer: Running renderer.Renderer (dual-core mode) - frames are
+            posted to it instead of drawn here (default: None)
+        buttons: ButtonReader for the LUX buttons (default: new, on
+            SWITCH_BRIGHTNESS_UP/DOWN)
+        ble: BLEGlucose to publish readings on (default: None)
     """
-    # Shared state - initialize with current or None values
-    state = {
-        'brightness': initial_brightness,
-        'needs_update': True,  # Flag to trigger display updates
-        'glucose_value': dexcom.get_glucose_value() or None,
-        'glucose_trend': dexcom.get_glucose_trend() or None,
-    }
+    followers = dexcom if isinstance(dexcom, FollowerGroup) else FollowerGroup([dexcom])
+    
+    # Shared state - fields versioned per change (see state.py)
+    state = AppState(len(followers), initial_brightness)
+    state.alerts = [AlertEngine() for _ in range(len(followers))]  # Low alert state per account
+    state.power = PowerScheduler()     # Day/night profile and duty cycle estimate
+    state.wifi = wifi                   # Fetches wait on wifi.connected
+    state.ntp = NtpClient() if wifi is not None else None  # Keeps ntp.clock in step
+    state.renderer = renderer           # Core 1 renderer (dual-core mode), else None
+    state.ble = ble                     # BLE glucose service, else None
+    state.buttons = buttons or ButtonReader((SWITCH_BRIGHTNESS_UP, SWITCH_BRIGHTNESS_DOWN))
+    state.boot = boot or BootTimeline(time.ticks_ms())  # Cleared once the first reading is shown
+    for index, client in enumerate(followers.clients):
+        update_account(state, index, client)
     
     # Create tasks
     tasks = [
         asyncio.create_task(button_checker(gu, display, state)),
-        asyncio.create_task(glucose_fetcher(dexcom, state)),
-        asyncio.create_task(display_updater(display, state)),
+        asyncio.create_task(boot_pipeline(followers, display, state, self_test)),
+        asyncio.create_task(frame_poster(renderer, state) if renderer else display_updater(display, state)),
+        asyncio.create_task(power_manager(gu, display, state)),
     ]
+    if ble is not None:
+        tasks.append(asyncio.create_task(ble_publisher(followers, state)))
+    if wifi is not None:
+        tasks.append(asyncio.create_task(wifi.run()))
+        tasks.append(asyncio.create_task(state.ntp.run(wifi)))
     
     # Run all tasks concurrently with error handling
     try:
@@ -232,69 +318,352 @@ async def async_main(gu, display, dexcom, initial_brightness):
         raise
 
 
+def update_account(state, index, client):
+    """
+    Store an account's latest reading, flagging a redraw if it is on screen
+    
+    A reading older than STALE_SECONDS no longer drives alerts; the display
+    switches to stale mode on its own from the reading time. The source's
+    circuit breaker state goes with the reading, for the error indicator.
+    
+    Args:
+        state: Shared AppState
+        index: Account index
+        client: GlucoseSource for that account
+    """
+    reading = (client.get_glucose_value() or None, client.get_glucose_trend() or None,
+               client.is_trend_local(), client.get_glucose_delta(), client.get_glucose_change(),
+               client.get_glucose_ticks(), client.breaker.error_level())
+    
+    age = client.get_glucose_age()
+    value = None if age is not None and age >= STALE_SECONDS else reading[0]
+    state.alerts[index].update(value, client.get_glucose_rate())
+    
+    # Only put it on screen if it actually changed
+    if state.store_account(index, reading) and index == state.account_index:
+        state.show_account(index)
+    if state.ble is not None:
+        publish_ble(state.ble, index, client, age)
+
+
+def publish_ble(ble, index, client, age):
+    """Publish an account's reading over BLE (notifies only if it changed)"""
+    ble.update(index, client.glucose_time, client.get_glucose_value(), client.get_glucose_trend(),
+               age is not None and age >= STALE_SECONDS, client.is_trend_local())
+
+
 async def button_checker(gu, display, state):
     """
-    Async task to check buttons frequently
+    Async task handling LUX button events
+    
+    Presses are captured by GPIO interrupts into state.buttons (see
+    buttons.py), so none are lost while another task blocks. This task
+    sleeps until an edge comes in, and only wakes on a timer while a button
+    is held (for long press and repeat) or still bouncing.
+    
+    A press steps the brightness one level; holding a button keeps stepping
+    it every buttons.REPEAT_MS once held for buttons.LONG_PRESS_MS. While a
+    low alert is showing, a press snoozes it instead, and holding on doesn't
+    then change brightness.
+    
+    Allocation-free while decoding: brightness is tracked as an integer
+    percent and only converted to a float (and logged) when it changes.
     
     Args:
         gu: GalacticUnicorn instance
         display: Display instance
-        state: Shared state dictionary
+        state: Shared AppState
     """
-    lux_up_was_pressed = False
-    lux_down_was_pressed = False
+    buttons = state.buttons
+    power = state.power
+    level = int(state.brightness * 100 + 0.5)
+    seen = state.versions[FIELD_BRIGHTNESS]     # Brightness version `level` was taken from
+    snoozed = False             # The press being held was used to snooze
     
-    while True:
-        # Check for brightness button presses (edge detection)
-        lux_up_pressed = gu.is_pressed(SWITCH_BRIGHTNESS_UP)
-        lux_down_pressed = gu.is_pressed(SWITCH_BRIGHTNESS_DOWN)
+    def on_event(button, event):
+        nonlocal level, seen, snoozed
+        if event == EVENT_PRESS:
+            snoozed = snooze_alert(state)
+            if snoozed:
+                return
+        elif snoozed or (event != EVENT_LONG_PRESS and event != EVENT_REPEAT):
+            return
+        
+        # Brightness may have been changed by the power profile
+        if state.changed(FIELD_BRIGHTNESS, seen):
+            seen = state.versions[FIELD_BRIGHTNESS]
+            level = int(state.brightness * 100 + 0.5)
         
-        # LUX Up - increase brightness on press (not hold)
-        if lux_up_pressed and not lux_up_was_pressed:
-            state['brightness'] = min(state['brightness'] + BRIGHTNESS_STEP, BRIGHTNESS_MAX)
-            gu.set_brightness(state['brightness'])
-            display.set_brightness(state['brightness'])
-            state['needs_update'] = True
-            print(f"Brightness: {state['brightness']:.1f}")
-        lux_up_was_pressed = lux_up_pressed
+        # Button 0 is LUX + (brightness up), button 1 LUX - (brightness down)
+        if button == 0:
+            new_level = min(level + _BRIGHTNESS_STEP_PCT, _BRIGHTNESS_MAX_PCT)
+        else:
+            new_level = max(level - _BRIGHTNESS_STEP_PCT, _BRIGHTNESS_MIN_PCT)
+        # Repeats stop quietly at the end of the range
+        if new_level != level or event == EVENT_PRESS:
+            level = new_level
+            set_brightness(gu, display, state, level)
+            seen = state.versions[FIELD_BRIGHTNESS]
+    
+    while True:
+        start_us = time.ticks_us()
+        wait = buttons.poll(time.ticks_ms(), on_event)
+        power.busy(start_us)
         
-        # LUX Down - decrease brightness on press (not hold)
-        if lux_down_pressed and not lux_down_was_pressed:
-            state['brightness'] = max(state['brightness'] - BRIGHTNESS_STEP, BRIGHTNESS_MIN)
-            gu.set_brightness(state['brightness'])
-            display.set_brightness(state['brightness'])
-            state['needs_update'] = True
-            print(f"Brightness: {state['brightness']:.1f}")
-        lux_down_was_pressed = lux_down_pressed
+        if wait < 0:
+            await buttons.flag.wait()
+        else:
+            await asyncio.sleep_ms(min(wait, BUTTON_HELD_POLL_MS))
+
+
+def snooze_alert(state):
+    """
+    Snooze the alert of the account on screen, if one is showing
+    
+    Args:
+        state: Shared AppState
         
-        # Check buttons every 50ms for responsiveness
-        await asyncio.sleep(0.05)
+    Returns:
+        bool: True if a button press was used to snooze
+    """
+    if not state.alerts[state.account_index].snooze():
+        return False
+    state.touch(FIELD_ALERT)
+    print("Alert snoozed")
+    return True
+
+
+def set_brightness(gu, display, state, level):
+    """
+    Apply a brightness level to hardware, display and shared state
+    
+    Args:
+        gu: GalacticUnicorn instance
+        display: Display instance
+        state: Shared AppState
+        level: Brightness in integer percent (20-100)
+    """
+    state.set_brightness(level / 100)
+    # In dual-core mode the renderer applies it from the next snapshot
+    if state.renderer is None:
+        gu.set_brightness(state.brightness)
+        display.set_brightness(state.brightness)
+    print("Brightness:", level, "%")
+
+
+async def boot_pipeline(followers, display, state, self_test):
+    """
+    Async task to bring the device up, then keep fetching glucose
+    
+    Boot steps run concurrently as far as their dependencies allow (see
+    startup.py): the digit test runs while WiFi connects, NTP and Dexcom
+    authentication run together once it is up, the last logged readings
+    are restored as soon as the clock is set, and the first fetch goes out
+    once all of these are done. After that it becomes glucose_fetcher (or
+    push_receiver, reading through a relay with RELAY_PUSH).
+    
+    Args:
+        followers: FollowerGroup instance
+        display: Display instance
+        state: Shared AppState
+        self_test: Run the digit test
+    """
+    wifi = state.wifi
+    graph = BootGraph(state.boot)
+    if self_test:
+        graph.add("self-test", lambda: run_digit_test(display, state))
+    if wifi is not None:
+        graph.add("wifi", wifi.connected.wait)
+        graph.add("ntp", state.ntp.sync, after=("wifi",))
+    graph.add("auth", followers.authenticate_all, after=("wifi",))
+    graph.add("history", lambda: restore_history(followers, state), after=("ntp",))
+    graph.add("first fetch", lambda: fetch_round(followers, state), after=("ntp", "auth", "history"))
+    await graph.run()
+    
+    if RELAY_PUSH and all(isinstance(client, RelayClient) for client in followers.clients):
+        await push_receiver(followers, state)
+    else:
+        await asyncio.sleep(poll_delay(followers, state))
+        await glucose_fetcher(followers, state)
+
+
+async def restore_history(followers, state):
+    """
+    Show each account's last logged reading until the first fetch
+    
+    Runs once the clock is set (the reading's age comes from it). Accounts
+    without a log, or already holding a reading, are left alone.
+    
+    Args:
+        followers: FollowerGroup instance
+        state: Shared AppState
+    """
+    for index, client in enumerate(followers.clients):
+        if client.restore_from_log():
+            update_account(state, index, client)
 
 
-async def glucose_fetcher(dexcom, state):
+async def glucose_fetcher(followers, state):
     """
     Async task to fetch glucose data periodically
     
+    All accounts are fetched concurrently with non-blocking requests, so
+    buttons and the display keep running while Share responds.
+    
     Args:
-        dexcom: DexcomClient instance
-        state: Shared state dictionary
+        followers: FollowerGroup instance
+        state: Shared AppState
     """
     while True:
-        try:
-            if dexcom.fetch_glucose():
-                new_value = dexcom.get_glucose_value()
-                new_trend = dexcom.get_glucose_trend()
-                
-                # Only trigger update if values actually changed
-                if new_value != state['glucose_value'] or new_trend != state['glucose_trend']:
-                    state['glucose_value'] = new_value
-                    state['glucose_trend'] = new_trend
-                    state['needs_update'] = True
-        except Exception as e:
-            print(f"Error fetching glucose: {e}")
+        await fetch_round(followers, state)
+        await asyncio.sleep(poll_delay(followers, state))
+
+
+async def push_receiver(followers, state):
+    """
+    Async task taking glucose_fetcher's place in relay mode (RELAY_PUSH)
+    
+    Each account keeps a long-poll open at the relay: the relay answers the
+    moment it caches a newer reading (or with 304 after PUSH_WAIT_SECONDS)
+    and the next long-poll goes straight out. A new reading is on screen as
+    soon as the relay has it, at about one request per reading, instead of
+    polling every DEXCOM_UPDATE_INTERVAL while a reading is due.
+    
+    If the channel drops - the relay is unreachable, or answers without
+    holding the request (no long-poll support) - that account falls back
+    to interval polling on the usual schedule. Each poll is a long-poll
+    attempt too, so push resumes as soon as the relay holds requests again.
+    
+    Args:
+        followers: FollowerGroup of RelayClients
+        state: Shared AppState
+    """
+    await asyncio.gather(*[push_account(client, index, state) for index, client in enumerate(followers.clients)])
+
+
+async def push_account(client, index, state):
+    """Long-poll one relay account for push_receiver, polling while the channel is down"""
+    wifi = state.wifi
+    while True:
+        if wifi is not None and not wifi.connected.is_set():
+            await wifi.connected.wait()
+        
+        start = time.ticks_ms()
+        newest = client.glucose_time
+        ok = await client.fetch_glucose_async(wait=PUSH_WAIT_SECONDS)
+        update_account(state, index, client)
+        held_ms = time.ticks_diff(time.ticks_ms(), start)
         
-        # Fetch every 30 seconds
-        await asyncio.sleep(DEXCOM_UPDATE_INTERVAL)
+        # Pushed a newer reading, or held open until the wait ran out: listen again
+        pushed = client.last_status == 200 and client.glucose_time != newest
+        if ok and (pushed or held_ms >= PUSH_WAIT_SECONDS * 500):
+            continue
+        retry = state.power.poll_interval(accounts_in_range(state), DEXCOM_UPDATE_INTERVAL)
+        await asyncio.sleep(next_poll_delay((client,), retry))
+
+
+async def fetch_round(followers, state):
+    """
+    Fetch every account once and store the results
+    
+    Every account is re-stored after each round, even if its fetch failed,
+    so a reading that stops updating still ages into stale.
+    
+    Fetching pauses while the WiFi supervisor reports the link down, and
+    resumes as soon as it reconnects.
+    
+    Args:
+        followers: FollowerGroup instance
+        state: Shared AppState
+    """
+    wifi = state.wifi
+    if wifi is not None and not wifi.connected.is_set():
+        print("Fetching paused until WiFi reconnects")
+        await wifi.connected.wait()
+    
+    try:
+        await followers.fetch_all()
+    except Exception as e:
+        print(f"Error fetching glucose: {e}")
+    for index, client in enumerate(followers.clients):
+        update_account(state, index, client)
+
+
+def poll_delay(followers, state):
+    """Seconds until the next fetch round (power profile sets the retry interval)"""
+    retry = state.power.poll_interval(accounts_in_range(state), DEXCOM_UPDATE_INTERVAL)
+    return next_poll_delay(followers.clients, retry)
+
+
+def accounts_in_range(state):
+    """True if every followed account has a reading in range with no alert"""
+    for index, reading in enumerate(state.accounts):
+        value = reading[0]
+        if value is None or value < GLUCOSE_LOW or value > GLUCOSE_HIGH:
+            return False
+        if state.alerts[index].level() != ALERT_NONE:
+            return False
+    return True
+
+
+def next_poll_delay(clients, retry=DEXCOM_UPDATE_INTERVAL):
+    """
+    Seconds until the next fetch, from the reading timestamps
+    
+    Readings come every READING_INTERVAL, so there's no point asking Share
+    again until the next one is due for some account. Once a reading is
+    due (or no timestamp is known yet) fetches repeat every `retry`
+    seconds until it arrives. An account whose circuit breaker is open
+    isn't due before its probe (breaker.py), so an outage doesn't wake the
+    fetcher every `retry` just to skip the fetch.
+    
+    Args:
+        clients: GlucoseSource instances
+        retry: Seconds between fetches while a reading is due
+            (default: DEXCOM_UPDATE_INTERVAL; longer in range, see power.py)
+        
+    Returns:
+        int: Seconds to sleep (at least retry)
+    """
+    delay = None
+    for client in clients:
+        age = client.get_glucose_age()
+        due = 0 if age is None else READING_INTERVAL + READING_UPLOAD_LAG - age
+        due = max(due, client.breaker.retry_in())
+        if delay is None or due < delay:
+            delay = due
+    return max(delay, retry)
+
+
+async def ble_publisher(followers, state):
+    """
+    Async task re-publishing readings over BLE as they age
+    
+    New readings are published by update_account as they arrive; this
+    catches a reading going stale between fetches (e.g. while WiFi is down),
+    so centrals get the stale flag within BLE_STALE_CHECK_SECONDS.
+    
+    Args:
+        followers: FollowerGroup instance
+        state: Shared AppState
+    """
+    ble = state.ble
+    while True:
+        await asyncio.sleep(BLE_STALE_CHECK_SECONDS)
+        for index, client in enumerate(followers.clients):
+            publish_ble(ble, index, client, client.get_glucose_age())
+
+
+def screen_changed(state, seen):
+    """
+    True if anything drawn changed after state version `seen`
+    
+    Spelled out rather than looping over a tuple of fields, so the display
+    loops stay allocation-free.
+    """
+    versions = state.versions
+    return (versions[FIELD_READING] > seen or versions[FIELD_BRIGHTNESS] > seen
+            or versions[FIELD_ALERT] > seen or versions[FIELD_SELF_TEST] > seen)
 
 
 async def display_updater(display, state):
@@ -302,34 +671,221 @@ async def display_updater(display, state):
     Async task to update display only when needed
     
     Updates when:
-    - needs_update flag is set (glucose/brightness change)
+    - Something on screen changed since the last frame (state versions)
     - Timer bar needs animation update (every 1 second)
+    - Next account is due (every ACCOUNT_ROTATE_SECONDS, multi-account only)
+    - A low alert is showing (every ALERT_FRAME_MS, pulse step from ticks_ms)
+    
+    Alert frames are scheduled against a deadline rather than a fixed sleep,
+    so the pulse keeps its rate while fetches run in other tasks. Otherwise
+    the loop wakes every power.redraw_ms (once a second at night). Nothing
+    is drawn while the boot digit test runs; the first frame showing a
+    real reading is marked in the boot timeline.
+    
+    Steady state is allocation-free (ticks_ms timing, no float maths),
+    checked on the host by host/frame_check.py. With DEBUG_ALLOC_GUARD the
+    heap is locked while drawing, so any frame that allocates raises
+    instead of silently feeding the GC.
     
     Args:
         display: Display instance
-        state: Shared state dictionary
+        state: Shared AppState
     """
-    last_timer_update = time.time()
+    last_timer_update = time.ticks_ms()
+    last_rotate = last_timer_update
+    account_count = len(state.accounts)
+    display.set_account(state.account_index, account_count)
+    alerts = state.alerts
+    alert_start = last_timer_update
+    alerting = False
+    power = state.power
+    boot = state.boot
+    seen = 0                    # State version the last frame showed
     
     while True:
-        current_time = time.time()
+        start_us = time.ticks_us()
+        current_ticks = time.ticks_ms()
+        
+        # Rotate between followed accounts
+        if account_count > 1 and time.ticks_diff(current_ticks, last_rotate) >= ACCOUNT_ROTATE_SECONDS * 1000:
+            state.show_account((state.account_index + 1) % account_count)
+            display.set_account(state.account_index, account_count)
+            last_rotate = current_ticks
+        
+        # Alert pulse for the account on screen
+        alert_level = alerts[state.account_index].level()
+        if alert_level != ALERT_NONE:
+            if not alerting:
+                alert_start = current_ticks
+                alerting = True
+            step = time.ticks_diff(current_ticks, alert_start) // ALERT_FRAME_MS
+            display.set_alert(alert_level, step)
+        elif alerting:
+            display.set_alert(ALERT_NONE, 0)
+            alerting = False
+            seen = -1           # Redraw without the pulse
         
         # Update timer bar every 1 second for animation
-        timer_needs_update = (current_time - last_timer_update) >= 1
+        timer_needs_update = time.ticks_diff(current_ticks, last_timer_update) >= 1000
         
-        # Redraw if something changed or timer needs update
-        if state['needs_update'] or timer_needs_update:
-            display.draw_glucose(
-                state['glucose_value'],
-                state['glucose_trend']
-            )
-            state['needs_update'] = False
+        # Redraw if something changed, timer needs update or an alert is
+        # pulsing (the digit test owns the screen while it runs)
+        if not state.self_test and (screen_changed(state, seen) or timer_needs_update or alerting):
+            display.set_source_error(state.source_error)
+            if DEBUG_ALLOC_GUARD:
+                draw_frame_heap_locked(display, state)
+            else:
+                display.draw_glucose(
+                    state.glucose_value,
+                    state.glucose_trend,
+                    state.trend_is_local,
+                    state.glucose_delta,
+                    state.glucose_change,
+                    state.reading_ticks
+                )
+            seen = state.version
             
             if timer_needs_update:
-                last_timer_update = current_time
+                last_timer_update = current_ticks
+            
+            if boot is not None and state.glucose_value is not None:
+                boot.mark("first reading shown")
+                boot = state.boot = None
+        
+        power.busy(start_us)
+        
+        if alerting:
+            # Next alert frame on the ALERT_FRAME_MS grid, minus time spent drawing
+            elapsed = time.ticks_diff(time.ticks_ms(), alert_start)
+            await asyncio.sleep_ms(ALERT_FRAME_MS - elapsed % ALERT_FRAME_MS)
+        else:
+            # Check every 100ms for updates (power profile sets the period),
+            # waking no later than the next timer bar step
+            wait = 1000 - time.ticks_diff(time.ticks_ms(), last_timer_update)
+            if wait > power.redraw_ms:
+                wait = power.redraw_ms
+            await asyncio.sleep_ms(wait if wait > 1 else 1)
+
+
+async def frame_poster(renderer, state):
+    """
+    Async task feeding the core 1 renderer (dual-core mode)
+    
+    Takes display_updater's place on core 0: rotates accounts, tracks the
+    alert level of the account shown and posts a snapshot whenever
+    something on screen changes. The timer bar and alert pulse are
+    animated by the renderer itself, so this only wakes every
+    power.redraw_ms and never draws.
+    
+    Args:
+        renderer: Running renderer.Renderer
+        state: Shared AppState
+    """
+    slot = renderer.slot
+    last_rotate = time.ticks_ms()
+    account_count = len(state.accounts)
+    alerts = state.alerts
+    power = state.power
+    boot = state.boot
+    posted_alert = ALERT_NONE
+    seen = 0                    # State version the last snapshot showed
+    level = int(state.brightness * 100 + 0.5)
+    
+    while True:
+        start_us = time.ticks_us()
+        current_ticks = time.ticks_ms()
+        
+        # Rotate between followed accounts
+        if account_count > 1 and time.ticks_diff(current_ticks, last_rotate) >= ACCOUNT_ROTATE_SECONDS * 1000:
+            state.show_account((state.account_index + 1) % account_count)
+            last_rotate = current_ticks
+        
+        # Percent only recomputed on a change (float maths allocates)
+        if state.changed(FIELD_BRIGHTNESS, seen):
+            level = int(state.brightness * 100 + 0.5)
+        
+        alert_level = alerts[state.account_index].level()
+        if not state.self_test and (screen_changed(state, seen) or alert_level != posted_alert):
+            slot.post(
+                state.glucose_value,
+                state.glucose_trend,
+                state.trend_is_local,
+                state.glucose_delta,
+                state.glucose_change,
+                state.reading_ticks,
+                level,
+                alert_level,
+                state.account_index,
+                account_count,
+                state.source_error
+            )
+            posted_alert = alert_level
+            seen = state.version
+            
+            if boot is not None and state.glucose_value is not None:
+                boot.mark("first reading posted")
+                boot = state.boot = None
+        
+        power.busy(start_us)
+        await asyncio.sleep_ms(power.redraw_ms)
+
+
+async def power_manager(gu, display, state):
+    """
+    Async task to apply the day/night power profile and log CPU duty cycle
+    
+    Re-checks the schedule every PROFILE_CHECK_SECONDS. Entering night caps
+    the brightness (the day level comes back in the morning); button presses
+    still adjust brightness at night.
+    
+    Args:
+        gu: GalacticUnicorn instance
+        display: Display instance
+        state: Shared AppState
+    """
+    power = state.power
+    while True:
+        level = power.update(int(state.brightness * 100 + 0.5))
+        if level is not None:
+            print("Power profile:", PROFILE_NAMES[power.profile])
+            set_brightness(gu, display, state, level)
+        
+        report = power.duty_report()
+        if report:
+            duty_x10, wakeups, seconds = report
+            print(f"CPU duty: {duty_x10 // 10}.{duty_x10 % 10}% ({wakeups} wake-ups in {seconds}s)")
         
-        # Check every 100ms for updates
-        await asyncio.sleep(0.1)
+        await asyncio.sleep(PROFILE_CHECK_SECONDS)
+
+
+def draw_frame_heap_locked(display, state):
+    """
+    Draw one frame with the MicroPython heap locked (DEBUG_ALLOC_GUARD)
+    
+    Any heap allocation while locked raises MemoryError, which is turned
+    into an AssertionError naming the culprit frame.
+    
+    Args:
+        display: Display instance
+        state: Shared AppState
+    """
+    micropython.heap_lock()
+    try:
+        display.draw_glucose(
+            state.glucose_value,
+            state.glucose_trend,
+            state.trend_is_local,
+            state.glucose_delta,
+            state.glucose_change,
+            state.reading_ticks
+        )
+    except MemoryError:
+        micropython.heap_unlock()
+        raise AssertionError("Display frame allocated heap memory")
+    except Exception:
+        micropython.heap_unlock()
+        raise
+    micropython.heap_unlock()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,99 @@
+"""
+Nightscout client
+Reads an account from a Nightscout site's REST API instead of Dexcom Share
+
+Nightscout can filter entries by time, so every fetch after the first asks
+only for readings newer than the newest one held (source._fetch_since):
+
+    GET /api/v1/entries/sgv.json?count=<n>&find[date][$gt]=<epoch ms>[&token=<token>]
+
+Nothing new is an empty list - a few bytes - rather than the latest
+reading again. No login: sites that need one take an access token
+(Admin Tools > Subjects, with the readable role) as `token`.
+
+Failures go through the circuit breaker (breaker.py) as with Share; a
+401 means the token was refused.
+"""
+
+import json
+import ahttp
+
+from source import GlucoseSource
+from breaker import ENDPOINT_READ, FAIL_SERVER, FAIL_AUTH
+
+# Nightscout directions that differ from Share's trend strings
+_DIRECTIONS = {
+    "NOT COMPUTABLE": "NotComputable",
+    "RATE OUT OF RANGE": "RateOutOfRange",
+    "NONE": None,
+}
+
+
+def parse_nightscout_readings(content):
+    """
+    Parse an entries response into reading records
+
+    Args:
+        content: Response text (JSON list of entries with date, sgv, direction)
+
+    Returns:
+        list: (epoch seconds, mg/dL, trend) records, newest first
+    """
+    data = json.loads(content) if content else []
+    readings = []
+    for entry in data:
+        if entry.get("sgv") is None or entry.get("date") is None:
+            continue                    # Calibrations, meter readings
+        direction = entry.get("direction")
+        readings.append((int(entry["date"]) // 1000, entry["sgv"], _DIRECTIONS.get(direction, direction)))
+    return readings
+
+
+class NightscoutClient(GlucoseSource):
+    """Glucose source reading a Nightscout site"""
+
+    def __init__(self, base_url, token=None):
+        """
+        Initialize Nightscout client
+
+        Args:
+            base_url: Site URL (e.g., "https://example.herokuapp.com")
+            token: Access token for sites that need one (default: None)
+        """
+        super().__init__()
+        self.base_url = base_url.rstrip("/")
+        self.token = token
+        self.not_modified = 0           # Fetches with nothing newer
+
+    def _fetch_url(self):
+        """Build the entries URL for readings newer than the newest held"""
+        since, count = self._fetch_since()
+        url = f"{self.base_url}/api/v1/entries/sgv.json?count={count}&find%5Bdate%5D%5B%24gt%5D={since * 1000}"
+        if self.token:
+            url += f"&token={self.token}"
+        return url
+
+    def _handle_fetch(self, status, content):
+        """Apply an entries response (an empty list means nothing newer)"""
+        if status != 200:
+            print(f"Nightscout fetch failed: {status}")
+            self.breaker.failure(ENDPOINT_READ, FAIL_AUTH if status in (401, 403) else FAIL_SERVER)
+            return False
+        self.breaker.success(ENDPOINT_READ)
+        readings = parse_nightscout_readings(content)
+        if not readings and self.glucose_time is not None:
+            self.not_modified += 1
+            return True
+        return self._apply_readings(readings)
+
+    async def fetch_glucose_async(self):
+        """Fetch new readings without blocking, unless backing off. Returns: True if successful"""
+        if not self.breaker.allow():
+            return False
+        try:
+            status, content = await ahttp.get(self._fetch_url())
+            return self._handle_fetch(status, content)
+        except Exception as e:
+            print(f"Nightscout error: {e}")
+            self.breaker.failure(ENDPOINT_READ)
+            return False
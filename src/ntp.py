@@ -0,0 +1,207 @@
+"""
+NTP time sync
+Non-blocking SNTP client and a ticks_ms-based wall clock corrected by it
+
+ntptime.settime() blocks the event loop for a whole round trip (or its
+timeout) and sets the RTC once. Instead, NtpClient sends one SNTP request
+over a non-blocking UDP socket and polls for the answer, so the display
+and buttons keep running, and resyncs every NTP_RESYNC_SECONDS. The
+server's address is looked up once (getaddrinfo blocks for the DNS round
+trip) and kept; it is looked up again only after a request times out, in
+case that server has gone.
+
+Each answer is applied to `clock`, a SyncedClock: wall time is an NTP
+timestamp plus the ticks_ms elapsed since it was taken, so it never jumps
+between syncs. The error found at each resync (offset) over the time since
+the last one gives the crystal's drift, which is corrected from then on.
+
+Use ntp.clock.time() wherever epoch seconds are needed. Until the first
+sync it falls back to time.time() (the RTC, 2021 after boot on rp2).
+"""
+
+import time
+import socket
+import struct
+import uasyncio as asyncio
+
+# Configuration
+NTP_HOST = "pool.ntp.org"
+NTP_PORT = 123
+NTP_TIMEOUT_MS = 2000           # Give up on one request after this
+NTP_POLL_MS = 20                # Socket poll period while waiting for the answer
+NTP_RESYNC_SECONDS = 3600       # Resync period once synced
+NTP_RETRY_SECONDS = 60          # Retry period after a failed sync
+DRIFT_MIN_SECONDS = 600         # Shorter gaps between syncs don't update the drift estimate
+MAX_DRIFT_PPM = 500             # Drift estimate clamp (crystals are within ~50 ppm)
+REBASE_MS = 86400000            # Move the clock's base forward daily (keeps ticks_diff in range)
+
+# Seconds from the NTP epoch (1900) to the device epoch (1970, or 2000 on older ports)
+NTP_DELTA = 3155673600 if time.gmtime(0)[0] == 2000 else 2208988800
+
+
+class SyncedClock:
+    """Wall clock from the last NTP answer plus drift-corrected ticks_ms"""
+
+    def __init__(self):
+        self.synced = False
+        self.base_ms = 0                # Epoch ms at base_ticks
+        self.base_ticks = 0
+        self.rebased_ms = 0             # Ticks elapsed between last sync and base_ticks
+        self.drift_ppm = 0              # Local ticks run this much slow (+) or fast (-)
+        self.offset_ms = 0              # Error found at the last sync (0 on the first)
+        self.rtt_ms = 0                 # Round trip of the last sync
+        self.syncs = 0
+
+    def now_ms(self):
+        """Epoch milliseconds (RTC-based until synced)"""
+        if not self.synced:
+            return time.time() * 1000
+        now = time.ticks_ms()
+        elapsed = time.ticks_diff(now, self.base_ticks)
+        ms = self.base_ms + elapsed + elapsed // 1000 * self.drift_ppm // 1000
+        if elapsed > REBASE_MS:
+            self.base_ms = ms
+            self.base_ticks = now
+            self.rebased_ms += elapsed
+        return ms
+
+    def time(self):
+        """Epoch seconds, like time.time()"""
+        if not self.synced:
+            return time.time()
+        return self.now_ms() // 1000
+
+    def apply(self, server_ms, at_ticks):
+        """
+        Set the clock from an NTP answer
+
+        Args:
+            server_ms: Server epoch ms at the moment of at_ticks
+            at_ticks: ticks_ms the answer refers to
+        """
+        if self.synced:
+            elapsed = time.ticks_diff(at_ticks, self.base_ticks)
+            local_ms = self.base_ms + elapsed + elapsed // 1000 * self.drift_ppm // 1000
+            self.offset_ms = server_ms - local_ms
+            since_s = (self.rebased_ms + elapsed) // 1000
+            if since_s >= DRIFT_MIN_SECONDS:
+                drift = self.drift_ppm + self.offset_ms * 1000 // since_s
+                self.drift_ppm = max(-MAX_DRIFT_PPM, min(drift, MAX_DRIFT_PPM))
+        self.base_ms = server_ms
+        self.base_ticks = at_ticks
+        self.rebased_ms = 0
+        self.synced = True
+        self.syncs += 1
+
+
+# Wall clock shared by every module
+clock = SyncedClock()
+
+
+def _timestamp_ms(data, offset):
+    """NTP timestamp (seconds and 32-bit fraction since 1900) at offset, as epoch ms"""
+    seconds, fraction = struct.unpack_from("!II", data, offset)
+    return (seconds - NTP_DELTA) * 1000 + (fraction * 1000 >> 32)
+
+
+class NtpClient:
+    """Non-blocking SNTP client that keeps a SyncedClock in step"""
+
+    def __init__(self, sync_clock=None, host=NTP_HOST, port=NTP_PORT, timeout_ms=NTP_TIMEOUT_MS):
+        """
+        Initialize NTP client
+
+        Args:
+            sync_clock: SyncedClock to update (default: the shared ntp.clock)
+            host: NTP server (default: pool.ntp.org)
+            port: NTP port (default: 123)
+            timeout_ms: Per-request timeout (default: 2000)
+        """
+        self.clock = sync_clock or clock
+        self.host = host
+        self.port = port
+        self.timeout_ms = timeout_ms
+        self.addr = None                # Resolved server address (see _query)
+        self.failures = 0
+        self.last_ok = False
+
+    async def sync(self):
+        """
+        Query the server once and apply the answer
+
+        Returns:
+            bool: True if the clock was set
+        """
+        try:
+            server_ms, at_ticks, rtt_ms = await self._query()
+        except (OSError, ValueError) as e:
+            self.failures += 1
+            self.last_ok = False
+            print(f"NTP sync failed: {e}")
+            return False
+        first = not self.clock.synced
+        self.clock.apply(server_ms, at_ticks)
+        self.clock.rtt_ms = rtt_ms
+        self.last_ok = True
+        if first:
+            print(f"Time synced (RTT {rtt_ms} ms)")
+        else:
+            print(f"Time resynced: offset {self.clock.offset_ms} ms, drift {self.clock.drift_ppm} ppm "
+                  f"(RTT {rtt_ms} ms)")
+        return True
+
+    async def run(self, wifi=None):
+        """
+        Resync task: every NTP_RESYNC_SECONDS, or NTP_RETRY_SECONDS after a failure
+
+        Args:
+            wifi: WifiSupervisor to wait on while the link is down (optional)
+        """
+        while True:
+            await asyncio.sleep(NTP_RESYNC_SECONDS if self.last_ok else NTP_RETRY_SECONDS)
+            if wifi is not None and not wifi.connected.is_set():
+                await wifi.connected.wait()
+            await self.sync()
+
+    async def _query(self):
+        """
+        One SNTP exchange
+
+        Resolves the server only if no address is held; a timeout drops it,
+        so the next request resolves again (pool.ntp.org rotates servers).
+
+        Returns:
+            tuple: (server epoch ms at at_ticks, at_ticks, round trip ms)
+        """
+        if self.addr is None:
+            self.addr = socket.getaddrinfo(self.host, self.port)[0][-1]
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setblocking(False)
+            request = bytearray(48)
+            request[0] = 0x23               # LI 0, version 4, mode 3 (client)
+            # Any unique transmit timestamp; the server echoes it back as origin
+            struct.pack_into("!II", request, 40, time.ticks_us(), time.ticks_ms())
+            start = time.ticks_ms()
+            sock.sendto(request, self.addr)
+            while True:
+                try:
+                    data = sock.recv(48)
+                except OSError:
+                    data = None             # EAGAIN - nothing yet
+                at_ticks = time.ticks_ms()
+                if data and len(data) >= 48 and data[24:32] == request[40:48]:
+                    break
+                if time.ticks_diff(at_ticks, start) >= self.timeout_ms:
+                    self.addr = None
+                    raise OSError("NTP request timed out")
+                await asyncio.sleep_ms(NTP_POLL_MS)
+        finally:
+            sock.close()
+
+        if data[0] & 0x07 != 4 or data[1] == 0:
+            raise ValueError("NTP server refused the request")      # Not a server reply, or kiss-o'-death
+        receive_ms = _timestamp_ms(data, 32)
+        transmit_ms = _timestamp_ms(data, 40)
+        rtt_ms = max(0, time.ticks_diff(at_ticks, start) - (transmit_ms - receive_ms))
+        return transmit_ms + rtt_ms // 2, at_ticks, rtt_ms
@@ -0,0 +1,148 @@
+"""
+Power profiles
+Night dimming and slower task rates for battery-powered displays
+
+The day/night profile comes from the NTP-synced clock (see ntp.py),
+shifted by UTC_OFFSET_HOURS since NTP sets UTC. At night the brightness is
+capped at NIGHT_BRIGHTNESS_PCT and the display is redrawn only as often as
+the timer bar needs (once a second). Until the clock has been synced the
+day profile is used.
+
+Independently of the time of day, an overdue reading is retried less often
+while every followed account is in range.
+
+Tasks report how long each wake-up kept the CPU busy (busy()), which gives
+an estimated active-CPU duty cycle per DUTY_WINDOW_SECONDS. Timing uses
+ticks_us/ticks_ms, so the estimate itself doesn't allocate.
+"""
+
+import time
+import ntp
+
+# Schedule (local hours, 0-23)
+UTC_OFFSET_HOURS = 0            # Local time offset from UTC (e.g., -5 for EST)
+NIGHT_START_HOUR = 22           # Night profile from 22:00...
+NIGHT_END_HOUR = 7              # ...until 07:00
+NIGHT_BRIGHTNESS_PCT = 20       # Brightness cap at night (percent)
+CLOCK_VALID_YEAR = 2023         # Earlier years mean NTP hasn't synced yet (rp2 boots in 2021)
+
+# Task rates
+DAY_REDRAW_MS = 100             # Display loop period by day
+NIGHT_REDRAW_MS = 1000          # Display loop period at night (timer bar steps once a second)
+IN_RANGE_POLL_SECONDS = 90      # Retry interval for an overdue reading while in range
+
+# Scheduling and reporting
+PROFILE_CHECK_SECONDS = 60      # How often the schedule is re-checked
+DUTY_WINDOW_SECONDS = 600       # Duty cycle reporting window (10 minutes)
+
+PROFILE_DAY = 0
+PROFILE_NIGHT = 1
+PROFILE_NAMES = ("day", "night")
+
+
+class PowerScheduler:
+    """
+    Day/night power profile and CPU duty cycle estimate
+
+    The display task reads redraw_ms for its sleep period; tasks call
+    busy() after each wake-up with the ticks_us it started at.
+    """
+
+    def __init__(self, utc_offset_hours=UTC_OFFSET_HOURS, night_start=NIGHT_START_HOUR,
+                 night_end=NIGHT_END_HOUR, night_brightness=NIGHT_BRIGHTNESS_PCT):
+        """
+        Initialize power scheduler
+
+        Args:
+            utc_offset_hours: Local time offset from UTC (default: 0)
+            night_start: Hour the night profile starts (default: 22)
+            night_end: Hour the night profile ends (default: 7)
+            night_brightness: Brightness cap at night in percent (default: 20)
+        """
+        self.utc_offset = utc_offset_hours * 3600
+        self.night_start = night_start
+        self.night_end = night_end
+        self.night_brightness = night_brightness
+        self.profile = PROFILE_DAY
+        self.redraw_ms = DAY_REDRAW_MS
+        self.day_brightness = None      # Brightness to restore in the morning (percent)
+
+        # Duty cycle window
+        self.busy_us = 0
+        self.wakeups = 0
+        self.window_start = time.ticks_ms()
+
+    def local_hour(self):
+        """Local hour (0-23) from the system clock, or None if it isn't synced"""
+        t = time.gmtime(ntp.clock.time() + self.utc_offset)
+        if t[0] < CLOCK_VALID_YEAR:
+            return None
+        return t[3]
+
+    def is_night(self, hour):
+        """True if a local hour falls in the night window (which may wrap midnight)"""
+        if hour is None:
+            return False
+        if self.night_start <= self.night_end:
+            return self.night_start <= hour < self.night_end
+        return hour >= self.night_start or hour < self.night_end
+
+    def update(self, brightness):
+        """
+        Re-check the schedule and switch profile if needed
+
+        Args:
+            brightness: Current brightness in percent
+
+        Returns:
+            int: Brightness in percent to apply on a profile change, else None
+        """
+        profile = PROFILE_NIGHT if self.is_night(self.local_hour()) else PROFILE_DAY
+        if profile == self.profile:
+            return None
+        self.profile = profile
+        if profile == PROFILE_NIGHT:
+            self.redraw_ms = NIGHT_REDRAW_MS
+            self.day_brightness = brightness
+            return min(brightness, self.night_brightness)
+        self.redraw_ms = DAY_REDRAW_MS
+        level = self.day_brightness if self.day_brightness is not None else brightness
+        self.day_brightness = None
+        return level
+
+    def poll_interval(self, in_range, interval):
+        """
+        Retry interval for an overdue reading
+
+        Args:
+            in_range: True if every followed account is in range
+            interval: Normal retry interval in seconds
+
+        Returns:
+            int: Seconds between retries
+        """
+        return max(interval, IN_RANGE_POLL_SECONDS) if in_range else interval
+
+    def busy(self, start_us):
+        """Record one task wake-up that started at ticks_us start_us"""
+        self.busy_us += time.ticks_diff(time.ticks_us(), start_us)
+        self.wakeups += 1
+
+    def duty_report(self):
+        """
+        Close the duty cycle window once DUTY_WINDOW_SECONDS have passed
+
+        Returns:
+            tuple: (duty in tenths of a percent, wake-ups, window seconds), or
+                   None while the window is still open
+        """
+        now = time.ticks_ms()
+        window_ms = time.ticks_diff(now, self.window_start)
+        if window_ms < DUTY_WINDOW_SECONDS * 1000:
+            return None
+        duty_x10 = self.busy_us // window_ms      # us / ms = 1000 * fraction = tenths of %
+        report = (duty_x10, self.wakeups, window_ms // 1000)
+        self.busy_us = 0
+        self.wakeups = 0
+        self.window_start = now
+        return report
@@ -0,0 +1,207 @@
+"""
+Raster kernels
+Glyph and rectangle fills written straight into the PicoGraphics framebuffer
+
+Drawing a glyph through graphics.pixel() costs an interpreted loop
+iteration and a method call per pixel - a 3-digit value and its arrow are
+a few hundred of them every frame. These kernels store the pen into the
+framebuffer directly instead. On the device they are @micropython.viper
+functions over ptr32/ptr8, so the inner loops compile to native stores.
+
+The framebuffer is the Galactic Unicorn PicoGraphics buffer (PEN_RGB888:
+one 32-bit 0x00RRGGBB word per pixel, FRAME_WIDTH x FRAME_HEIGHT, row
+major), which PicoGraphics exposes through the buffer protocol - see
+framebuffer(). Pens from graphics.create_pen() are those words. Fills are
+clipped to the frame like graphics.pixel().
+
+Glyphs are passed packed (pack_blocks, pack_coords, pack_bitmap): one byte
+each for x, y, width and height per block, or x and y per pixel, so the
+kernels never touch Python tuples.
+
+The kernels are chosen at import: the viper versions are probed once, and
+where that fails (CPython on the host, where micropython.viper is a no-op)
+the pure-Python versions of the same loops are used. KERNEL names the one
+in use.
+"""
+
+import micropython
+from micropython import const
+
+_W = const(53)                  # Underscored consts are inlined, so viper sees native ints
+_H = const(11)
+FRAME_WIDTH = _W
+FRAME_HEIGHT = _H
+FRAME_PIXELS = FRAME_WIDTH * FRAME_HEIGHT
+
+
+def pack_blocks(blocks):
+    """Pack (x, y, width, height) blocks into bytes for fill_blocks"""
+    packed = bytearray()
+    for block in blocks:
+        packed.extend(bytes(block))
+    return bytes(packed)
+
+
+def pack_coords(coords):
+    """Pack (x, y) pixels into bytes for fill_coords"""
+    packed = bytearray()
+    for x, y in coords:
+        packed.append(x)
+        packed.append(y)
+    return bytes(packed)
+
+
+def pack_bitmap(bitmap):
+    """Pack the set pixels of a 2D bitmap (rows of 0/1) into bytes for fill_coords"""
+    return pack_coords([(x, y) for y, row in enumerate(bitmap) for x, pixel in enumerate(row) if pixel])
+
+
+# --- Viper kernels (device) ---
+
+@micropython.viper
+def _fill_rect_viper(buf, x: int, y: int, w: int, h: int, color: int):
+    fb = ptr32(buf)
+    x1 = x + w
+    y1 = y + h
+    if x < 0:
+        x = 0
+    if y < 0:
+        y = 0
+    if x1 > _W:
+        x1 = _W
+    if y1 > _H:
+        y1 = _H
+    while y < y1:
+        i = y * _W + x
+        end = y * _W + x1
+        while i < end:
+            fb[i] = color
+            i += 1
+        y += 1
+
+
+@micropython.viper
+def _fill_blocks_viper(buf, blocks, size: int, x: int, y: int, color: int):
+    fb = ptr32(buf)
+    b = ptr8(blocks)
+    k = 0
+    while k < size:
+        x0 = x + int(b[k])
+        y0 = y + int(b[k + 1])
+        x1 = x0 + int(b[k + 2])
+        y1 = y0 + int(b[k + 3])
+        k += 4
+        if x0 < 0:
+            x0 = 0
+        if y0 < 0:
+            y0 = 0
+        if x1 > _W:
+            x1 = _W
+        if y1 > _H:
+            y1 = _H
+        while y0 < y1:
+            i = y0 * _W + x0
+            end = y0 * _W + x1
+            while i < end:
+                fb[i] = color
+                i += 1
+            y0 += 1
+
+
+@micropython.viper
+def _fill_coords_viper(buf, coords, size: int, x: int, y: int, color: int):
+    fb = ptr32(buf)
+    c = ptr8(coords)
+    k = 0
+    while k < size:
+        px = x + int(c[k])
+        py = y + int(c[k + 1])
+        k += 2
+        if px >= 0 and px < _W and py >= 0 and py < _H:
+            fb[py * _W + px] = color
+
+
+# --- Pure-Python kernels (fallback) ---
+#
+# Same loops and signatures as the viper kernels above:
+# - fill_rect(buf, x, y, w, h, color): one rectangle
+# - fill_blocks(buf, blocks, len(blocks), x, y, color): packed blocks at (x, y)
+# - fill_coords(buf, coords, len(coords), x, y, color): packed pixels at (x, y)
+# buf is a framebuffer (see framebuffer()), color a pen from graphics.create_pen()
+
+def _fill_rect_python(buf, x, y, w, h, color):
+    x1 = min(x + w, FRAME_WIDTH)
+    y1 = min(y + h, FRAME_HEIGHT)
+    x = max(x, 0)
+    y = max(y, 0)
+    while y < y1:
+        i = y * FRAME_WIDTH + x
+        end = y * FRAME_WIDTH + x1
+        while i < end:
+            buf[i] = color
+            i += 1
+        y += 1
+
+
+def _fill_blocks_python(buf, blocks, size, x, y, color):
+    k = 0
+    while k < size:
+        x0 = x + blocks[k]
+        y0 = y + blocks[k + 1]
+        x1 = min(x0 + blocks[k + 2], FRAME_WIDTH)
+        y1 = min(y0 + blocks[k + 3], FRAME_HEIGHT)
+        k += 4
+        if x0 < 0:
+            x0 = 0
+        if y0 < 0:
+            y0 = 0
+        while y0 < y1:
+            i = y0 * FRAME_WIDTH + x0
+            end = y0 * FRAME_WIDTH + x1
+            while i < end:
+                buf[i] = color
+                i += 1
+            y0 += 1
+
+
+def _fill_coords_python(buf, coords, size, x, y, color):
+    for k in range(0, size, 2):
+        px = x + coords[k]
+        py = y + coords[k + 1]
+        if 0 <= px < FRAME_WIDTH and 0 <= py < FRAME_HEIGHT:
+            buf[py * FRAME_WIDTH + px] = color
+
+
+try:
+    _fill_rect_viper(bytearray(4), 0, 0, 1, 1, 0)
+    KERNEL = "viper"
+    fill_rect = _fill_rect_viper
+    fill_blocks = _fill_blocks_viper
+    fill_coords = _fill_coords_viper
+except NameError:               # No ptr32: the decorator didn't compile it
+    KERNEL = "python"
+    fill_rect = _fill_rect_python
+    fill_blocks = _fill_blocks_python
+    fill_coords = _fill_coords_python
+
+
+def framebuffer(graphics):
+    """
+    Pixel buffer behind a PicoGraphics, for the kernels
+
+    On the device this is memoryview(graphics), used by the viper kernels.
+    The Python kernels need a buffer of 32-bit words instead (the host
+    emulator's framebuffer array).
+
+    Returns:
+        The buffer, or None if it isn't a FRAME_WIDTH x FRAME_HEIGHT RGB888
+        frame the selected kernels can write (draw through graphics instead)
+    """
+    if KERNEL == "viper":
+        try:
+            buf = memoryview(graphics)
+        except TypeError:
+            return None
+        return buf if len(buf) == FRAME_PIXELS * 4 else None
+    buf = getattr(graphics, 'framebuffer', None)
+    return buf if buf is not None and len(buf) == FRAME_PIXELS else None
@@ -0,0 +1,81 @@
+"""
+Relay client
+Reads an account from a LAN relay (host/relay.py) instead of Dexcom Share
+
+With several displays following the same account, each one logging in and
+polling Share multiplies the requests (and the rate-limit risk). The relay
+holds the only Share session and caches the readings; displays ask it over
+plain HTTP on the LAN instead - no credentials, no TLS.
+
+The relay answers in Share's own reading format (parsed as for Share) and
+needs no login; readings, local trend, log and backfill come from
+source.GlucoseSource as for every other backend. Requests are conditional -
+`since` carries the newest reading's timestamp, and the relay answers 304
+(an empty response) until there's a newer one. With `wait` the relay holds
+the request open until it has a newer reading (long-poll, see
+main.push_receiver), so a display hears about it the moment the relay does:
+
+    GET /glucose/<account>?minutes=<m>&maxCount=<n>[&since=<epoch seconds>][&wait=<seconds>]
+"""
+
+import ahttp
+
+from dexcom import parse_share_readings
+from source import GlucoseSource
+
+
+class RelayClient(GlucoseSource):
+    """Glucose source reading one relay account over the LAN"""
+
+    def __init__(self, relay_url, account=0):
+        """
+        Initialize relay client
+
+        Args:
+            relay_url: Relay base URL (e.g., "http://192.168.1.10:8081")
+            account: Account index on the relay (default: 0)
+        """
+        super().__init__()
+        self.base_url = relay_url
+        self.account = account
+        self.not_modified = 0           # Fetches answered 304 (nothing new)
+        self.last_status = None         # HTTP status of the last fetch (None if it failed)
+
+    def _fetch_url(self, wait=0):
+        """Build the relay URL, conditional on the newest reading held"""
+        minutes, max_count = self._fetch_window()
+        url = f"{self.base_url}/glucose/{self.account}?minutes={minutes}&maxCount={max_count}"
+        if self.glucose_time is not None:
+            url += f"&since={self.glucose_time}"
+            if wait:
+                url += f"&wait={wait}"
+        return url
+
+    def _handle_relay(self, status, content):
+        """Apply a relay response: 200 with readings, or 304 if nothing is newer"""
+        self.last_status = status
+        if status == 304:
+            self.not_modified += 1
+            return True
+        if status == 200:
+            return self._apply_readings(parse_share_readings(content))
+        print(f"Relay fetch failed: {status}")
+        return False
+
+    async def fetch_glucose_async(self, _retry_count=0, wait=0):
+        """
+        Fetch from the relay without blocking
+
+        Args:
+            wait: Seconds the relay may hold the request until a newer
+                reading arrives (long-poll; default: 0, answer at once)
+
+        Returns: True if successful (including 304, nothing new)
+        """
+        self.last_status = None
+        try:
+            status, content = await ahttp.get(self._fetch_url(wait), timeout=wait + ahttp.HTTP_TIMEOUT)
+            return self._handle_relay(status, content)
+        except Exception as e:
+            print(f"Relay error: {e}")
+            return False
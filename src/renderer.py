@@ -0,0 +1,214 @@
+"""
+Dual-core rendering
+Runs Display and gu.update on the RP2350's second core
+
+In dual-core mode (main.DUAL_CORE) a _thread worker on core 1 owns the
+Display: it draws every frame, steps the timer bar and the alert pulse,
+and applies brightness. Core 0 keeps uasyncio (buttons, fetching, alerts,
+power) and only posts state snapshots into a FrameSlot. A blocking socket
+call or a GC pass on core 0 then never freezes the LEDs - the render loop
+doesn't allocate, so it never waits on the GC lock either.
+
+FrameSlot is a single-producer/single-consumer seqlock over a preallocated
+int array: the writer makes the sequence number odd, writes the fields and
+makes it even again; the reader copies the fields and keeps the copy only
+if the sequence number was even and unchanged throughout. Neither side
+takes a lock, so core 0 can't stall core 1 (and vice versa).
+"""
+
+import time
+import _thread
+from array import array
+
+from alerts import ALERT_NONE, ALERT_FRAME_MS
+from breaker import SOURCE_OK
+from trend import TRENDS, trend_index
+
+# Configuration
+SLOT_POLL_MS = 50               # Longest a new snapshot waits to be picked up
+
+# Snapshot fields (indices into FrameSlot.data)
+FIELD_VALUE = 0
+FIELD_TREND = 1                 # Index into TRENDS
+FIELD_LOCAL = 2                 # 1 if the trend was estimated locally
+FIELD_DELTA = 3
+FIELD_CHANGE = 4
+FIELD_TICKS = 5                 # ticks_ms when the reading was taken
+FIELD_BRIGHTNESS = 6            # Percent
+FIELD_ALERT = 7                 # alerts.ALERT_* level
+FIELD_ACCOUNT = 8
+FIELD_ACCOUNTS = 9
+FIELD_ERROR = 10                # breaker.SOURCE_* level of the account shown
+SLOT_SIZE = 11
+
+NO_VALUE = -(1 << 29)           # Stands for None in the int array
+
+
+def _optional(value):
+    return None if value == NO_VALUE else value
+
+
+class FrameSlot:
+    """Lock-free single-producer/single-consumer snapshot slot"""
+
+    def __init__(self):
+        self.seq = 0                    # Odd while a post is in progress
+        self.data = array('i', [NO_VALUE] * SLOT_SIZE)
+        self.data[FIELD_TREND] = 0
+        self.data[FIELD_LOCAL] = 0
+        self.data[FIELD_BRIGHTNESS] = 50
+        self.data[FIELD_ALERT] = ALERT_NONE
+        self.data[FIELD_ACCOUNT] = 0
+        self.data[FIELD_ACCOUNTS] = 1
+        self.data[FIELD_ERROR] = SOURCE_OK
+
+    def post(self, value, trend, trend_is_local, delta, change, reading_ticks,
+             brightness_pct, alert_level, account_index, account_count, source_error=SOURCE_OK):
+        """
+        Publish a snapshot (producer side, core 0)
+
+        Args:
+            value: Glucose value in mg/dL (or None)
+            trend: Dexcom trend string (or None)
+            trend_is_local: True if the trend was estimated locally
+            delta: mg/dL since previous reading (or None)
+            change: mg/dL over 15 minutes (or None)
+            reading_ticks: ticks_ms when the reading was taken (or None)
+            brightness_pct: Brightness in integer percent
+            alert_level: alerts.ALERT_* level of the account shown
+            account_index: Account shown
+            account_count: Number of followed accounts
+            source_error: breaker.SOURCE_* level of the account shown
+        """
+        data = self.data
+        self.seq = (self.seq + 1) & 0x3FFFFFFF
+        data[FIELD_VALUE] = NO_VALUE if value is None else value
+        data[FIELD_TREND] = trend_index(trend)
+        data[FIELD_LOCAL] = 1 if trend_is_local else 0
+        data[FIELD_DELTA] = NO_VALUE if delta is None else delta
+        data[FIELD_CHANGE] = NO_VALUE if change is None else change
+        data[FIELD_TICKS] = NO_VALUE if reading_ticks is None else reading_ticks
+        data[FIELD_BRIGHTNESS] = brightness_pct
+        data[FIELD_ALERT] = alert_level
+        data[FIELD_ACCOUNT] = account_index
+        data[FIELD_ACCOUNTS] = account_count
+        data[FIELD_ERROR] = source_error
+        self.seq = (self.seq + 1) & 0x3FFFFFFF
+
+    def read(self, into, last_seq):
+        """
+        Copy the latest snapshot into `into` if it is newer (consumer side, core 1)
+
+        Args:
+            into: array('i', SLOT_SIZE) to copy into
+            last_seq: Sequence number of the snapshot already held
+
+        Returns:
+            int: Sequence number of the snapshot now in `into` (last_seq if
+                 nothing new, or a post was in progress - try again later)
+        """
+        seq = self.seq
+        if seq == last_seq or seq & 1:
+            return last_seq
+        data = self.data
+        for i in range(SLOT_SIZE):
+            into[i] = data[i]
+        if self.seq != seq:
+            return last_seq             # Overwritten while copying
+        return seq
+
+
+class Renderer:
+    """Core 1 render loop drawing the latest FrameSlot snapshot"""
+
+    def __init__(self, gu, display):
+        """
+        Initialize renderer
+
+        Args:
+            gu: GalacticUnicorn instance (brightness applied here)
+            display: Display instance (only touched from the render thread
+                once started)
+        """
+        self.gu = gu
+        self.display = display
+        self.slot = FrameSlot()
+        self.snapshot = array('i', [NO_VALUE] * SLOT_SIZE)
+        self.running = False
+        self.stopped = True
+        self.frames = 0
+
+    def start(self):
+        """Start the render loop on core 1"""
+        self.running = True
+        self.stopped = False
+        _thread.start_new_thread(self.run, ())
+
+    def stop(self):
+        """Ask the render loop to exit and wait for it"""
+        self.running = False
+        while not self.stopped:
+            time.sleep_ms(10)
+
+    def run(self):
+        """
+        Render loop (thread body)
+
+        Redraws on a new snapshot, every second for the timer bar, and every
+        ALERT_FRAME_MS while an alert pulses (step from ticks_ms, as in
+        main.display_updater). Allocation-free in steady state.
+        """
+        slot = self.slot
+        snapshot = self.snapshot
+        display = self.display
+        last_seq = -1
+        brightness = -1
+        last_timer_update = time.ticks_ms()
+        alert_start = last_timer_update
+        alerting = False
+
+        while self.running:
+            current_ticks = time.ticks_ms()
+            seq = slot.read(snapshot, last_seq)
+            dirty = seq != last_seq
+            if dirty:
+                last_seq = seq
+                if snapshot[FIELD_BRIGHTNESS] != brightness:
+                    brightness = snapshot[FIELD_BRIGHTNESS]
+                    self.gu.set_brightness(brightness / 100)
+                    display.set_brightness(brightness / 100)
+                display.set_account(snapshot[FIELD_ACCOUNT], snapshot[FIELD_ACCOUNTS])
+                display.set_source_error(snapshot[FIELD_ERROR])
+
+            alert_level = snapshot[FIELD_ALERT]
+            if alert_level != ALERT_NONE:
+                if not alerting:
+                    alert_start = current_ticks
+                    alerting = True
+                display.set_alert(alert_level, time.ticks_diff(current_ticks, alert_start) // ALERT_FRAME_MS)
+            elif alerting:
+                display.set_alert(ALERT_NONE, 0)
+                alerting = False
+                dirty = True
+
+            timer_needs_update = time.ticks_diff(current_ticks, last_timer_update) >= 1000
+            if dirty or timer_needs_update or alerting:
+                display.draw_glucose(
+                    _optional(snapshot[FIELD_VALUE]),
+                    TRENDS[snapshot[FIELD_TREND]],
+                    snapshot[FIELD_LOCAL] == 1,
+                    _optional(snapshot[FIELD_DELTA]),
+                    _optional(snapshot[FIELD_CHANGE]),
+                    _optional(snapshot[FIELD_TICKS])
+                )
+                self.frames += 1
+                if timer_needs_update:
+                    last_timer_update = current_ticks
+
+            if alerting:
+                elapsed = time.ticks_diff(time.ticks_ms(), alert_start)
+                time.sleep_ms(ALERT_FRAME_MS - elapsed % ALERT_FRAME_MS)
+            else:
+                wait = 1000 - time.ticks_diff(time.ticks_ms(), last_timer_update)
+                time.sleep_ms(max(1, min(wait, SLOT_POLL_MS)))
+        self.stopped = True
@@ -0,0 +1,65 @@
+"""
+Replay source
+Plays back a recorded glucose log as if its readings were arriving now
+
+For demos, shop windows and testing a display without a CGM account: point
+REPLAY_LOG at a glucose_log.py directory - copied from another display's
+/glucose/<n>, or written on a computer - and the display shows its readings
+again, shifted so the recording starts (with trend history) when the
+display does, and looping back to the start at the end.
+
+No network: a fetch reads the readings that are due since the last one
+straight from the log's time index, the same incremental fetch the network
+backends make (source._fetch_since).
+"""
+
+import ntp
+
+from glucose_log import GlucoseLog
+from source import GlucoseSource, READING_INTERVAL
+from trend import TREND_HISTORY_SIZE
+
+
+class ReplaySource(GlucoseSource):
+    """Glucose source replaying a glucose log directory"""
+
+    def __init__(self, path, loop=True):
+        """
+        Open the recording
+
+        Args:
+            path: glucose_log.py log directory to replay
+            loop: Start over after the last reading (default: True)
+        """
+        super().__init__()
+        self.recording = GlucoseLog(path)
+        self.loop = loop
+        self.first = None
+        for reading in self.recording.between():
+            self.first = reading[0]
+            break
+        latest = self.recording.latest()
+        self.last = latest[0] if latest else None
+        self.offset = None              # Seconds added to recorded timestamps
+
+    async def fetch_glucose_async(self):
+        """Read the readings due since the last fetch. Returns: True if successful"""
+        if self.first is None:
+            print("Replay log is empty")
+            return False
+        now = ntp.clock.time()
+        if self.offset is None:
+            # Start a trend history's worth into the recording
+            self.offset = now - self.first - (TREND_HISTORY_SIZE - 1) * READING_INTERVAL
+        span = self.last - self.first + READING_INTERVAL
+        while self.loop and now - self.offset > self.last + READING_INTERVAL:
+            self.offset += span
+
+        since, count = self._fetch_since()
+        readings = [(t + self.offset, value, trend)
+                    for t, value, trend, _ in self.recording.between(since - self.offset + 1, now - self.offset)]
+        readings = readings[-count:]
+        readings.reverse()                  # Newest first, like the network backends
+        if not readings and self.glucose_time is not None:
+            return True
+        return self._apply_readings(readings)
@@ -0,0 +1,250 @@
+"""
+Glucose data sources
+Base class for the backends that readings come from
+
+Every backend - Dexcom Share (dexcom.py), a LAN relay (relay_client.py),
+Nightscout (nightscout.py), a replayed log (replay_source.py) - is a
+GlucoseSource. Backends only talk to their server and turn its responses
+into compact reading records:
+
+    (epoch seconds, mg/dL, Dexcom trend string)
+
+newest first, the order every server answers in. Everything the rest of
+the app uses - the latest reading and its age, the local trend estimate,
+delta and change, the flash log and the restore after a reboot - lives
+here, so it works the same whatever the source.
+
+A backend implements:
+    fetch_glucose_async()   Fetch new readings and apply them (_apply_readings);
+                            True if successful (default: no readings)
+    connect_async()         Log in / open a session if the backend needs one
+                            (default: nothing to do)
+
+Fetches are incremental: glucose_time is the newest reading held, and
+backends that can ask for readings newer than a timestamp do (see
+_fetch_since). Share can't, so it asks for a window (_fetch_window).
+
+Backends talking to a server record each request's outcome on `breaker`
+(breaker.CircuitBreaker) and skip fetches while it is open, so an outage
+costs a probe per backoff period rather than a request per poll.
+"""
+
+import time
+import ntp
+
+from breaker import CircuitBreaker
+from trend import TrendEstimator, UNCOMPUTED_TRENDS, TREND_HISTORY_SIZE, TREND_MAX_GAP_SECONDS
+
+# Constants
+READING_INTERVAL = 300          # Seconds between CGM readings
+READING_MAX_AGE = 86400         # Reading ages are clamped to this (keeps ticks_diff in range)
+LOG_BACKFILL_READINGS = 36      # Most readings fetched at once to fill a gap (3 hours)
+
+
+class GlucoseSource:
+    """Latest reading, local trend and log for one account, from any backend"""
+
+    def __init__(self):
+        self.glucose_value = None
+        self.glucose_trend = None
+        self.glucose_time = None        # Reading timestamp (epoch seconds)
+        self.glucose_ticks = None       # Same instant as ticks_ms (see _anchor_reading)
+        self.trend_is_local = False     # True when trend was estimated from history
+        self.trend_estimator = TrendEstimator()
+        self.log = None                 # glucose_log.GlucoseLog new readings are appended to
+        self.breaker = CircuitBreaker()     # Server failure backoff (see breaker.py)
+
+    # --- Backend interface ---
+
+    async def connect_async(self):
+        """Open a session if the backend needs one. Returns: True if ready"""
+        return True
+
+    async def fetch_glucose_async(self):
+        """Fetch and apply new readings. Returns: True if successful (default: no readings)"""
+        return False
+
+    # --- Fetch windows ---
+
+    def _fetch_window(self):
+        """
+        Minutes and number of readings to ask for in the next fetch
+
+        The first fetch also backfills recent readings so the local trend
+        estimator has history to work with. With a log, readings missed
+        since the last one (while powered off or offline) are backfilled
+        too, up to LOG_BACKFILL_READINGS.
+
+        Returns:
+            tuple: (minutes, max_count)
+        """
+        if self.trend_estimator.count:
+            minutes, max_count = 10, 1
+        else:
+            minutes, max_count = TREND_HISTORY_SIZE * 5 + 5, TREND_HISTORY_SIZE
+        if self.log is not None and self.glucose_time is not None:
+            missed = min((ntp.clock.time() - self.glucose_time) // READING_INTERVAL, LOG_BACKFILL_READINGS)
+            if missed > max_count:
+                minutes, max_count = missed * 5 + 5, missed
+        return minutes, max_count
+
+    def _fetch_since(self):
+        """
+        Timestamp and count for backends that fetch readings newer than a time
+
+        After the first fetch that's the newest reading held, so a fetch
+        returns only new readings - usually none or one - and anything missed
+        meanwhile (up to LOG_BACKFILL_READINGS) comes with it, log or not.
+        The first fetch covers the _fetch_window backfill.
+
+        Returns:
+            tuple: (epoch seconds, max_count)
+        """
+        minutes, max_count = self._fetch_window()
+        now = ntp.clock.time()
+        if self.glucose_time is None:
+            return now - minutes * 60, max_count
+        missed = min((now - self.glucose_time) // READING_INTERVAL, LOG_BACKFILL_READINGS)
+        return self.glucose_time, max(max_count, missed)
+
+    # --- Readings ---
+
+    def _apply_readings(self, readings):
+        """
+        Apply fetched reading records, newest first (oldest is applied first)
+
+        Args:
+            readings: List of (epoch seconds, mg/dL, trend) records
+
+        Returns:
+            bool: True if there was at least one reading
+        """
+        if not readings:
+            print("No recent glucose data available")
+            return False
+        for index in range(len(readings) - 1, -1, -1):
+            self._apply_reading(*readings[index])
+        local = " (local)" if self.trend_is_local else ""
+        print(f"Glucose: {self.glucose_value} mg/dL, Trend: {self.glucose_trend}{local}")
+        return True
+
+    def _apply_reading(self, timestamp, value, trend):
+        """
+        Store a reading and fill in the trend locally if the source couldn't
+
+        Args:
+            timestamp: Reading time in epoch seconds
+            value: Glucose in mg/dL
+            trend: Dexcom trend string (or None)
+        """
+        previous_time = self.glucose_time
+        self.glucose_value = value
+        self.glucose_time = timestamp
+
+        # A new reading is one with a new timestamp, even if the value repeats
+        if self.glucose_time != previous_time:
+            self._anchor_reading()
+
+        if self.glucose_time is not None and self.glucose_value is not None:
+            self.trend_estimator.add(self.glucose_time, self.glucose_value)
+
+        # Replace "no direction" trends with the local estimate when available
+        self.trend_is_local = False
+        if trend in UNCOMPUTED_TRENDS:
+            local_trend = self.trend_estimator.get_trend()
+            if local_trend:
+                trend = local_trend
+                self.trend_is_local = True
+        self.glucose_trend = trend
+
+        if self.log is not None and self.glucose_time != previous_time:
+            try:
+                self.log.append(self.glucose_time, self.glucose_value, trend, self.trend_is_local)
+            except OSError as e:
+                print(f"Glucose log write failed: {e}")
+
+    def restore_from_log(self):
+        """
+        Reload the newest logged reading (and its trend history) after a reboot
+
+        Puts the last reading on screen before the first fetch. A reading
+        recent enough to still count for the trend also refills the trend
+        estimator from the log, so the first fetch doesn't need to backfill
+        from the source. Skipped if the clock is behind the logged reading
+        (not yet set) - the reading's age would be wrong.
+
+        Returns:
+            bool: True if a reading was restored
+        """
+        latest = self.log.latest() if self.log is not None else None
+        if latest is None or self.glucose_time is not None:
+            return False
+        timestamp, value, trend, local = latest
+        if ntp.clock.time() < timestamp:
+            return False
+
+        if ntp.clock.time() - timestamp <= TREND_MAX_GAP_SECONDS:
+            history = (TREND_HISTORY_SIZE - 1) * READING_INTERVAL
+            for reading in self.log.between(timestamp - history, timestamp):
+                self.trend_estimator.add(reading[0], reading[1])
+        self.glucose_value = value
+        self.glucose_trend = trend
+        self.trend_is_local = local
+        self.glucose_time = timestamp
+        self._anchor_reading()
+        return True
+
+    def _anchor_reading(self):
+        """
+        Convert the reading timestamp to ticks_ms, once per new reading
+
+        Epoch seconds don't fit a MicroPython small int, so the age is
+        worked out here (against the NTP-set clock) and everything after
+        uses ticks. A device clock behind the reading counts as age 0.
+        Later NTP corrections don't move readings already anchored.
+        """
+        if self.glucose_time is None:
+            self.glucose_ticks = None
+            return
+        age = max(0, min(ntp.clock.time() - self.glucose_time, READING_MAX_AGE))
+        self.glucose_ticks = time.ticks_add(time.ticks_ms(), -age * 1000)
+
+    def get_glucose_ticks(self):
+        """Get ticks_ms at which the current reading was taken (or None)"""
+        return self.glucose_ticks
+
+    def get_glucose_age(self):
+        """Get age of the current reading in seconds (or None)"""
+        if self.glucose_ticks is None:
+            return None
+        now = time.ticks_ms()
+        age = time.ticks_diff(now, self.glucose_ticks) // 1000
+        if age > READING_MAX_AGE:
+            # Re-anchor so ticks_diff stays in range while no new reading arrives
+            age = READING_MAX_AGE
+            self.glucose_ticks = time.ticks_add(now, -age * 1000)
+        return age
+
+    def get_glucose_value(self):
+        """Get current glucose value"""
+        return self.glucose_value
+
+    def get_glucose_trend(self):
+        """Get current glucose trend"""
+        return self.glucose_trend
+
+    def is_trend_local(self):
+        """True if current trend was computed locally from history"""
+        return self.trend_is_local
+
+    def get_glucose_rate(self):
+        """Get local rate of change in tenths of mg/dL/min (or None)"""
+        return self.trend_estimator.get_rate()
+
+    def get_glucose_delta(self):
+        """Get change since the previous reading in mg/dL (or None)"""
+        return self.trend_estimator.get_delta()
+
+    def get_glucose_change(self):
+        """Get change over the last 15 minutes in mg/dL (or None)"""
+        return self.trend_estimator.get_change()
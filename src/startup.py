@@ -0,0 +1,92 @@
+"""
+Boot pipeline
+Runs the startup steps as concurrent tasks ordered by their dependencies
+
+Each step is an async callable that waits only for the steps it really
+needs, e.g.:
+
+    self-test  (display)       ─┐
+    wifi       (radio)         ─┼─ ntp  ── history ─┐
+                                └─ auth ────────────┴─ first fetch
+
+so the self-test animates while WiFi associates, and NTP and Dexcom
+authentication overlap instead of running one after the other. Every step
+is time-stamped in a BootTimeline, which is printed as it goes.
+
+A step that fails is logged and counts as done - later steps go ahead and
+fall back on their own (e.g., the first fetch authenticates by itself).
+"""
+
+import time
+import uasyncio as asyncio
+
+
+class BootTimeline:
+    """Milliseconds from power-on to each boot step"""
+
+    def __init__(self, start=0):
+        """
+        Initialize boot timeline
+
+        Args:
+            start: ticks_ms of power-on (default: 0 - ticks_ms counts from
+                reset on rp2, so imports and hardware init are included)
+        """
+        self.start = start
+        self.steps = []                 # (name, ms since power-on), in order
+
+    def mark(self, name):
+        """Record that a step finished now"""
+        ms = time.ticks_diff(time.ticks_ms(), self.start)
+        self.steps.append((name, ms))
+        print(f"Boot: {name} at {ms} ms")
+
+    def elapsed(self, name):
+        """Milliseconds from power-on to a step, or None if it hasn't finished"""
+        for step, ms in self.steps:
+            if step == name:
+                return ms
+        return None
+
+
+class BootGraph:
+    """Boot steps with dependencies, run concurrently"""
+
+    def __init__(self, timeline):
+        """
+        Initialize boot graph
+
+        Args:
+            timeline: BootTimeline to record finished steps in
+        """
+        self.timeline = timeline
+        self.steps = []                 # (name, async callable, dependency names)
+        self.done = {}                  # name -> asyncio.Event
+
+    def add(self, name, step, after=()):
+        """
+        Add a step
+
+        Args:
+            name: Step name (as shown in the timeline)
+            step: Async callable taking no arguments
+            after: Names of steps that must finish first; names that were
+                never added are ignored (e.g., no WiFi on the host)
+        """
+        self.steps.append((name, step, after))
+        self.done[name] = asyncio.Event()
+
+    async def run(self):
+        """Run every step as soon as its dependencies are done"""
+        await asyncio.gather(*[self._run_step(name, step, after) for name, step, after in self.steps])
+
+    async def _run_step(self, name, step, after):
+        for dependency in after:
+            if dependency in self.done:
+                await self.done[dependency].wait()
+        try:
+            await step()
+        except Exception as e:
+            print(f"Boot step '{name}' failed: {e}")
+        self.timeline.mark(name)
+        self.done[name].set()
@@ -0,0 +1,115 @@
+"""
+Shared state
+What the async tasks share, with a version counter per field
+
+The tasks used to share a dict with string keys and a single needs_update
+flag. Every access hashed a key, and the flag couldn't say what changed:
+whichever consumer cleared it could swallow a change another one hadn't
+acted on yet.
+
+AppState has fixed attributes instead. Attribute lookups are cached in
+the bytecode on MicroPython, which ignores __slots__, and on the host a
+misspelt field raises rather than quietly adding a key. Every change
+goes through touch(), which bumps `version` and that field's entry in
+`versions`. A consumer keeps the version it last acted on and asks
+changed(field, seen) for the fields it cares about (or compares
+`version` for any change). Nothing is ever cleared, so no consumer can
+miss a change another one handled.
+"""
+
+from array import array
+
+from breaker import SOURCE_OK
+
+# Versioned fields (indices into AppState.versions)
+FIELD_READING = 0               # Reading on screen: value, trend, deltas, reading time, source error
+FIELD_ACCOUNTS = 1              # Any account's latest reading (accounts)
+FIELD_BRIGHTNESS = 2
+FIELD_ALERT = 3                 # Alert snoozed (levels themselves come from the alert engines)
+FIELD_SELF_TEST = 4             # Digit test started or finished
+FIELD_COUNT = 5
+
+# Account reading tuple: value, trend, trend is local, delta, change,
+# reading ticks, source error (see main.update_account)
+NO_READING = (None, None, False, None, None, None, SOURCE_OK)
+
+
+class AppState:
+    """State shared by the async tasks (see main.async_main)"""
+
+    __slots__ = (
+        # Reading on screen (show_account), FIELD_READING
+        'glucose_value', 'glucose_trend', 'trend_is_local', 'glucose_delta', 'glucose_change',
+        'reading_ticks', 'source_error', 'account_index',
+        # Latest reading per account, FIELD_ACCOUNTS
+        'accounts',
+        'brightness',
+        'self_test',
+        # Components the tasks share (set once by async_main)
+        'alerts', 'power', 'wifi', 'ntp', 'renderer', 'ble', 'buttons', 'boot',
+        'version', 'versions',
+    )
+
+    def __init__(self, account_count, brightness):
+        """
+        Initialize shared state
+
+        Args:
+            account_count: Number of followed accounts
+            brightness: Initial brightness (0.0-1.0)
+        """
+        self.accounts = [NO_READING] * account_count
+        self.account_index = 0
+        (self.glucose_value, self.glucose_trend, self.trend_is_local, self.glucose_delta,
+         self.glucose_change, self.reading_ticks, self.source_error) = NO_READING
+        self.brightness = brightness
+        self.self_test = False          # Digit test owns the display while set
+        self.alerts = None
+        self.power = None
+        self.wifi = None
+        self.ntp = None
+        self.renderer = None
+        self.ble = None
+        self.buttons = None
+        self.boot = None
+        self.version = 1                # Starts ahead of any consumer's "seen nothing" (0)
+        self.versions = array('i', [1] * FIELD_COUNT)
+
+    def touch(self, field):
+        """Record a change to a FIELD_* field"""
+        self.version += 1
+        self.versions[field] = self.version
+
+    def changed(self, field, seen):
+        """True if a FIELD_* field changed after version `seen`"""
+        return self.versions[field] > seen
+
+    def store_account(self, index, reading):
+        """
+        Store an account's latest reading tuple
+
+        Returns:
+            bool: True if it differs from the one stored
+        """
+        if reading == self.accounts[index]:
+            return False
+        self.accounts[index] = reading
+        self.touch(FIELD_ACCOUNTS)
+        return True
+
+    def show_account(self, index):
+        """Make an account's stored reading the one on screen"""
+        self.account_index = index
+        (self.glucose_value, self.glucose_trend, self.trend_is_local, self.glucose_delta,
+         self.glucose_change, self.reading_ticks, self.source_error) = self.accounts[index]
+        self.touch(FIELD_READING)
+
+    def set_brightness(self, brightness):
+        """Set the brightness (0.0-1.0)"""
+        self.brightness = brightness
+        self.touch(FIELD_BRIGHTNESS)
+
+    def set_self_test(self, running):
+        """Mark the digit test as running or finished"""
+        self.self_test = running
+        self.touch(FIELD_SELF_TEST)
@@ -0,0 +1,173 @@
+"""
+Local glucose trend estimation
+Estimates rate of change from recent readings when Dexcom can't provide a trend
+
+Dexcom reports "NotComputable" or "RateOutOfRange" when its own estimator gives
+up - which is usually exactly when glucose is moving fast. This module keeps a
+small ring buffer of (timestamp, value) readings and maintains the rate of
+change incrementally as each new reading arrives, so asking for the trend is
+O(1) and costs nothing extra per poll.
+
+Rates use integer maths in tenths of mg/dL/min (e.g. 15 = 1.5 mg/dL/min) and
+map onto the same 7 arrow buckets documented in Display.get_trend_arrow.
+
+The same update also keeps the change since the previous reading (delta) and
+the change over 15 minutes (the buffer's slope scaled to 900 seconds) for the
+display's delta mode.
+"""
+
+# Configuration
+TREND_HISTORY_SIZE = 4          # Readings kept (4 readings = 15 minutes at 5 min/reading)
+TREND_MIN_SPAN_SECONDS = 240    # Minimum time span needed to estimate (~one reading interval)
+TREND_MAX_GAP_SECONDS = 1200    # Gap between readings that resets the history (20 minutes)
+CHANGE_WINDOW_SECONDS = 900     # Window for get_change() (15 minutes)
+
+# Rate bucket thresholds in tenths of mg/dL/min (match trend_map in display.py)
+RATE_FORTY_FIVE = 5             # 0.5-1 mg/dL/min
+RATE_SINGLE = 10                # 1-2 mg/dL/min
+RATE_DOUBLE = 20                # >2 mg/dL/min
+
+# Dexcom trend strings that carry no usable direction
+UNCOMPUTED_TRENDS = ("NotComputable", "RateOutOfRange")
+
+# Dexcom trend strings by index (compact stores - renderer snapshots, the
+# glucose log - carry the index, not the string)
+TRENDS = (None, "DoubleUp", "SingleUp", "FortyFiveUp", "Flat", "FortyFiveDown",
+          "SingleDown", "DoubleDown", "NotComputable", "RateOutOfRange")
+
+
+def trend_index(trend):
+    """Index of a trend string in TRENDS (0 for None or unknown)"""
+    for index in range(1, len(TRENDS)):
+        if TRENDS[index] == trend:
+            return index
+    return 0
+
+
+def rate_to_trend(rate_x10):
+    """
+    Map a rate of change onto a Dexcom trend string
+
+    Args:
+        rate_x10: Rate in tenths of mg/dL/min (or None)
+
+    Returns:
+        str: Dexcom trend string (e.g., "SingleUp", "Flat") or None
+    """
+    if rate_x10 is None:
+        return None
+
+    magnitude = rate_x10 if rate_x10 >= 0 else -rate_x10
+    if magnitude <= RATE_FORTY_FIVE:
+        return "Flat"
+    rising = rate_x10 > 0
+    if magnitude <= RATE_SINGLE:
+        return "FortyFiveUp" if rising else "FortyFiveDown"
+    if magnitude <= RATE_DOUBLE:
+        return "SingleUp" if rising else "SingleDown"
+    return "DoubleUp" if rising else "DoubleDown"
+
+
+class TrendEstimator:
+    """
+    Incremental rate-of-change estimator over a ring buffer of readings
+
+    The rate is the slope between the oldest and newest reading in the buffer,
+    recomputed in O(1) whenever a new reading is added. Repeated polls of the
+    same reading are ignored, and gaps longer than TREND_MAX_GAP_SECONDS reset
+    the history so the estimate never spans a signal loss.
+    """
+
+    def __init__(self, size=TREND_HISTORY_SIZE):
+        """
+        Initialize estimator
+
+        Args:
+            size: Number of readings kept in the ring buffer (default: 4)
+        """
+        self.size = size
+        self.times = [0] * size
+        self.values = [0] * size
+        self.head = 0           # Index of next write
+        self.count = 0          # Number of valid readings
+        self.rate_x10 = None    # Latest rate in tenths of mg/dL/min
+        self.delta = None       # mg/dL since previous reading
+        self.change = None      # mg/dL over CHANGE_WINDOW_SECONDS
+
+    def add(self, timestamp, value):
+        """
+        Add a reading to the history
+
+        Args:
+            timestamp: Reading time in epoch seconds
+            value: Glucose in mg/dL
+
+        Returns:
+            bool: True if the reading was new, False if it was a repeat
+        """
+        if self.count:
+            last_time = self.times[(self.head - 1) % self.size]
+            if timestamp <= last_time:
+                return False
+            if timestamp - last_time > TREND_MAX_GAP_SECONDS:
+                self.count = 0
+
+        # Delta against the previous reading (history survives only short gaps)
+        if self.count:
+            self.delta = value - self.values[(self.head - 1) % self.size]
+        else:
+            self.delta = None
+
+        self.times[self.head] = timestamp
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.size
+        if self.count < self.size:
+            self.count += 1
+
+        self._update_rate()
+        return True
+
+    def _update_rate(self):
+        """Recompute rate and 15-minute change from oldest and newest buffered readings"""
+        self.rate_x10 = None
+        self.change = None
+        if self.count < 2:
+            return
+
+        newest = (self.head - 1) % self.size
+        oldest = (self.head - self.count) % self.size
+        span = self.times[newest] - self.times[oldest]
+        if span < TREND_MIN_SPAN_SECONDS:
+            return
+
+        # 600 = 60 seconds/minute * 10 (tenths)
+        delta = self.values[newest] - self.values[oldest]
+        if delta >= 0:
+            self.rate_x10 = (delta * 600 + span // 2) // span
+            self.change = (delta * CHANGE_WINDOW_SECONDS + span // 2) // span
+        else:
+            self.rate_x10 = -((-delta * 600 + span // 2) // span)
+            self.change = -((-delta * CHANGE_WINDOW_SECONDS + span // 2) // span)
+
+    def get_rate(self):
+        """Get rate of change in tenths of mg/dL/min (or None)"""
+        return self.rate_x10
+
+    def get_delta(self):
+        """Get change since the previous reading in mg/dL (or None)"""
+        return self.delta
+
+    def get_change(self):
+        """Get change over 15 minutes in mg/dL, from the buffered slope (or None)"""
+        return self.change
+
+    def get_trend(self):
+        """Get estimated Dexcom trend string (or None if not enough history)"""
+        return rate_to_trend(self.rate_x10)
+
+    def reset(self):
+        """Discard all buffered readings"""
+        self.count = 0
+        self.rate_x10 = None
+        self.delta = None
+        self.change = None
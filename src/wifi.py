@@ -0,0 +1,168 @@
+"""
+WiFi supervisor
+Keeps the station connected in the background without blocking the display
+
+WifiSupervisor.run() is an async task that polls wlan.status(), notices
+drops, and reconnects with exponential backoff plus random jitter (so a
+house full of devices doesn't retry in lockstep after a router reboot).
+Other tasks wait on the `connected` event - the glucose fetcher pauses
+while it is clear and resumes as soon as the link is back.
+
+The first connect starts straight away, with no scan (a scan blocks for a
+couple of seconds, and boot would wait on it). Once associated, the access
+point's BSSID and channel are read back from the driver and cached;
+reconnects ask for that access point on that channel, which skips the full
+scan. Each attempt falls back to a plain connect, and every successful
+connect refreshes the cache, so a replaced router is picked up without
+ever scanning.
+"""
+
+import time
+import random
+import network
+import uasyncio as asyncio
+
+# Configuration
+WIFI_CHECK_MS = 1000            # Link status poll period while connected
+CONNECT_POLL_MS = 250           # Status poll period while associating
+CONNECT_TIMEOUT_MS = 15000      # Give up on one connect attempt after this
+BACKOFF_MIN_MS = 1000           # First retry delay
+BACKOFF_MAX_MS = 60000          # Retry delay cap
+BACKOFF_JITTER_PCT = 25         # Up to this much extra random delay per retry
+
+# network.STAT_GOT_IP on rp2 (the constant isn't exported on every port)
+STAT_GOT_IP = getattr(network, 'STAT_GOT_IP', 3)
+
+
+class WifiSupervisor:
+    """Background WiFi connection manager for one station interface"""
+
+    def __init__(self, wlan, ssid, password, on_connect=None):
+        """
+        Initialize WiFi supervisor
+
+        Args:
+            wlan: network.WLAN(network.STA_IF) instance
+            ssid: Network name
+            password: Network password
+            on_connect: Optional callable run after every successful connect
+                (e.g., NTP sync); exceptions are logged and ignored
+        """
+        self.wlan = wlan
+        self.ssid = ssid
+        self.password = password
+        self.on_connect = on_connect
+        self.connected = asyncio.Event()
+        self.bssid = None               # Access point of the last connect (see _remember_ap)
+        self.channel = None
+        self.backoff_ms = BACKOFF_MIN_MS
+        self.attempts = 0               # Connect attempts since start
+        self.drops = 0                  # Link losses noticed while connected
+
+    def is_connected(self):
+        """True if the link is up with an IP address"""
+        return self.wlan.status() == STAT_GOT_IP
+
+    def start_connect(self):
+        """
+        Kick off association without waiting (e.g., before the self-test)
+
+        run() picks the attempt up if it is still in progress.
+        """
+        self.wlan.active(True)
+        self._connect()
+
+    async def run(self):
+        """Supervisor task: keep the link up for as long as the device runs"""
+        if self.is_connected():
+            self._connected()
+        while True:
+            if self.connected.is_set():
+                if self.is_connected():
+                    await asyncio.sleep_ms(WIFI_CHECK_MS)
+                    continue
+                self.drops += 1
+                self.connected.clear()
+                print(f"WiFi lost (status: {self.wlan.status()}) - reconnecting in background")
+
+            if await self._connect_once():
+                self._connected()
+                continue
+
+            # Exponential backoff with jitter
+            delay = self.backoff_ms + random.randint(0, self.backoff_ms * BACKOFF_JITTER_PCT // 100)
+            print(f"WiFi connect failed (status: {self.wlan.status()}), retrying in {delay} ms")
+            self.backoff_ms = min(self.backoff_ms * 2, BACKOFF_MAX_MS)
+            await asyncio.sleep_ms(delay)
+
+    async def _connect_once(self):
+        """
+        One association attempt, cached access point first
+
+        Returns:
+            bool: True if connected
+        """
+        self.attempts += 1
+        self.wlan.active(True)
+        # Pending attempt (start_connect, or the radio reassociating by itself)
+        if await self._wait_for_link():
+            return True
+        if self.bssid is not None:
+            self._connect()
+            if await self._wait_for_link():
+                return True
+        self.wlan.connect(self.ssid, self.password)
+        return await self._wait_for_link()
+
+    def _connect(self):
+        """Start associating, with the cached access point and channel if known"""
+        if self.bssid is None:
+            self.wlan.connect(self.ssid, self.password)
+        elif self.channel is None:
+            self.wlan.connect(self.ssid, self.password, bssid=self.bssid)
+        else:
+            self.wlan.connect(self.ssid, self.password, bssid=self.bssid, channel=self.channel)
+
+    async def _wait_for_link(self):
+        """Poll status until connected, failed or CONNECT_TIMEOUT_MS"""
+        start = time.ticks_ms()
+        while time.ticks_diff(time.ticks_ms(), start) < CONNECT_TIMEOUT_MS:
+            status = self.wlan.status()
+            if status == STAT_GOT_IP:
+                return True
+            if status < 0 or status == 0:
+                return False        # Failed or idle (no attempt in progress)
+            await asyncio.sleep_ms(CONNECT_POLL_MS)
+        return False
+
+    def _connected(self):
+        self.backoff_ms = BACKOFF_MIN_MS
+        self._remember_ap()
+        channel = f" on channel {self.channel}" if self.channel is not None else ""
+        print(f"WiFi connected{channel}! IP: {self.wlan.ifconfig()[0]}")
+        if self.on_connect:
+            try:
+                self.on_connect()
+            except Exception as e:
+                print(f"WiFi on_connect error: {e}")
+        self.connected.set()
+
+    def _remember_ap(self):
+        """
+        Cache the access point and channel we are associated with
+
+        Read back from the driver (no scan, nothing blocks). A port that
+        can't report the BSSID leaves the cache empty: plain connects.
+        """
+        try:
+            bssid = self.wlan.config('bssid')
+        except (ValueError, OSError):
+            bssid = None
+        try:
+            channel = self.wlan.config('channel') if bssid else None
+        except (ValueError, OSError):
+            channel = None
+        if bssid != self.bssid and self.bssid is not None:
+            print("WiFi: associated with a different access point, caching it")
+        self.bssid = bssid or None
+        self.channel = channel